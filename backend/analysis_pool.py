@@ -0,0 +1,204 @@
+"""
+Process-Pool AST Analysis
+Runs CPU-bound AST analysis for repository reviews in worker processes, so it
+uses every core and overlaps with Gemini calls instead of holding the GIL
+"""
+
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    from backend.ast_analyzer import ASTAnalysis, CodeAnalyzer
+except ImportError:
+    from ast_analyzer import ASTAnalysis, CodeAnalyzer
+
+ANALYSIS_POOL_WORKERS = int(os.getenv("ANALYSIS_POOL_WORKERS", "0")) or (os.cpu_count() or 1)
+# Per file, counted from submission and stretched by the files already queued on the pool;
+# a chunk that runs past it is abandoned and its worker killed
+ANALYSIS_TIMEOUT_SECONDS = float(os.getenv("ANALYSIS_TIMEOUT_SECONDS", "20"))
+# Small files are shipped to workers in chunks to save IPC round trips; big files go alone
+ANALYSIS_CHUNK_FILES = int(os.getenv("ANALYSIS_CHUNK_FILES", "4"))
+ANALYSIS_CHUNK_CHARS = int(os.getenv("ANALYSIS_CHUNK_CHARS", "65536"))
+
+_worker_analyzer = None
+
+
+def _analyze_chunk(items: Sequence[Tuple[str, str]]) -> List[ASTAnalysis]:
+    """Worker-process entry point: analyze (code, language) pairs with one analyzer per process"""
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = CodeAnalyzer()
+    return [_worker_analyzer.analyze_code(code, language) for code, language in items]
+
+
+def fallback_analysis(code: str, language: str, reason: str) -> ASTAnalysis:
+    return CodeAnalyzer()._fallback_analysis(code, language, reason)
+
+
+class _ChunkTask:
+    """One chunk of files in flight on a worker, with a deadline fixed when it was submitted"""
+
+    def __init__(self, pool: "AnalysisPool", items: Sequence[Tuple[str, str]]):
+        self.pool = pool
+        self.items = items
+        self.budget = 0.0
+        self.executor = None
+        self.future = None
+        self.deadline = None
+        self._results: Optional[List[ASTAnalysis]] = None
+        self._lock = threading.Lock()
+
+    def submit(self):
+        self.executor = None
+        # Time for its own files plus its share of every file already queued on the pool, by any caller
+        queued_ahead = self.pool._start(len(self.items))
+        self.budget = self.pool.timeout * (len(self.items) + queued_ahead / self.pool.max_workers)
+        self.deadline = time.monotonic() + self.budget
+        try:
+            self.executor = self.pool._get_executor()
+            self.future = self.executor.submit(self.pool.worker, self.items)
+        except (BrokenProcessPool, RuntimeError, OSError) as e:
+            print(f"⚠️  Could not submit AST analysis: {e}")
+            self.pool._finish(len(self.items))
+            self.pool.reset(self.executor)
+            self.future = None
+            return
+        # Finished, failed or cancelled with a recycled pool, the files leave the queue
+        self.future.add_done_callback(lambda _: self.pool._finish(len(self.items)))
+
+    def _fallbacks(self, reason: str) -> List[ASTAnalysis]:
+        return [fallback_analysis(code, language, reason) for code, language in self.items]
+
+    def _collect(self) -> List[ASTAnalysis]:
+        for attempt in range(2):
+            if self.future is None:
+                return self._fallbacks("analysis pool unavailable")
+            try:
+                return self.future.result(timeout=max(0.0, self.deadline - time.monotonic()))
+            except FutureTimeoutError:
+                # The worker is still busy with it: replace the pool so it can't hold a process forever
+                self.pool.recycle(self.executor)
+                print(f"⚠️  AST analysis timed out after {self.pool.timeout:.0f}s per file; analysis pool recycled")
+                return self._fallbacks(f"analysis timed out after {self.pool.timeout:.0f}s")
+            except (BrokenProcessPool, CancelledError):
+                if attempt == 0 and self.pool.was_recycled(self.executor):
+                    # Lost with a pool recycled for another chunk's timeout: run again on the new pool
+                    self.submit()
+                    continue
+                self.pool.reset(self.executor)
+                print("⚠️  AST analysis worker crashed")
+                return self._fallbacks("analysis worker crashed")
+            except Exception as e:
+                return self._fallbacks(str(e))
+        return self._fallbacks("analysis worker crashed")
+
+    def results(self) -> List[ASTAnalysis]:
+        with self._lock:
+            if self._results is None:
+                self._results = self._collect()
+            return self._results
+
+
+class PendingAnalysis:
+    """Handle for one file's analysis; result() never raises"""
+
+    def __init__(self, chunk: _ChunkTask, position: int):
+        self._chunk = chunk
+        self._position = position
+
+    def result(self) -> ASTAnalysis:
+        return self._chunk.results()[self._position]
+
+
+class AnalysisPool:
+    """Lazily started ProcessPoolExecutor for AST analysis with chunking, timeouts and fallback"""
+
+    # Module-level function run in the worker processes for each chunk
+    worker = staticmethod(_analyze_chunk)
+
+    def __init__(self, max_workers: Optional[int] = None, timeout: Optional[float] = None,
+                 chunk_files: Optional[int] = None, chunk_chars: Optional[int] = None):
+        self.max_workers = max(1, max_workers or ANALYSIS_POOL_WORKERS)
+        self.timeout = timeout or ANALYSIS_TIMEOUT_SECONDS
+        self.chunk_files = max(1, chunk_files or ANALYSIS_CHUNK_FILES)
+        self.chunk_chars = chunk_chars or ANALYSIS_CHUNK_CHARS
+        self._executor = None
+        self._recycled = weakref.WeakSet()
+        self.recycles = 0
+        self.queued_files = 0  # submitted to the pool and not finished yet
+        self._lock = threading.Lock()
+
+    def _start(self, count: int) -> int:
+        """Count files entering the pool; returns how many were queued ahead of them"""
+        with self._lock:
+            queued_ahead = self.queued_files
+            self.queued_files += count
+            return queued_ahead
+
+    def _finish(self, count: int):
+        with self._lock:
+            self.queued_files -= count
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def reset(self, broken=None):
+        """Drop the pool (only if it is still the broken one); the next submission starts a fresh one"""
+        with self._lock:
+            if broken is not None and broken is not self._executor:
+                return
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def recycle(self, executor):
+        """Kill a pool whose worker is stuck on a timed-out chunk and start fresh on the next submission.
+        Other chunks in flight on it are lost with it; was_recycled() lets them run again."""
+        with self._lock:
+            if executor is None or executor in self._recycled:
+                return
+            self._recycled.add(executor)
+            self.recycles += 1
+            if executor is self._executor:
+                self._executor = None
+        # shutdown() alone waits for running calls to finish, which a hung one never does
+        for process in list((getattr(executor, "_processes", None) or {}).values()):
+            process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def was_recycled(self, executor) -> bool:
+        with self._lock:
+            return executor is not None and executor in self._recycled
+
+    def _chunks(self, files: Sequence[Tuple[str, str]]) -> List[List[Tuple[str, str]]]:
+        chunks, current, current_chars = [], [], 0
+        for code, language in files:
+            size = len(code or "")
+            if current and (len(current) >= self.chunk_files or current_chars + size > self.chunk_chars):
+                chunks.append(current)
+                current, current_chars = [], 0
+            current.append((code, language))
+            current_chars += size
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def submit_many(self, files: Sequence[Tuple[str, str]]) -> List[PendingAnalysis]:
+        """Start analyzing (code, language) pairs; returns one handle per file, in order"""
+        handles = []
+        for items in self._chunks(files):
+            chunk = _ChunkTask(self, items)
+            chunk.submit()
+            handles.extend(PendingAnalysis(chunk, i) for i in range(len(items)))
+        return handles
+
+    def shutdown(self):
+        self.reset()
@@ -98,44 +98,201 @@ class CodeAnalyzer:
             best_practices=[]
         )
 
+# Node types counted by the Python analyzer
+BRANCH_NODES = (ast.If, ast.For, ast.While, ast.Try)
+NESTING_NODES = (ast.If, ast.For, ast.While, ast.Try, ast.With)
+LOOP_NODES = (ast.For, ast.While)
+DANGEROUS_FUNCTIONS = {'eval', 'exec', 'compile', '__import__'}
+
+class PythonAnalysisVisitor(ast.NodeVisitor):
+    """Collects structure, complexity, issues, security, performance and best-practice
+    findings in one depth-first traversal.
+    Findings that were historically reported in ast.walk (breadth-first) order are keyed
+    by (depth, visit order) and sorted on output, so reports read exactly as before."""
+
+    def __init__(self):
+        self.total_nodes = 0
+        self.complexity_score = 1  # Base complexity
+        self.max_nesting = 0
+        self.performance_issues = []
+        self._order = 0
+        self._depth = 0
+        self._nesting = 0
+        self._loop_depth = 0
+        self._functions = []
+        self._classes = []
+        self._imports = []
+        self._assignments = []
+        self._used_vars = set()
+        self._dangerous_calls = []
+
+    def visit(self, node):
+        self.total_nodes += 1
+        self._order += 1
+        self._key = (self._depth, self._order)
+
+        if isinstance(node, BRANCH_NODES):
+            self.complexity_score += 1
+        is_nested = isinstance(node, NESTING_NODES)
+        if is_nested:
+            self._nesting += 1
+            self.max_nesting = max(self.max_nesting, self._nesting)
+        is_loop = isinstance(node, LOOP_NODES)
+        if is_loop:
+            self._loop_depth += 1
+            if self._loop_depth > 2:
+                self.performance_issues.append(f"Deeply nested loops detected (depth: {self._loop_depth})")
+
+        self._depth += 1
+        try:
+            super().visit(node)
+        finally:
+            self._depth -= 1
+            if is_nested:
+                self._nesting -= 1
+            if is_loop:
+                self._loop_depth -= 1
+
+    def visit_FunctionDef(self, node):
+        self._functions.append((self._key, node))
+        self.generic_visit(node)
+
+    def visit_ClassDef(self, node):
+        self._classes.append((self._key, node))
+        self.generic_visit(node)
+
+    def visit_Import(self, node):
+        self._imports.append((self._key, [alias.name for alias in node.names]))
+        self.generic_visit(node)
+
+    def visit_ImportFrom(self, node):
+        self._imports.append((self._key, [node.module or 'relative_import']))
+        self.generic_visit(node)
+
+    def visit_Assign(self, node):
+        names = [target.id for target in node.targets if isinstance(target, ast.Name)]
+        if names:
+            self._assignments.append((self._key, (names, node.lineno)))
+        self.generic_visit(node)
+
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self._used_vars.add(node.id)
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        if isinstance(node.func, ast.Name) and node.func.id in DANGEROUS_FUNCTIONS:
+            self._dangerous_calls.append((self._key, node))
+        self.generic_visit(node)
+
+    # ------------------ Results ------------------
+
+    @staticmethod
+    def _in_walk_order(items):
+        return [value for _, value in sorted(items, key=lambda item: item[0])]
+
+    def structure(self) -> Dict[str, Any]:
+        functions = [{
+            'name': node.name,
+            'args': len(node.args.args),
+            'line': node.lineno,
+            'is_async': isinstance(node, ast.AsyncFunctionDef)
+        } for node in self._in_walk_order(self._functions)]
+        classes = [{
+            'name': node.name,
+            'methods': [n.name for n in node.body if isinstance(n, ast.FunctionDef)],
+            'line': node.lineno
+        } for node in self._in_walk_order(self._classes)]
+        imports = [name for names in self._in_walk_order(self._imports) for name in names]
+        return {
+            'functions': functions,
+            'classes': classes,
+            'imports': imports,
+            'total_functions': len(functions),
+            'total_classes': len(classes),
+            'total_imports': len(imports)
+        }
+
+    def complexity(self) -> Dict[str, Any]:
+        if self.complexity_score <= 5:
+            complexity_level = 'low'
+        elif self.complexity_score <= 10:
+            complexity_level = 'medium'
+        else:
+            complexity_level = 'high'
+        return {
+            'cyclomatic_complexity': self.complexity_score,
+            'max_nesting_depth': self.max_nesting,
+            'complexity_level': complexity_level
+        }
+
+    def issues(self) -> List[str]:
+        issues = []
+        for node in self._in_walk_order(self._functions):
+            if hasattr(node, 'end_lineno') and node.end_lineno:
+                func_length = node.end_lineno - node.lineno
+                if func_length > 50:
+                    issues.append(f"Line {node.lineno}: Function '{node.name}' is too long ({func_length} lines)")
+            if len(node.args.args) > 7:
+                issues.append(f"Line {node.lineno}: Function '{node.name}' has too many parameters ({len(node.args.args)})")
+
+        # Check for unused variables (basic check); later assignments in walk order win
+        assigned_vars = {}
+        for names, line in self._in_walk_order(self._assignments):
+            for name in names:
+                assigned_vars[name] = line
+        unused_vars = set(assigned_vars.keys()) - self._used_vars
+        if unused_vars:
+            unused_with_lines = [(var, assigned_vars[var]) for var in list(unused_vars)[:5]]
+            unused_str = ', '.join([f"'{var}' (line {line})" for var, line in unused_with_lines])
+            issues.append(f"Potentially unused variables: {unused_str}")
+        return issues
+
+    def security_concerns(self) -> List[str]:
+        return [f"Line {node.lineno}: Dangerous function '{node.func.id}' used"
+                for node in self._in_walk_order(self._dangerous_calls)]
+
+    def best_practices(self) -> List[str]:
+        suggestions = []
+        definitions = sorted(self._functions + self._classes, key=lambda item: item[0])
+        for _, node in definitions:
+            if isinstance(node, ast.FunctionDef):
+                if not node.name.islower() or '__' in node.name[1:-1]:
+                    if not node.name.startswith('__'):  # Allow magic methods
+                        suggestions.append(f"Line {node.lineno}: Function '{node.name}' should use snake_case naming")
+            elif not node.name[0].isupper():
+                suggestions.append(f"Line {node.lineno}: Class '{node.name}' should use PascalCase naming")
+
+        functions_without_docstrings = []
+        for node in self._in_walk_order(self._functions):
+            if node.body and not (isinstance(node.body[0], ast.Expr) and
+                                  isinstance(node.body[0].value, ast.Constant) and
+                                  isinstance(node.body[0].value.value, str)):
+                functions_without_docstrings.append(f"'{node.name}' (line {node.lineno})")
+        if functions_without_docstrings:
+            suggestions.append(f"Functions missing docstrings: {', '.join(functions_without_docstrings[:3])}")
+        return suggestions
+
 class PythonASTAnalyzer:
     """Python-specific AST analyzer"""
     
     def analyze(self, code: str) -> ASTAnalysis:
-        """Analyze Python code using AST"""
+        """Analyze Python code using AST (single traversal)"""
         try:
             tree = ast.parse(code)
             
-            # Extract structure
-            structure = self._extract_structure(tree)
-            
-            # Calculate complexity
-            complexity = self._calculate_complexity(tree)
-            
-            # Find issues
-            issues = self._find_issues(tree, code)
-            
-            # Calculate metrics
-            metrics = self._calculate_metrics(tree, code)
-            
-            # Security analysis
-            security_concerns = self._analyze_security(tree, code)
-            
-            # Performance analysis
-            performance_issues = self._analyze_performance(tree)
-            
-            # Best practices check
-            best_practices = self._check_best_practices(tree, code)
+            visitor = PythonAnalysisVisitor()
+            visitor.visit(tree)
             
             return ASTAnalysis(
                 language='python',
-                structure=structure,
-                complexity=complexity,
-                issues=issues,
-                metrics=metrics,
-                security_concerns=security_concerns,
-                performance_issues=performance_issues,
-                best_practices=best_practices
+                structure=visitor.structure(),
+                complexity=visitor.complexity(),
+                issues=visitor.issues(),
+                metrics=self._calculate_metrics(visitor, code),
+                security_concerns=self._analyze_security(visitor, code),
+                performance_issues=visitor.performance_issues,
+                best_practices=visitor.best_practices()
             )
             
         except SyntaxError as e:
@@ -150,121 +307,7 @@ class PythonASTAnalyzer:
                 best_practices=[]
             )
     
-    def _extract_structure(self, tree: ast.AST) -> Dict[str, Any]:
-        """Extract code structure from AST"""
-        functions = []
-        classes = []
-        imports = []
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                functions.append({
-                    'name': node.name,
-                    'args': len(node.args.args),
-                    'line': node.lineno,
-                    'is_async': isinstance(node, ast.AsyncFunctionDef)
-                })
-            elif isinstance(node, ast.ClassDef):
-                methods = [n.name for n in node.body if isinstance(n, ast.FunctionDef)]
-                classes.append({
-                    'name': node.name,
-                    'methods': methods,
-                    'line': node.lineno
-                })
-            elif isinstance(node, (ast.Import, ast.ImportFrom)):
-                if isinstance(node, ast.Import):
-                    imports.extend([alias.name for alias in node.names])
-                else:
-                    imports.append(node.module or 'relative_import')
-        
-        return {
-            'functions': functions,
-            'classes': classes,
-            'imports': imports,
-            'total_functions': len(functions),
-            'total_classes': len(classes),
-            'total_imports': len(imports)
-        }
-    
-    def _calculate_complexity(self, tree: ast.AST) -> Dict[str, Any]:
-        """Calculate cyclomatic complexity"""
-        complexity_score = 1  # Base complexity
-        max_nesting = 0
-        current_nesting = 0
-        
-        def count_complexity(node, nesting=0):
-            nonlocal complexity_score, max_nesting, current_nesting
-            current_nesting = max(current_nesting, nesting)
-            max_nesting = max(max_nesting, nesting)
-            
-            # Add complexity for control flow
-            if isinstance(node, (ast.If, ast.For, ast.While, ast.Try)):
-                complexity_score += 1
-            elif isinstance(node, ast.If) and node.orelse:
-                complexity_score += 1  # elif/else
-            
-            # Recursively process child nodes
-            for child in ast.iter_child_nodes(node):
-                if isinstance(child, (ast.If, ast.For, ast.While, ast.Try, ast.With)):
-                    count_complexity(child, nesting + 1)
-                else:
-                    count_complexity(child, nesting)
-        
-        count_complexity(tree)
-        
-        # Classify complexity
-        if complexity_score <= 5:
-            complexity_level = 'low'
-        elif complexity_score <= 10:
-            complexity_level = 'medium'
-        else:
-            complexity_level = 'high'
-        
-        return {
-            'cyclomatic_complexity': complexity_score,
-            'max_nesting_depth': max_nesting,
-            'complexity_level': complexity_level
-        }
-    
-    def _find_issues(self, tree: ast.AST, code: str) -> List[str]:
-        """Find potential code issues"""
-        issues = []
-        
-        # Check for long functions
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                # Estimate function length
-                if hasattr(node, 'end_lineno') and node.end_lineno:
-                    func_length = node.end_lineno - node.lineno
-                    if func_length > 50:
-                        issues.append(f"Line {node.lineno}: Function '{node.name}' is too long ({func_length} lines)")
-                
-                # Check for too many parameters
-                if len(node.args.args) > 7:
-                    issues.append(f"Line {node.lineno}: Function '{node.name}' has too many parameters ({len(node.args.args)})")
-        
-        # Check for unused variables (basic check)
-        assigned_vars = {}  # Store variable name -> line number
-        used_vars = set()
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name):
-                        assigned_vars[target.id] = node.lineno
-            elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
-                used_vars.add(node.id)
-        
-        unused_vars = set(assigned_vars.keys()) - used_vars
-        if unused_vars:
-            # Get line numbers for first few unused vars
-            unused_with_lines = [(var, assigned_vars[var]) for var in list(unused_vars)[:5]]
-            unused_str = ', '.join([f"'{var}' (line {line})" for var, line in unused_with_lines])
-            issues.append(f"Potentially unused variables: {unused_str}")
-        
-        return issues
-    
-    def _calculate_metrics(self, tree: ast.AST, code: str) -> Dict[str, Any]:
+    def _calculate_metrics(self, visitor: PythonAnalysisVisitor, code: str) -> Dict[str, Any]:
         """Calculate code metrics"""
         lines = code.split('\n')
         
@@ -272,84 +315,18 @@ class PythonASTAnalyzer:
             'total_lines': len(lines),
             'non_empty_lines': len([line for line in lines if line.strip()]),
             'comment_lines': len([line for line in lines if line.strip().startswith('#')]),
-            'total_nodes': len(list(ast.walk(tree)))
+            'total_nodes': visitor.total_nodes
         }
     
-    def _analyze_security(self, tree: ast.AST, code: str) -> List[str]:
+    def _analyze_security(self, visitor: PythonAnalysisVisitor, code: str) -> List[str]:
         """Basic security analysis"""
-        security_issues = []
-        
-        # Check for dangerous functions
-        dangerous_funcs = ['eval', 'exec', 'compile', '__import__']
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
-                if node.func.id in dangerous_funcs:
-                    line_num = node.lineno if hasattr(node, 'lineno') else 'unknown'
-                    security_issues.append(f"Line {line_num}: Dangerous function '{node.func.id}' used")
+        security_issues = visitor.security_concerns()
         
         # Check for SQL injection patterns
         if re.search(r'["\'].*%.*["\'].*%', code):
             security_issues.append("Potential SQL injection vulnerability (string formatting) - review string concatenation in SQL queries")
         
         return security_issues
-    
-    def _analyze_performance(self, tree: ast.AST) -> List[str]:
-        """Analyze performance issues"""
-        performance_issues = []
-        
-        # Check for nested loops
-        loop_nesting = 0
-        max_loop_nesting = 0
-        
-        def check_loops(node, depth=0):
-            nonlocal loop_nesting, max_loop_nesting
-            
-            if isinstance(node, (ast.For, ast.While)):
-                depth += 1
-                max_loop_nesting = max(max_loop_nesting, depth)
-                
-                if depth > 2:
-                    performance_issues.append(f"Deeply nested loops detected (depth: {depth})")
-            
-            for child in ast.iter_child_nodes(node):
-                check_loops(child, depth)
-        
-        check_loops(tree)
-        
-        return performance_issues
-    
-    def _check_best_practices(self, tree: ast.AST, code: str) -> List[str]:
-        """Check coding best practices"""
-        suggestions = []
-        
-        # Check naming conventions
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                line_num = node.lineno if hasattr(node, 'lineno') else 'unknown'
-                if not node.name.islower() or '__' in node.name[1:-1]:
-                    if not node.name.startswith('__'):  # Allow magic methods
-                        suggestions.append(f"Line {line_num}: Function '{node.name}' should use snake_case naming")
-            
-            elif isinstance(node, ast.ClassDef):
-                line_num = node.lineno if hasattr(node, 'lineno') else 'unknown'
-                if not node.name[0].isupper():
-                    suggestions.append(f"Line {line_num}: Class '{node.name}' should use PascalCase naming")
-        
-        # Check for docstrings
-        functions_without_docstrings = []
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef) and len(node.body) > 0:
-                if not (isinstance(node.body[0], ast.Expr) and 
-                       isinstance(node.body[0].value, ast.Constant) and 
-                       isinstance(node.body[0].value.value, str)):
-                    line_num = node.lineno if hasattr(node, 'lineno') else 'unknown'
-                    functions_without_docstrings.append(f"'{node.name}' (line {line_num})")
-        
-        if functions_without_docstrings:
-            suggestions.append(f"Functions missing docstrings: {', '.join(functions_without_docstrings[:3])}")
-        
-        return suggestions
 
 class JavaScriptASTAnalyzer:
     """JavaScript-specific AST analyzer (simplified)"""
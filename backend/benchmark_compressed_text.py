@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: plain Text vs CompressedText for review text columns on a synthetic corpus.
+The corpus is built from this repository's own Python sources (as submitted code and
+optimized code) and marker-delimited review text, written to two temporary SQLite files.
+
+Usage: python benchmark_compressed_text.py [--reviews N]
+"""
+
+import argparse
+import glob
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, Column, Integer, Text
+from sqlalchemy.orm import declarative_base, sessionmaker
+from compressed_text import CompressedText, TEXT_COMPRESSION_CODEC, TEXT_COMPRESSION_LEVEL
+
+SECTIONS = ["CODE_QUALITY", "KEY_FINDINGS", "SECURITY", "PERFORMANCE", "BEST_PRACTICES",
+            "RECOMMENDATIONS", "SYNTAX_ERRORS", "SEMANTIC_ERRORS", "EXPLANATION"]
+
+def make_models(text_type):
+    Base = declarative_base()
+
+    class BenchReview(Base):
+        __tablename__ = "reviews"
+        id = Column(Integer, primary_key=True)
+        code = Column(text_type, nullable=False)
+        review = Column(text_type)
+        optimized_code = Column(text_type)
+
+    return Base, BenchReview
+
+def build_corpus(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    sources = []
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            lines = f.read().split("\n")
+        sources.extend("\n".join(lines[i:i + 400]) for i in range(0, len(lines), 400))
+    corpus = []
+    for _ in range(count):
+        code = rng.choice(sources)
+        # Multi-file reviews concatenate several files
+        if rng.random() < 0.2:
+            code = "\n\n".join(f"# File: src/module_{i}.py\n{rng.choice(sources)}" for i in range(rng.randint(3, 10)))
+        lines = code.split("\n")
+        review = "\n".join(
+            f"###{section}###\n" + "\n".join(
+                f"• Line {rng.randint(1, len(lines))}: {rng.choice(lines).strip()[:80]} - consider refactoring this "
+                f"for readability and add error handling" for _ in range(rng.randint(1, 6)))
+            for section in SECTIONS)
+        corpus.append((code, review, code.replace("    ", "    ").replace("print(", "logger.info(")))
+    return corpus
+
+def run(label: str, text_type, corpus, path: str):
+    Base, BenchReview = make_models(text_type)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(engine)
+    raw_bytes = sum(len(value.encode("utf-8")) for row in corpus for value in row)
+
+    start = time.perf_counter()
+    with Session() as session:
+        for i in range(0, len(corpus), 200):
+            session.add_all(BenchReview(code=c, review=r, optimized_code=o) for c, r, o in corpus[i:i + 200])
+            session.commit()
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with Session() as session:
+        read_bytes = sum(len(row.code) + len(row.review) + len(row.optimized_code)
+                         for row in session.query(BenchReview).yield_per(500))
+    read_seconds = time.perf_counter() - start
+    engine.dispose()
+
+    size = os.path.getsize(path)
+    print(f"{label:>15}: db {size / 1e6:7.1f} MB | write {len(corpus) / write_seconds:7.0f} rows/s "
+          f"({raw_bytes / 1e6 / write_seconds:6.1f} MB/s of text) | read {len(corpus) / read_seconds:7.0f} rows/s "
+          f"({raw_bytes / 1e6 / read_seconds:6.1f} MB/s of text)")
+    assert read_bytes > 0
+    return size
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reviews", type=int, default=2000)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.reviews)
+    total = sum(len(value.encode("utf-8")) for row in corpus for value in row)
+    print(f"📊 {args.reviews} reviews, {total / 1e6:.1f} MB of text, codec {TEXT_COMPRESSION_CODEC} level {TEXT_COMPRESSION_LEVEL}")
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = run("Text", Text, corpus, os.path.join(tmp, "plain.db"))
+        compressed = run("CompressedText", CompressedText, corpus, os.path.join(tmp, "compressed.db"))
+    print(f"✅ Database size: {compressed / plain:.1%} of plain Text")
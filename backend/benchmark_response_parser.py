@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the legacy per-marker regex scans (~20 per response) vs parse_review_sections,
+which tokenizes a response once. Responses are built from repeated ###MARKER### sections.
+
+Usage: python benchmark_response_parser.py [--sizes 4 64 512]
+"""
+
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from response_parser import parse_review_sections
+from test_response_parser import LEGACY_MARKERS, build_large_response, legacy_parse_all
+
+def time_per_parse(parse, text: str, runs: int) -> float:
+    """Milliseconds per call, best of three rounds"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(runs):
+            parse(text)
+        best = min(best, (time.perf_counter() - start) / runs * 1000)
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 64, 512], help="Response sizes in KB")
+    args = parser.parse_args()
+
+    print("📊 legacy parse_section x20 vs parse_review_sections")
+    for kb in args.sizes:
+        text = build_large_response(kb)
+        single = parse_review_sections(text)
+        legacy = legacy_parse_all(text)
+        assert all(single.get(m, '') == legacy[m] for m in LEGACY_MARKERS)
+
+        runs = max(3, 2000 // kb)
+        legacy_ms = time_per_parse(legacy_parse_all, text, runs)
+        single_ms = time_per_parse(parse_review_sections, text, runs)
+        print(f"  {kb:>4} KB: legacy {legacy_ms:8.3f}ms  single-pass {single_ms:8.3f}ms  ({legacy_ms / single_ms:.1f}x)")
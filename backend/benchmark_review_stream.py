@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time to first section vs total latency of a single-file review, against a running
+server. Each run streams one review from /generate-review/stream and times the first `section`
+event and the `done` event on the client; --blocking also times /generate-review for comparison.
+Every run reviews a slightly different file, so neither the review cache nor the duplicate
+policy answers it.
+
+Usage: python benchmark_review_stream.py --token TOKEN [--url http://localhost:8000] [--file path]
+                                          [--runs N] [--blocking]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+import uuid
+
+import requests
+
+SAMPLE_CODE = '''def load_users(path):
+    users = []
+    for line in open(path):
+        name, age = line.split(",")
+        users.append({"name": name, "age": int(age)})
+    return users
+'''
+
+def stream_review(url: str, headers: dict, code: str) -> dict:
+    """Client-side timings of one streamed review, plus the ones the server reports"""
+    started = time.perf_counter()
+    timings = {"first_section_ms": None, "sections": 0}
+    with requests.post(f"{url}/generate-review/stream", json={"code": code}, headers=headers,
+                       stream=True, timeout=300) as response:
+        response.raise_for_status()
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:"):
+                data = json.loads(line[len("data:"):])
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                if event == "section":
+                    timings["sections"] += 1
+                    if timings["first_section_ms"] is None:
+                        timings["first_section_ms"] = elapsed_ms
+                        timings["server_first_section_ms"] = data.get("time_to_first_section_ms")
+                elif event == "done":
+                    timings["total_ms"] = elapsed_ms
+                    timings["server_total_ms"] = data.get("total_ms")
+                elif event == "error":
+                    raise RuntimeError(data.get("detail"))
+    return timings
+
+def blocking_review(url: str, headers: dict, code: str) -> float:
+    started = time.perf_counter()
+    response = requests.post(f"{url}/generate-review", json={"code": code}, headers=headers, timeout=300)
+    response.raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+def median(values):
+    return statistics.median(values) if values else float("nan")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="Bearer token of the user to review as")
+    parser.add_argument("--file", help="Code file to review (default: a short Python sample)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--blocking", action="store_true", help="Also time /generate-review")
+    args = parser.parse_args()
+
+    code = SAMPLE_CODE
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            code = f.read()
+    headers = {"Authorization": f"Bearer {args.token}"}
+
+    streamed, blocking = [], []
+    for run in range(args.runs):
+        timings = stream_review(args.url, headers, f"{code}\n# benchmark run {run} {uuid.uuid4().hex}\n")
+        streamed.append(timings)
+        print(f"  run {run + 1}: first section {timings['first_section_ms']:.0f}ms, "
+              f"done {timings['total_ms']:.0f}ms ({timings['sections']} sections)")
+        if args.blocking:
+            blocking.append(blocking_review(args.url, headers, f"{code}\n# blocking run {run} {uuid.uuid4().hex}\n"))
+
+    first = median([t["first_section_ms"] for t in streamed if t["first_section_ms"] is not None])
+    total = median([t["total_ms"] for t in streamed])
+    print(f"📊 {os.path.basename(args.file or 'sample.py')}, median of {args.runs}: "
+          f"first section {first:.0f}ms, stream done {total:.0f}ms ({first / total:.0%} of total)")
+    if blocking:
+        print(f"   /generate-review median {median(blocking):.0f}ms")
@@ -0,0 +1,155 @@
+"""
+AST-Aware Code Chunking
+Files too large for one review prompt are split at function/class boundaries (from the
+CodeAnalyzer structure, or top-level statements when there is none) into size-bounded chunks.
+Each chunk is reviewed on its own and the per-chunk sections are merged back into one
+response, with line numbers shifted from chunk-relative to file-relative.
+"""
+
+import bisect
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    from backend.response_parser import parse_review_sections
+except ImportError:
+    from response_parser import parse_review_sections
+
+# Chunks reviewed per file; anything past the last chunk is reported as not reviewed
+REVIEW_CHUNK_MAX_CHUNKS = int(os.getenv("REVIEW_CHUNK_MAX_CHUNKS", "8"))
+
+TRUNCATION_MARKER = "\n# ... (truncated)"
+
+# "Line 12", "line 12", "Lines 3-5", "lines 3 to 5"
+LINE_REFERENCE_RE = re.compile(r"\b([Ll]ines?)(\s+)(\d+)(?:(\s*(?:-|–|to)\s*)(\d+))?")
+NO_ERRORS_RE = re.compile(r"^\s*no (syntax|semantic) errors detected\.?\s*$", re.IGNORECASE)
+COMMENT_PREFIXES = ("@", "#", "//", "/*", "*")
+
+
+class CodeChunk(NamedTuple):
+    start_line: int  # 1-based, inclusive
+    end_line: int
+    text: str
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def boundary_lines(code: str, structure: Optional[dict] = None) -> List[int]:
+    """1-based lines a chunk may start at: function and class definitions, including the
+    decorators and comments directly above them"""
+    lines = code.split("\n")
+    starts = set()
+    if isinstance(structure, dict):
+        for item in list(structure.get("functions") or []) + list(structure.get("classes") or []):
+            line = item.get("line") if isinstance(item, dict) else None
+            if isinstance(line, int) and 1 <= line <= len(lines):
+                starts.add(line)
+    if not starts:
+        # No structure (other languages, syntax errors): top-level statements that follow a blank line
+        for i in range(1, len(lines)):
+            line = lines[i]
+            if (line.strip() and not line[0].isspace() and not lines[i - 1].strip()
+                    and not line.startswith(("}", ")", "]"))):
+                starts.add(i + 1)
+
+    boundaries = set()
+    for line in starts:
+        index = line - 1
+        while index > 0 and lines[index - 1].strip().startswith(COMMENT_PREFIXES):
+            index -= 1
+        boundaries.add(index + 1)
+    return sorted(line for line in boundaries if line > 1)
+
+
+def chunk_code(code: str, structure: Optional[dict] = None, max_chars: int = 4000,
+               max_chunks: int = REVIEW_CHUNK_MAX_CHUNKS) -> List[CodeChunk]:
+    """Split code into at most max_chunks chunks of up to max_chars, cutting only between lines.
+    A chunk ends before the last definition that fits, preferring top-level ones; a single line
+    longer than max_chars is cut with the truncation marker."""
+    lines = code.split("\n")
+    if len(code) <= max_chars:
+        return [CodeChunk(1, len(lines), code)]
+
+    # offsets[k] = characters before line k + 1 (each line plus its newline)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line) + 1)
+    boundaries = boundary_lines(code, structure)
+
+    chunks = []
+    start = 1
+    while start <= len(lines) and len(chunks) < max(1, max_chunks):
+        # Last line such that lines start..limit fit in max_chars (at least one line)
+        limit = max(start, bisect.bisect_right(offsets, offsets[start - 1] + max_chars + 1) - 1)
+        if limit >= len(lines):
+            end = len(lines)
+        else:
+            ends = [b - 1 for b in boundaries if start < b <= limit + 1]
+            top_level = [e for e in ends if _indent(lines[e]) == 0]
+            end = max(top_level or ends or [limit])
+        text = "\n".join(lines[start - 1:end])
+        if len(text) > max_chars:
+            text = text[:max_chars] + TRUNCATION_MARKER
+        chunks.append(CodeChunk(start, end, text))
+        start = end + 1
+    return chunks
+
+
+def excerpt_heading(chunk: CodeChunk, index: int, count: int, total_lines: int) -> str:
+    """Prompt heading telling the model which part of the file it is reviewing"""
+    return (f"**Code to Review (lines {chunk.start_line}-{chunk.end_line} of {total_lines}, part {index + 1} of {count}):**\n"
+            "Number lines from the first line of this excerpt (line 1). The rest of the file is reviewed "
+            "separately, so don't report definitions outside this excerpt as missing.")
+
+
+def offset_line_numbers(text: str, offset: int) -> str:
+    """Shift "Line N" / "Lines N-M" references by offset lines"""
+    if not offset or not text:
+        return text
+
+    def shift(match):
+        shifted = f"{match.group(1)}{match.group(2)}{int(match.group(3)) + offset}"
+        if match.group(5):
+            shifted += f"{match.group(4)}{int(match.group(5)) + offset}"
+        return shifted
+
+    return LINE_REFERENCE_RE.sub(shift, text)
+
+
+def merge_chunk_responses(chunks: List[CodeChunk], responses: List[str], total_lines: int) -> str:
+    """One marker-delimited response from the per-chunk responses, in chunk order"""
+    merged: Dict[str, Dict[int, str]] = {}
+    for index, response in enumerate(responses):
+        for name, content in parse_review_sections(response).items():
+            if content:
+                merged.setdefault(name, {})[index] = content
+
+    def labelled(by_chunk: Dict[int, str]) -> str:
+        return "\n\n".join(
+            f"**Lines {chunks[i].start_line}-{chunks[i].end_line}:**\n"
+            f"{offset_line_numbers(content, chunks[i].start_line - 1)}"
+            for i, content in sorted(by_chunk.items())
+        )
+
+    sections = {}
+    for name, by_chunk in merged.items():
+        if name.startswith("OPTIMIZED_CODE"):
+            # Chunks the model left out keep their original code, so the optimized file stays whole
+            sections[name] = "\n\n".join(by_chunk.get(i, chunk.text) for i, chunk in enumerate(chunks))
+        elif name in ("SYNTAX_ERRORS", "SEMANTIC_ERRORS"):
+            found = [offset_line_numbers(content, chunks[i].start_line - 1)
+                     for i, content in sorted(by_chunk.items()) if not NO_ERRORS_RE.match(content)]
+            sections[name] = "\n".join(found) if found else next(iter(by_chunk.values()))
+        else:
+            sections[name] = labelled(by_chunk)
+
+    last_reviewed = chunks[-1].end_line if chunks else 0
+    if last_reviewed < total_lines:
+        note = (f"⚠️ Lines {last_reviewed + 1}-{total_lines} were not reviewed: "
+                f"the file is larger than {len(chunks)} review chunks.")
+        sections["CODE_QUALITY"] = f"{sections['CODE_QUALITY']}\n\n{note}" if sections.get("CODE_QUALITY") else note
+
+    return "\n\n".join(f"###{name}###\n{content}" for name, content in sections.items())
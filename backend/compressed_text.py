@@ -0,0 +1,160 @@
+"""
+Compressed Text Columns
+Review code, review text and optimized code are large and compress well (source code,
+markdown, repeated section markers). CompressedText stores them as bytes with a small
+version header: a magic prefix, then the codec. Values too small to gain are stored raw
+behind the same header. Values written before the column was compressed (plain text, no
+header) are still read as is, so rows can be migrated in the background.
+"""
+
+import os
+import threading
+import zlib
+from typing import Optional, Union
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+try:
+    import zstandard  # optional; zlib is used without it
+except ImportError:
+    zstandard = None
+
+# Header: magic (a NUL byte never starts stored UTF-8 text), format version, codec
+MAGIC = b"\x00CT"
+FORMAT_VERSION = b"1"
+CODEC_RAW = b"r"
+CODEC_ZLIB = b"z"
+CODEC_ZSTD = b"s"
+HEADER_LENGTH = len(MAGIC) + 2
+
+TEXT_COMPRESSION_CODEC = os.getenv("TEXT_COMPRESSION_CODEC", "zstd" if zstandard else "zlib").lower()
+TEXT_COMPRESSION_LEVEL = int(os.getenv("TEXT_COMPRESSION_LEVEL", "6"))
+# Smaller values are stored raw: the header and codec framing would eat the savings
+TEXT_COMPRESSION_MIN_BYTES = int(os.getenv("TEXT_COMPRESSION_MIN_BYTES", "256"))
+
+
+class CompressionStats:
+    """Thread-safe byte counters for compress/decompress calls"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.stored_raw = 0
+        self.text_bytes_in = 0
+        self.stored_bytes_out = 0
+        self.decompressed = 0
+        self.legacy_reads = 0
+
+    def record_write(self, text_bytes: int, stored_bytes: int, compressed: bool):
+        with self._lock:
+            if compressed:
+                self.compressed += 1
+            else:
+                self.stored_raw += 1
+            self.text_bytes_in += text_bytes
+            self.stored_bytes_out += stored_bytes
+
+    def record_read(self, legacy: bool):
+        with self._lock:
+            if legacy:
+                self.legacy_reads += 1
+            else:
+                self.decompressed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "codec": TEXT_COMPRESSION_CODEC,
+                "level": TEXT_COMPRESSION_LEVEL,
+                "min_bytes": TEXT_COMPRESSION_MIN_BYTES,
+                "compressed_writes": self.compressed,
+                "raw_writes": self.stored_raw,
+                "text_bytes_written": self.text_bytes_in,
+                "stored_bytes_written": self.stored_bytes_out,
+                "write_ratio": round(self.stored_bytes_out / self.text_bytes_in, 3) if self.text_bytes_in else None,
+                "reads": self.decompressed,
+                "legacy_reads": self.legacy_reads,
+            }
+
+
+compression_stats = CompressionStats()
+
+
+def _compressor(codec: str, level: int):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("TEXT_COMPRESSION_CODEC=zstd needs the zstandard package")
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=level).compress
+    if codec == "zlib":
+        return CODEC_ZLIB, lambda data: zlib.compress(data, level)
+    raise ValueError(f"Unknown text compression codec '{codec}'")
+
+
+def compress_text(text: str, codec: str = TEXT_COMPRESSION_CODEC, level: int = TEXT_COMPRESSION_LEVEL,
+                  min_bytes: int = TEXT_COMPRESSION_MIN_BYTES) -> bytes:
+    """Header + compressed UTF-8, or header + raw UTF-8 when compressing doesn't pay off"""
+    data = text.encode("utf-8")
+    if len(data) >= min_bytes:
+        codec_id, compress = _compressor(codec, level)
+        packed = compress(data)
+        if len(packed) < len(data):
+            stored = MAGIC + FORMAT_VERSION + codec_id + packed
+            compression_stats.record_write(len(data), len(stored), compressed=True)
+            return stored
+    stored = MAGIC + FORMAT_VERSION + CODEC_RAW + data
+    compression_stats.record_write(len(data), len(stored), compressed=False)
+    return stored
+
+
+def is_compressed_value(value: Union[bytes, memoryview, str, None]) -> bool:
+    """Whether a stored value already carries the header (migrations skip those)"""
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    return isinstance(value, bytes) and value.startswith(MAGIC)
+
+
+def decompress_text(value: Union[bytes, memoryview, str]) -> str:
+    """The text of a stored value; values without the header are legacy plain text"""
+    if isinstance(value, str):
+        compression_stats.record_read(legacy=True)
+        return value
+    if isinstance(value, memoryview):
+        value = value.tobytes()
+    if not value.startswith(MAGIC):
+        compression_stats.record_read(legacy=True)
+        return value.decode("utf-8")
+    version, codec_id, payload = value[3:4], value[4:5], value[HEADER_LENGTH:]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compressed text format version {version!r}")
+    compression_stats.record_read(legacy=False)
+    if codec_id == CODEC_RAW:
+        return payload.decode("utf-8")
+    if codec_id == CODEC_ZLIB:
+        return zlib.decompress(payload).decode("utf-8")
+    if codec_id == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("This value was compressed with zstd; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(payload).decode("utf-8")
+    raise ValueError(f"Unknown compressed text codec {codec_id!r}")
+
+
+class CompressedText(TypeDecorator):
+    """Text stored compressed as bytes (BLOB / BYTEA). Reads and writes see plain str.
+    Compressed bytes can't be compared, searched or substr'd in SQL; do that in Python."""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return compress_text(value if isinstance(value, str) else str(value))
+
+    def result_processor(self, dialect, coltype):
+        # Skip LargeBinary's own processing: legacy rows can still hold str (SQLite TEXT values)
+        def process(value):
+            return None if value is None else decompress_text(value)
+        return process
+
+    def process_result_value(self, value, dialect) -> Optional[str]:
+        return None if value is None else decompress_text(value)
@@ -0,0 +1,305 @@
+"""
+Diff Review
+Reviews only what changed: a unified diff (pasted, or produced from two refs of a cloned
+repository) is split into per-file hunks, each change is widened to the function that
+encloses it (or a few lines of context), and only those regions go to the LLM.
+"""
+
+import ast
+import os
+import re
+import subprocess
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    from backend.code_chunking import boundary_lines
+    from backend.repo_discovery import REPO_FILE_MAX_CHARS, BINARY_SNIFF_BYTES
+except ImportError:
+    from code_chunking import boundary_lines
+    from repo_discovery import REPO_FILE_MAX_CHARS, BINARY_SNIFF_BYTES
+
+# Lines of context around a change that isn't inside a function
+DIFF_CONTEXT_LINES = int(os.getenv("DIFF_REVIEW_CONTEXT_LINES", "3"))
+# A changed function larger than this is reviewed as its changed lines plus context instead
+DIFF_REGION_MAX_CHARS = int(os.getenv("DIFF_REVIEW_REGION_MAX_CHARS", "4000"))
+# Rendered regions per file; later regions of the same file are reported as not reviewed
+DIFF_FILE_MAX_CHARS = int(os.getenv("DIFF_REVIEW_FILE_MAX_CHARS", "12000"))
+DIFF_MAX_FILES = int(os.getenv("DIFF_REVIEW_MAX_FILES", "50"))
+GIT_TIMEOUT_SECONDS = 300
+
+HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+@dataclass
+class Hunk:
+    old_start: int
+    new_start: int
+    # (tag, text): tag is " " (context), "+" (added) or "-" (removed)
+    lines: List[Tuple[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class FileDiff:
+    path: str  # path in the new tree (old path for deletions)
+    old_path: Optional[str] = None
+    hunks: List[Hunk] = field(default_factory=list)
+    is_new: bool = False
+    is_deleted: bool = False
+    is_binary: bool = False
+
+    def new_side(self) -> Tuple[Dict[int, str], Set[int], Dict[int, List[str]]]:
+        """(new line number -> text for lines the diff shows, added line numbers,
+        new line number -> removed lines that stood just before it)"""
+        lines: Dict[int, str] = {}
+        added: Set[int] = set()
+        removed: Dict[int, List[str]] = {}
+        for hunk in self.hunks:
+            new_no = hunk.new_start
+            for tag, text in hunk.lines:
+                if tag == "-":
+                    removed.setdefault(new_no, []).append(text)
+                    continue
+                lines[new_no] = text
+                if tag == "+":
+                    added.add(new_no)
+                new_no += 1
+        return lines, added, removed
+
+
+@dataclass
+class DiffRegion:
+    start_line: int  # new-file lines, 1-based, inclusive
+    end_line: int
+    complete: bool  # a whole definition, so it can be analyzed on its own
+
+
+def _strip_diff_path(path: str) -> Optional[str]:
+    path = path.strip().split("\t")[0]
+    if path == "/dev/null":
+        return None
+    if path.startswith('"') and path.endswith('"'):
+        path = path[1:-1]
+    return path[2:] if path[:2] in ("a/", "b/") else path
+
+
+def parse_unified_diff(text: str) -> List[FileDiff]:
+    """Files and hunks of a unified diff (git diff or diff -u output)"""
+    files: List[FileDiff] = []
+    current: Optional[FileDiff] = None
+    hunk: Optional[Hunk] = None
+    old_left = new_left = 0
+
+    for line in (text or "").replace("\r\n", "\n").split("\n"):
+        if hunk is not None and (old_left > 0 or new_left > 0):
+            tag, body = (line[:1] or " "), line[1:]
+            if tag == "\\":  # "\ No newline at end of file"
+                continue
+            if tag in (" ", "+", "-"):
+                hunk.lines.append((tag, body))
+                if tag != "+":
+                    old_left -= 1
+                if tag != "-":
+                    new_left -= 1
+                continue
+            hunk = None
+
+        if line.startswith("diff --git "):
+            current = FileDiff(path="")
+            files.append(current)
+            hunk = None
+            match = re.match(r'diff --git "?a/(.+?)"? "?b/(.+?)"?$', line)
+            if match:
+                current.old_path, current.path = match.group(1), match.group(2)
+        elif line.startswith("--- "):
+            if current is None or current.hunks:
+                current = FileDiff(path="")
+                files.append(current)
+            old_path = _strip_diff_path(line[4:])
+            current.old_path = old_path
+            current.is_new = old_path is None
+        elif line.startswith("+++ ") and current is not None:
+            new_path = _strip_diff_path(line[4:])
+            current.is_deleted = new_path is None
+            current.path = new_path or current.old_path or current.path
+        elif line.startswith("new file mode") and current is not None:
+            current.is_new = True
+        elif line.startswith("deleted file mode") and current is not None:
+            current.is_deleted = True
+        elif (line.startswith("Binary files ") or line.startswith("GIT binary patch")) and current is not None:
+            current.is_binary = True
+        elif current is not None:
+            match = HUNK_HEADER_RE.match(line)
+            if match:
+                old_left = int(match.group(2)) if match.group(2) is not None else 1
+                new_left = int(match.group(4)) if match.group(4) is not None else 1
+                hunk = Hunk(old_start=int(match.group(1)), new_start=int(match.group(3)))
+                current.hunks.append(hunk)
+    return [f for f in files if f.path]
+
+
+def _git(repo_dir: str, *args, env: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], cwd=repo_dir, env=env, capture_output=True, timeout=GIT_TIMEOUT_SECONDS)
+
+
+def fetch_ref(repo_dir: str, ref: str, env: Optional[Dict[str, str]] = None) -> str:
+    """Fetch one ref (branch, tag or commit) from origin into a clone_git_repository directory; returns its commit.
+    FETCH_HEAD is per worktree, so this doesn't disturb other checkouts of a shared mirror."""
+    result = _git(repo_dir, "fetch", "--depth", "1", "--no-tags", "origin", ref, env=env)
+    if result.returncode != 0:
+        raise Exception(f"Failed to fetch ref '{ref}': {result.stderr.decode('utf-8', 'replace')}")
+    return _git(repo_dir, "rev-parse", "FETCH_HEAD").stdout.decode().strip()
+
+
+def git_diff_refs(repo_dir: str, base: str, head: str, context_lines: int = DIFF_CONTEXT_LINES,
+                  fetch: Optional[Callable[[str], str]] = None,
+                  env: Optional[Dict[str, str]] = None) -> Tuple[str, str]:
+    """(unified diff from base to head, head commit). Both refs are fetched explicitly rather than
+    trusting the checkout, which falls back to the default branch for unknown branch names.
+    fetch(ref) replaces fetch_ref (the mirror cache fetches under its lock); env is passed to
+    git commands that may fetch missing blobs."""
+    fetch = fetch or (lambda ref: fetch_ref(repo_dir, ref, env=env))
+    base_commit = fetch(base)
+    head_commit = fetch(head)
+    result = _git(repo_dir, "diff", "--no-color", "--no-ext-diff", f"-U{context_lines}", base_commit, head_commit,
+                  env=env)
+    if result.returncode != 0:
+        raise Exception(f"Failed to diff '{base}' against '{head}': {result.stderr.decode('utf-8', 'replace')}")
+    return result.stdout.decode("utf-8", "replace"), head_commit
+
+
+def read_revision_file(repo_dir: str, commit: str, path: str, env: Optional[Dict[str, str]] = None) -> Optional[str]:
+    """A file's content at commit, truncated like discovered files; None for binary or non-UTF-8 files"""
+    result = _git(repo_dir, "show", f"{commit}:{path}", env=env)
+    if result.returncode != 0 or b"\0" in result.stdout[:BINARY_SNIFF_BYTES]:
+        return None
+    try:
+        content = result.stdout.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    if len(content) > REPO_FILE_MAX_CHARS:
+        content = content[:REPO_FILE_MAX_CHARS] + "\n# ... (file truncated)"
+    return content
+
+
+def python_definition_spans(code: str) -> List[Tuple[int, int]]:
+    """(first line including decorators, last line) of each top-level function and method"""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return []
+    spans = []
+
+    def collect(body):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+                spans.append((start, node.end_lineno))
+            elif isinstance(node, ast.ClassDef):
+                collect(node.body)  # methods are reviewed one by one, not the whole class
+
+    collect(tree.body)
+    return spans
+
+
+def _block_spans(code: str, lines: List[str]) -> List[Tuple[int, int]]:
+    """Top-level blocks between statement boundaries, for languages without a Python AST"""
+    starts = [1] + boundary_lines(code)
+    spans = []
+    for start, following in zip(starts, starts[1:] + [len(lines) + 1]):
+        end = following - 1
+        while end > start and not lines[end - 1].strip():
+            end -= 1
+        spans.append((start, end))
+    return spans
+
+
+def changed_regions(file_diff: FileDiff, new_content: Optional[str], language: str,
+                    context_lines: int = DIFF_CONTEXT_LINES,
+                    max_region_chars: int = DIFF_REGION_MAX_CHARS) -> List[DiffRegion]:
+    """Regions of the new file to review: each change widened to its enclosing function when
+    the full file is known and the function is small enough, else to its surrounding lines"""
+    shown, added, removed = file_diff.new_side()
+    touched = set(added)
+    for new_no in removed:
+        touched.add(max(1, new_no - 1) if new_no not in shown else new_no)
+    if not touched:
+        return []
+
+    if new_content is None:
+        # Only the diff is known: review each hunk's new side with the context the diff carries
+        regions = []
+        for hunk in file_diff.hunks:
+            new_lines = [no for no in range(hunk.new_start, hunk.new_start + len(hunk.lines)) if no in shown]
+            if new_lines:
+                regions.append(DiffRegion(min(new_lines), max(new_lines), complete=False))
+            elif any(tag == "-" for tag, _ in hunk.lines):
+                regions.append(DiffRegion(hunk.new_start, hunk.new_start, complete=False))
+        return _merge(regions)
+
+    lines = new_content.split("\n")
+    total = len(lines)
+    if (language or "").lower() == "python":
+        spans = python_definition_spans(new_content)
+    else:
+        spans = _block_spans(new_content, lines)
+
+    regions = []
+    for line in sorted(no for no in touched if no <= total):
+        span = next(((s, e) for s, e in spans if s <= line <= e), None)
+        if span and sum(len(lines[i]) + 1 for i in range(span[0] - 1, span[1])) <= max_region_chars:
+            regions.append(DiffRegion(span[0], span[1], complete=True))
+        else:
+            regions.append(DiffRegion(max(1, line - context_lines), min(total, line + context_lines), complete=False))
+    return _merge(regions)
+
+
+def _merge(regions: List[DiffRegion]) -> List[DiffRegion]:
+    merged: List[DiffRegion] = []
+    for region in sorted(regions, key=lambda r: (r.start_line, -r.end_line)):
+        if merged and region.start_line <= merged[-1].end_line + 1:
+            last = merged[-1]
+            if region.end_line > last.end_line:
+                merged[-1] = DiffRegion(last.start_line, region.end_line, last.complete and region.complete)
+            continue
+        merged.append(region)
+    return merged
+
+
+def region_text(region: DiffRegion, file_diff: FileDiff, new_content: Optional[str]) -> str:
+    """The region's new code, without diff markers (for AST analysis)"""
+    if new_content is not None:
+        return "\n".join(new_content.split("\n")[region.start_line - 1:region.end_line])
+    shown, _, _ = file_diff.new_side()
+    return "\n".join(shown[no] for no in range(region.start_line, region.end_line + 1) if no in shown)
+
+
+def render_regions(regions: List[DiffRegion], file_diff: FileDiff, new_content: Optional[str],
+                   max_chars: int = DIFF_FILE_MAX_CHARS) -> Tuple[str, List[DiffRegion]]:
+    """Regions as numbered lines, added lines marked "+" and removed lines "-", for the prompt.
+    Returns (text, regions that fit in max_chars)."""
+    shown, added, removed = file_diff.new_side()
+    content_lines = new_content.split("\n") if new_content is not None else None
+    blocks, rendered = [], []
+    size = 0
+    for region in regions:
+        out = [f"@@ lines {region.start_line}-{region.end_line} @@"]
+        # Removed lines are keyed by the new line they stood before, so a deletion just past
+        # the region's last line is shown with it (merged regions are never adjacent)
+        for no in range(region.start_line, region.end_line + 2):
+            out.extend(f"-{'':>5} | {text}" for text in removed.get(no, []))
+            if no > region.end_line:
+                break
+            if content_lines is not None:
+                text = content_lines[no - 1] if no <= len(content_lines) else None
+            else:
+                text = shown.get(no)
+            if text is not None:
+                out.append(f"{'+' if no in added else ' '}{no:>5} | {text}")
+        block = "\n".join(out)
+        if rendered and size + len(block) > max_chars:
+            break
+        blocks.append(block)
+        rendered.append(region)
+        size += len(block) + 1
+    return "\n".join(blocks), rendered
@@ -0,0 +1,63 @@
+"""
+Repository File Review Rows
+A multi-file review stores one repository_file_reviews row per file instead of one JSON blob,
+so a single file or a page of files can be read without loading the whole repository. This
+maps the file review dicts the review pipeline produces to row columns and back; keys without
+a column of their own (diff regions, reuse flags, ...) travel in the row's details JSON.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional
+
+FILE_REVIEW_PAGE_SIZE = int(os.getenv("FILE_REVIEW_PAGE_SIZE", "20"))
+FILE_REVIEW_MAX_PAGE_SIZE = int(os.getenv("FILE_REVIEW_MAX_PAGE_SIZE", "100"))
+
+# Searchable or small fields, readable without the file's text
+FILE_REVIEW_SUMMARY_COLUMNS = ("file_index", "file_path", "language", "rating", "review_failed",
+                               "content_hash", "prompt_hash")
+FILE_REVIEW_TEXT_COLUMNS = ("original_code", "review", "optimized_code", "explanation", "security_issues")
+FILE_REVIEW_COLUMNS = FILE_REVIEW_SUMMARY_COLUMNS + FILE_REVIEW_TEXT_COLUMNS
+# Derived from the parent review when a row is read back
+DERIVED_KEYS = ("total_files",)
+
+
+def file_review_columns(file_review: dict, file_index: Optional[int] = None) -> Dict[str, object]:
+    """Column values for one file review dict; unknown keys go to details"""
+    values = {column: file_review.get(column) for column in FILE_REVIEW_COLUMNS}
+    if file_index is not None:
+        values["file_index"] = file_index
+    values["review_failed"] = bool(values["review_failed"])
+    extras = {key: value for key, value in file_review.items()
+              if key not in FILE_REVIEW_COLUMNS and key not in DERIVED_KEYS}
+    values["details"] = json.dumps(extras) if extras else None
+    return values
+
+
+def file_review_from_columns(values: Dict[str, object], total_files: Optional[int] = None,
+                             summary: bool = False) -> dict:
+    """The file review dict stored by file_review_columns(); summary leaves out the file's text"""
+    columns = FILE_REVIEW_SUMMARY_COLUMNS if summary else FILE_REVIEW_COLUMNS
+    file_review = {column: values.get(column) for column in columns}
+    if not summary and values.get("details"):
+        try:
+            extras = json.loads(values["details"])
+        except (TypeError, ValueError):
+            extras = {}
+        if isinstance(extras, dict):
+            file_review.update({key: value for key, value in extras.items() if key not in file_review})
+    file_review["total_files"] = total_files
+    return file_review
+
+
+def parse_file_reviews_json(file_reviews_json: Optional[str]) -> List[dict]:
+    """File review dicts from a legacy Review.file_reviews blob ([] if missing or unreadable)"""
+    if not file_reviews_json:
+        return []
+    try:
+        file_reviews = json.loads(file_reviews_json)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(file_reviews, list):
+        return []
+    return [file_review for file_review in file_reviews if isinstance(file_review, dict)]
@@ -0,0 +1,63 @@
+"""
+Incremental Repository Review
+Decides which repository files can reuse their stored review from the previous
+review of the same repository/branch and which need a fresh AST + Gemini pass
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Optional, Union
+
+
+def content_hash(content: str) -> str:
+    """SHA-256 of a file's content as stored in file_reviews"""
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+def prompt_fingerprint(custom_prompt: str, model_name: str) -> str:
+    """Fingerprint of the effective prompt - a stored review is only reusable if it matches"""
+    return hashlib.sha256(f"{model_name}\n{custom_prompt}".encode("utf-8")).hexdigest()
+
+
+def index_previous_file_reviews(file_reviews: Union[str, List[dict], None]) -> Dict[str, dict]:
+    """Map file_path -> stored file review, from the review's file rows or a legacy
+    Review.file_reviews JSON blob"""
+    if not file_reviews:
+        return {}
+    if isinstance(file_reviews, str):
+        try:
+            file_reviews = json.loads(file_reviews)
+        except (json.JSONDecodeError, TypeError):
+            return {}
+    return {fr["file_path"]: fr for fr in file_reviews if isinstance(fr, dict) and fr.get("file_path")}
+
+
+def _is_reusable(previous: dict, new_hash: str, prompt_hash: str) -> bool:
+    if previous.get("review_failed"):
+        return False
+    # Reviews stored before hashes were recorded fall back to hashing the stored code
+    stored_hash = previous.get("content_hash") or content_hash(previous.get("original_code", ""))
+    if stored_hash != new_hash:
+        return False
+    # Without a prompt hash there is no telling which prompt produced the review, so it is redone
+    return previous.get("prompt_hash") == prompt_hash
+
+
+def reuse_previous_review(index: int, file_path: str, file_content: str, previous_by_path: Dict[str, dict],
+                          prompt_hash: str) -> Optional[dict]:
+    """The stored review of one discovered file, re-indexed for this run, if it can be reused.
+    total_files is left unset: it is only known once discovery finishes."""
+    new_hash = content_hash(file_content)
+    previous = previous_by_path.get(file_path)
+    if not previous or not _is_reusable(previous, new_hash, prompt_hash):
+        return None
+    file_review = dict(previous)
+    file_review.update({
+        "original_code": file_content,
+        "file_index": index,
+        "total_files": None,
+        "content_hash": new_hash,
+        "reused": True,
+    })
+    return file_review
+
@@ -0,0 +1,314 @@
+"""
+LLM Gateway
+Async entry point for every review LLM call. Wraps a pluggable backend (Gemini over pooled
+HTTP connections by default) with per-call deadlines, jittered retries on 429/5xx, a
+circuit breaker that fails fast while the provider is down, and an optional rate governor.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import nullcontext
+from typing import AsyncIterator, Optional
+
+import httpx
+
+try:
+    from backend.llm_governor import LLMGovernor, PRIORITY_INTERACTIVE, estimate_tokens
+except ImportError:
+    from llm_governor import LLMGovernor, PRIORITY_INTERACTIVE, estimate_tokens
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "8"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
+
+
+class LLMError(Exception):
+    """A failed LLM call; retryable for rate limits, server errors, timeouts and dropped connections"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class LLMTimeoutError(LLMError):
+    def __init__(self, message: str):
+        super().__init__(message, retryable=True)
+
+
+class CircuitOpenError(LLMError):
+    """Raised without calling the backend while the circuit breaker is open"""
+
+
+# ------------------ Circuit Breaker ------------------
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; after `reset_seconds` one probe call is let through"""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_seconds: float = LLM_BREAKER_RESET_SECONDS,
+                 clock=time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+        return self.state == self.CLOSED
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = self._clock()
+            self._probing = False
+
+
+# ------------------ Backends ------------------
+
+def _error_for_response(response: httpx.Response, body: str) -> LLMError:
+    status = response.status_code
+    retry_after = None
+    try:
+        retry_after = float(response.headers.get("retry-after", ""))
+    except ValueError:
+        pass
+    return LLMError(f"Gemini API returned {status}: {body[:500]}", status=status,
+                    retryable=status == 429 or status >= 500, retry_after=retry_after)
+
+
+def _response_text(payload: dict) -> str:
+    candidates = payload.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts)
+
+
+class GeminiHTTPBackend:
+    """Gemini REST API over one pooled httpx.AsyncClient per event loop"""
+
+    def __init__(self, api_key: Optional[str], model_name: str, base_url: str = GEMINI_API_BASE,
+                 max_connections: int = LLM_MAX_CONNECTIONS):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        # Connections belong to the event loop that opened them, so the client is rebuilt per loop
+        self._loop = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop or self._client is None:
+            self._loop = loop
+            limits = httpx.Limits(max_connections=self.max_connections,
+                                  max_keepalive_connections=self.max_connections)
+            # Deadlines are enforced by the gateway, per call rather than per socket operation
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=None,
+                                             headers={"x-goog-api-key": self.api_key or ""})
+        return self._client
+
+    def _request_body(self, prompt: str) -> dict:
+        return {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+
+    async def generate(self, prompt: str) -> str:
+        try:
+            response = await self._get_client().post(f"/models/{self.model_name}:generateContent",
+                                                     json=self._request_body(prompt))
+        except httpx.TransportError as e:
+            raise LLMError(f"Gemini API connection failed: {e!r}", retryable=True)
+        if response.status_code != 200:
+            raise _error_for_response(response, response.text)
+        return _response_text(response.json())
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        try:
+            async with self._get_client().stream("POST", f"/models/{self.model_name}:streamGenerateContent",
+                                                 params={"alt": "sse"}, json=self._request_body(prompt)) as response:
+                if response.status_code != 200:
+                    raise _error_for_response(response, (await response.aread()).decode("utf-8", "replace"))
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        text = _response_text(json.loads(line[len("data:"):]))
+                        if text:
+                            yield text
+        except httpx.TransportError as e:
+            raise LLMError(f"Gemini API connection failed: {e!r}", retryable=True)
+
+    async def aclose(self):
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+
+
+# ------------------ Gateway ------------------
+
+class LLMGateway:
+    """await gateway.generate(prompt) / async for text in gateway.stream(prompt)
+    With a governor, every attempt first waits for a slot in the caller's priority class."""
+
+    def __init__(self, backend, timeout: float = LLM_TIMEOUT_SECONDS, max_retries: int = LLM_MAX_RETRIES,
+                 retry_base: float = LLM_RETRY_BASE_SECONDS, retry_max: float = LLM_RETRY_MAX_SECONDS,
+                 breaker: Optional[CircuitBreaker] = None, governor: Optional[LLMGovernor] = None):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.breaker = breaker or CircuitBreaker()
+        self.governor = governor
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM circuit breaker is open; the provider is failing, try again shortly")
+
+    def _record(self, error: Optional[LLMError]):
+        # Client errors (bad request, auth) still mean the provider answered
+        if error is not None and error.retryable:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    async def _backoff(self, attempt: int, error: LLMError, deadline: float) -> bool:
+        """Sleep before the next attempt; False if attempts or the deadline are exhausted"""
+        if not error.retryable or attempt >= self.max_retries:
+            return False
+        # Full jitter, so callers that failed together don't retry together
+        delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+        if error.retry_after:
+            delay = max(delay, min(error.retry_after, self.retry_max))
+        if time.monotonic() + delay >= deadline:
+            return False
+        self.retries += 1
+        print(f"🔁 LLM call failed ({error}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+        return True
+
+    async def _within(self, awaitable, deadline: float):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            awaitable.close()
+            raise LLMTimeoutError("LLM call exceeded its deadline")
+        try:
+            return await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"LLM call exceeded its deadline ({remaining:.1f}s left when the attempt started)")
+
+    def _slot(self, user_id, priority: int, prompt: str):
+        if self.governor is None:
+            return nullcontext()
+        return self.governor.slot(user_id, priority, estimate_tokens(prompt))
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None, user_id=None,
+                       priority: int = PRIORITY_INTERACTIVE) -> str:
+        """The full response text; retries and backoff all fit inside one deadline"""
+        self.calls += 1
+        deadline = None
+        attempt = 0
+        while True:
+            async with self._slot(user_id, priority, prompt):
+                # Time spent queued behind the rate governor doesn't count against the deadline
+                if deadline is None:
+                    deadline = time.monotonic() + (timeout or self.timeout)
+                self._check_breaker()
+                try:
+                    text = await self._within(self.backend.generate(prompt), deadline)
+                except LLMError as e:
+                    self._record(e)
+                    error = e
+                else:
+                    self._record(None)
+                    return text
+            # Back off outside the slot so a sleeping retry doesn't hold capacity
+            if await self._backoff(attempt, error, deadline):
+                attempt += 1
+                continue
+            self.failures += 1
+            raise error
+
+    async def stream(self, prompt: str, timeout: Optional[float] = None, user_id=None,
+                     priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[str]:
+        """Response text chunks as they arrive. Only failures before the first chunk are retried."""
+        self.calls += 1
+        deadline = None
+        attempt = 0
+        while True:
+            async with self._slot(user_id, priority, prompt):
+                if deadline is None:
+                    deadline = time.monotonic() + (timeout or self.timeout)
+                self._check_breaker()
+                chunks = self.backend.stream(prompt).__aiter__()
+                started = False
+                try:
+                    while True:
+                        try:
+                            text = await self._within(chunks.__anext__(), deadline)
+                        except StopAsyncIteration:
+                            break
+                        if not started:
+                            started = True
+                            self._record(None)
+                        yield text
+                    if not started:
+                        self._record(None)
+                    return
+                except LLMError as e:
+                    if started:
+                        self.failures += 1
+                        raise
+                    self._record(e)
+                    error = e
+                finally:
+                    await chunks.aclose()
+            if await self._backoff(attempt, error, deadline):
+                attempt += 1
+                continue
+            self.failures += 1
+            raise error
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "breaker_state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "governor": self.governor.stats() if self.governor else None,
+        }
+
+    async def aclose(self):
+        close = getattr(self.backend, "aclose", None)
+        if close:
+            await close()
@@ -0,0 +1,247 @@
+"""
+LLM Rate Governor
+Caps LLM calls by concurrency, requests/min and estimated tokens/min before they reach the
+provider. Waiting calls are served by priority (single-file reviews before repository work),
+then round-robin across users, so one bulk job can't starve everyone else.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Optional
+
+try:
+    import fcntl  # POSIX only; shared limits are unavailable elsewhere
+except ImportError:
+    fcntl = None
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+# Limits shared by every process that points at the same directory (e.g. all gunicorn workers)
+LLM_SHARED_LIMIT_DIR = os.getenv("LLM_SHARED_LIMIT_DIR", "")
+LLM_SHARED_REQUESTS_PER_MINUTE = float(os.getenv("LLM_SHARED_REQUESTS_PER_MINUTE", "0"))
+LLM_SHARED_TOKENS_PER_MINUTE = float(os.getenv("LLM_SHARED_TOKENS_PER_MINUTE", "0"))
+# Review responses are long; counted up front because the real size is only known afterwards
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "2048"))
+
+PRIORITY_INTERACTIVE = 0  # single-file reviews - a user is waiting on the page
+PRIORITY_BULK = 1  # repository reviews
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk"}
+
+WAIT_SAMPLES = 1000
+
+
+def estimate_tokens(prompt: str) -> int:
+    """Rough prompt + response token count (~4 characters per token)"""
+    return len(prompt or "") // 4 + LLM_EXPECTED_OUTPUT_TOKENS
+
+
+class TokenBucket:
+    """Refills at per_minute/60 per second up to per_minute; a per_minute of 0 means unlimited"""
+
+    def __init__(self, per_minute: float, clock=time.monotonic):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self._clock = clock
+        self.tokens = per_minute
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (0 if it can be taken now)"""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        if self.capacity > 0:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+
+
+class SharedRateLimit:
+    """Request and token buckets kept in a flock-guarded state file, shared across processes"""
+
+    def __init__(self, directory: str, requests_per_minute: float, tokens_per_minute: float):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "llm_rate_limit.json")
+        self.limits = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+
+    def try_take(self, requests: float, tokens: float) -> float:
+        """Take from both buckets and return 0, or take nothing and return seconds to wait"""
+        with open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.load(f)
+                except ValueError:
+                    state = {}
+                now = time.time()
+                wait = 0.0
+                amounts = {"requests": requests, "tokens": tokens}
+                for name, per_minute in self.limits.items():
+                    if per_minute <= 0:
+                        continue
+                    bucket = state.get(name, {"tokens": per_minute, "updated": now})
+                    available = min(per_minute, bucket["tokens"] + (now - bucket["updated"]) * per_minute / 60.0)
+                    amount = min(amounts[name], per_minute)
+                    if available < amount:
+                        wait = max(wait, (amount - available) * 60.0 / per_minute)
+                    state[name] = {"tokens": available, "updated": now}
+                if wait == 0:
+                    for name, per_minute in self.limits.items():
+                        if per_minute > 0:
+                            state[name]["tokens"] -= min(amounts[name], per_minute)
+                f.seek(0)
+                f.truncate()
+                json.dump(state, f)
+                return wait
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class LLMGovernor:
+    """async with governor.slot(user_id, priority, estimated_tokens): <one LLM call>"""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+                 shared: Optional[SharedRateLimit] = None, clock=time.monotonic):
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests = TokenBucket(requests_per_minute, clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock)
+        self.shared = shared
+        self._clock = clock
+        self.in_flight = 0
+
+        # priority -> user -> waiting (future, estimated_tokens, enqueued_at), oldest first
+        self._queues: Dict[int, "OrderedDict[object, Deque[tuple]]"] = {p: OrderedDict() for p in PRIORITY_NAMES}
+        self._wakeup = None
+        self._loop = None
+        self._waits: Dict[int, Deque[float]] = {p: deque(maxlen=WAIT_SAMPLES) for p in PRIORITY_NAMES}
+        self._granted = {p: 0 for p in PRIORITY_NAMES}
+        self._total_wait = {p: 0.0 for p in PRIORITY_NAMES}
+        self._max_wait = {p: 0.0 for p in PRIORITY_NAMES}
+
+    def _bind_loop(self):
+        # Waiters are futures of one event loop; a new loop starts with an empty queue
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._queues = {p: OrderedDict() for p in PRIORITY_NAMES}
+            self._wakeup = None
+            self.in_flight = 0
+
+    def _next_waiter(self):
+        """Head of the highest-priority queue, rotating users round-robin"""
+        for priority, users in self._queues.items():
+            while users:
+                user_id, waiting = next(iter(users.items()))
+                if waiting:
+                    return priority, user_id, waiting
+                del users[user_id]
+        return None
+
+    def _dispatch(self):
+        self._wakeup = None
+        while self.in_flight < self.max_concurrency:
+            head = self._next_waiter()
+            if head is None:
+                return
+            priority, user_id, waiting = head
+            future, estimated_tokens, enqueued_at = waiting[0]
+            if future.done():  # cancelled while queued
+                waiting.popleft()
+                continue
+
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+            if wait == 0 and self.shared:
+                wait = self.shared.try_take(1, estimated_tokens)
+            if wait > 0:
+                # The head waits for the buckets; nothing may overtake it
+                self._wakeup = self._loop.call_later(wait, self._dispatch)
+                return
+
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+            waiting.popleft()
+            users = self._queues[priority]
+            users.move_to_end(user_id)  # the next grant at this priority goes to another user
+            if not waiting:
+                del users[user_id]
+            self.in_flight += 1
+            self._record_wait(priority, self._clock() - enqueued_at)
+            future.set_result(None)
+
+    def _record_wait(self, priority: int, waited: float):
+        self._waits[priority].append(waited)
+        self._granted[priority] += 1
+        self._total_wait[priority] += waited
+        self._max_wait[priority] = max(self._max_wait[priority], waited)
+
+    def _release(self):
+        self.in_flight -= 1
+        self._schedule()
+
+    def _schedule(self):
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user_id=None, priority: int = PRIORITY_INTERACTIVE, estimated_tokens: int = 0):
+        self._bind_loop()
+        future = self._loop.create_future()
+        self._queues[priority].setdefault(user_id, deque()).append((future, estimated_tokens, self._clock()))
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # granted just as the caller gave up
+            else:
+                self._schedule()
+            raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> dict:
+        by_priority = {}
+        for priority, name in PRIORITY_NAMES.items():
+            waits = sorted(self._waits[priority])
+            granted = self._granted[priority]
+            by_priority[name] = {
+                "granted": granted,
+                "queued": sum(len(waiting) for waiting in self._queues[priority].values()),
+                "avg_wait_ms": round(self._total_wait[priority] / granted * 1000, 1) if granted else 0.0,
+                "p95_wait_ms": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+                "max_wait_ms": round(self._max_wait[priority] * 1000, 1),
+            }
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "requests_per_minute": self.requests.capacity,
+            "tokens_per_minute": self.tokens.capacity,
+            "shared": self.shared is not None,
+            "queues": by_priority,
+        }
+
+
+def governor_from_env() -> LLMGovernor:
+    shared = None
+    if LLM_SHARED_LIMIT_DIR and fcntl:
+        shared = SharedRateLimit(LLM_SHARED_LIMIT_DIR, LLM_SHARED_REQUESTS_PER_MINUTE, LLM_SHARED_TOKENS_PER_MINUTE)
+    return LLMGovernor(shared=shared)
@@ -1,19 +1,20 @@
 # FORCE REDEPLOY - 2025-10-29 FIX: AST import error + Smart acceptance logic (>50% rule)
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import os
 import re
 import socket
+import asyncio
+import time
 import fnmatch
-import google.generativeai as genai
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Index, Boolean
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship
-from passlib.context import CryptContext
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Index, Boolean, func, or_
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import declarative_base, sessionmaker, relationship, defer, deferred, undefer, undefer_group
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 import uuid
@@ -21,13 +22,14 @@ import traceback
 import json
 import subprocess
 import tempfile
+import textwrap
 import shutil
 import smtplib
 import secrets
 import random
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 # Import ast_analyzer with fallback for different deployment environments
 try:
@@ -42,6 +44,68 @@ except ImportError:
         sys.path.insert(0, os.path.dirname(__file__))
         from ast_analyzer import CodeAnalyzer, format_ast_analysis_for_gemini
 
+try:
+    from backend.review_executor import ReviewExecutor
+    from backend.review_batch import check_batch_size, run_batch
+    from backend.analysis_pool import AnalysisPool
+    from backend.review_jobs import ReviewJobQueue, LeaseLost
+    from backend.response_parser import StreamingSectionParser, parse_review_sections, optimized_code_variants
+    from backend.incremental_review import (content_hash, prompt_fingerprint, index_previous_file_reviews,
+                                            reuse_previous_review)
+    from backend.repo_discovery import iter_code_files, select_candidate_paths
+    from backend.repo_cache import RepoMirrorCache, REPO_CACHE_ENABLED
+    from backend.sparse_checkout import SPARSE_CHECKOUT_ENABLED, PARTIAL_CLONE_FILTER, checkout_reviewable_paths
+    from backend.llm_gateway import LLMGateway, GeminiHTTPBackend
+    from backend.llm_governor import governor_from_env, PRIORITY_INTERACTIVE, PRIORITY_BULK
+    from backend.review_packing import FilePack, packable, build_packed_prompt, attribute_packed_response
+    from backend.code_chunking import CodeChunk, chunk_code, excerpt_heading, merge_chunk_responses, offset_line_numbers
+    from backend.diff_review import (DIFF_CONTEXT_LINES, DIFF_MAX_FILES, parse_unified_diff, git_diff_refs, fetch_ref,
+                                     read_revision_file, changed_regions, render_regions, region_text)
+    from backend.prompt_templates import PromptTemplate, PromptTemplateCache, prompt_options
+    from backend.password_hashing import PasswordHasher, PasswordHashBusy, make_password_context, forwarded_client
+    from backend.user_context import UserContext, UserContextCache, USER_CONTEXT_CACHE_ENABLED
+    from backend.token_claims import TokenClaims, TokenVersionCache, user_token_claims, parse_token_claims
+    from backend.pagination import PAST_REVIEWS_PREVIEW_CHARS, encode_cursor, decode_cursor, page_size
+    from backend.file_reviews import (FILE_REVIEW_PAGE_SIZE, FILE_REVIEW_MAX_PAGE_SIZE, FILE_REVIEW_SUMMARY_COLUMNS,
+                                      FILE_REVIEW_COLUMNS, file_review_columns, file_review_from_columns,
+                                      parse_file_reviews_json)
+    from backend.compressed_text import CompressedText, compression_stats
+    from backend.review_policy import (REVIEW_POLICY_DUPLICATE_WINDOW_SECONDS, SYNTAX_FIX_PROMPT_KEY, ReviewPolicyStats,
+                                       load_review_policy, store_review_policy, evaluate_review_policy,
+                                       deterministic_review, targeted_syntax_prompt)
+    from backend.review_cache import (ReviewCache, DatabaseCacheBacking, make_cache_key, REVIEW_CACHE_ENABLED,
+                                      REVIEW_CACHE_MAX_ENTRIES, REVIEW_CACHE_TTL_SECONDS, REVIEW_CACHE_PERSIST)
+except ImportError:
+    from review_executor import ReviewExecutor
+    from review_batch import check_batch_size, run_batch
+    from analysis_pool import AnalysisPool
+    from review_jobs import ReviewJobQueue, LeaseLost
+    from response_parser import StreamingSectionParser, parse_review_sections, optimized_code_variants
+    from incremental_review import content_hash, prompt_fingerprint, index_previous_file_reviews, reuse_previous_review
+    from repo_discovery import iter_code_files, select_candidate_paths
+    from repo_cache import RepoMirrorCache, REPO_CACHE_ENABLED
+    from sparse_checkout import SPARSE_CHECKOUT_ENABLED, PARTIAL_CLONE_FILTER, checkout_reviewable_paths
+    from llm_gateway import LLMGateway, GeminiHTTPBackend
+    from llm_governor import governor_from_env, PRIORITY_INTERACTIVE, PRIORITY_BULK
+    from review_packing import FilePack, packable, build_packed_prompt, attribute_packed_response
+    from code_chunking import CodeChunk, chunk_code, excerpt_heading, merge_chunk_responses, offset_line_numbers
+    from diff_review import (DIFF_CONTEXT_LINES, DIFF_MAX_FILES, parse_unified_diff, git_diff_refs, fetch_ref,
+                             read_revision_file, changed_regions, render_regions, region_text)
+    from prompt_templates import PromptTemplate, PromptTemplateCache, prompt_options
+    from password_hashing import PasswordHasher, PasswordHashBusy, make_password_context, forwarded_client
+    from user_context import UserContext, UserContextCache, USER_CONTEXT_CACHE_ENABLED
+    from token_claims import TokenClaims, TokenVersionCache, user_token_claims, parse_token_claims
+    from pagination import PAST_REVIEWS_PREVIEW_CHARS, encode_cursor, decode_cursor, page_size
+    from file_reviews import (FILE_REVIEW_PAGE_SIZE, FILE_REVIEW_MAX_PAGE_SIZE, FILE_REVIEW_SUMMARY_COLUMNS,
+                              FILE_REVIEW_COLUMNS, file_review_columns, file_review_from_columns,
+                              parse_file_reviews_json)
+    from compressed_text import CompressedText, compression_stats
+    from review_policy import (REVIEW_POLICY_DUPLICATE_WINDOW_SECONDS, SYNTAX_FIX_PROMPT_KEY, ReviewPolicyStats,
+                               load_review_policy, store_review_policy, evaluate_review_policy,
+                               deterministic_review, targeted_syntax_prompt)
+    from review_cache import (ReviewCache, DatabaseCacheBacking, make_cache_key, REVIEW_CACHE_ENABLED,
+                              REVIEW_CACHE_MAX_ENTRIES, REVIEW_CACHE_TTL_SECONDS, REVIEW_CACHE_PERSIST)
+
 # ------------------ Constants ------------------
 PREDEFINED_REJECTION_REASONS = [
     "Code has syntax errors",
@@ -136,6 +200,8 @@ class User(Base):
     otp_expires_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Carried in access tokens; bumping it revokes every token issued before
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     
     # Relationship to reviews
     reviews = relationship("Review", back_populates="user", cascade="all, delete-orphan")
@@ -208,14 +274,19 @@ class Review(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     
-    # Original submission data
-    code = Column(Text, nullable=False)
+    # Original submission data. The large text columns are stored compressed and only loaded
+    # (and decompressed) when first accessed; undefer_group("review_text") loads them up front.
+    code = deferred(Column(CompressedText, nullable=False), group="review_text")
+    # SHA-256 of code for single-file reviews, so resubmissions are found without decompressing
+    code_hash = Column(String(64), nullable=True)
     language = Column(String(50), nullable=True, index=True)
     
     # AI-generated review content
-    review = Column(Text, nullable=True)
+    review = deferred(Column(CompressedText, nullable=True), group="review_text")
+    # Uncompressed start of the review, so /past-reviews can cut its preview in SQL
+    review_preview = Column(Text, nullable=True)
     title = Column(String(200), nullable=True)
-    optimized_code = Column(Text, nullable=True)
+    optimized_code = deferred(Column(CompressedText, nullable=True), group="review_text")
     explanation = Column(Text, nullable=True)
     security_issues = Column(Text, nullable=True)
     rating = Column(Integer, nullable=True)  # 1-10 rating extracted from review
@@ -225,7 +296,9 @@ class Review(Base):
     repository_url = Column(String(500), nullable=True)  # Git repository URL
     repository_branch = Column(String(100), nullable=True)  # Git branch name
     total_files = Column(Integer, nullable=True)  # Total number of files in repo review
-    file_reviews = Column(Text, nullable=True)  # JSON structure containing individual file reviews
+    # Legacy JSON of the individual file reviews; new reviews use repository_file_reviews rows
+    # (migrate_repository_file_reviews.py moves old ones over)
+    file_reviews = deferred(Column(CompressedText, nullable=True), group="review_text")
     
     # User feedback
     feedback = Column(Text, nullable=True)
@@ -242,10 +315,14 @@ class Review(Base):
     
     # Relationship to user
     user = relationship("User", back_populates="reviews")
+    # One row per file of a multi-file review
+    file_rows = relationship("RepositoryFileReview", back_populates="parent_review", cascade="all, delete-orphan",
+                             passive_deletes=True, order_by="RepositoryFileReview.file_index")
     
     # Add indexes for common queries
     __table_args__ = (
         Index('ix_reviews_user_created', 'user_id', 'created_at'),
+        Index('ix_reviews_user_code_hash_created', 'user_id', 'code_hash', 'created_at'),
         Index('ix_reviews_language_created', 'language', 'created_at'),
         Index('ix_reviews_status_created', 'status', 'created_at'),
         Index('ix_reviews_repo_type', 'is_repository_review', 'created_at'),
@@ -324,6 +401,74 @@ class UserPreferences(Base):
         Index('ix_user_preferences_user_id', 'user_id'),
     )
 
+class ReviewCacheEntry(Base):
+    __tablename__ = "review_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)  # SHA-256 of code + language + prompt + model
+    response = Column(Text, nullable=False)  # Raw Gemini response text
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class ReviewJob(Base):
+    __tablename__ = "review_jobs"
+    
+    id = Column(String(36), primary_key=True)  # UUID handed to the client
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    job_type = Column(String(20), nullable=False)  # "review" or "repository"
+    status = Column(String(20), default="queued", nullable=False, index=True)  # queued, running, completed, failed
+    payload = Column(Text, nullable=False)  # JSON request body (CodeInput / GitRepoInput)
+    progress_done = Column(Integer, default=0, nullable=False)  # Files reviewed so far
+    progress_total = Column(Integer, nullable=True)  # Total files, known once discovery finishes
+    review_id = Column(Integer, ForeignKey("reviews.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text, nullable=True)
+    owner = Column(String(100), nullable=True)  # Worker process running the job (host:pid:nonce)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)  # Lease renewed by the owner; a stale one means the owner died
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ReviewJobFile(Base):
+    __tablename__ = "review_job_files"
+    
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(36), ForeignKey("review_jobs.id", ondelete="CASCADE"), nullable=False)
+    file_index = Column(Integer, nullable=False)
+    result = Column(Text, nullable=False)  # JSON file review, readable by every worker until the job completes
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_review_job_files_job_file", "job_id", "file_index", unique=True),
+    )
+
+class RepositoryFileReview(Base):
+    __tablename__ = "repository_file_reviews"
+    
+    id = Column(Integer, primary_key=True)
+    review_id = Column(Integer, ForeignKey("reviews.id", ondelete="CASCADE"), nullable=False)
+    file_index = Column(Integer, nullable=False)  # 0-based position in the review, as shown in the UI
+    file_path = Column(String(1000), nullable=True)
+    language = Column(String(50), nullable=True)
+    rating = Column(Integer, nullable=True)
+    review_failed = Column(Boolean, default=False, nullable=False)
+    content_hash = Column(String(64), nullable=True)  # Incremental reviews reuse rows whose hashes match
+    prompt_hash = Column(String(64), nullable=True)
+    
+    original_code = Column(CompressedText, nullable=True)
+    review = Column(CompressedText, nullable=True)
+    optimized_code = Column(CompressedText, nullable=True)
+    explanation = Column(Text, nullable=True)
+    security_issues = Column(Text, nullable=True)
+    details = Column(Text, nullable=True)  # JSON of the remaining file review keys (diff regions, ...)
+    
+    parent_review = relationship("Review", back_populates="file_rows")
+    
+    __table_args__ = (
+        Index('ix_repository_file_reviews_review_file', 'review_id', 'file_index', unique=True),
+    )
+
 # Update User model to include preferences relationship
 User.preferences = relationship("UserPreferences", back_populates="user", uselist=False)
 
@@ -349,8 +494,81 @@ except Exception as e:
     print(f"⚠️  Startup warning (non-blocking): {e}")
 
 # ------------------ Gemini Setup ------------------
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel("gemini-2.5-flash")
+GEMINI_MODEL_NAME = "gemini-2.5-flash"
+# Every review LLM call goes through the gateway: pooled connections, deadlines, retries, circuit breaker,
+# and a governor that rate-limits calls and serves single-file reviews ahead of repository work
+review_llm = LLMGateway(GeminiHTTPBackend(GOOGLE_API_KEY, GEMINI_MODEL_NAME), governor=governor_from_env())
+
+# Re-reviews fetch into a cached mirror instead of cloning from scratch
+repo_mirror_cache = RepoMirrorCache() if REPO_CACHE_ENABLED else None
+
+# Shared across requests so the in-flight limits hold for all users, not per call
+repo_review_executor = ReviewExecutor()
+# CPU-bound AST analysis for repository reviews runs in worker processes
+ast_analysis_pool = AnalysisPool()
+
+# Identical code + identical effective prompt => identical review, so reuse the response
+review_cache = ReviewCache(
+    max_entries=REVIEW_CACHE_MAX_ENTRIES,
+    ttl_seconds=REVIEW_CACHE_TTL_SECONDS,
+    backing=DatabaseCacheBacking(SessionLocal, ReviewCacheEntry, REVIEW_CACHE_TTL_SECONDS) if REVIEW_CACHE_PERSIST else None,
+    enabled=REVIEW_CACHE_ENABLED,
+)
+
+# Review prompts depend only on a few preference values; each combination is compiled once
+prompt_template_cache = PromptTemplateCache()
+
+# Empty, unparseable and just-resubmitted code is answered without the full review prompt
+review_policy_stats = ReviewPolicyStats()
+
+def review_cache_key(code: str, language: str, custom_prompt: str, file_path: Optional[str] = None,
+                     excerpt: Optional[str] = None) -> str:
+    """file_path is given for repository and diff reviews, whose prompts name the file, and excerpt
+    for one chunk of a longer file, whose prompt carries the chunk's heading"""
+    return make_cache_key(code, language, custom_prompt, GEMINI_MODEL_NAME, file_path, excerpt)
+
+def packed_review_cache_key(packed_prompt: str) -> str:
+    """A packed response answers its whole prompt (every file, path and the custom prompt), so it is
+    cached under that prompt as a whole, never as single-file reviews"""
+    return make_cache_key(packed_prompt, "packed", "", GEMINI_MODEL_NAME)
+
+async def generate_review_text(prompt: str, code: str, language: str, custom_prompt: str, user_id: int,
+                               priority: int = PRIORITY_INTERACTIVE, file_path: Optional[str] = None,
+                               excerpt: Optional[str] = None) -> str:
+    """Call Gemini for a review, serving identical (code, language, prompt, model, file path, chunk heading)
+    requests from the cache"""
+    cache_key = review_cache_key(code, language, custom_prompt, file_path, excerpt)
+    # The cache may fall through to the database, so it is consulted off the event loop
+    cached = await asyncio.to_thread(review_cache.get, cache_key)
+    if cached is not None:
+        print(f"♻️ Review cache hit ({cache_key[:12]}) - skipping Gemini call")
+        return cached
+    
+    response_text = (await review_llm.generate(prompt, user_id=user_id, priority=priority)).strip()
+    await asyncio.to_thread(review_cache.put, cache_key, response_text)
+    return response_text
+
+async def generate_chunked_review_text(chunk_prompts: List[str], chunks: List[CodeChunk], language: str, custom_prompt: str,
+                                       user_id: int, total_lines: int, priority: int = PRIORITY_INTERACTIVE,
+                                       file_path: Optional[str] = None) -> str:
+    """Review the chunks of a long file concurrently (each cached on its own) and merge them into one response.
+    chunk_prompts are built with code_review_headings(chunks, total_lines); each chunk is cached under its heading,
+    since the same text at another line range or part number gets a different prompt."""
+    if len(chunks) == 1:
+        return await generate_review_text(chunk_prompts[0], chunks[0].text, language, custom_prompt, user_id, priority,
+                                          file_path)
+    responses = await asyncio.gather(*(
+        generate_review_text(prompt, chunk.text, language, custom_prompt, user_id, priority, file_path, heading)
+        for prompt, chunk, heading in zip(chunk_prompts, chunks, code_review_headings(chunks, total_lines))
+    ))
+    print(f"🧩 Reviewed a {total_lines}-line file in {len(chunks)} chunks")
+    return merge_chunk_responses(chunks, responses, total_lines)
+
+def code_review_headings(chunks: List[CodeChunk], total_lines: int) -> List[str]:
+    """Prompt heading for each chunk; a file that fits in one chunk keeps the plain heading"""
+    if len(chunks) == 1:
+        return ["**Code to Review:**"]
+    return [excerpt_heading(chunk, index, len(chunks), total_lines) for index, chunk in enumerate(chunks)]
 
 # ------------------ Pattern Learning Functions ------------------
 import json
@@ -543,6 +761,7 @@ def learn_from_feedback(db, user_id: int, feedback_text: str):
     preferences.feedback_history = json.dumps(feedback_history[-10:])  # Keep last 10 feedback entries
     preferences.updated_at = datetime.utcnow()
     db.commit()
+    user_context_cache.invalidate(user_id=user_id)
     
     if changes_made:
         print(f"✅ Preferences updated for user {user_id}:")
@@ -576,224 +795,14 @@ def get_latest_improvement_suggestion(db, user_id: int) -> str:
         print(f"⚠️ Error fetching improvement suggestions: {e}")
         return None
 
+def custom_prompt_template(preferences: UserPreferences, is_repository_review: bool = False, detailed_mode: bool = False,
+                           user_feedback: str = None) -> PromptTemplate:
+    """The compiled review prompt (and its fingerprint) for these preferences, built once per distinct combination"""
+    return prompt_template_cache.get(prompt_options(preferences, is_repository_review, detailed_mode, user_feedback))
+
 def generate_custom_prompt(preferences: UserPreferences, is_repository_review: bool = False, detailed_mode: bool = False, user_feedback: str = None) -> str:
     """Generate a comprehensive code review prompt based on user preferences and previous feedback"""
-    
-    # Start with user feedback incorporation if available
-    feedback_section = ""
-    if user_feedback:
-        feedback_section = f"""
-📝 **IMPORTANT - User Feedback from Previous Review:**
-The user previously provided this feedback to improve future code reviews:
-"{user_feedback}"
-
-Please incorporate this feedback and adjust your review approach accordingly. Pay special attention to the points mentioned above.
----
-
-"""
-    
-    if detailed_mode or preferences.detailed_explanations:
-        # Professional, comprehensive multi-level analysis mode
-        analysis_depth = """
-You are an advanced Code Review Engine. Analyze the code across multiple dimensions:
-
-1️⃣ **Syntax & Language Rules** - syntax errors, deprecated APIs, formatting issues
-2️⃣ **Logic & Semantics** - logical errors, edge cases, control flow problems
-3️⃣ **Architecture & Design** - SOLID principles, design patterns, modularity
-4️⃣ **Performance** - inefficient loops, memory issues, blocking operations
-5️⃣ **Security** - hardcoded secrets, injection risks, weak crypto, missing validation
-6️⃣ **Maintainability** - complexity, coupling, scalability, technical debt"""
-        
-        # Best practices section removed per user request
-        # if preferences.best_practices:
-        #     analysis_depth += "\n6️⃣ **Best Practices** - code standards, naming conventions, documentation"
-        
-        # analysis_depth += "\n7️⃣ **Maintainability** - complexity, coupling, scalability, technical debt"
-        
-    else:
-        # Simple, beginner-friendly mode
-        analysis_depth = "You are a friendly code teacher who explains things super simply! 😊"
-    
-    # Build structured output with SEPARATE markers for each subsection (Option 1)
-    prompt_parts = [
-        analysis_depth,
-        "",
-        "Analyze this code and return SEPARATE sections with exact markers. Each section will be independently reviewable:",
-        "",
-        "###CODE_QUALITY###",
-        "📋 **Code Quality Summary:**",
-        "- Overall assessment in 2-3 sentences",
-        "- Quality score: X/10",
-        "- Use emojis: ✅ (good), ⚠️ (needs improvement), ❌ (problems)",
-        "- Keep under 60 words",
-        "",
-        "###KEY_FINDINGS###",
-        "🔍 **Key Findings:**",
-        "List each issue with:",
-        "  • Severity: 🔴 CRITICAL | 🟠 HIGH | 🟡 MEDIUM | 🟢 LOW",
-        "  • Category: Syntax/Logic/Architecture/Performance/Security/Style",
-        "  • **Line number (if applicable)**: Specify 'Line X:' for each issue",
-        "  • Brief description + specific fix",
-        "Group by severity. If no issues: 'No critical issues found! ✅'",
-        "Max 150 words.",
-        ""
-    ]
-    
-    # Now add conditional sections based on preferences
-    
-    # Security as SEPARATE section (conditional)
-    if preferences.security_analysis:
-        prompt_parts.extend([
-            "###SECURITY###",
-            "�️ **Security Analysis:**",
-            "- Check: hardcoded secrets, injection risks, validation gaps, auth issues, data exposure",
-            "- List findings with severity (🔴 CRITICAL | 🟠 HIGH | 🟡 MEDIUM | 🟢 LOW)",
-            "- If no concerns: 'No security issues detected ✅'",
-            "- Max 100 words",
-            "",
-        ])
-    
-    # Performance as SEPARATE section (conditional)
-    if preferences.performance_analysis:
-        prompt_parts.extend([
-            "###PERFORMANCE###",
-            "⚡ **Performance Analysis:**",
-            "- Inefficient operations, algorithms, loops",
-            "- Memory management concerns",
-            "- Blocking or expensive operations",
-            "- Optimization opportunities",
-            "- If efficient: 'Performance looks good ✅'",
-            "- Max 100 words",
-            "",
-        ])
-    
-    # Architecture as SEPARATE section (conditional - detailed mode)
-    if detailed_mode:
-        prompt_parts.extend([
-            "###ARCHITECTURE###",
-            "🏗️ **Architecture & Design:**",
-            "- Design pattern usage/violations",
-            "- SOLID principles assessment",
-            "- Modularity, coupling, cohesion",
-            "- Scalability concerns",
-            "- Max 120 words",
-            "",
-        ])
-    
-    # Best practices section REMOVED per user request
-    # if preferences.best_practices:
-    #     prompt_parts.extend([
-    #         "###BEST_PRACTICES###",
-    #         "📖 **Best Practices:**",
-    #         "- Code standards compliance",
-    #         "- Naming conventions",
-    #         "- Documentation quality",
-    #         "- Error handling patterns",
-    #         "- If compliant: 'Follows best practices ✅'",
-    #         "- Max 80 words",
-    #         "",
-    #     ])
-    
-    # Optimized code section (if user wants it)
-    if preferences.code_optimization:
-        # Check if user requested multiple optimized versions
-        num_optimized = 1  # Default
-        if preferences.learning_patterns:
-            try:
-                patterns = json.loads(preferences.learning_patterns)
-                num_optimized = patterns.get("optimized_code_count", 1)
-            except:
-                pass
-        
-        if num_optimized > 1:
-            # Generate multiple optimized code sections
-            for i in range(1, num_optimized + 1):
-                approach = 'performance-optimized' if i == 1 else 'readability-optimized' if i == 2 else f'alternative approach {i}'
-                prompt_parts.extend([
-                    f"###OPTIMIZED_CODE_{i}###",
-                    f"CRITICAL: Provide ONLY the {approach} code. NO explanatory text. NO inline comments. NO docstrings. NO descriptions.",
-                    f"Pure executable code ONLY. Start directly with the code syntax (def, class, function, import, etc.).",
-                    f"Remove ALL comments and explanations. Code should be clean and ready to run as-is.",
-                    ""
-                ])
-        else:
-            # Single optimized code section
-            prompt_parts.extend([
-                "###OPTIMIZED_CODE###",
-                "CRITICAL: Provide ONLY the optimized code. NO explanatory text. NO inline comments. NO docstrings. NO descriptions.",
-                "Pure executable code ONLY. Start directly with the code syntax (def, class, function, import, etc.).",
-                "Remove ALL comments and explanations. Code should be clean and ready to run as-is.",
-                ""
-            ])
-    
-    # Explanation section - MUCH SHORTER NOW
-    prompt_parts.extend([
-        "###EXPLANATION###",
-        "📚 **Quick Summary:**",
-        "- What the code does in 1-2 sentences (MAX 40 words total)",
-        "- Keep it concise and clear",
-    ])
-    
-    prompt_parts.append("")
-    
-    # Add priority recommendations as SEPARATE section
-    prompt_parts.extend([
-        "###RECOMMENDATIONS###",
-        "🎯 **Top Priority Actions:**",
-        "- List 2-3 most critical improvements",
-        "- Focus on high-impact changes",
-        "- If code is excellent: 'Code quality is excellent! Minor suggestions: [if any]'",
-        "- Max 80 words",
-        "",
-    ])
-    
-    # Add Syntax Errors section (ALWAYS include - critical for error detection)
-    prompt_parts.extend([
-        "###SYNTAX_ERRORS###",
-        "🔴 **Syntax Errors:**",
-        "Analyze the code for ALL syntax errors including:",
-        "- Missing colons, semicolons, brackets, parentheses, quotes",
-        "- Invalid operators or syntax (e.g., ^ instead of ** in Python)",
-        "- Malformed statements or declarations",
-        "- Incorrect indentation (for Python)",
-        "- Incomplete code blocks",
-        "- Invalid keywords or language-specific syntax violations",
-        "**CRITICAL: MUST include line numbers for EVERY error found!**",
-        "Format: List each error as '• Line X: [Error description]' where X is the line number",
-        "Example: '• Line 5: Missing closing parenthesis'",
-        "If NO syntax errors found, respond with EXACTLY: 'No syntax errors detected.'",
-        "Be thorough - check every line carefully and ALWAYS specify the line number!",
-        "",
-    ])
-    
-    # Add Semantic Errors section (ALWAYS include - critical for logic errors)
-    prompt_parts.extend([
-        "###SEMANTIC_ERRORS###",
-        "🟠 **Semantic Errors:**",
-        "Analyze the code for ALL semantic/logic errors including:",
-        "- Undefined variables or functions being used",
-        "- Type mismatches or incorrect data types",
-        "- Function calls with wrong number of arguments",
-        "- Name mismatches (e.g., defining function_name but calling functionname)",
-        "- Unreachable code or dead code paths",
-        "- Logical errors (incorrect conditions, wrong operators)",
-        "- Missing return statements where expected",
-        "- Incorrect scope or variable access issues",
-        "**CRITICAL: MUST include line numbers for EVERY error found!**",
-        "Format: List each error as '• Line X: [Error description]' where X is the line number",
-        "Example: '• Line 12: Variable 'result' used before definition'",
-        "If NO semantic errors found, respond with EXACTLY: 'No semantic errors detected.'",
-        "Be thorough - analyze the entire logic flow and ALWAYS specify the line number!",
-        "",
-    ])
-    
-    # Context note
-    if is_repository_review:
-        prompt_parts.append("\n💡 Note: This is part of a larger project. Focus on integration and consistency.")
-    
-    # Combine feedback section with the rest of the prompt
-    final_prompt = feedback_section + "\n".join(prompt_parts)
-    return final_prompt
+    return custom_prompt_template(preferences, is_repository_review, detailed_mode, user_feedback).text
 
 # ------------------ FastAPI App ------------------
 app = FastAPI()
@@ -833,17 +842,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
 
 # ------------------ Security Setup ------------------
-# Use bcrypt with explicit configuration for compatibility
-pwd_context = CryptContext(
-    schemes=["bcrypt"],
-    deprecated="auto",
-    bcrypt__rounds=12  # Explicit rounds for bcrypt
-)
+# bcrypt at PASSWORD_BCRYPT_ROUNDS (12 by default); hashes at another cost are upgraded on login
+pwd_context = make_password_context()
+# Hashing and verification run on a bounded pool so a login burst can't stall the event loop
+password_hasher = PasswordHasher(pwd_context)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # ------------------ Models ------------------
@@ -851,6 +859,15 @@ class CodeInput(BaseModel):
     code: str
     filename: str | None = None
 
+class BatchCodeInput(BaseModel):
+    files: List[CodeInput]
+
+class ReviewPolicyInput(BaseModel):
+    # Per rule: "skip" (answer without the LLM), "targeted" (syntax_error only: a small fix-it prompt) or "llm"
+    empty_code: Optional[str] = None
+    syntax_error: Optional[str] = None
+    duplicate: Optional[str] = None
+
 class FeedbackInput(BaseModel):
     review_id: int
     feedback: str
@@ -875,43 +892,94 @@ class UserOut(BaseModel):
     username: str
     email: str
 
+DEFAULT_INCLUDE_PATTERNS = [
+    "*.py", "*.js", "*.ts", "*.jsx", "*.tsx", 
+    "*.java", "*.cpp", "*.c", "*.h", "*.cs", 
+    "*.php", "*.rb", "*.go", "*.rs", "*.kt"
+]
+DEFAULT_EXCLUDE_PATTERNS = [
+    "node_modules/**", "*.min.js", "dist/**", "build/**",
+    "__pycache__/**", "*.pyc", ".git/**", "vendor/**"
+]
+
 class GitRepoInput(BaseModel):
     repo_url: str
     branch: str = "main"
-    include_patterns: List[str] = [
-        "*.py", "*.js", "*.ts", "*.jsx", "*.tsx", 
-        "*.java", "*.cpp", "*.c", "*.h", "*.cs", 
-        "*.php", "*.rb", "*.go", "*.rs", "*.kt"
-    ]
-    exclude_patterns: List[str] = [
-        "node_modules/**", "*.min.js", "dist/**", "build/**",
-        "__pycache__/**", "*.pyc", ".git/**", "vendor/**"
-    ]
+    include_patterns: List[str] = DEFAULT_INCLUDE_PATTERNS
+    exclude_patterns: List[str] = DEFAULT_EXCLUDE_PATTERNS
     max_files: int = 50
+    incremental: bool = False  # Reuse stored reviews of files unchanged since the last review of this repo/branch
+
+class DiffReviewInput(BaseModel):
+    # Either a unified diff (git diff / diff -u output)...
+    diff: Optional[str] = None
+    # ...or a repository and two refs (branch, tag or commit); the diff runs from base to head
+    repo_url: Optional[str] = None
+    base: Optional[str] = None
+    head: Optional[str] = None
+    include_patterns: List[str] = DEFAULT_INCLUDE_PATTERNS
+    exclude_patterns: List[str] = DEFAULT_EXCLUDE_PATTERNS
+    context_lines: int = DIFF_CONTEXT_LINES
 
 # ------------------ Helpers ------------------
-def verify_password(plain_password, hashed_password):
+def password_busy_error(e: PasswordHashBusy) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+def client_address(request: Optional[Request]) -> Optional[str]:
+    """The caller's address: the connecting peer, or the client a trusted proxy forwarded for"""
+    if request is None or not request.client:
+        return None
+    return forwarded_client(request.client.host, request.headers.get("x-forwarded-for"))
+
+def verify_password(plain_password, hashed_password, client: Optional[str] = None) -> bool:
+    """Blocking check on the password pool, for sync handlers (async ones await password_hasher.verify)"""
     try:
-        # Truncate password to 72 bytes max (bcrypt limit)
-        password_bytes = plain_password.encode('utf-8')[:72]
-        password_truncated = password_bytes.decode('utf-8', errors='ignore')
-        return pwd_context.verify(password_truncated, hashed_password)
-    except Exception as e:
-        print(f"Password verification error: {e}")
-        return False
+        return password_hasher.verify_blocking(plain_password or "", hashed_password, client)[0]
+    except PasswordHashBusy as e:
+        raise password_busy_error(e)
 
-def get_password_hash(password):
+def find_login_user(username: str) -> Optional[User]:
+    """The (detached) user row for a login; its session is closed before the slow password check"""
+    db = SessionLocal()
     try:
-        # Truncate password to 72 bytes max (bcrypt limit)
-        # Encode to UTF-8 first, then truncate by bytes, not characters
-        password_bytes = password.encode('utf-8')[:72]
-        password_truncated = password_bytes.decode('utf-8', errors='ignore')
-        
-        hashed = pwd_context.hash(password_truncated)
+        return db.query(User).filter(User.username == username).first()
+    finally:
+        db.close()
+
+def store_rehashed_password(user_id: int, old_hash: str, new_hash: str) -> bool:
+    """Replace a hash made at an outdated bcrypt cost, unless the password changed in the meantime"""
+    db = SessionLocal()
+    try:
+        updated = db.query(User).filter(User.id == user_id, User.hashed_password == old_hash).update(
+            {User.hashed_password: new_hash}, synchronize_session=False
+        )
+        db.commit()
+        return updated > 0
+    finally:
+        db.close()
+
+async def check_user_password(user: User, password: str, client: Optional[str]) -> bool:
+    """Verify a user's password on the password pool, storing a rehash if the bcrypt cost has changed.
+    No database connection is held while waiting, so a login burst can't drain the connection pool."""
+    try:
+        valid, new_hash = await password_hasher.verify(password or "", user.hashed_password, client)
+    except PasswordHashBusy as e:
+        raise password_busy_error(e)
+    if valid and new_hash and await asyncio.to_thread(store_rehashed_password, user.id, user.hashed_password, new_hash):
+        user_context_cache.invalidate(username=user.username)
+        print(f"🔐 Rehashed password for {user.username} at the current bcrypt cost")
+    return valid
+
+def get_password_hash(password, client: Optional[str] = None):
+    """Blocking hash on the password pool (passwords are truncated to bcrypt's 72-byte limit)"""
+    try:
+        hashed = password_hasher.hash_blocking(password, client)
         if hashed is None:
             print(f"⚠️  Warning: pwd_context.hash returned None for password")
             raise ValueError("Password hashing returned None")
         return hashed
+    except PasswordHashBusy as e:
+        raise password_busy_error(e)
     except Exception as e:
         print(f"🔴 CRITICAL: Password hashing error: {e}")
         print(f"   pwd_context type: {type(pwd_context)}")
@@ -924,7 +992,67 @@ def create_access_token(data: dict):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def create_user_token(user: User) -> str:
+    """Access token carrying the user's id and token version as signed claims"""
+    return create_access_token(data=user_token_claims(user.id, user.username, user.token_version or 0))
+
+# Current token version per user id; logout bumps it
+token_version_cache = TokenVersionCache()
+
+def load_token_version(user_id: int) -> Optional[int]:
+    db = SessionLocal()
+    try:
+        row = db.query(User.token_version).filter(User.id == user_id).first()
+        return (row[0] or 0) if row else None
+    finally:
+        db.close()
+
+def revoke_user_tokens(user_id: int) -> int:
+    """Bump the user's token version so every token issued so far is rejected; returns the new version"""
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.id == user_id).update(
+            {User.token_version: func.coalesce(User.token_version, 0) + 1}, synchronize_session=False
+        )
+        db.commit()
+        version = db.query(User.token_version).filter(User.id == user_id).scalar() or 0
+    finally:
+        db.close()
+    token_version_cache.set(user_id, version)
+    user_context_cache.invalidate(user_id=user_id)
+    return version
+
+# The user row, preferences and latest improvement suggestion, cached per username for a short TTL
+user_context_cache = UserContextCache(enabled=USER_CONTEXT_CACHE_ENABLED)
+
+def load_user_context(username: str) -> Optional[UserContext]:
+    """Load the user row, preferences and latest improvement suggestion in one session (None for unknown users)"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        if not user:
+            return None
+        preferences = get_user_preferences(db, user.id)
+        latest_suggestion = get_latest_improvement_suggestion(db, user.id)
+        if sa_inspect(user).expired_attributes:
+            db.refresh(user)  # creating the preferences row committed and expired it
+        return UserContext(user, preferences, latest_suggestion)
+    finally:
+        db.close()
+
+def resolve_user_context(username: str) -> Optional[UserContext]:
+    return user_context_cache.get(username, lambda: load_user_context(username))
+
+def user_context_for(user: User) -> UserContext:
+    """The cached context of an already authenticated user"""
+    context = resolve_user_context(user.username)
+    if context is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return context
+
+async def get_current_claims(token: str = Depends(oauth2_scheme)) -> TokenClaims:
+    """The caller's verified claims. Tokens with uid/ver claims cost no query while the version
+    is cached; older tokens resolve the user through the context cache (as version 0)."""
     if SessionLocal is None:
         raise HTTPException(status_code=500, detail="Database not configured")
 
@@ -937,125 +1065,37 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("role"):
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.username == username).first()
-        if not user:
+    claims = parse_token_claims(payload)
+    if claims is None:
+        context = resolve_user_context(username)
+        if context is None:
             raise credentials_exception
-        return user
-    finally:
-        db.close()
-
-# ------------------ Git Helper Functions ------------------
-
-def clone_git_repository(repo_url: str, branch: str = "main") -> str:
-    """Clone a Git repository to a temporary directory."""
-    temp_dir = tempfile.mkdtemp(prefix="git_review_")
-    try:
-        # Clone the repository
-        if branch:
-            result = subprocess.run(
-                ["git", "clone", "--branch", branch, "--depth", "1", repo_url, temp_dir],
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout
-            )
-        else:
-            result = subprocess.run(
-                ["git", "clone", "--depth", "1", repo_url, temp_dir],
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
-        
-        if result.returncode != 0:
-            raise Exception(f"Git clone failed: {result.stderr}")
-        
-        print(f"Successfully cloned repository to: {temp_dir}")
-        return temp_dir
-    
-    except subprocess.TimeoutExpired:
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-        raise Exception("Git clone timed out after 5 minutes")
-    except Exception as e:
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-        raise Exception(f"Failed to clone repository: {str(e)}")
+        claims = TokenClaims(context.user.id, username, 0)
+    if not token_version_cache.is_current(claims, lambda: load_token_version(claims.user_id)):
+        raise credentials_exception
+    return claims
+
+async def get_current_user_context(claims: TokenClaims = Depends(get_current_claims)) -> UserContext:
+    context = resolve_user_context(claims.username)
+    if context is None or context.user.id != claims.user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return context
 
-def get_code_files(repo_path: str, include_patterns: List[str], exclude_patterns: List[str], max_files: int) -> Dict[str, str]:
-    """Extract code files from the cloned repository."""
-    import fnmatch
-    
-    code_files = {}
-    file_count = 0
-    
-    for root, dirs, files in os.walk(repo_path):
-        # Skip excluded directories
-        dirs[:] = [d for d in dirs if not any(fnmatch.fnmatch(d, pattern) for pattern in exclude_patterns)]
-        
-        for file in files:
-            if file_count >= max_files:
-                break
-                
-            file_path = os.path.join(root, file)
-            relative_path = os.path.relpath(file_path, repo_path)
-            
-            # Check if file matches include patterns
-            if not any(fnmatch.fnmatch(file, pattern) for pattern in include_patterns):
-                continue
-            
-            # Check if file matches exclude patterns
-            if any(fnmatch.fnmatch(file, pattern) or fnmatch.fnmatch(relative_path, pattern) for pattern in exclude_patterns):
-                continue
-            
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    
-                # Skip empty files or files that are too large (> 100KB)
-                if not content.strip() or len(content) > 100000:
-                    continue
-                    
-                code_files[relative_path] = content
-                file_count += 1
-                
-            except Exception as e:
-                print(f"Warning: Could not read file {relative_path}: {e}")
-                continue
-        
-        if file_count >= max_files:
-            break
-    
-    return code_files
+async def get_current_user(context: UserContext = Depends(get_current_user_context)):
+    return context.user
 
 def ensure_str(s) -> str:
     return s if isinstance(s, str) else str(s or "")
 
-def extract_text_from_gemini_response(resp) -> str:
-    try:
-        if not resp:
-            return ""
-        for attr in ("text", "output_text", "content", "message", "response"):
-            val = getattr(resp, attr, None)
-            if isinstance(val, str) and val.strip():
-                return val.strip()
-        if hasattr(resp, "candidates") and resp.candidates:
-            first = resp.candidates[0]
-            if hasattr(first, "content"):
-                return str(first.content).strip()
-            if hasattr(first, "text"):
-                return str(first.text).strip()
-        return str(resp).strip()
-    except Exception:
-        traceback.print_exc()
-        return str(resp)
-
 def derive_title(review_text: str, code_text: str) -> str:
     if not review_text:
         return (code_text or "")[:120]
@@ -1125,77 +1165,76 @@ def extract_rating_from_review(review_text: str) -> int:
     except Exception:
         return None
 
-def clone_git_repository(repo_url: str, branch: str = "main") -> str:
-    """Clone a Git repository to a temporary directory."""
+# ------------------ Git Helper Functions ------------------
+
+def clone_git_repository(repo_url: str, branch: str = "main", include_patterns: Optional[List[str]] = None,
+                         exclude_patterns: Optional[List[str]] = None, max_files: int = 0) -> str:
+    """Clone a Git repository to a temporary directory (a worktree of the mirror cache when enabled).
+    With include_patterns and REPO_SPARSE_CHECKOUT on, the clone is blob-less and only enough
+    matching files for max_files reviewable ones are checked out. Release the directory with release_repository_checkout."""
     try:
         # Ensure URL ends with .git for proper cloning
         if not repo_url.endswith('.git') and 'github.com' in repo_url:
             repo_url = repo_url + '.git'
+        
+        sparse = SPARSE_CHECKOUT_ENABLED and include_patterns is not None
+        if repo_mirror_cache:
+            if sparse:
+                return repo_mirror_cache.checkout(repo_url, branch, include_patterns, exclude_patterns, max_files)
+            return repo_mirror_cache.checkout(repo_url, branch)
             
         temp_dir = tempfile.mkdtemp(prefix="code_review_repo_")
         print(f"Cloning repository {repo_url} (branch: {branch}) to {temp_dir}")
         
         # Clone the repository
-        cmd = ["git", "clone", "--depth", "1", "--branch", branch, repo_url, temp_dir]
+        clone = ["git", "clone", "--depth", "1"]
+        if sparse:
+            # Commits and trees only; the sparse checkout below fetches just the selected blobs
+            clone += [f"--filter={PARTIAL_CLONE_FILTER}", "--no-checkout"]
+        cmd = clone + ["--branch", branch, repo_url, temp_dir]
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
         
         if result.returncode != 0:
             # Try without specifying branch if the branch doesn't exist
-            cmd = ["git", "clone", "--depth", "1", repo_url, temp_dir]
+            cmd = clone + [repo_url, temp_dir]
             result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
             
             if result.returncode != 0:
                 raise Exception(f"Failed to clone repository: {result.stderr}")
         
+        if sparse:
+            try:
+                checkout_reviewable_paths(temp_dir, temp_dir, "HEAD", include_patterns, exclude_patterns or [],
+                                          max_files)
+            except Exception:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                raise
+        
         return temp_dir
     except subprocess.TimeoutExpired:
         raise Exception("Repository cloning timed out (5 minutes)")
     except Exception as e:
         raise Exception(f"Error cloning repository: {str(e)}")
 
-def get_code_files(repo_path: str, include_patterns: List[str], exclude_patterns: List[str], max_files: int) -> Dict[str, str]:
-    """Get code files from the cloned repository."""
-    import fnmatch
-    import os
-    
-    code_files = {}
-    file_count = 0
-    
-    for root, dirs, files in os.walk(repo_path):
-        # Skip excluded directories
-        dirs[:] = [d for d in dirs if not any(fnmatch.fnmatch(d, pattern.split('/')[0]) for pattern in exclude_patterns)]
-        
-        for file in files:
-            if file_count >= max_files:
-                break
-                
-            file_path = os.path.join(root, file)
-            relative_path = os.path.relpath(file_path, repo_path)
-            
-            # Check if file matches include patterns
-            if not any(fnmatch.fnmatch(file, pattern) for pattern in include_patterns):
-                continue
-                
-            # Check if file matches exclude patterns
-            if any(fnmatch.fnmatch(relative_path, pattern) for pattern in exclude_patterns):
-                continue
-            
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Limit file size to prevent overwhelming the AI
-                    if len(content) > 50000:  # 50KB limit
-                        content = content[:50000] + "\n# ... (file truncated)"
-                    code_files[relative_path] = content
-                    file_count += 1
-            except (UnicodeDecodeError, IOError):
-                # Skip binary files or files that can't be read
-                continue
-                
-        if file_count >= max_files:
-            break
-    
-    return code_files
+def release_repository_checkout(repo_path: str):
+    """Clean up a directory returned by clone_git_repository."""
+    if repo_mirror_cache and repo_mirror_cache.owns(repo_path):
+        repo_mirror_cache.release(repo_path)
+    elif os.path.exists(repo_path):
+        shutil.rmtree(repo_path)
+
+def fetch_repository_ref(repo_path: str, ref: str) -> str:
+    """Fetch another ref into a directory returned by clone_git_repository; returns its commit."""
+    if repo_mirror_cache and repo_mirror_cache.owns(repo_path):
+        return repo_mirror_cache.fetch_ref(repo_path, ref)
+    return fetch_ref(repo_path, ref)
+
+def repository_git_env(repo_path: str) -> Optional[dict]:
+    """Environment for git commands in a clone_git_repository directory that may fetch missing blobs.
+    A temporary clone keeps its URL in its own config, so it needs none."""
+    if repo_mirror_cache and repo_mirror_cache.owns(repo_path):
+        return repo_mirror_cache.git_env(repo_path)
+    return None
 
 # ------------------ Routes ------------------
 @app.get("/rejection-reasons")
@@ -1207,7 +1246,7 @@ def get_rejection_reasons():
     }
 
 @app.post("/register")
-def register(user: UserCreate):
+def register(user: UserCreate, request: Request):
     db = SessionLocal()
     try:
         print(f"\n[REGISTER] Attempting registration: username={user.username}, email={user.email}")
@@ -1228,7 +1267,7 @@ def register(user: UserCreate):
             raise HTTPException(status_code=400, detail="Invalid email format")
         
         # Create user (auto-verified - no OTP needed)
-        hashed_password = get_password_hash(user.password)
+        hashed_password = get_password_hash(user.password, client_address(request))
         new_user = User(
             username=user.username, 
             email=user.email,
@@ -1286,6 +1325,7 @@ def verify_otp(otp_request: OTPVerify):
         user.otp_code = None
         user.otp_expires_at = None
         db.commit()
+        user_context_cache.invalidate(username=user.username)
         
         return {"message": "Email verified successfully! You can now login."}
     finally:
@@ -1309,6 +1349,7 @@ def resend_otp(resend_request: ResendOTP):
         user.otp_code = otp
         user.otp_expires_at = otp_expires_at
         db.commit()
+        user_context_cache.invalidate(username=user.username)
         
         # Send OTP email
         email_sent = send_otp_email(user.email, otp)
@@ -1321,50 +1362,45 @@ def resend_otp(resend_request: ResendOTP):
         db.close()
 
 @app.post("/token")
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    db = SessionLocal()
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     try:
         print(f"\n[LOGIN] Login attempt: username={form_data.username}")
-        user = db.query(User).filter(User.username == form_data.username).first()
+        user = await asyncio.to_thread(find_login_user, form_data.username)
         if not user:
             print(f"[LOGIN] User not found: {form_data.username}")
             raise HTTPException(status_code=401, detail="Incorrect username or password")
         
-        if not verify_password(form_data.password, user.hashed_password):
+        if not await check_user_password(user, form_data.password, client_address(request)):
             print(f"[LOGIN] Password incorrect for user: {form_data.username}")
             raise HTTPException(status_code=401, detail="Incorrect username or password")
         
         # Auto-verified on registration - no need to check is_verified
         print(f"[LOGIN] Login successful for user: {form_data.username}")
-        access_token = create_access_token(data={"sub": user.username})
+        access_token = create_user_token(user)
         return {"access_token": access_token, "token_type": "bearer"}
     except HTTPException:
         raise
     except Exception as e:
         print(f"[LOGIN] ERROR: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Login error: {str(e)}")
-    finally:
-        db.close()
 
 @app.post("/quick-login")
-async def quick_login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def quick_login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     """Development/Testing endpoint - allows login without email verification.
     Use this for testing when email/OTP delivery is unavailable."""
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.username == form_data.username).first()
-        if not user or not verify_password(form_data.password, user.hashed_password):
-            raise HTTPException(status_code=401, detail="Incorrect username or password")
-        
-        # Skip verification check - for testing/fallback only
-        access_token = create_access_token(data={"sub": user.username})
-        return {"access_token": access_token, "token_type": "bearer", "note": "Logged in without email verification (dev mode)"}
-    finally:
-        db.close()
+    user = await asyncio.to_thread(find_login_user, form_data.username)
+    if not user or not await check_user_password(user, form_data.password, client_address(request)):
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+    
+    # Skip verification check - for testing/fallback only
+    access_token = create_user_token(user)
+    return {"access_token": access_token, "token_type": "bearer", "note": "Logged in without email verification (dev mode)"}
 
 @app.post("/logout")
-def logout():
-    # Frontend must delete token from localStorage/session
+def logout(claims: TokenClaims = Depends(get_current_claims)):
+    """Revoke every token issued to the user so far; the frontend also deletes its copy"""
+    revoke_user_tokens(claims.user_id)
+    print(f"🔒 Revoked tokens for {claims.username}")
     return {"message": "Logged out successfully"}
 
 # Pattern Learning Endpoints
@@ -1384,11 +1420,10 @@ def submit_feedback(feedback: FeedbackRequest, current_user: User = Depends(get_
         db.close()
 
 @app.get("/preferences/")
-def get_preferences(current_user: User = Depends(get_current_user)):
+def get_preferences(context: UserContext = Depends(get_current_user_context)):
     """Get current user preferences"""
-    db = SessionLocal()
     try:
-        preferences = get_user_preferences(db, current_user.id)
+        preferences = context.preferences
         return {
             "security_analysis": preferences.security_analysis,
             "performance_analysis": preferences.performance_analysis,
@@ -1400,20 +1435,39 @@ def get_preferences(current_user: User = Depends(get_current_user)):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting preferences: {str(e)}")
+
+@app.get("/preferences/review-policy")
+def get_review_policy(context: UserContext = Depends(get_current_user_context)):
+    """The user's fast-path review policy: which rules skip the full review prompt"""
+    return load_review_policy(context.preferences.learning_patterns)
+
+@app.put("/preferences/review-policy")
+def update_review_policy(data: ReviewPolicyInput, current_user: User = Depends(get_current_user)):
+    """Change the action of one or more fast-path rules; unset rules keep their current action"""
+    updates = {rule: action for rule, action in data.model_dump().items() if action is not None}
+    db = SessionLocal()
+    try:
+        preferences = get_user_preferences(db, current_user.id)
+        try:
+            preferences.learning_patterns = store_review_policy(preferences.learning_patterns, updates)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        db.commit()
+        user_context_cache.invalidate(user_id=current_user.id)
+        return load_review_policy(preferences.learning_patterns)
     finally:
         db.close()
 
 @app.post("/admin/login")
-def admin_login(credentials: dict):
+def admin_login(credentials: dict, request: Request):
     username = credentials.get("username")
     password = credentials.get("password")
     
     print(f"DEBUG: Admin login attempt - username: {username}")
-    print(f"DEBUG: Expected username: {ADMIN_USERNAME}")
     print(f"DEBUG: Username match: {username == ADMIN_USERNAME}")
-    print(f"DEBUG: Password verification: {verify_password(password, ADMIN_PASSWORD_HASH)}")
     
-    if username == ADMIN_USERNAME and verify_password(password, ADMIN_PASSWORD_HASH):
+    # One bcrypt check, and only for the admin username
+    if username == ADMIN_USERNAME and verify_password(password, ADMIN_PASSWORD_HASH, client_address(request)):
         access_token = create_access_token(data={"sub": username, "role": "admin"})
         print("DEBUG: Admin login successful")
         return {"access_token": access_token, "token_type": "bearer"}
@@ -1512,15 +1566,368 @@ def admin_test_smtp_connectivity(current_admin: dict = Depends(get_current_admin
     
     return results
 
-@app.post("/generate-review")
-def generate_review(data: CodeInput, current_user: User = Depends(get_current_user)):
-    db = SessionLocal()
-    try:
-        # Initialize AST analyzer
-        analyzer = CodeAnalyzer()
-        
-        if not GOOGLE_API_KEY:
-            review_text = """≡ƒöì **General Review:**
+def load_review_user_context(current_user: User) -> dict:
+    """Preferences, latest feedback and the custom prompt built from them - the per-user part of a review"""
+    # Get user preferences for customized review (cached with the user, so usually no query)
+    context = user_context_for(current_user)
+    preferences = context.preferences
+    print(f"≡ƒöì User preferences loaded for {current_user.username}:")
+    print(f"   - Code Optimization: {preferences.code_optimization}")
+    print(f"   - Security Analysis: {preferences.security_analysis}")
+    print(f"   - Detailed Explanations: {preferences.detailed_explanations}")
+    print(f"   - Best Practices: {preferences.best_practices}")
+    print(f"   - AST Analysis: {preferences.ast_analysis}")
+    
+    # Latest improvement suggestion to incorporate into prompt
+    latest_feedback = context.latest_suggestion
+    if latest_feedback:
+        print(f"≡ƒô¥ Incorporating user feedback into review prompt: '{latest_feedback[:80]}...'")
+    else:
+        print(f"Γä╣∩╕Å No previous feedback to incorporate")
+    
+    # Generate custom prompt based on user preferences
+    # Use detailed mode if user has enabled detailed_explanations
+    detailed_mode = preferences.detailed_explanations
+    custom_prompt = generate_custom_prompt(
+        preferences, 
+        is_repository_review=False, 
+        detailed_mode=detailed_mode,
+        user_feedback=latest_feedback  # Pass the latest user feedback
+    )
+    return {"preferences": preferences, "latest_feedback": latest_feedback, "custom_prompt": custom_prompt,
+            "review_policy": load_review_policy(preferences.learning_patterns)}
+
+def find_recent_duplicate_review(db, user_id: int, code: str, preferences: UserPreferences) -> Optional[Review]:
+    """The user's latest single-file review of identical code from the duplicate window, unless preferences
+    changed or feedback was given since (either would change the review)"""
+    cutoff = datetime.utcnow() - timedelta(seconds=REVIEW_POLICY_DUPLICATE_WINDOW_SECONDS)
+    last_feedback_at = db.query(func.max(Review.updated_at)).filter(
+        Review.user_id == user_id, Review.status != "completed"
+    ).scalar()
+    cutoff = max([cutoff] + [t for t in (preferences.updated_at, last_feedback_at) if t is not None])
+    # code is stored compressed, so it is matched by hash
+    return db.query(Review).options(undefer_group("review_text")).filter(
+        Review.user_id == user_id,
+        Review.code_hash == content_hash(ensure_str(code)),
+        Review.created_at >= cutoff,
+        Review.is_repository_review == "false",
+        Review.status == "completed",
+    ).order_by(Review.created_at.desc()).first()
+
+def prepare_single_review(db, data: CodeInput, current_user: User, user_context: Optional[dict] = None,
+                          ast_analysis=None) -> dict:
+    """Load user context, run AST analysis and build the Gemini prompt for a single-file review.
+    Batches pass in the user context and AST analysis they already have."""
+    if user_context is None:
+        user_context = load_review_user_context(current_user)
+    preferences = user_context["preferences"]
+    custom_prompt = user_context["custom_prompt"]
+    
+    # Perform AST analysis (always needed for syntax/semantic error detection)
+    detected_language = detect_programming_language(data.code)
+    if ast_analysis is None:
+        print(f"Performing AST analysis for code review and error detection...")
+        ast_analysis = CodeAnalyzer().analyze_code(data.code, detected_language)
+    
+    # Format AST summary for Gemini if user preference is enabled
+    ast_summary = ""
+    if preferences.ast_analysis:
+        ast_summary = format_ast_analysis_for_gemini(ast_analysis)
+    
+    # Long submissions are split at function/class boundaries and reviewed chunk by chunk
+    max_chars = 3500 if preferences.ast_analysis else 4000
+    chunks = chunk_code(data.code, ast_analysis.structure if ast_analysis else None, max_chars)
+    total_lines = data.code.count("\n") + 1
+    
+    # Build complete prompt with code, one per chunk
+    chunk_prompts = [f"""{custom_prompt}
+
+{heading}
+```{detected_language}
+{chunk.text}
+```
+
+Provide your analysis following the exact section markers (###REVIEW###, ###OPTIMIZED_CODE###, ###EXPLANATION###, etc.)."""
+                     for chunk, heading in zip(chunks, code_review_headings(chunks, total_lines))]
+
+    if preferences.code_optimization:
+        print("Γ£à OPTIMIZED_CODE section will be requested in prompt (preference enabled)")
+    else:
+        print("ΓÜá∩╕Å OPTIMIZED_CODE section will NOT be requested (preference disabled)")
+
+    # Fast path: decide whether this submission needs the full prompt at all
+    policy = user_context["review_policy"]
+    duplicate_review = None
+    if policy["duplicate"] != "llm" and data.code.strip():
+        duplicate_review = find_recent_duplicate_review(db, current_user.id, data.code, preferences)
+    decision = evaluate_review_policy(data.code, detected_language, ast_analysis, policy,
+                                      duplicate_review.id if duplicate_review else None)
+    policy_prompt = None
+    full_prompt_chars = sum(len(prompt) for prompt in chunk_prompts)
+    if decision is None:
+        review_policy_stats.record(None)
+    elif decision.action == "targeted":
+        policy_prompt = targeted_syntax_prompt(data.code, detected_language, ast_analysis)
+        review_policy_stats.record(decision, len(chunks) - 1, full_prompt_chars - len(policy_prompt))
+    else:
+        review_policy_stats.record(decision, len(chunks), full_prompt_chars)
+    if decision:
+        print(f"⚡ Review policy: {decision.rule} -> {decision.action}")
+
+    return {
+        "preferences": preferences,
+        "code": data.code,
+        "language": detected_language,
+        "ast_analysis": ast_analysis,
+        "custom_prompt": custom_prompt,
+        "prompt": chunk_prompts[0],
+        "chunks": chunks,
+        "chunk_prompts": chunk_prompts,
+        "total_lines": total_lines,
+        "policy_decision": decision,
+        "policy_prompt": policy_prompt,
+        "duplicate_review": duplicate_review,
+    }
+
+def duplicate_review_result(context: dict) -> Optional[dict]:
+    """The earlier review a duplicate submission is answered with, or None"""
+    duplicate_review = context.get("duplicate_review")
+    decision = context.get("policy_decision")
+    if duplicate_review is None or decision is None or decision.rule != "duplicate":
+        return None
+    return {**review_result(duplicate_review), "duplicate": True}
+
+async def generate_prepared_review_text(context: dict, user_id: int, priority: int = PRIORITY_INTERACTIVE) -> str:
+    """Gemini response for a review built by prepare_single_review (or the fast-path answer its policy chose)"""
+    decision = context.get("policy_decision")
+    if decision is not None:
+        if decision.rule == "duplicate":
+            return context["duplicate_review"].review or ""
+        if decision.action == "targeted":
+            return await generate_review_text(context["policy_prompt"], context["code"], context["language"],
+                                              SYNTAX_FIX_PROMPT_KEY, user_id, priority)
+        return deterministic_review(decision, context["code"], context["language"], context["ast_analysis"])
+    return await generate_chunked_review_text(context["chunk_prompts"], context["chunks"], context["language"],
+                                              context["custom_prompt"], user_id, context["total_lines"], priority)
+
+def build_single_review_sections(combined_resp: str, ast_analysis, detected_language: str):
+    """Turn Gemini's marker-delimited response into (review_text, optimized_code, explanation, security_issues)"""
+    # Parse combined response by markers - one pass over the response
+    sections = parse_review_sections(combined_resp)
+
+    # Parse all new sections
+    code_quality = sections.get('CODE_QUALITY', '')
+    key_findings = sections.get('KEY_FINDINGS', '')
+    security_issues = sections.get('SECURITY', '')
+    performance_analysis = sections.get('PERFORMANCE', '')
+    architecture_analysis = sections.get('ARCHITECTURE', '')
+    best_practices = sections.get('BEST_PRACTICES', '')
+
+    # --- Syntax and Semantic Error Extraction ---
+    # Use the ast_analysis already performed earlier
+    syntax_errors = []
+    semantic_errors = []
+    
+    # Debug logging
+    print(f"≡ƒöì AST Analysis Debug:")
+    print(f"  - Language: {detected_language}")
+    print(f"  - AST Analysis exists: {ast_analysis is not None}")
+    if ast_analysis:
+        print(f"  - Structure: {ast_analysis.structure}")
+        print(f"  - Issues: {ast_analysis.issues}")
+        print(f"  - Security concerns: {ast_analysis.security_concerns}")
+    
+    # Extract errors based on language
+    if ast_analysis:
+        # Get syntax errors from structure (for Python)
+        if isinstance(ast_analysis.structure, dict) and 'syntax_error' in ast_analysis.structure:
+            syntax_errors.append(ast_analysis.structure['syntax_error'])
+            print(f"Γ£à Found syntax error in structure: {ast_analysis.structure['syntax_error']}")
+        
+        # Process issues list
+        if ast_analysis.issues:
+            for issue in ast_analysis.issues:
+                if issue.lower().startswith('syntax error'):
+                    # It's a syntax error
+                    if issue not in syntax_errors:  # Avoid duplicates
+                        syntax_errors.append(issue)
+                        print(f"Γ£à Found syntax error in issues: {issue}")
+                else:
+                    # It's a semantic error
+                    semantic_errors.append(issue)
+                    print(f"Γ£à Found semantic error: {issue}")
+        
+        # Also check security concerns and performance issues for semantic errors
+        if ast_analysis.security_concerns:
+            semantic_errors.extend(ast_analysis.security_concerns)
+            print(f"Γ£à Added {len(ast_analysis.security_concerns)} security concerns to semantic errors")
+        
+        if ast_analysis.performance_issues:
+            semantic_errors.extend(ast_analysis.performance_issues)
+            print(f"Γ£à Added {len(ast_analysis.performance_issues)} performance issues to semantic errors")
+
+    # Format error sections with better formatting
+    if syntax_errors:
+        syntax_errors_section = '\n'.join([f"ΓÇó {error}" for error in syntax_errors])
+    else:
+        syntax_errors_section = 'No syntax errors detected.'
+    
+    if semantic_errors:
+        semantic_errors_section = '\n'.join([f"ΓÇó {error}" for error in semantic_errors])
+    else:
+        semantic_errors_section = 'No semantic errors detected.'
+    
+    print(f"≡ƒôï Final Error Sections:")
+    print(f"  - Syntax ({len(syntax_errors)} errors):")
+    if syntax_errors:
+        for err in syntax_errors:
+            print(f"    ΓÇó {err}")
+    else:
+        print(f"    {syntax_errors_section}")
+    print(f"  - Semantic ({len(semantic_errors)} errors):")
+    if semantic_errors:
+        for err in semantic_errors:
+            print(f"    ΓÇó {err}")
+    else:
+        print(f"    {semantic_errors_section}")
+    
+    # Optimized code sections (may be multiple: OPTIMIZED_CODE, OPTIMIZED_CODE_1, OPTIMIZED_CODE_2, ...)
+    # Combine all optimized codes with separators if multiple
+    # NO extra text - just code separated by horizontal rules
+    optimized_code = "\n\n---\n\n".join(optimized_code_variants(sections))
+    
+    explanation_text = sections.get('EXPLANATION', '')
+    recommendations = sections.get('RECOMMENDATIONS', '')
+    
+    # Parse syntax and semantic errors from Gemini's response
+    syntax_errors_from_gemini = sections.get('SYNTAX_ERRORS', '')
+    semantic_errors_from_gemini = sections.get('SEMANTIC_ERRORS', '')
+    
+    # Use Gemini's analysis (primary source), fall back to AST if empty
+    if syntax_errors_from_gemini and syntax_errors_from_gemini.strip():
+        syntax_errors_section = syntax_errors_from_gemini.strip()
+    else:
+        # Fallback to AST analysis if Gemini didn't provide
+        syntax_errors_section = syntax_errors_section if syntax_errors else 'No syntax errors detected.'
+    
+    if semantic_errors_from_gemini and semantic_errors_from_gemini.strip():
+        semantic_errors_section = semantic_errors_from_gemini.strip()
+    else:
+        # Fallback to AST analysis if Gemini didn't provide
+        semantic_errors_section = semantic_errors_section if semantic_errors else 'No semantic errors detected.'
+    
+    print(f"≡ƒöì Final Error Sections (from Gemini):")
+    print(f"  - Syntax Errors: {syntax_errors_section[:100]}...")
+    print(f"  - Semantic Errors: {semantic_errors_section[:100]}...")
+    
+    # Combine all sections into the review text with section markers for frontend parsing
+    review_sections = []
+    
+    if code_quality:
+        review_sections.append(f"###CODE_QUALITY###\n{code_quality}")
+    
+    if key_findings:
+        review_sections.append(f"###KEY_FINDINGS###\n{key_findings}")
+    
+    if security_issues:
+        review_sections.append(f"###SECURITY###\n{security_issues}")
+    
+    if performance_analysis:
+        review_sections.append(f"###PERFORMANCE###\n{performance_analysis}")
+    
+    if architecture_analysis:
+        review_sections.append(f"###ARCHITECTURE###\n{architecture_analysis}")
+    
+    if best_practices:
+        review_sections.append(f"###BEST_PRACTICES###\n{best_practices}")
+    
+    if recommendations:
+        review_sections.append(f"###RECOMMENDATIONS###\n{recommendations}")
+    
+    # Add syntax and semantic error sections (always, not conditional)
+    review_sections.append(f"###SYNTAX_ERRORS###\n{syntax_errors_section}")
+    review_sections.append(f"###SEMANTIC_ERRORS###\n{semantic_errors_section}")
+    
+    print(f"≡ƒöì Syntax errors found: {len(syntax_errors)}")
+    print(f"≡ƒöì Semantic errors found: {len(semantic_errors)}")
+    
+    # Join all sections
+    review_text = "\n\n".join(review_sections)
+    
+    # Enhance review with AST findings if Gemini response is incomplete
+    if not review_text and ast_analysis.issues:
+        review_text = f"AST Analysis findings:\n" + '\n'.join([f"- {issue}" for issue in ast_analysis.issues])
+    
+    print(f"AST analysis complete. Found {len(ast_analysis.issues)} issues.")
+    print(f"Generated sections: {', '.join([s.split('###')[1] for s in review_sections]) if review_sections else 'None'}")
+    
+    return review_text, optimized_code, explanation_text, security_issues
+
+def build_review_row(data: CodeInput, current_user: User, review_text: str, optimized_code: str,
+                     explanation_text: str, security_issues: str) -> Review:
+    """The Review row for a single-file review (not yet added to a session)"""
+    # Detect programming language and extract rating
+    detected_language = detect_programming_language(data.code)
+    extracted_rating = extract_rating_from_review(review_text)
+
+    # Use filename in title if provided
+    review_title = data.filename if data.filename else derive_title(review_text, data.code)
+    if data.filename and review_text:
+        # Add a brief summary from the review to the filename
+        first_line = review_text.split('\n')[0].strip()
+        if first_line and len(first_line) < 100:
+            review_title = f"{data.filename} - {first_line.lstrip('- ')}"
+
+    return Review(
+        user_id=current_user.id,
+        code=ensure_str(data.code),
+        code_hash=content_hash(ensure_str(data.code)),
+        language=detected_language,
+        review=review_text.strip(),
+        review_preview=review_preview(review_text.strip()),
+        title=review_title[:200],  # Limit title length
+        optimized_code=optimized_code.strip(),
+        explanation=explanation_text.strip(),
+        security_issues=security_issues.strip(),
+        rating=extracted_rating,
+        status="completed"
+    )
+
+def review_preview(review_text: Optional[str]) -> Optional[str]:
+    return review_text[:PAST_REVIEWS_PREVIEW_CHARS] if review_text is not None else None
+
+def review_result(new_review: Review) -> dict:
+    """The /generate-review response body for a stored review"""
+    return {
+        "id": new_review.id,
+        "title": new_review.title,
+        "review": new_review.review,
+        "optimized_code": new_review.optimized_code,
+        "explanation": new_review.explanation,
+        "security_issues": new_review.security_issues,
+        "language": new_review.language,
+        "rating": new_review.rating,
+    }
+
+def save_single_review(db, data: CodeInput, current_user: User, review_text: str, optimized_code: str,
+                       explanation_text: str, security_issues: str) -> dict:
+    """Store a single-file review and return the /generate-review response body"""
+    new_review = build_review_row(data, current_user, review_text, optimized_code, explanation_text, security_issues)
+    db.add(new_review)
+    db.commit()
+    db.refresh(new_review)
+    return review_result(new_review)
+
+def complete_single_review(db, data: CodeInput, current_user: User, context: dict, combined_resp: str) -> dict:
+    """Parse the full Gemini response for a prepared review and store the Review row"""
+    review_text, optimized_code, explanation_text, security_issues = build_single_review_sections(
+        combined_resp, context["ast_analysis"], context["language"]
+    )
+    return save_single_review(db, data, current_user, review_text, optimized_code, explanation_text, security_issues)
+
+def placeholder_single_review(data: CodeInput) -> tuple:
+    """(review_text, optimized_code, explanation_text, security_issues) used when no Gemini API key is configured"""
+    review_text = """≡ƒöì **General Review:**
 Γ£à Code looks good! Add some comments to make it easier to read. ≡ƒÿè
 
 ≡ƒ¢í∩╕Å **Security Check:**
@@ -1528,277 +1935,194 @@ Safe Γ£à No security problems found.
 
 ≡ƒÜ¿ **Issues Found:**
 ≡ƒƒó LOW: Missing comments for better readability"""
-            optimized_code = data.code
-            explanation_text = "This code does something cool! ≡ƒÜÇ"
-            security_issues = ""
-        else:
-            # Get user preferences for customized review
-            preferences = get_user_preferences(db, current_user.id)
-            print(f"≡ƒöì User preferences loaded for {current_user.username}:")
-            print(f"   - Code Optimization: {preferences.code_optimization}")
-            print(f"   - Security Analysis: {preferences.security_analysis}")
-            print(f"   - Detailed Explanations: {preferences.detailed_explanations}")
-            print(f"   - Best Practices: {preferences.best_practices}")
-            print(f"   - AST Analysis: {preferences.ast_analysis}")
-            
-            # Fetch latest improvement suggestion to incorporate into prompt
-            latest_feedback = get_latest_improvement_suggestion(db, current_user.id)
-            if latest_feedback:
-                print(f"≡ƒô¥ Incorporating user feedback into review prompt: '{latest_feedback[:80]}...'")
-            else:
-                print(f"Γä╣∩╕Å No previous feedback to incorporate")
-            
-            # Perform AST analysis (always needed for syntax/semantic error detection)
-            detected_language = detect_programming_language(data.code)
-            print(f"Performing AST analysis for code review and error detection...")
-            ast_analysis = analyzer.analyze_code(data.code, detected_language)
-            
-            # Format AST summary for Gemini if user preference is enabled
-            ast_summary = ""
-            if preferences.ast_analysis:
-                ast_summary = format_ast_analysis_for_gemini(ast_analysis)
-            
-            # Truncate long code submissions to limit model input size and latency
-            max_chars = 3500 if preferences.ast_analysis else 4000
-            code_for_prompt = data.code
-            if isinstance(code_for_prompt, str) and len(code_for_prompt) > max_chars:
-                code_for_prompt = code_for_prompt[:max_chars] + "\n# ... (truncated)"
-
-            # Generate custom prompt based on user preferences
-            # Use detailed mode if user has enabled detailed_explanations
-            detailed_mode = preferences.detailed_explanations
-            custom_prompt = generate_custom_prompt(
-                preferences, 
-                is_repository_review=False, 
-                detailed_mode=detailed_mode,
-                user_feedback=latest_feedback  # Pass the latest user feedback
-            )
-            
-            # Build complete prompt with code
-            combined_prompt = f"""{custom_prompt}
-
-**Code to Review:**
-```{detected_language}
-{code_for_prompt}
-```
-
-Provide your analysis following the exact section markers (###REVIEW###, ###OPTIMIZED_CODE###, ###EXPLANATION###, etc.)."""
+    return review_text, data.code, "This code does something cool! ≡ƒÜÇ", ""
 
-            if preferences.code_optimization:
-                print("Γ£à OPTIMIZED_CODE section will be requested in prompt (preference enabled)")
-            else:
-                print("ΓÜá∩╕Å OPTIMIZED_CODE section will NOT be requested (preference disabled)")
-
-            combined_resp = extract_text_from_gemini_response(model.generate_content(combined_prompt))
-
-            # Parse combined response by markers - NOW WITH SEPARATE SECTIONS
-            def parse_section(text, marker):
-                import re
-                pattern = rf"{marker}(.*?)(?=###[A-Z_]+###|$)"
-                m = re.search(pattern, text, re.S)
-                return m.group(1).strip() if m else ''
-
-            # Parse all new sections
-            code_quality = parse_section(combined_resp, '###CODE_QUALITY###')
-            key_findings = parse_section(combined_resp, '###KEY_FINDINGS###')
-            security_issues = parse_section(combined_resp, '###SECURITY###')
-            performance_analysis = parse_section(combined_resp, '###PERFORMANCE###')
-            architecture_analysis = parse_section(combined_resp, '###ARCHITECTURE###')
-            best_practices = parse_section(combined_resp, '###BEST_PRACTICES###')
-
-            # --- Syntax and Semantic Error Extraction ---
-            # Use the ast_analysis already performed earlier
-            syntax_errors = []
-            semantic_errors = []
-            
-            # Debug logging
-            print(f"≡ƒöì AST Analysis Debug:")
-            print(f"  - Language: {detected_language}")
-            print(f"  - AST Analysis exists: {ast_analysis is not None}")
-            if ast_analysis:
-                print(f"  - Structure: {ast_analysis.structure}")
-                print(f"  - Issues: {ast_analysis.issues}")
-                print(f"  - Security concerns: {ast_analysis.security_concerns}")
-            
-            # Extract errors based on language
-            if ast_analysis:
-                # Get syntax errors from structure (for Python)
-                if isinstance(ast_analysis.structure, dict) and 'syntax_error' in ast_analysis.structure:
-                    syntax_errors.append(ast_analysis.structure['syntax_error'])
-                    print(f"Γ£à Found syntax error in structure: {ast_analysis.structure['syntax_error']}")
-                
-                # Process issues list
-                if ast_analysis.issues:
-                    for issue in ast_analysis.issues:
-                        if issue.lower().startswith('syntax error'):
-                            # It's a syntax error
-                            if issue not in syntax_errors:  # Avoid duplicates
-                                syntax_errors.append(issue)
-                                print(f"Γ£à Found syntax error in issues: {issue}")
-                        else:
-                            # It's a semantic error
-                            semantic_errors.append(issue)
-                            print(f"Γ£à Found semantic error: {issue}")
-                
-                # Also check security concerns and performance issues for semantic errors
-                if ast_analysis.security_concerns:
-                    semantic_errors.extend(ast_analysis.security_concerns)
-                    print(f"Γ£à Added {len(ast_analysis.security_concerns)} security concerns to semantic errors")
-                
-                if ast_analysis.performance_issues:
-                    semantic_errors.extend(ast_analysis.performance_issues)
-                    print(f"Γ£à Added {len(ast_analysis.performance_issues)} performance issues to semantic errors")
+async def run_single_review(data: CodeInput, current_user: User, before_save=None) -> dict:
+    """Single-file review pipeline shared by /generate-review and background review jobs.
+    before_save() is called (on a worker thread) right before the Review row is stored."""
+    db = SessionLocal()
+    try:
+        if not GOOGLE_API_KEY:
+            if before_save:
+                await asyncio.to_thread(before_save)
+            return await asyncio.to_thread(save_single_review, db, data, current_user, *placeholder_single_review(data))
+        
+        # Database and AST work run on worker threads; the event loop only waits on Gemini
+        context = await asyncio.to_thread(prepare_single_review, db, data, current_user)
+        duplicate = duplicate_review_result(context)
+        if duplicate is not None:
+            return duplicate
+        combined_resp = await generate_prepared_review_text(context, current_user.id)
+        if before_save:
+            await asyncio.to_thread(before_save)
+        return await asyncio.to_thread(complete_single_review, db, data, current_user, context, combined_resp)
+    finally:
+        db.close()
 
-            # Format error sections with better formatting
-            if syntax_errors:
-                syntax_errors_section = '\n'.join([f"ΓÇó {error}" for error in syntax_errors])
-            else:
-                syntax_errors_section = 'No syntax errors detected.'
-            
-            if semantic_errors:
-                semantic_errors_section = '\n'.join([f"ΓÇó {error}" for error in semantic_errors])
-            else:
-                semantic_errors_section = 'No semantic errors detected.'
-            
-            print(f"≡ƒôï Final Error Sections:")
-            print(f"  - Syntax ({len(syntax_errors)} errors):")
-            if syntax_errors:
-                for err in syntax_errors:
-                    print(f"    ΓÇó {err}")
-            else:
-                print(f"    {syntax_errors_section}")
-            print(f"  - Semantic ({len(semantic_errors)} errors):")
-            if semantic_errors:
-                for err in semantic_errors:
-                    print(f"    ΓÇó {err}")
-            else:
-                print(f"    {semantic_errors_section}")
-            
-            # Parse optimized code sections (may be multiple)
-            optimized_code = parse_section(combined_resp, '###OPTIMIZED_CODE###')
-            optimized_codes = []
-            if optimized_code:
-                optimized_codes.append(optimized_code)
-            
-            # Check for numbered optimized code sections (OPTIMIZED_CODE_1, OPTIMIZED_CODE_2, etc.)
-            for i in range(1, 10):  # Support up to 9 versions
-                opt_code = parse_section(combined_resp, f'###OPTIMIZED_CODE_{i}###')
-                if opt_code:
-                    optimized_codes.append(opt_code)
-            
-            # Combine all optimized codes with separators if multiple
-            # NO extra text - just code separated by horizontal rules
-            if optimized_codes:
-                if len(optimized_codes) > 1:
-                    optimized_code = "\n\n---\n\n".join(optimized_codes)
-                else:
-                    optimized_code = optimized_codes[0]
-            
-            explanation_text = parse_section(combined_resp, '###EXPLANATION###')
-            recommendations = parse_section(combined_resp, '###RECOMMENDATIONS###')
+@app.post("/generate-review")
+async def generate_review(data: CodeInput, current_user: User = Depends(get_current_user)):
+    return await run_single_review(data, current_user)
+
+def sse_event(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@app.post("/generate-review/stream")
+def generate_review_stream(data: CodeInput, current_user: User = Depends(get_current_user)):
+    """Server-Sent Events variant of /generate-review.
+    Emits a `section` event as soon as each ###SECTION### of the Gemini response is complete,
+    then a `done` event carrying the stored review (same body as /generate-review).
+    Every section event carries elapsed_ms; the first also carries time_to_first_section_ms."""
+    async def cached_chunks(cached: str):
+        yield cached
+    
+    def section_event(section: str, content: str, elapsed_ms: int, first: bool) -> str:
+        event = {"section": section, "content": content, "elapsed_ms": elapsed_ms}
+        if first:
+            event["time_to_first_section_ms"] = elapsed_ms
+        return sse_event("section", event)
+    
+    async def event_stream():
+        db = SessionLocal()
+        started = time.perf_counter()
+        first_section_ms = None
+        try:
+            if not GOOGLE_API_KEY:
+                result = await run_single_review(data, current_user)
+                yield sse_event("done", {**result, "time_to_first_section_ms": None, "total_ms": round((time.perf_counter() - started) * 1000)})
+                return
             
-            # Parse syntax and semantic errors from Gemini's response
-            syntax_errors_from_gemini = parse_section(combined_resp, '###SYNTAX_ERRORS###')
-            semantic_errors_from_gemini = parse_section(combined_resp, '###SEMANTIC_ERRORS###')
+            context = await asyncio.to_thread(prepare_single_review, db, data, current_user)
+            decision = context["policy_decision"]
+            cache_key = review_cache_key(data.code, context["language"], context["custom_prompt"])
+            cached = None if decision else await asyncio.to_thread(review_cache.get, cache_key)
             
-            # Use Gemini's analysis (primary source), fall back to AST if empty
-            if syntax_errors_from_gemini and syntax_errors_from_gemini.strip():
-                syntax_errors_section = syntax_errors_from_gemini.strip()
+            parser = StreamingSectionParser()
+            response_parts = []
+            if cached is not None:
+                chunks = cached_chunks(cached)
+            elif decision or len(context["chunks"]) > 1:
+                # A chunked review is only complete once every chunk is merged, so its sections arrive together;
+                # fast-path answers are short (or already stored) and arrive the same way
+                chunks = cached_chunks(await generate_prepared_review_text(context, current_user.id))
             else:
-                # Fallback to AST analysis if Gemini didn't provide
-                syntax_errors_section = syntax_errors_section if syntax_errors else 'No syntax errors detected.'
-            
-            if semantic_errors_from_gemini and semantic_errors_from_gemini.strip():
-                semantic_errors_section = semantic_errors_from_gemini.strip()
-            else:
-                # Fallback to AST analysis if Gemini didn't provide
-                semantic_errors_section = semantic_errors_section if semantic_errors else 'No semantic errors detected.'
-            
-            print(f"≡ƒöì Final Error Sections (from Gemini):")
-            print(f"  - Syntax Errors: {syntax_errors_section[:100]}...")
-            print(f"  - Semantic Errors: {semantic_errors_section[:100]}...")
-            
-            # Combine all sections into the review text with section markers for frontend parsing
-            review_sections = []
-            
-            if code_quality:
-                review_sections.append(f"###CODE_QUALITY###\n{code_quality}")
-            
-            if key_findings:
-                review_sections.append(f"###KEY_FINDINGS###\n{key_findings}")
-            
-            if security_issues:
-                review_sections.append(f"###SECURITY###\n{security_issues}")
-            
-            if performance_analysis:
-                review_sections.append(f"###PERFORMANCE###\n{performance_analysis}")
+                chunks = review_llm.stream(context["prompt"], user_id=current_user.id)
+            async for text in chunks:
+                response_parts.append(text)
+                for section, content in parser.feed(text):
+                    elapsed_ms = round((time.perf_counter() - started) * 1000)
+                    yield section_event(section, content, elapsed_ms, first=first_section_ms is None)
+                    if first_section_ms is None:
+                        first_section_ms = elapsed_ms
+            for section, content in parser.finish():
+                elapsed_ms = round((time.perf_counter() - started) * 1000)
+                yield section_event(section, content, elapsed_ms, first=first_section_ms is None)
+                if first_section_ms is None:
+                    first_section_ms = elapsed_ms
             
-            if architecture_analysis:
-                review_sections.append(f"###ARCHITECTURE###\n{architecture_analysis}")
+            combined_resp = "".join(response_parts).strip()
+            if cached is None and decision is None:
+                await asyncio.to_thread(review_cache.put, cache_key, combined_resp)
             
-            if best_practices:
-                review_sections.append(f"###BEST_PRACTICES###\n{best_practices}")
-            
-            if recommendations:
-                review_sections.append(f"###RECOMMENDATIONS###\n{recommendations}")
-            
-            # Add syntax and semantic error sections (always, not conditional)
-            review_sections.append(f"###SYNTAX_ERRORS###\n{syntax_errors_section}")
-            review_sections.append(f"###SEMANTIC_ERRORS###\n{semantic_errors_section}")
-            
-            print(f"≡ƒöì Syntax errors found: {len(syntax_errors)}")
-            print(f"≡ƒöì Semantic errors found: {len(semantic_errors)}")
-            
-            # Join all sections
-            review_text = "\n\n".join(review_sections)
-            
-            # Enhance review with AST findings if Gemini response is incomplete
-            if not review_text and ast_analysis.issues:
-                review_text = f"AST Analysis findings:\n" + '\n'.join([f"- {issue}" for issue in ast_analysis.issues])
-            
-            print(f"AST analysis complete. Found {len(ast_analysis.issues)} issues.")
-            print(f"Generated sections: {', '.join([s.split('###')[1] for s in review_sections]) if review_sections else 'None'}")
-
-        # Detect programming language and extract rating
-        detected_language = detect_programming_language(data.code)
-        extracted_rating = extract_rating_from_review(review_text)
-
-        # Use filename in title if provided
-        review_title = data.filename if data.filename else derive_title(review_text, data.code)
-        if data.filename and review_text:
-            # Add a brief summary from the review to the filename
-            first_line = review_text.split('\n')[0].strip()
-            if first_line and len(first_line) < 100:
-                review_title = f"{data.filename} - {first_line.lstrip('- ')}"
-
-        new_review = Review(
-            user_id=current_user.id,
-            code=ensure_str(data.code),
-            language=detected_language,
-            review=review_text.strip(),
-            title=review_title[:200],  # Limit title length
-            optimized_code=optimized_code.strip(),
-            explanation=explanation_text.strip(),
-            security_issues=security_issues.strip(),
-            rating=extracted_rating,
-            status="completed"
-        )
-        db.add(new_review)
-        db.commit()
-        db.refresh(new_review)
-        return {
-            "id": new_review.id,
-            "title": new_review.title,
-            "review": new_review.review,
-            "optimized_code": new_review.optimized_code,
-            "explanation": new_review.explanation,
-            "security_issues": new_review.security_issues,
-            "language": new_review.language,
-            "rating": new_review.rating,
-        }
+            # The Review row is written once, from the complete response; a duplicate keeps the earlier row
+            result = duplicate_review_result(context)
+            if result is None:
+                result = await asyncio.to_thread(complete_single_review, db, data, current_user, context, combined_resp)
+            total_ms = round((time.perf_counter() - started) * 1000)
+            print(f"📡 Streamed review {result['id']}: first section after {first_section_ms}ms, full response after {total_ms}ms")
+            yield sse_event("done", {**result, "time_to_first_section_ms": first_section_ms, "total_ms": total_ms})
+        except Exception as e:
+            traceback.print_exc()
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            db.close()
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def save_review_batch(db, rows: List[Review]) -> List[dict]:
+    """Insert all rows in one transaction and return their /generate-review response bodies"""
+    db.add_all(rows)
+    db.flush()  # assigns ids while the rows are still loaded
+    results = [review_result(row) for row in rows]
+    db.commit()
+    return results
+
+def prepare_batch_file(data: CodeInput, current_user: User, user_context: dict, ast_analysis) -> dict:
+    """prepare_single_review on its own session, so concurrent batch files never share one"""
+    db = SessionLocal()
+    try:
+        context = prepare_single_review(db, data, current_user, user_context, ast_analysis)
+        # Built before the session closes: the duplicate's row is only readable while it's attached
+        context["duplicate_result"] = duplicate_review_result(context)
+        return context
+    finally:
+        db.close()
+
+def save_new_review_batch(rows: List[Review]) -> List[dict]:
+    db = SessionLocal()
+    try:
+        return save_review_batch(db, rows)
     finally:
         db.close()
 
+async def run_review_batch(files: List[CodeInput], current_user: User, on_file_reviewed=None) -> dict:
+    """Review several files with one user-context load. AST analysis and Gemini calls run concurrently;
+    files that fail are reported with an error and get no Review row."""
+    user_context = None
+    pending = [None] * len(files)
+    if GOOGLE_API_KEY:
+        user_context = await asyncio.to_thread(load_review_user_context, current_user)
+        # AST analysis of every file starts on the analysis pool before the first Gemini call
+        pending = ast_analysis_pool.submit_many([(f.code, detect_programming_language(f.code)) for f in files])
+    
+    async def review_file(index: int, data: CodeInput) -> dict:
+        if not GOOGLE_API_KEY:
+            return {"row": build_review_row(data, current_user, *placeholder_single_review(data))}
+        ast_analysis = await asyncio.to_thread(pending[index].result)
+        context = await asyncio.to_thread(prepare_batch_file, data, current_user, user_context, ast_analysis)
+        if context["duplicate_result"] is not None:
+            # Resubmitted code keeps its earlier review instead of getting a new row
+            return {"existing": context["duplicate_result"]}
+        combined_resp = await generate_prepared_review_text(context, current_user.id)
+        sections = build_single_review_sections(combined_resp, ast_analysis, context["language"])
+        return {"row": build_review_row(data, current_user, *sections)}
+    
+    return await run_batch(files, review_file, save_new_review_batch, review_result,
+                           fan_out=lambda review, args: repo_review_executor.map(current_user.id, review, args),
+                           on_file_reviewed=on_file_reviewed)
+
+@app.post("/generate-reviews/batch")
+async def generate_reviews_batch(data: BatchCodeInput, stream: bool = False,
+                                 current_user: User = Depends(get_current_user)):
+    """Review up to REVIEW_BATCH_MAX_FILES files in one request.
+    Returns per-file results in input order (each shaped like /generate-review, plus file_index and
+    filename, or an `error`). With ?stream=true, Server-Sent Events: a `file` event as each review
+    finishes, then a `done` event with the stored reviews and their ids."""
+    try:
+        check_batch_size(len(data.files))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not stream:
+        return await run_review_batch(data.files, current_user)
+    
+    async def event_stream():
+        finished = asyncio.Queue()
+        batch = asyncio.create_task(run_review_batch(data.files, current_user, on_file_reviewed=finished.put))
+        batch.add_done_callback(lambda _: finished.put_nowait(None))
+        try:
+            while (file_review := await finished.get()) is not None:
+                yield sse_event("file", file_review)
+            yield sse_event("done", batch.result())
+        except Exception as e:
+            traceback.print_exc()
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            batch.cancel()
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/submit-feedback")
 def submit_feedback(data: FeedbackInput, current_user: User = Depends(get_current_user)):
     print(f"DEBUG: Received feedback data:")
@@ -1972,6 +2296,7 @@ def submit_improvement_suggestion(data: dict, current_user: User = Depends(get_c
             learn_from_feedback(db, current_user.id, suggestion)
         
         db.commit()
+        user_context_cache.invalidate(user_id=current_user.id)
         
         return {
             "message": "Improvement suggestion saved successfully",
@@ -1986,36 +2311,105 @@ def submit_improvement_suggestion(data: dict, current_user: User = Depends(get_c
         db.close()
 
 @app.get("/past-reviews")
-def get_past_reviews(current_user: User = Depends(get_current_user)):
+def get_past_reviews(response: Response, limit: Optional[int] = None, cursor: Optional[str] = None,
+                     claims: TokenClaims = Depends(get_current_claims)):
+    """One page of the user's reviews, newest first. Only the listed columns and the review preview are read;
+    when there are more, the X-Next-Cursor header holds the cursor to pass next."""
+    size = page_size(limit)
     db = SessionLocal()
     try:
-        reviews = db.query(Review).filter(Review.user_id == current_user.id).order_by(Review.created_at.desc()).all()
+        query = db.query(
+            Review.id,
+            Review.title,
+            func.substr(Review.review_preview, 1, PAST_REVIEWS_PREVIEW_CHARS).label("preview"),
+            Review.created_at,
+        ).filter(Review.user_id == claims.user_id)
+        if cursor:
+            try:
+                after_created, after_id = decode_cursor(cursor)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            # <= keeps the index range scan; the OR breaks ties on created_at by id
+            query = query.filter(
+                Review.created_at <= after_created,
+                or_(Review.created_at < after_created, Review.id < after_id),
+            )
+        rows = query.order_by(Review.created_at.desc(), Review.id.desc()).limit(size + 1).all()
+        if len(rows) > size:
+            rows = rows[:size]
+            response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+        # Rows from before review_preview existed (migrate_compress_review_text.py fills it in) read the full review
+        missing = [r.id for r in rows if r.preview is None]
+        legacy = dict(db.query(Review.id, Review.review).filter(Review.id.in_(missing)).all()) if missing else {}
         return [
             {
                 "id": r.id,
                 "title": r.title,
-                "comment": (r.review or "")[:200],
+                "comment": r.preview if r.preview is not None else review_preview(legacy.get(r.id)) or "",
                 "created_at": r.created_at.isoformat() if r.created_at else None,
             }
-            for r in reviews
+            for r in rows
         ]
     finally:
         db.close()
 
+def query_review_header(db):
+    """Query for the small columns of a review that file lookups need, without any of its text"""
+    return db.query(
+        Review.id,
+        Review.total_files,
+        Review.is_repository_review,
+        Review.file_reviews.isnot(None).label("has_legacy_file_reviews"),
+    )
+
+def load_file_reviews(db, header, start: int = 0, limit: Optional[int] = None, summary: bool = False) -> List[dict]:
+    """File reviews start.. of a multi-file review (all, or at most limit), in file order.
+    Reads the review's rows, or its legacy JSON blob if it hasn't been migrated.
+    summary leaves out the files' code and review text."""
+    start = max(0, start)
+    if header.has_legacy_file_reviews:
+        blob = db.query(Review.file_reviews).filter(Review.id == header.id).scalar()
+        legacy = parse_file_reviews_json(blob)
+        page = legacy[start:start + limit] if limit is not None else legacy[start:]
+        if summary:
+            return [file_review_from_columns(file_review, header.total_files, summary=True) for file_review in page]
+        return page
+    
+    columns = FILE_REVIEW_SUMMARY_COLUMNS if summary else FILE_REVIEW_COLUMNS + ("details",)
+    query = db.query(*(getattr(RepositoryFileReview, column) for column in columns)).filter(
+        RepositoryFileReview.review_id == header.id,
+        RepositoryFileReview.file_index >= start,
+    ).order_by(RepositoryFileReview.file_index)
+    if limit is not None:
+        query = query.limit(limit)
+    return [file_review_from_columns(row._asdict(), header.total_files, summary=summary) for row in query]
+
+def find_repository_review_header(db, review_id: int, user_id: int):
+    header = query_review_header(db).filter(Review.id == review_id, Review.user_id == user_id).first()
+    if not header:
+        raise HTTPException(status_code=404, detail="Review not found")
+    if header.is_repository_review != "true":
+        raise HTTPException(status_code=404, detail="Not a multi-file review")
+    return header
+
 @app.get("/past-reviews/{review_id}")
-def get_past_review_detail(review_id: int, current_user: User = Depends(get_current_user)):
+def get_past_review_detail(review_id: int, include_files: bool = True, claims: TokenClaims = Depends(get_current_claims)):
+    """A review with its content. For multi-file reviews include_files=false leaves out the per-file
+    reviews, which can then be paged through /past-reviews/{review_id}/files."""
     db = SessionLocal()
     try:
-        review = db.query(Review).filter(Review.id == review_id, Review.user_id == current_user.id).first()
+        review = db.query(Review).options(undefer_group("review_text"), defer(Review.file_reviews)).filter(
+            Review.id == review_id, Review.user_id == claims.user_id
+        ).first()
         if not review:
             raise HTTPException(status_code=404, detail="Review not found")
         
         # Check if this is a repository review
-        if review.is_repository_review == "true" and review.file_reviews:
-            # Parse file reviews from JSON
-            try:
-                file_reviews = json.loads(review.file_reviews)
-                return {
+        if review.is_repository_review == "true":
+            header = query_review_header(db).filter(Review.id == review.id).first()
+            file_reviews = load_file_reviews(db, header) if include_files else None
+            if file_reviews or not include_files:
+                detail = {
                     "id": review.id,
                     "title": review.title,
                     "code": review.code,
@@ -2032,11 +2426,10 @@ def get_past_review_detail(review_id: int, current_user: User = Depends(get_curr
                     "repository_url": review.repository_url,
                     "repository_branch": review.repository_branch,
                     "total_files": review.total_files,
-                    "file_reviews": file_reviews  # Individual file reviews for navigation
                 }
-            except json.JSONDecodeError:
-                # Fallback if JSON parsing fails
-                pass
+                if include_files:
+                    detail["file_reviews"] = file_reviews  # Individual file reviews for navigation
+                return detail
         
         # Return normal single file review
         return {
@@ -2057,34 +2450,271 @@ def get_past_review_detail(review_id: int, current_user: User = Depends(get_curr
     finally:
         db.close()
 
+@app.get("/past-reviews/{review_id}/files")
+def get_past_review_files(review_id: int, start: int = 0, limit: Optional[int] = None, summary: bool = False,
+                          claims: TokenClaims = Depends(get_current_claims)):
+    """A page of a multi-file review's file reviews, from file index start. summary=true returns only
+    paths, languages, ratings and hashes, for navigation. next_start is null on the last page."""
+    size = page_size(limit, default=FILE_REVIEW_PAGE_SIZE, maximum=FILE_REVIEW_MAX_PAGE_SIZE)
+    db = SessionLocal()
+    try:
+        header = find_repository_review_header(db, review_id, claims.user_id)
+        files = load_file_reviews(db, header, start=start, limit=size + 1, summary=summary)
+        next_start = None
+        if len(files) > size:
+            files = files[:size]
+            next_start = max(0, start) + size
+        return {"review_id": review_id, "total_files": header.total_files, "start": max(0, start),
+                "next_start": next_start, "files": files}
+    finally:
+        db.close()
+
+@app.get("/past-reviews/{review_id}/files/{file_index}")
+def get_past_review_file(review_id: int, file_index: int, claims: TokenClaims = Depends(get_current_claims)):
+    """One file of a multi-file review"""
+    db = SessionLocal()
+    try:
+        header = find_repository_review_header(db, review_id, claims.user_id)
+        files = load_file_reviews(db, header, start=file_index, limit=1) if file_index >= 0 else []
+        if not files:
+            raise HTTPException(status_code=404, detail="File not found in review")
+        return files[0]
+    finally:
+        db.close()
+
+def repository_review_sections(combined_resp: str):
+    """Turn a repository file's Gemini response into (review_text, optimized_code, explanation, security_issues)"""
+    # Parse ALL sections from the response in one pass
+    sections = parse_review_sections(combined_resp)
+    code_quality = sections.get('CODE_QUALITY', '')
+    key_findings = sections.get('KEY_FINDINGS', '')
+    security_issues = sections.get('SECURITY', '')
+    performance_analysis = sections.get('PERFORMANCE', '')
+    architecture_analysis = sections.get('ARCHITECTURE', '')
+    best_practices = sections.get('BEST_PRACTICES', '')
+    recommendations = sections.get('RECOMMENDATIONS', '')
+    syntax_errors_section = sections.get('SYNTAX_ERRORS', '')
+    semantic_errors_section = sections.get('SEMANTIC_ERRORS', '')
+    optimized_code = "\n\n---\n\n".join(optimized_code_variants(sections))
+    explanation_text = sections.get('EXPLANATION', '')
+
+    # Combine all sections into review_text with section markers
+    review_sections = []
+
+    if code_quality:
+        review_sections.append(f"###CODE_QUALITY###\n{code_quality}")
+
+    if key_findings:
+        review_sections.append(f"###KEY_FINDINGS###\n{key_findings}")
+
+    if security_issues:
+        review_sections.append(f"###SECURITY###\n{security_issues}")
+
+    if performance_analysis:
+        review_sections.append(f"###PERFORMANCE###\n{performance_analysis}")
+
+    if architecture_analysis:
+        review_sections.append(f"###ARCHITECTURE###\n{architecture_analysis}")
+
+    if best_practices:
+        review_sections.append(f"###BEST_PRACTICES###\n{best_practices}")
+
+    if recommendations:
+        review_sections.append(f"###RECOMMENDATIONS###\n{recommendations}")
+
+    # Add syntax and semantic error sections (always)
+    review_sections.append(f"###SYNTAX_ERRORS###\n{syntax_errors_section}")
+    review_sections.append(f"###SEMANTIC_ERRORS###\n{semantic_errors_section}")
+
+    # Join all sections
+    review_text = "\n\n".join(review_sections)
+    return review_text, optimized_code, explanation_text, security_issues
+
+async def review_repository_file(file_path: str, file_content: str, file_index: int, total_files: Optional[int],
+                                 preferences: UserPreferences, latest_feedback: str, pending_analysis=None,
+                                 ready_response: Optional[str] = None) -> dict:
+    """Review a single repository file under the ReviewExecutor's concurrency limits.
+    pending_analysis is this file's AST analysis, already running in the analysis pool.
+    ready_response is a Gemini response already obtained for this file (a cache hit or its share
+    of a packed multi-file review), in which case no Gemini call is made."""
+    print(f"Processing file {file_index + 1}/{total_files or '?'}: {file_path}")
+    review_failed = False
+    
+    # Generate review using user preferences
+    if not GOOGLE_API_KEY:
+        review_text = f"""🔍 **General Review:**
+✅ {file_path} looks good! Add some comments to make it clearer. 😊
+
+🛡️ **Security Check:**
+Safe ✅ No security problems found.
+
+🚨 **Issues Found:**
+🟢 LOW: Missing comments for better readability"""
+        optimized_code = file_content
+        explanation_text = f"This {file_path} does something useful! 🚀"
+        security_issues = "No security analysis available (no API key)"
+    else:
+        file_language = detect_programming_language(file_content)
+        
+        # Perform AST analysis if enabled
+        ast_analysis = None
+        ast_summary = ""
+        if preferences.ast_analysis and pending_analysis:
+            ast_analysis = await asyncio.to_thread(pending_analysis.result)
+            ast_summary = format_ast_analysis_for_gemini(ast_analysis)
+        
+        # Long files are split at function/class boundaries; chunk size depends on the AST preference
+        max_chars = 2500 if preferences.ast_analysis else 3000
+        chunks = chunk_code(file_content, ast_analysis.structure if ast_analysis else None, max_chars)
+        total_lines = file_content.count("\n") + 1
+
+        # Generate custom prompt based on user preferences for repository review
+        detailed_mode = preferences.detailed_explanations
+        custom_prompt = generate_custom_prompt(
+            preferences, 
+            is_repository_review=True, 
+            detailed_mode=detailed_mode,
+            user_feedback=latest_feedback  # Pass the latest user feedback
+        )
+        
+        # Build complete prompt with file context, one per chunk
+        chunk_prompts = [f"""{custom_prompt}
+
+**Repository File:** {file_path}
+**Language:** {file_language}
+
+{heading}
+```{file_language}
+{chunk.text}
+```
+
+Provide your analysis following the exact section markers (###CODE_QUALITY###, ###KEY_FINDINGS###, ###SECURITY###, ###PERFORMANCE###, ###ARCHITECTURE###, ###BEST_PRACTICES###, ###RECOMMENDATIONS###, ###SYNTAX_ERRORS###, ###SEMANTIC_ERRORS###, ###OPTIMIZED_CODE###, ###EXPLANATION###)."""
+                         for chunk, heading in zip(chunks, code_review_headings(chunks, total_lines))]
+
+        try:
+            if ready_response is not None:
+                combined_resp = ready_response
+            else:
+                combined_resp = await generate_chunked_review_text(chunk_prompts, chunks, file_language, custom_prompt,
+                                                                   preferences.user_id, total_lines, priority=PRIORITY_BULK,
+                                                                   file_path=file_path)
+
+            review_text, optimized_code, explanation_text, security_issues = repository_review_sections(combined_resp)
+            
+            # Fallback to AST findings if Gemini response is empty
+            if not review_text and ast_analysis and ast_analysis.issues:
+                review_text = "AST Analysis findings:\n" + '\n'.join([f"- {issue}" for issue in ast_analysis.issues])
+            
+        except Exception as e:
+            print(f"Error processing {file_path}: {e}")
+            review_failed = True
+            # Use AST analysis as fallback
+            if ast_analysis and ast_analysis.issues:
+                review_text = f"AST Analysis for {file_path}:\n" + '\n'.join([f"- {issue}" for issue in ast_analysis.issues])
+                security_issues = '\n'.join(ast_analysis.security_concerns) if ast_analysis.security_concerns else "No security analysis available"
+            else:
+                review_text = f"Basic analysis completed for {file_path}"
+                security_issues = "Analysis failed"
+            optimized_code = file_content
+            explanation_text = f"Failed to analyze {file_path} with AI" + (", AST analysis completed" if ast_analysis else "")
+
+    # Detect programming language and extract rating
+    detected_language = detect_programming_language(file_content)
+    extracted_rating = extract_rating_from_review(review_text)
+
+    # Create individual file review object
+    return {
+        "file_path": file_path,
+        "original_code": file_content,
+        "review": review_text.strip(),
+        "optimized_code": optimized_code.strip(),
+        "explanation": explanation_text.strip(),
+        "security_issues": security_issues.strip(),
+        "language": detected_language,
+        "rating": extracted_rating,
+        "file_index": file_index,  # 0-based index for UI navigation
+        "total_files": total_files,
+        "content_hash": content_hash(file_content),
+        "review_failed": review_failed,  # Failed reviews are never reused by incremental mode
+        "reused": False
+    }
+
+def build_multi_file_review_row(current_user: User, file_reviews: List[dict], title: str, repository_url: Optional[str],
+                                repository_branch: Optional[str]) -> Review:
+    """One Review row for a multi-file review, with a repository_file_reviews row per file for UI navigation"""
+    combined_code = ""
+    combined_review = ""
+    combined_optimized_code = ""
+    combined_explanation = ""
+    combined_security_issues = ""
+    languages_found = set()
+    total_rating = 0
+    valid_ratings = 0
+    
+    for file_review in file_reviews:
+        file_path = file_review["file_path"]
+        
+        # Track languages and ratings
+        languages_found.add(file_review["language"])
+        if file_review["rating"]:
+            total_rating += file_review["rating"]
+            valid_ratings += 1
+        
+        # Build combined content for the main review fields
+        combined_code += f"\n\n# File: {file_path}\n" + file_review["original_code"]
+        combined_review += f"\n\n## 📁 {file_path}\n{file_review['review']}"
+        combined_optimized_code += f"\n\n# Optimized: {file_path}\n{file_review['optimized_code']}"
+        combined_explanation += f"\n• {file_path}: {file_review['explanation']}"
+        combined_security_issues += f"\n• {file_path}: {file_review['security_issues']}"
+
+    # Calculate average rating
+    avg_rating = round(total_rating / valid_ratings) if valid_ratings > 0 else None
+    
+    return Review(
+        user_id=current_user.id,
+        code=ensure_str(combined_code.strip()[:65000]),  # Limit size for database
+        language=", ".join(sorted(languages_found)) if languages_found else "Mixed",
+        review=combined_review.strip()[:65000],  # Limit size for database
+        review_preview=review_preview(combined_review.strip()),
+        title=title[:200],
+        optimized_code=combined_optimized_code.strip()[:65000],  # Limit size for database
+        explanation=combined_explanation.strip()[:5000],
+        security_issues=combined_security_issues.strip()[:5000],
+        rating=avg_rating,
+        is_repository_review="true",
+        repository_url=repository_url,
+        repository_branch=repository_branch,
+        total_files=len(file_reviews),
+        file_rows=[RepositoryFileReview(**file_review_columns(file_review, index))
+                   for index, file_review in enumerate(file_reviews)],
+        status="completed"
+    )
+
 @app.post("/generate-repo-review")
 async def generate_repo_review(data: GitRepoInput, current_user: User = Depends(get_current_user)):
     """Generate reviews for all files in a Git repository and store as single database entry."""
+    return await run_repository_review(data, current_user)
+
+async def run_repository_review(data: GitRepoInput, current_user: User, on_file_reviewed=None,
+                                before_save=None) -> dict:
+    """Repository review pipeline shared by /generate-repo-review and background review jobs.
+    on_file_reviewed(file_review) is called on a worker thread as each file finishes, and
+    before_save() on a worker thread right before the Review row is stored."""
     temp_dir = None
     try:
         print(f"Starting repository review for: {data.repo_url}")
         
-        # Clone the repository
-        temp_dir = clone_git_repository(data.repo_url, data.branch)
-        
-        # Get all code files
-        code_files = get_code_files(temp_dir, data.include_patterns, data.exclude_patterns, data.max_files)
-        
-        if not code_files:
-            raise HTTPException(status_code=400, detail="No code files found in repository")
+        # Clone the repository (off the event loop - it may wait on the network or a mirror lock)
+        temp_dir = await asyncio.get_running_loop().run_in_executor(
+            None, clone_git_repository, data.repo_url, data.branch,
+            data.include_patterns, data.exclude_patterns, data.max_files
+        )
         
-        print(f"Found {len(code_files)} code files to review")
+        # Code files are discovered lazily; each file's review starts as soon as it is found
+        discovered_files = iter_code_files(temp_dir, data.include_patterns, data.exclude_patterns, data.max_files)
         
         # Process each file and collect reviews
         file_reviews = []
-        combined_code = ""
-        combined_review = ""
-        combined_optimized_code = ""
-        combined_explanation = ""
-        combined_security_issues = ""
-        languages_found = set()
-        total_rating = 0
-        valid_ratings = 0
         
         db = SessionLocal()
         
@@ -2092,217 +2722,208 @@ async def generate_repo_review(data: GitRepoInput, current_user: User = Depends(
             # Extract repository name from URL for title
             repo_name = data.repo_url.split('/')[-1].replace('.git', '')
             
-            # Get user preferences for repository review
-            preferences = get_user_preferences(db, current_user.id)
-            
-            # Fetch latest improvement suggestion to incorporate into prompt
-            latest_feedback = get_latest_improvement_suggestion(db, current_user.id)
+            # User preferences and latest improvement suggestion for the repository review prompt
+            user_context = user_context_for(current_user)
+            preferences = user_context.preferences
+            latest_feedback = user_context.latest_suggestion
             if latest_feedback:
                 print(f"📝 Incorporating user feedback into repository review prompt: '{latest_feedback[:80]}...'")
             else:
                 print(f"ℹ️ No previous feedback to incorporate for repository review")
             
-            # Initialize AST analyzer for repository review (if enabled)
-            analyzer = CodeAnalyzer() if preferences.ast_analysis else None
+            # A stored review is only reusable if it was produced by the same effective prompt
+            repo_custom_prompt = generate_custom_prompt(preferences, is_repository_review=True,
+                                                        detailed_mode=preferences.detailed_explanations,
+                                                        user_feedback=latest_feedback)
+            prompt_hash = prompt_fingerprint(repo_custom_prompt, GEMINI_MODEL_NAME)
             
-            for i, (file_path, file_content) in enumerate(code_files.items(), 1):
-                print(f"Processing file {i}/{len(code_files)}: {file_path}")
-                
-                # Generate review using user preferences
-                if not GOOGLE_API_KEY:
-                    review_text = f"""🔍 **General Review:**
-✅ {file_path} looks good! Add some comments to make it clearer. 😊
-
-🛡️ **Security Check:**
-Safe ✅ No security problems found.
-
-🚨 **Issues Found:**
-🟢 LOW: Missing comments for better readability"""
-                    optimized_code = file_content
-                    explanation_text = f"This {file_path} does something useful! 🚀"
-                    security_issues = "No security analysis available (no API key)"
-                else:
-                    file_language = detect_programming_language(file_content)
+            # Incremental mode: index the last review of this repo/branch
+            previous_review_id = None
+            previous_by_path = {}
+            if data.incremental:
+                previous_review = query_review_header(db).filter(
+                    Review.user_id == current_user.id,
+                    Review.is_repository_review == "true",
+                    Review.repository_url == data.repo_url,
+                    Review.repository_branch == data.branch
+                ).order_by(Review.created_at.desc()).first()
+                if previous_review:
+                    previous_review_id = previous_review.id
+                    previous_by_path = index_previous_file_reviews(load_file_reviews(db, previous_review))
+            
+            # total_files is only known once discovery finishes; reviews reported before that carry None
+            discovery = {"total_files": None}
+            
+            async def review_file(*args, **kwargs):
+                file_review = await review_repository_file(*args, **kwargs)
+                file_review["prompt_hash"] = prompt_hash
+                file_review["total_files"] = file_review["total_files"] or discovery["total_files"]
+                if on_file_reviewed:
+                    await asyncio.to_thread(on_file_reviewed, file_review)
+                return file_review
+            
+            # Small files share one Gemini call, so the review instructions are sent once per pack
+            pack = FilePack()
+            pack_stats = {"packs": 0, "packed_files": 0}
+            
+            # Discovery only reads ahead of reviews still in flight, so memory grows with the
+            # number of in-flight files rather than the size of the repository. Files waiting in
+            # the pack hold slots too, so the pack can never take every slot.
+            read_ahead = asyncio.Semaphore(repo_review_executor.max_per_user * 2 + pack.max_files)
+            results = {}
+            review_tasks = []
+            
+            def submit_file_analyses(files):
+                """Start AST analysis of (path, content) files in one submission, so small files share
+                worker chunks; None per file when AST analysis is off"""
+                if not (preferences.ast_analysis and GOOGLE_API_KEY):
+                    return [None] * len(files)
+                return ast_analysis_pool.submit_many(
+                    [(content, detect_programming_language(content)) for _, content in files]
+                )
+            
+            async def review_discovered_file(index, file_path, file_content, ready_response=None, pending_analysis=None):
+                try:
+                    # AST analysis (if enabled) runs on the analysis pool alongside the Gemini call
+                    if pending_analysis is None:
+                        pending_analysis = submit_file_analyses([(file_path, file_content)])[0]
+                    results[index] = await repo_review_executor.run(
+                        current_user.id, review_file, file_path, file_content, index, discovery["total_files"],
+                        preferences, latest_feedback, pending_analysis, ready_response=ready_response
+                    )
+                finally:
+                    read_ahead.release()
+            
+            async def review_packed_files(files):
+                """Review (index, path, content) files with one Gemini call; files whose review can't be
+                found in the response (or all of them, if the call fails) are reviewed one by one"""
+                attributed = {}
+                # The pack's files are analyzed together, while the packed Gemini call runs
+                analyses = submit_file_analyses([(path, content) for _, path, content in files])
+                try:
+                    packed = [(path, detect_programming_language(content), content) for _, path, content in files]
+                    packed_prompt = build_packed_prompt(repo_custom_prompt, packed)
                     
-                    # Perform AST analysis if enabled
-                    ast_analysis = None
-                    ast_summary = ""
-                    if preferences.ast_analysis and analyzer:
-                        ast_analysis = analyzer.analyze_code(file_content, file_language)
-                        ast_summary = format_ast_analysis_for_gemini(ast_analysis)
+                    async def generate_packed():
+                        return await review_llm.generate(packed_prompt, user_id=current_user.id, priority=PRIORITY_BULK)
                     
-                    # Truncate based on AST preference
-                    max_chars = 2500 if preferences.ast_analysis else 3000
-                    code_for_prompt = file_content
-                    if isinstance(code_for_prompt, str) and len(code_for_prompt) > max_chars:
-                        code_for_prompt = code_for_prompt[:max_chars] + "\n# ... (truncated)"
-
-                    # Generate custom prompt based on user preferences for repository review
-                    detailed_mode = preferences.detailed_explanations
-                    custom_prompt = generate_custom_prompt(
-                        preferences, 
-                        is_repository_review=True, 
-                        detailed_mode=detailed_mode,
-                        user_feedback=latest_feedback  # Pass the latest user feedback
-                    )
+                    cache_key = packed_review_cache_key(packed_prompt)
+                    response_text = await asyncio.to_thread(review_cache.get, cache_key)
+                    if response_text is None:
+                        response_text = await repo_review_executor.run(current_user.id, generate_packed)
+                        await asyncio.to_thread(review_cache.put, cache_key, response_text)
+                    attributed = attribute_packed_response(response_text, [path for path, _, _ in packed])
+                    pack_stats["packs"] += 1
+                    pack_stats["packed_files"] += len(attributed)
+                    if len(attributed) < len(files):
+                        print(f"📦 Packed review covered {len(attributed)}/{len(files)} files; reviewing the rest individually")
+                except Exception as e:
+                    print(f"⚠️ Packed review of {len(files)} files failed ({e}); reviewing them individually")
+                await asyncio.gather(*(review_discovered_file(index, path, content, attributed.get(path), analysis)
+                                       for (index, path, content), analysis in zip(files, analyses)))
+            
+            def flush_pack():
+                files = pack.take()
+                if len(files) == 1:
+                    review_tasks.append(asyncio.create_task(review_discovered_file(*files[0])))
+                elif files:
+                    review_tasks.append(asyncio.create_task(review_packed_files(files)))
+            
+            loop = asyncio.get_running_loop()
+            file_count = 0
+            reused_count = 0
+            try:
+                while True:
+                    await read_ahead.acquire()
+                    discovered = await loop.run_in_executor(None, next, discovered_files, None)
+                    if discovered is None:
+                        read_ahead.release()
+                        break
+                    file_path, file_content = discovered
+                    index = file_count
+                    file_count += 1
                     
-                    # Build complete prompt with file context
-                    combined_prompt = f"""{custom_prompt}
-
-**Repository File:** {file_path}
-**Language:** {file_language}
-
-**Code to Review:**
-```{file_language}
-{code_for_prompt}
-```
-
-Provide your analysis following the exact section markers (###CODE_QUALITY###, ###KEY_FINDINGS###, ###SECURITY###, ###PERFORMANCE###, ###ARCHITECTURE###, ###BEST_PRACTICES###, ###RECOMMENDATIONS###, ###SYNTAX_ERRORS###, ###SEMANTIC_ERRORS###, ###OPTIMIZED_CODE###, ###EXPLANATION###)."""
-
-                    try:
-                        combined_resp = extract_text_from_gemini_response(model.generate_content(combined_prompt))
-
-                        # Parse combined response by markers
-                        def parse_section(text, marker):
-                            import re
-                            pattern = rf"{marker}(.*?)(?=###[A-Z_]+###|$)"
-                            m = re.search(pattern, text, re.S)
-                            return m.group(1).strip() if m else ''
-
-                        # Parse ALL sections from the response
-                        code_quality = parse_section(combined_resp, '###CODE_QUALITY###')
-                        key_findings = parse_section(combined_resp, '###KEY_FINDINGS###')
-                        security_issues = parse_section(combined_resp, '###SECURITY###')
-                        performance_analysis = parse_section(combined_resp, '###PERFORMANCE###')
-                        architecture_analysis = parse_section(combined_resp, '###ARCHITECTURE###')
-                        best_practices = parse_section(combined_resp, '###BEST_PRACTICES###')
-                        recommendations = parse_section(combined_resp, '###RECOMMENDATIONS###')
-                        syntax_errors_section = parse_section(combined_resp, '###SYNTAX_ERRORS###')
-                        semantic_errors_section = parse_section(combined_resp, '###SEMANTIC_ERRORS###')
-                        optimized_code = parse_section(combined_resp, '###OPTIMIZED_CODE###')
-                        explanation_text = parse_section(combined_resp, '###EXPLANATION###')
-                        
-                        # Combine all sections into review_text with section markers
-                        review_sections = []
-                        
-                        if code_quality:
-                            review_sections.append(f"###CODE_QUALITY###\n{code_quality}")
-                        
-                        if key_findings:
-                            review_sections.append(f"###KEY_FINDINGS###\n{key_findings}")
-                        
-                        if security_issues:
-                            review_sections.append(f"###SECURITY###\n{security_issues}")
-                        
-                        if performance_analysis:
-                            review_sections.append(f"###PERFORMANCE###\n{performance_analysis}")
-                        
-                        if architecture_analysis:
-                            review_sections.append(f"###ARCHITECTURE###\n{architecture_analysis}")
-                        
-                        if best_practices:
-                            review_sections.append(f"###BEST_PRACTICES###\n{best_practices}")
-                        
-                        if recommendations:
-                            review_sections.append(f"###RECOMMENDATIONS###\n{recommendations}")
-                        
-                        # Add syntax and semantic error sections (always)
-                        review_sections.append(f"###SYNTAX_ERRORS###\n{syntax_errors_section}")
-                        review_sections.append(f"###SEMANTIC_ERRORS###\n{semantic_errors_section}")
-                        
-                        # Join all sections
-                        review_text = "\n\n".join(review_sections)
-                        
-                        # Fallback to AST findings if Gemini response is empty
-                        if not review_text and ast_analysis and ast_analysis.issues:
-                            review_text = "AST Analysis findings:\n" + '\n'.join([f"- {issue}" for issue in ast_analysis.issues])
-                        
-                    except Exception as e:
-                        print(f"Error processing {file_path}: {e}")
-                        # Use AST analysis as fallback
-                        if ast_analysis and ast_analysis.issues:
-                            review_text = f"AST Analysis for {file_path}:\n" + '\n'.join([f"- {issue}" for issue in ast_analysis.issues])
-                            security_issues = '\n'.join(ast_analysis.security_concerns) if ast_analysis.security_concerns else "No security analysis available"
-                        else:
-                            review_text = f"Basic analysis completed for {file_path}"
-                            security_issues = "Analysis failed"
-                        optimized_code = file_content
-                        explanation_text = f"Failed to analyze {file_path} with AI" + (", AST analysis completed" if ast_analysis else "")
-
-                # Detect programming language and extract rating
-                detected_language = detect_programming_language(file_content)
-                extracted_rating = extract_rating_from_review(review_text)
-                
-                # Track languages and ratings
-                languages_found.add(detected_language)
-                if extracted_rating:
-                    total_rating += extracted_rating
-                    valid_ratings += 1
-
-                # Create individual file review object
-                file_review = {
-                    "file_path": file_path,
-                    "original_code": file_content,
-                    "review": review_text.strip(),
-                    "optimized_code": optimized_code.strip(),
-                    "explanation": explanation_text.strip(),
-                    "security_issues": security_issues.strip(),
-                    "language": detected_language,
-                    "rating": extracted_rating,
-                    "file_index": i - 1,  # 0-based index for UI navigation
-                    "total_files": len(code_files)
-                }
-                
-                file_reviews.append(file_review)
+                    # Incremental mode: reuse reviews of files unchanged since the last review of this repo/branch
+                    reused = reuse_previous_review(index, file_path, file_content, previous_by_path, prompt_hash)
+                    if reused:
+                        read_ahead.release()
+                        reused_count += 1
+                        results[index] = reused
+                        if on_file_reviewed:
+                            await asyncio.to_thread(on_file_reviewed, reused)
+                        continue
+                    
+                    if GOOGLE_API_KEY and packable(file_content):
+                        # A cached review is served as is rather than spent on a pack
+                        cached = await asyncio.to_thread(
+                            review_cache.get,
+                            review_cache_key(file_content, detect_programming_language(file_content), repo_custom_prompt,
+                                             file_path)
+                        )
+                        if cached is None:
+                            if not pack.fits(file_content):
+                                flush_pack()
+                            pack.add(index, file_path, file_content)
+                            if pack.full():
+                                flush_pack()
+                            continue
+                        review_tasks.append(asyncio.create_task(
+                            review_discovered_file(index, file_path, file_content, cached)))
+                        continue
+                    review_tasks.append(asyncio.create_task(review_discovered_file(index, file_path, file_content)))
+                flush_pack()
                 
-                # Build combined content for the main review fields
-                combined_code += f"\n\n# File: {file_path}\n" + file_content
-                combined_review += f"\n\n## 📁 {file_path}\n{review_text}"
-                combined_optimized_code += f"\n\n# Optimized: {file_path}\n{optimized_code}"
-                combined_explanation += f"\n• {file_path}: {explanation_text}"
-                combined_security_issues += f"\n• {file_path}: {security_issues}"
-
-            # Calculate average rating
-            avg_rating = round(total_rating / valid_ratings) if valid_ratings > 0 else None
+                discovery["total_files"] = file_count
+                if file_count:
+                    print(f"Found {file_count} code files to review")
+                await asyncio.gather(*review_tasks)
+            except BaseException:
+                for task in review_tasks:
+                    task.cancel()
+                raise
+            
+            if not file_count:
+                raise HTTPException(status_code=400, detail="No code files found in repository")
+            if data.incremental:
+                print(f"♻️ Incremental review: reused {reused_count} file(s) from review {previous_review_id}, re-reviewed {file_count - reused_count}")
+            if pack_stats["packs"]:
+                print(f"📦 Reviewed {pack_stats['packed_files']} small file(s) in {pack_stats['packs']} packed Gemini call(s)")
+            
+            file_reviews = [results[i] for i in range(file_count)]
+            for file_review in file_reviews:
+                file_review["total_files"] = file_count
             
             # Create repository title
-            repo_title = f"🏗️ Repository: {repo_name} ({data.branch}) - {len(code_files)} files"
+            repo_title = f"🏗️ Repository: {repo_name} ({data.branch}) - {file_count} files"
             
             # Create single database entry for the entire repository
-            new_review = Review(
-                user_id=current_user.id,
-                code=ensure_str(combined_code.strip()[:65000]),  # Limit size for database
-                language=", ".join(sorted(languages_found)) if languages_found else "Mixed",
-                review=combined_review.strip()[:65000],  # Limit size for database
-                title=repo_title[:200],
-                optimized_code=combined_optimized_code.strip()[:65000],  # Limit size for database
-                explanation=combined_explanation.strip()[:5000],
-                security_issues=combined_security_issues.strip()[:5000],
-                rating=avg_rating,
-                is_repository_review="true",
-                repository_url=data.repo_url,
-                repository_branch=data.branch,
-                total_files=len(code_files),
-                file_reviews=json.dumps(file_reviews),  # Store individual file reviews as JSON
-                status="completed"
-            )
+            new_review = build_multi_file_review_row(current_user, file_reviews, repo_title, data.repo_url, data.branch)
+            if before_save:
+                await asyncio.to_thread(before_save)
             db.add(new_review)
             db.commit()
             db.refresh(new_review)
             
             # Return response in the format expected by frontend
             return {
-                "message": f"Successfully reviewed {len(code_files)} files from repository",
+                "message": f"Successfully reviewed {file_count} files from repository",
                 "repository_url": data.repo_url,
                 "branch": data.branch,
-                "total_files": len(code_files),
+                "total_files": file_count,
                 "review_id": new_review.id,
+                "incremental": data.incremental,
+                "previous_review_id": previous_review_id,
+                "reused_files": reused_count,
+                "reviewed_files": file_count - reused_count,
+                "packed_files": pack_stats["packed_files"],
                 "reviews": file_reviews  # Individual file reviews for UI navigation
             }
         
         finally:
             db.close()
         
+    except LeaseLost:
+        raise
     except Exception as e:
         print(f"Error processing repository: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing repository: {str(e)}")
@@ -2311,13 +2932,361 @@ Provide your analysis following the exact section markers (###CODE_QUALITY###, #
         # Clean up temporary directory
         if temp_dir and os.path.exists(temp_dir):
             try:
-                shutil.rmtree(temp_dir)
+                release_repository_checkout(temp_dir)
                 print(f"Cleaned up temporary directory: {temp_dir}")
             except Exception as e:
                 print(f"Warning: Failed to clean up temporary directory {temp_dir}: {e}")
 
+# ------------------ Diff Review ------------------
+
+def load_review_diff(data: DiffReviewInput):
+    """(unified diff, checkout directory or None, head commit or None) for a diff review request"""
+    if data.diff:
+        return data.diff, None, None
+    # Reuse the clone path (and its mirror cache); the diff itself is taken between fetched commits
+    repo_dir = clone_git_repository(data.repo_url, data.head)
+    try:
+        diff_text, head_commit = git_diff_refs(repo_dir, data.base, data.head, data.context_lines,
+                                               fetch=lambda ref: fetch_repository_ref(repo_dir, ref),
+                                               env=repository_git_env(repo_dir))
+    except Exception:
+        release_repository_checkout(repo_dir)
+        raise
+    return diff_text, repo_dir, head_commit
+
+async def review_diff_file(file_diff, new_content: Optional[str], file_index: int, total_files: int,
+                           preferences: UserPreferences, custom_prompt: str, user_id: int, context_lines: int) -> dict:
+    """Review the changed regions of one file. Only regions that are whole functions get AST analysis,
+    and only the regions (not the whole file) are sent to Gemini."""
+    shown_lines = file_diff.new_side()[0]
+    language = detect_programming_language(new_content if new_content is not None else "\n".join(shown_lines.values()))
+    regions = changed_regions(file_diff, new_content, language, context_lines)
+    rendered, regions = render_regions(regions, file_diff, new_content)
+    changed_code = "\n\n".join(region_text(region, file_diff, new_content) for region in regions)
+    print(f"Processing changed file {file_index + 1}/{total_files}: {file_diff.path} ({len(regions)} region(s))")
+    review_failed = False
+    
+    # AST analysis of the changed functions only; findings are renumbered to file lines
+    ast_findings = []
+    if preferences.ast_analysis and GOOGLE_API_KEY:
+        complete = [region for region in regions if region.complete]
+        pending = ast_analysis_pool.submit_many(
+            [(textwrap.dedent(region_text(region, file_diff, new_content)), language) for region in complete]
+        )
+        for region, handle in zip(complete, pending):
+            analysis = await asyncio.to_thread(handle.result)
+            for finding in analysis.issues + analysis.security_concerns + analysis.performance_issues:
+                ast_findings.append(offset_line_numbers(finding, region.start_line - 1))
+    
+    if not GOOGLE_API_KEY:
+        review_text = f"""🔍 **General Review:**
+✅ The changes to {file_diff.path} look good! 😊
+
+🛡️ **Security Check:**
+Safe ✅ No security problems found."""
+        optimized_code = changed_code
+        explanation_text = f"Changes to {file_diff.path} reviewed without AI (no API key)"
+        security_issues = "No security analysis available (no API key)"
+    else:
+        findings_block = ""
+        if ast_findings:
+            findings_block = "\n**Static Analysis of Changed Functions:**\n" + "\n".join(f"- {f}" for f in ast_findings) + "\n"
+        combined_prompt = f"""{custom_prompt}
+
+**Changed File:** {file_diff.path}{" (new file)" if file_diff.is_new else ""}
+**Language:** {language}
+
+**Changes to Review:**
+Only the changed regions of this file are shown, numbered as in the new version of the file. Lines marked "+" were added or changed and lines marked "-" were removed. Review the changes and their direct effects, don't report code outside these regions as missing, and give optimized code for the shown regions only.
+```diff
+{rendered}
+```
+{findings_block}
+Provide your analysis following the exact section markers (###CODE_QUALITY###, ###KEY_FINDINGS###, ###SECURITY###, ###PERFORMANCE###, ###ARCHITECTURE###, ###BEST_PRACTICES###, ###RECOMMENDATIONS###, ###SYNTAX_ERRORS###, ###SEMANTIC_ERRORS###, ###OPTIMIZED_CODE###, ###EXPLANATION###)."""
+        try:
+            combined_resp = await generate_review_text(combined_prompt, rendered, language, custom_prompt, user_id,
+                                                       file_path=file_diff.path)
+            review_text, optimized_code, explanation_text, security_issues = repository_review_sections(combined_resp)
+        except Exception as e:
+            print(f"Error processing changes to {file_diff.path}: {e}")
+            review_failed = True
+            if ast_findings:
+                review_text = f"AST Analysis of changed functions in {file_diff.path}:\n" + "\n".join(f"- {f}" for f in ast_findings)
+            else:
+                review_text = f"Basic analysis completed for changes to {file_diff.path}"
+            optimized_code = changed_code
+            explanation_text = f"Failed to analyze changes to {file_diff.path} with AI"
+            security_issues = "Analysis failed"
+    
+    return {
+        "file_path": file_diff.path,
+        "original_code": changed_code,  # the reviewed regions, not the whole file
+        "diff": rendered,
+        "changed_regions": [[region.start_line, region.end_line] for region in regions],
+        "is_new_file": file_diff.is_new,
+        "review": review_text.strip(),
+        "optimized_code": optimized_code.strip(),
+        "explanation": explanation_text.strip(),
+        "security_issues": security_issues.strip(),
+        "language": language,
+        "rating": extract_rating_from_review(review_text),
+        "file_index": file_index,
+        "total_files": total_files,
+        "content_hash": content_hash(changed_code),
+        "review_failed": review_failed,
+        "reused": False
+    }
+
+@app.post("/generate-diff-review")
+async def generate_diff_review(data: DiffReviewInput, current_user: User = Depends(get_current_user)):
+    """Review only what changed: the hunks of a unified diff, or the diff between two refs of a repository.
+    Stored as a multi-file review with one entry per changed file."""
+    if not data.diff and not (data.repo_url and data.base and data.head):
+        raise HTTPException(status_code=400, detail="Provide a unified diff, or repo_url with base and head refs")
+    
+    repo_dir = None
+    db = SessionLocal()
+    try:
+        diff_text, repo_dir, head_commit = await asyncio.to_thread(load_review_diff, data)
+        
+        # Deleted and binary files have nothing left to review
+        file_diffs = [f for f in parse_unified_diff(diff_text) if f.hunks and not (f.is_deleted or f.is_binary)]
+        selected = set(select_candidate_paths([f.path for f in file_diffs], data.include_patterns,
+                                              data.exclude_patterns, DIFF_MAX_FILES))
+        file_diffs = [f for f in file_diffs if f.path in selected]
+        if not file_diffs:
+            raise HTTPException(status_code=400, detail="No changed code files found in the diff")
+        
+        new_contents = [None] * len(file_diffs)
+        if repo_dir:
+            new_contents = await asyncio.gather(*(
+                asyncio.to_thread(read_revision_file, repo_dir, head_commit, f.path, repository_git_env(repo_dir))
+                for f in file_diffs
+            ))
+        
+        user_context = user_context_for(current_user)
+        preferences, latest_feedback = user_context.preferences, user_context.latest_suggestion
+        custom_prompt = generate_custom_prompt(preferences, is_repository_review=True,
+                                               detailed_mode=preferences.detailed_explanations,
+                                               user_feedback=latest_feedback)
+        
+        total = len(file_diffs)
+        file_reviews = await asyncio.gather(*(
+            repo_review_executor.run(current_user.id, review_diff_file, file_diff, new_content, index, total,
+                                     preferences, custom_prompt, current_user.id, data.context_lines)
+            for index, (file_diff, new_content) in enumerate(zip(file_diffs, new_contents))
+        ))
+        
+        changed_lines = sum(len(f.new_side()[1]) for f in file_diffs)
+        reviewed_lines = sum(end - start + 1 for fr in file_reviews for start, end in fr["changed_regions"])
+        print(f"🔀 Diff review: {changed_lines} changed line(s) in {total} file(s), {reviewed_lines} line(s) sent for review")
+        
+        if data.repo_url:
+            repo_name = data.repo_url.rstrip('/').split('/')[-1].replace('.git', '')
+            title = f"🔀 Diff: {repo_name} ({data.base}..{data.head}) - {total} files"
+            branch_label = f"{data.base}..{data.head}"[:100]
+        else:
+            title = f"🔀 Diff review - {total} files"
+            branch_label = None
+        new_review = build_multi_file_review_row(current_user, file_reviews, title, data.repo_url, branch_label)
+        db.add(new_review)
+        db.commit()
+        db.refresh(new_review)
+        
+        return {
+            "message": f"Successfully reviewed changes to {total} files",
+            "review_id": new_review.id,
+            "repository_url": data.repo_url,
+            "base": data.base,
+            "head": data.head,
+            "total_files": total,
+            "changed_lines": changed_lines,
+            "reviewed_lines": reviewed_lines,
+            "reviews": file_reviews
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error processing diff review: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing diff review: {str(e)}")
+    finally:
+        db.close()
+        if repo_dir:
+            release_repository_checkout(repo_dir)
+
+# ------------------ Review Jobs ------------------
+# Submit a review, get a job id back immediately, then poll for status and per-file results
+
+review_job_queue = ReviewJobQueue(SessionLocal, ReviewJob, ReviewJobFile)
+
+def load_user(user_id: int) -> User:
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return user
+    finally:
+        db.close()
+
+async def run_review_job(job, report, check_lease):
+    """Background handler for single-file review jobs"""
+    user = await asyncio.to_thread(load_user, job.user_id)
+    result = await run_single_review(CodeInput(**json.loads(job.payload)), user, before_save=check_lease)
+    await asyncio.to_thread(report, {**result, "file_index": 0, "total_files": 1})
+    return result["id"]
+
+async def run_repository_review_job(job, report, check_lease):
+    """Background handler for repository review jobs"""
+    user = await asyncio.to_thread(load_user, job.user_id)
+    result = await run_repository_review(GitRepoInput(**json.loads(job.payload)), user, on_file_reviewed=report,
+                                         before_save=check_lease)
+    return result["review_id"]
+
+review_job_queue.register("review", run_review_job)
+review_job_queue.register("repository", run_repository_review_job)
+
+@app.on_event("startup")
+async def start_review_job_workers():
+    try:
+        await review_job_queue.start()
+    except Exception as e:
+        print(f"⚠️  Could not start review job workers: {e}")
+
+@app.on_event("shutdown")
+async def stop_review_job_workers():
+    await review_job_queue.stop()
+    ast_analysis_pool.shutdown()
+    password_hasher.shutdown()
+    await review_llm.aclose()
+
+def serialize_job(job) -> dict:
+    return {
+        "job_id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "progress": {"done": job.progress_done, "total": job.progress_total},
+        "review_id": job.review_id,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+@app.post("/jobs/review", status_code=202)
+async def submit_review_job(data: CodeInput, current_user: User = Depends(get_current_user)):
+    """Queue a single-file review; returns a job id right away"""
+    job_id = review_job_queue.submit(current_user.id, "review", data.model_dump())
+    return {"job_id": job_id, "status": "queued"}
+
+@app.post("/jobs/repo-review", status_code=202)
+async def submit_repo_review_job(data: GitRepoInput, current_user: User = Depends(get_current_user)):
+    """Queue a repository review; returns a job id right away"""
+    job_id = review_job_queue.submit(current_user.id, "repository", data.model_dump())
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+def get_review_job(job_id: str, claims: TokenClaims = Depends(get_current_claims)):
+    """Job status and file-level progress"""
+    job = review_job_queue.get_job(job_id, claims.user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_job(job)
+
+@app.get("/jobs/{job_id}/files/{file_index}")
+def get_review_job_file(job_id: str, file_index: int, claims: TokenClaims = Depends(get_current_claims)):
+    """Fetch one file's review as soon as it is ready, without waiting for the whole job"""
+    job = review_job_queue.get_job(job_id, claims.user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job.status != "completed":
+        file_review = review_job_queue.get_partial_result(job_id, file_index)
+        if file_review is None and job.status == "failed":
+            raise HTTPException(status_code=409, detail=f"Job failed: {job.error}")
+        if file_review is None:
+            return JSONResponse(status_code=202, content={"job_id": job_id, "status": job.status, "file_index": file_index})
+        return file_review
+    
+    db = SessionLocal()
+    try:
+        header = query_review_header(db).filter(Review.id == job.review_id, Review.user_id == claims.user_id).first()
+        if not header:
+            raise HTTPException(status_code=404, detail="Review not found")
+        
+        if header.is_repository_review == "true":
+            files = load_file_reviews(db, header, start=file_index, limit=1) if file_index >= 0 else []
+            if not files:
+                raise HTTPException(status_code=404, detail="File not found in job results")
+            return files[0]
+        
+        if file_index != 0:
+            raise HTTPException(status_code=404, detail="File not found in job results")
+        review = db.query(Review).options(undefer(Review.review), undefer(Review.optimized_code)).filter(
+            Review.id == header.id
+        ).first()
+        return {
+            "id": review.id,
+            "title": review.title,
+            "review": review.review,
+            "optimized_code": review.optimized_code,
+            "explanation": review.explanation,
+            "security_issues": review.security_issues,
+            "language": review.language,
+            "rating": review.rating,
+            "file_index": 0,
+            "total_files": 1,
+        }
+    finally:
+        db.close()
+
 # ------------------ Admin Endpoints ------------------
 
+@app.get("/admin/stats/review-cache")
+def get_review_cache_stats(current_admin = Depends(get_current_admin)):
+    """Hit/miss counters for the content-addressed review cache"""
+    return review_cache.stats()
+
+@app.get("/admin/stats/prompt-templates")
+def get_prompt_template_stats(current_admin = Depends(get_current_admin)):
+    """Hit/miss counters for the compiled prompt template cache"""
+    return prompt_template_cache.stats()
+
+@app.get("/admin/stats/review-policy")
+def get_review_policy_stats(current_admin = Depends(get_current_admin)):
+    """Fast-path short-circuits per rule and the LLM calls and prompt characters they saved (estimated)"""
+    return review_policy_stats.stats()
+
+@app.get("/admin/stats/user-context")
+def get_user_context_stats(current_admin = Depends(get_current_admin)):
+    """Hit/miss counters for the per-user context cache used by authentication and reviews"""
+    return user_context_cache.stats()
+
+@app.get("/admin/stats/token-claims")
+def get_token_claims_stats(current_admin = Depends(get_current_admin)):
+    """Hit/miss counters of the token version cache and how many revoked tokens were rejected"""
+    return token_version_cache.stats()
+
+@app.get("/admin/stats/text-compression")
+def get_text_compression_stats(current_admin = Depends(get_current_admin)):
+    """Codec settings and the bytes written before and after compression by this process"""
+    return compression_stats.stats()
+
+@app.get("/admin/stats/password-hashing")
+def get_password_hashing_stats(current_admin = Depends(get_current_admin)):
+    """Queue depth, rejections and rehashes of the bcrypt pool"""
+    return password_hasher.stats()
+
+@app.get("/admin/stats/llm")
+def get_llm_stats(current_admin = Depends(get_current_admin)):
+    """Call, retry and circuit breaker counters for the LLM gateway"""
+    return review_llm.stats()
+
+@app.get("/admin/stats/repo-cache")
+def get_repo_cache_stats(current_admin = Depends(get_current_admin)):
+    """Disk usage of the repository mirror cache"""
+    return repo_mirror_cache.stats() if repo_mirror_cache else {"enabled": False}
+
 @app.get("/admin/stats/overall")
 def get_overall_stats(current_admin = Depends(get_current_admin)):
     """Get overall system statistics for admin dashboard"""
@@ -2397,7 +3366,7 @@ def get_all_reviews(current_admin = Depends(get_current_admin), page: int = 1, l
     db = SessionLocal()
     try:
         offset = (page - 1) * limit
-        reviews = db.query(Review).join(User).offset(offset).limit(limit).all()
+        reviews = db.query(Review).options(undefer(Review.code)).join(User).offset(offset).limit(limit).all()
         total_reviews = db.query(Review).count()
         
         reviews_data = []
@@ -2430,7 +3399,7 @@ def get_review_detail(review_id: int, current_admin = Depends(get_current_admin)
     """Get detailed view of a specific review for admin"""
     db = SessionLocal()
     try:
-        review = db.query(Review).join(User).filter(Review.id == review_id).first()
+        review = db.query(Review).options(undefer_group("review_text")).join(User).filter(Review.id == review_id).first()
         if not review:
             raise HTTPException(status_code=404, detail="Review not found")
         
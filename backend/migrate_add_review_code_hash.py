@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the code_hash column to the reviews table.
+Duplicate detection compares this SHA-256 of the submitted code in SQL instead of
+decompressing every recent review. Single-file reviews from the duplicate window get
+their hash filled in; older ones are never compared, so they are left without one.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+from compressed_text import decompress_text
+from incremental_review import content_hash
+from review_policy import REVIEW_POLICY_DUPLICATE_WINDOW_SECONDS
+
+# Load environment variables
+load_dotenv()
+POSTGRES_URI = os.getenv("POSTGRES_URI")
+
+# Database setup
+if POSTGRES_URI:
+    db_uri = POSTGRES_URI
+    engine = create_engine(db_uri, future=True)
+else:
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "code_review.db").replace("\\", "/")
+    db_uri = f"sqlite:///{db_path}"
+    engine = create_engine(db_uri, future=True, connect_args={"check_same_thread": False})
+
+INDEX_NAME = "ix_reviews_user_code_hash_created"
+
+def existing_review_columns(conn):
+    if "postgresql" in str(engine.url):
+        result = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name = 'reviews'"))
+        return {row[0] for row in result.fetchall()}
+    result = conn.execute(text("PRAGMA table_info(reviews)"))
+    return {row[1] for row in result.fetchall()}
+
+def fill_recent_hashes(conn):
+    """code_hash for single-file reviews that duplicate detection can still match"""
+    cutoff = datetime.utcnow() - timedelta(seconds=REVIEW_POLICY_DUPLICATE_WINDOW_SECONDS)
+    rows = conn.execute(text(
+        "SELECT id, code FROM reviews WHERE code_hash IS NULL AND is_repository_review = 'false' "
+        "AND status = 'completed' AND created_at >= :cutoff"
+    ), {"cutoff": cutoff}).fetchall()
+    for review_id, code in rows:
+        conn.execute(text("UPDATE reviews SET code_hash = :hash WHERE id = :id"),
+                     {"hash": content_hash(decompress_text(code) if code is not None else ""), "id": review_id})
+    print(f"Filled code_hash for {len(rows)} recent review(s)")
+
+def migrate_database():
+    """Add code_hash and its index to the reviews table if they don't exist."""
+    print("Starting review code hash database migration...")
+
+    try:
+        with engine.connect() as conn:
+            existing_columns = existing_review_columns(conn)
+            if not existing_columns:
+                print("reviews doesn't exist yet; the app creates it with code_hash")
+                return
+            if 'code_hash' not in existing_columns:
+                migration = "ALTER TABLE reviews ADD COLUMN code_hash VARCHAR(64);"
+                print(f"Executing: {migration}")
+                conn.execute(text(migration))
+            migration = f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON reviews (user_id, code_hash, created_at);"
+            print(f"Executing: {migration}")
+            conn.execute(text(migration))
+            fill_recent_hashes(conn)
+            conn.commit()
+            print("✅ Migration applied successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+
+def verify_migration():
+    """Verify that the migration was successful."""
+    print("\nVerifying migration...")
+
+    try:
+        with engine.connect() as conn:
+            existing_columns = existing_review_columns(conn)
+            if not existing_columns:
+                print("✅ reviews will be created by the app")
+                return True
+            if 'code_hash' in existing_columns:
+                print("✅ code_hash column is present")
+                return True
+            print("⚠️ Missing column: code_hash")
+            return False
+
+    except Exception as e:
+        print(f"❌ Verification failed: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Review Code Hash Database Migration")
+    print("=" * 50)
+
+    migrate_database()
+
+    if verify_migration():
+        print("\n🎉 Migration completed successfully!")
+    else:
+        print("\n⚠️ Migration verification failed. Please check the database manually.")
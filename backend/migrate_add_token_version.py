@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the token_version column to the users table.
+Access tokens carry this version; logout bumps it to revoke the user's tokens.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+POSTGRES_URI = os.getenv("POSTGRES_URI")
+
+# Database setup
+if POSTGRES_URI:
+    db_uri = POSTGRES_URI
+    engine = create_engine(db_uri, future=True)
+else:
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "code_review.db").replace("\\", "/")
+    db_uri = f"sqlite:///{db_path}"
+    engine = create_engine(db_uri, future=True, connect_args={"check_same_thread": False})
+
+def existing_user_columns(conn):
+    if "postgresql" in str(engine.url):
+        result = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name = 'users'"))
+        return {row[0] for row in result.fetchall()}
+    result = conn.execute(text("PRAGMA table_info(users)"))
+    return {row[1] for row in result.fetchall()}
+
+def migrate_database():
+    """Add token_version to the users table if it doesn't exist."""
+    print("Starting token version database migration...")
+    
+    try:
+        with engine.connect() as conn:
+            existing_columns = existing_user_columns(conn)
+            if not existing_columns:
+                # Runs before the app on every deploy; a fresh database gets the column from create_all
+                print("users doesn't exist yet; the app creates it with token_version")
+                return
+            if 'token_version' in existing_columns:
+                print("token_version already exists, nothing to do")
+                return
+            migration = "ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0;"
+            print(f"Executing: {migration}")
+            conn.execute(text(migration))
+            conn.commit()
+            print("✅ Migration applied successfully!")
+            
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+
+def verify_migration():
+    """Verify that the migration was successful."""
+    print("\nVerifying migration...")
+    
+    try:
+        with engine.connect() as conn:
+            existing_columns = existing_user_columns(conn)
+            if not existing_columns:
+                print("✅ users will be created by the app")
+                return True
+            if 'token_version' in existing_columns:
+                print("✅ token_version column is present")
+                return True
+            print("⚠️ Missing column: token_version")
+            return False
+                
+    except Exception as e:
+        print(f"❌ Verification failed: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Token Version Database Migration")
+    print("=" * 50)
+    
+    migrate_database()
+    
+    if verify_migration():
+        print("\n🎉 Migration completed successfully!")
+    else:
+        print("\n⚠️ Migration verification failed. Please check the database manually.")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Migration script to store the large review text columns compressed.
+On PostgreSQL the columns change from TEXT to BYTEA first (existing text is kept as UTF-8
+bytes, which the app still reads), and reviews gets its uncompressed review_preview column,
+filled in for existing rows. Then every row is rewritten in the compressed format.
+Safe to re-run and to run while the app is up: values that are already compressed are skipped.
+
+The deploy runs it with --no-compress before the app starts: the schema changes are what new
+inserts need, and old values stay readable uncompressed until a full run rewrites them.
+
+Usage: python migrate_compress_review_text.py [--no-compress] [--batch-size N] [--vacuum]
+"""
+
+import argparse
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import text
+from main import engine, RepositoryFileReview
+from compressed_text import compress_text, decompress_text, is_compressed_value
+from pagination import PAST_REVIEWS_PREVIEW_CHARS
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COMPRESSED_COLUMNS = {
+    "reviews": ("code", "review", "optimized_code", "file_reviews"),
+    "repository_file_reviews": ("original_code", "review", "optimized_code"),
+}
+
+def convert_postgres_columns(conn):
+    """TEXT -> BYTEA for each compressed column that hasn't been converted yet"""
+    for table, columns in COMPRESSED_COLUMNS.items():
+        for column in columns:
+            data_type = conn.execute(text("""
+                SELECT data_type FROM information_schema.columns
+                WHERE table_name = :table AND column_name = :column
+            """), {"table": table, "column": column}).scalar()
+            if data_type == "text":
+                logger.info(f"Converting {table}.{column} to BYTEA...")
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BYTEA USING convert_to({column}, 'UTF8')"))
+
+def add_preview_column(conn):
+    if engine.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE reviews ADD COLUMN IF NOT EXISTS review_preview TEXT"))
+        return
+    existing_columns = {row[1] for row in conn.execute(text("PRAGMA table_info(reviews)")).fetchall()}
+    if "review_preview" not in existing_columns:
+        logger.info("Adding reviews.review_preview...")
+        conn.execute(text("ALTER TABLE reviews ADD COLUMN review_preview TEXT"))
+
+def fill_review_previews(batch_size: int):
+    """review_preview for rows written before the column existed"""
+    last_id = 0
+    filled = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                "SELECT id, review FROM reviews WHERE review_preview IS NULL AND review IS NOT NULL "
+                "AND id > :last_id ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": batch_size}).fetchall()
+            if not rows:
+                break
+            for review_id, review in rows:
+                conn.execute(text("UPDATE reviews SET review_preview = :preview WHERE id = :id"),
+                             {"preview": decompress_text(review)[:PAST_REVIEWS_PREVIEW_CHARS], "id": review_id})
+            last_id = rows[-1][0]
+            filled += len(rows)
+    logger.info(f"✅ reviews: filled {filled} review preview(s)")
+
+def compress_table(table: str, columns, batch_size: int):
+    """Rewrite the table's uncompressed values, batch_size rows per transaction"""
+    last_id = 0
+    rows_seen = 0
+    values_compressed = 0
+    bytes_before = 0
+    bytes_after = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                f"SELECT id, {', '.join(columns)} FROM {table} WHERE id > :last_id ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": batch_size}).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                updates = {}
+                for column, value in zip(columns, row[1:]):
+                    if value is None or is_compressed_value(value):
+                        continue
+                    plain = decompress_text(value)
+                    stored = compress_text(plain)
+                    updates[column] = stored
+                    bytes_before += len(plain.encode("utf-8"))
+                    bytes_after += len(stored)
+                if updates:
+                    assignments = ", ".join(f"{column} = :{column}" for column in updates)
+                    conn.execute(text(f"UPDATE {table} SET {assignments} WHERE id = :id"), {**updates, "id": row[0]})
+                    values_compressed += len(updates)
+            last_id = rows[-1][0]
+            rows_seen += len(rows)
+        logger.info(f"  {table}: {rows_seen} rows processed")
+    logger.info(f"✅ {table}: compressed {values_compressed} value(s), "
+                f"{bytes_before / 1e6:.1f} MB -> {bytes_after / 1e6:.1f} MB")
+
+def migrate_database(batch_size: int = 200, vacuum: bool = False, compress: bool = True):
+    try:
+        RepositoryFileReview.__table__.create(engine, checkfirst=True)
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                convert_postgres_columns(conn)
+            # SQLite stores any value in any column, so its columns need no conversion
+            add_preview_column(conn)
+        fill_review_previews(batch_size)
+
+        if compress:
+            for table, columns in COMPRESSED_COLUMNS.items():
+                compress_table(table, columns, batch_size)
+
+        if vacuum:
+            logger.info("Reclaiming free space (VACUUM)...")
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text("VACUUM"))
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--no-compress", action="store_true",
+                        help="Only convert columns and fill previews; leave existing values uncompressed")
+    parser.add_argument("--batch-size", type=int, default=200, help="Rows per transaction")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards so the file shrinks")
+    args = parser.parse_args()
+
+    print("🚀 Starting compression of review text columns...")
+
+    success = migrate_database(batch_size=args.batch_size, vacuum=args.vacuum, compress=not args.no_compress)
+
+    if success:
+        print("✅ Migration completed successfully!")
+    else:
+        print("❌ Migration failed! Please check the logs above.")
+        sys.exit(1)
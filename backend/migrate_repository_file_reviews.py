@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Migration script to move multi-file reviews from the reviews.file_reviews JSON blob into the
+repository_file_reviews table (one row per file).
+Safe to re-run: reviews that already have rows are only cleared, never duplicated.
+The deploy runs it before the app starts; on a fresh database there is nothing to move.
+
+Usage: python migrate_repository_file_reviews.py [--keep-json] [--batch-size N]
+"""
+
+import argparse
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import inspect
+from main import engine, SessionLocal, Review, RepositoryFileReview
+from file_reviews import file_review_columns, parse_file_reviews_json
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def migrate_database(keep_json: bool = False, batch_size: int = 50):
+    """Create the repository_file_reviews table and backfill it from the JSON blobs"""
+    try:
+        if not inspect(engine).has_table(Review.__tablename__):
+            logger.info("reviews doesn't exist yet; the app creates both tables")
+            return True
+        logger.info("Creating repository_file_reviews table...")
+        RepositoryFileReview.__table__.create(engine, checkfirst=True)
+
+        db = SessionLocal()
+        try:
+            pending_ids = [row.id for row in db.query(Review.id).filter(
+                Review.is_repository_review == "true",
+                Review.file_reviews.isnot(None),
+            ).order_by(Review.id)]
+            logger.info(f"Found {len(pending_ids)} review(s) with JSON file reviews")
+
+            migrated_reviews = 0
+            migrated_files = 0
+            for batch_start in range(0, len(pending_ids), batch_size):
+                # One blob at a time, so memory stays at one repository's worth
+                for review_id in pending_ids[batch_start:batch_start + batch_size]:
+                    blob = db.query(Review.file_reviews).filter(Review.id == review_id).scalar()
+                    already_migrated = db.query(RepositoryFileReview.id).filter(
+                        RepositoryFileReview.review_id == review_id
+                    ).first() is not None
+                    if not already_migrated:
+                        file_reviews = parse_file_reviews_json(blob)
+                        db.bulk_insert_mappings(RepositoryFileReview, [
+                            {"review_id": review_id, **file_review_columns(file_review, index)}
+                            for index, file_review in enumerate(file_reviews)
+                        ])
+                        migrated_files += len(file_reviews)
+                        migrated_reviews += 1
+                    if not keep_json:
+                        db.query(Review).filter(Review.id == review_id).update(
+                            {Review.file_reviews: None}, synchronize_session=False
+                        )
+                db.commit()
+                logger.info(f"  {min(batch_start + batch_size, len(pending_ids))}/{len(pending_ids)} reviews processed")
+
+            logger.info(f"✅ Moved {migrated_files} file review(s) from {migrated_reviews} review(s)")
+            if keep_json:
+                logger.info("JSON blobs kept; re-run without --keep-json to clear them")
+        finally:
+            db.close()
+        return True
+
+    except Exception as e:
+        logger.error(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keep-json", action="store_true", help="Backfill the table but keep the JSON blobs")
+    parser.add_argument("--batch-size", type=int, default=50, help="Reviews per commit")
+    args = parser.parse_args()
+
+    print("🚀 Starting database migration for repository_file_reviews table...")
+
+    success = migrate_database(keep_json=args.keep_json, batch_size=args.batch_size)
+
+    if success:
+        print("✅ Migration completed successfully!")
+    else:
+        print("❌ Migration failed! Please check the logs above.")
+        sys.exit(1)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add the owner and heartbeat_at columns to the review_jobs table.
+Workers claim a job by writing their id to owner and renew heartbeat_at while it runs; a job
+whose heartbeat is stale is picked up by another worker. The review_job_files table is new
+and is created by the app on startup.
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+POSTGRES_URI = os.getenv("POSTGRES_URI")
+
+# Database setup
+if POSTGRES_URI:
+    db_uri = POSTGRES_URI
+    engine = create_engine(db_uri, future=True)
+else:
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "code_review.db").replace("\\", "/")
+    db_uri = f"sqlite:///{db_path}"
+    engine = create_engine(db_uri, future=True, connect_args={"check_same_thread": False})
+
+NEW_COLUMNS = {
+    "owner": "VARCHAR(100)",
+    "heartbeat_at": "TIMESTAMP",
+}
+
+def existing_job_columns(conn):
+    if "postgresql" in str(engine.url):
+        result = conn.execute(text("SELECT column_name FROM information_schema.columns WHERE table_name = 'review_jobs'"))
+        return {row[0] for row in result.fetchall()}
+    result = conn.execute(text("PRAGMA table_info(review_jobs)"))
+    return {row[1] for row in result.fetchall()}
+
+def migrate_database():
+    """Add the lease columns to the review_jobs table if they don't exist."""
+    print("Starting review job lease database migration...")
+
+    try:
+        with engine.connect() as conn:
+            existing_columns = existing_job_columns(conn)
+            if not existing_columns:
+                print("review_jobs doesn't exist yet; the app creates it with these columns")
+                return
+            for column, column_type in NEW_COLUMNS.items():
+                if column in existing_columns:
+                    continue
+                migration = f"ALTER TABLE review_jobs ADD COLUMN {column} {column_type};"
+                print(f"Executing: {migration}")
+                conn.execute(text(migration))
+            conn.commit()
+            print("✅ Migration applied successfully!")
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        sys.exit(1)
+
+def verify_migration():
+    """Verify that the migration was successful."""
+    print("\nVerifying migration...")
+
+    try:
+        with engine.connect() as conn:
+            existing_columns = existing_job_columns(conn)
+            if not existing_columns:
+                print("✅ review_jobs will be created by the app")
+                return True
+            missing_columns = set(NEW_COLUMNS) - existing_columns
+            if missing_columns:
+                print(f"⚠️ Missing columns: {missing_columns}")
+                return False
+            print("✅ All review job lease columns are present")
+            return True
+
+    except Exception as e:
+        print(f"❌ Verification failed: {e}")
+        return False
+
+if __name__ == "__main__":
+    print("🔄 Review Job Lease Database Migration")
+    print("=" * 50)
+
+    migrate_database()
+
+    if verify_migration():
+        print("\n🎉 Migration completed successfully!")
+    else:
+        print("\n⚠️ Migration verification failed. Please check the database manually.")
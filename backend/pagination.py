@@ -0,0 +1,38 @@
+"""
+Keyset Pagination
+Listings are paged by position instead of OFFSET: the cursor is the (created_at, id) of the
+last row returned, and the next page starts strictly after it in (created_at DESC, id DESC)
+order. Each page is one range scan of the (user_id, created_at) index, however deep it is.
+"""
+
+import base64
+import os
+from datetime import datetime
+from typing import Optional, Tuple
+
+PAST_REVIEWS_PAGE_SIZE = int(os.getenv("PAST_REVIEWS_PAGE_SIZE", "50"))
+PAST_REVIEWS_MAX_PAGE_SIZE = int(os.getenv("PAST_REVIEWS_MAX_PAGE_SIZE", "200"))
+# Characters of review text returned as the listing preview
+PAST_REVIEWS_PREVIEW_CHARS = 200
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque, URL-safe cursor for the row after which the next page starts"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """(created_at, id) from encode_cursor(); raises ValueError for anything else"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def page_size(limit: Optional[int], default: int = PAST_REVIEWS_PAGE_SIZE,
+              maximum: int = PAST_REVIEWS_MAX_PAGE_SIZE) -> int:
+    """The requested page size, clamped to 1..maximum"""
+    return max(1, min(limit or default, maximum))
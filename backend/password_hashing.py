@@ -0,0 +1,196 @@
+"""
+Password Hashing Pool
+bcrypt is slow on purpose (hundreds of milliseconds per check at cost 12), so hashing and
+verification run on a small dedicated thread pool instead of the event loop or the request
+thread pool. The pool is bounded: once too many checks are waiting, new ones are refused at
+once instead of queueing (503), and one client can only have a few in flight (429). A stored
+hash made with a different cost is replaced after the next successful login.
+Behind a reverse proxy the client is taken from X-Forwarded-For, so users don't all share
+the proxy's address.
+"""
+
+import asyncio
+import ipaddress
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+from passlib.context import CryptContext
+
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Checks running or waiting for a worker before new ones are refused
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_HASH_MAX_PER_CLIENT = int(os.getenv("PASSWORD_HASH_MAX_PER_CLIENT", "4"))
+BCRYPT_MAX_PASSWORD_BYTES = 72
+# Peers whose X-Forwarded-For is believed (addresses or CIDR ranges). The hosting proxy connects
+# from a private address, so private ranges are trusted by default; set "" if clients connect directly.
+TRUSTED_PROXY_IPS = os.getenv("TRUSTED_PROXY_IPS", "127.0.0.1,::1,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16")
+
+
+class PasswordHashBusy(Exception):
+    """The pool (503) or the client's share of it (429) is full; retry after retry_after seconds"""
+
+    def __init__(self, detail: str, status_code: int, retry_after: int = 1):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_networks(spec: str) -> List[Network]:
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip()]
+
+
+TRUSTED_PROXY_NETWORKS = parse_networks(TRUSTED_PROXY_IPS)
+
+
+def _is_trusted(address: str, trusted: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def forwarded_client(peer: Optional[str], forwarded_for: Optional[str],
+                     trusted: Optional[List[Network]] = None) -> Optional[str]:
+    """The client address per-client limits are keyed on. A trusted proxy's X-Forwarded-For is read
+    from the right, skipping further trusted proxies: each proxy appends the address it saw, so the
+    first untrusted hop is the real client and anything left of it may be forged by the client."""
+    trusted = TRUSTED_PROXY_NETWORKS if trusted is None else trusted
+    if peer is None or not forwarded_for or not _is_trusted(peer, trusted):
+        return peer
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, trusted):
+            return hop
+    # Every hop is a trusted address (a client on the private network itself)
+    return hops[0] if hops else peer
+
+
+def make_password_context(rounds: int = PASSWORD_BCRYPT_ROUNDS) -> CryptContext:
+    """bcrypt at the configured cost; hashes at any other cost are flagged for rehashing"""
+    return CryptContext(schemes=["bcrypt"], deprecated="auto",
+                        bcrypt__rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds)
+
+
+def truncate_password(password: str) -> str:
+    """bcrypt only uses the first 72 bytes; truncate by bytes, not characters"""
+    return (password or "").encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES].decode("utf-8", errors="ignore")
+
+
+class PasswordHasher:
+    """Bounded pool for bcrypt hashing and verification, with global and per-client admission limits"""
+
+    def __init__(self, context: Optional[CryptContext] = None, workers: int = PASSWORD_HASH_WORKERS,
+                 max_pending: int = PASSWORD_HASH_MAX_PENDING, max_per_client: int = PASSWORD_HASH_MAX_PER_CLIENT):
+        self.context = context or make_password_context()
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self.max_per_client = max(1, max_per_client)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._per_client: Dict[str, int] = {}
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected_busy = 0
+        self.rejected_client = 0
+        self.rehashed = 0
+
+    def _admit(self, client: Optional[str]):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected_busy += 1
+                raise PasswordHashBusy("Too many sign-in attempts in progress, please retry shortly", 503)
+            if client is not None:
+                if self._per_client.get(client, 0) >= self.max_per_client:
+                    self.rejected_client += 1
+                    raise PasswordHashBusy("Too many concurrent sign-in attempts from this address", 429)
+                self._per_client[client] = self._per_client.get(client, 0) + 1
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+    def _release(self, client: Optional[str]):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+            if client is not None:
+                remaining = self._per_client.get(client, 1) - 1
+                if remaining <= 0:
+                    self._per_client.pop(client, None)
+                else:
+                    self._per_client[client] = remaining
+
+    def _submit(self, client: Optional[str], func, *args) -> Future:
+        self._admit(client)
+
+        def run():
+            # Released on the worker, so the slot is free by the time the caller sees the result
+            try:
+                return func(*args)
+            finally:
+                self._release(client)
+
+        try:
+            return self._pool.submit(run)
+        except Exception:
+            self._release(client)
+            raise
+
+    def _verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        try:
+            return self.context.verify_and_update(truncate_password(password), hashed)
+        except (ValueError, TypeError) as e:
+            # Malformed or unknown stored hash: a failed check, not a server error
+            print(f"Password verification error: {e}")
+            return False, None
+
+    def _hash(self, password: str) -> str:
+        return self.context.hash(truncate_password(password))
+
+    async def verify(self, password: str, hashed: str, client: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """(valid, replacement hash if the stored one uses another cost, else None)"""
+        valid, new_hash = await asyncio.wrap_future(self._submit(client, self._verify_and_update, password, hashed))
+        if new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    async def hash(self, password: str, client: Optional[str] = None) -> str:
+        return await asyncio.wrap_future(self._submit(client, self._hash, password))
+
+    def verify_blocking(self, password: str, hashed: str, client: Optional[str] = None) -> Tuple[bool, Optional[str]]:
+        """verify() for sync handlers, which run on the request thread pool"""
+        valid, new_hash = self._submit(client, self._verify_and_update, password, hashed).result()
+        if new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    def hash_blocking(self, password: str, client: Optional[str] = None) -> str:
+        """hash() for sync handlers, which run on the request thread pool"""
+        return self._submit(client, self._hash, password).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "max_per_client": self.max_per_client,
+                "bcrypt_rounds": self.context.to_dict().get("bcrypt__rounds"),
+                "pending": self.pending,
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "rejected_busy": self.rejected_busy,
+                "rejected_client": self.rejected_client,
+                "rehashed": self.rehashed,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
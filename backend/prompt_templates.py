@@ -0,0 +1,318 @@
+"""
+Compiled Review Prompt Templates
+The review prompt depends only on a few preference values, so each distinct combination is
+built once and kept in a bounded LRU along with a stable fingerprint; per-review code and
+file metadata are appended to the cached text rather than rebuilding it.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional
+
+PROMPT_TEMPLATE_CACHE_SIZE = int(os.getenv("PROMPT_TEMPLATE_CACHE_SIZE", "256"))
+
+
+class PromptOptions(NamedTuple):
+    """Everything that shapes the review prompt - the template cache key"""
+    security_analysis: bool
+    performance_analysis: bool
+    code_optimization: bool
+    detailed_explanations: bool  # professional rather than beginner-friendly persona
+    architecture: bool  # detailed mode adds the architecture section
+    num_optimized: int
+    is_repository_review: bool
+    user_feedback: str
+
+
+class PromptTemplate(NamedTuple):
+    text: str
+    fingerprint: str  # SHA-256 of text, stable across processes and restarts
+
+
+@lru_cache(maxsize=PROMPT_TEMPLATE_CACHE_SIZE)
+def optimized_code_count(learning_patterns: Optional[str]) -> int:
+    """optimized_code_count from a preferences.learning_patterns JSON blob (1 if unset or unreadable)"""
+    if not learning_patterns:
+        return 1
+    try:
+        return int(json.loads(learning_patterns).get("optimized_code_count", 1))
+    except (ValueError, TypeError, AttributeError):
+        return 1
+
+
+def prompt_options(preferences, is_repository_review: bool = False, detailed_mode: bool = False,
+                   user_feedback: Optional[str] = None) -> PromptOptions:
+    code_optimization = bool(preferences.code_optimization)
+    return PromptOptions(
+        security_analysis=bool(preferences.security_analysis),
+        performance_analysis=bool(preferences.performance_analysis),
+        code_optimization=code_optimization,
+        detailed_explanations=bool(detailed_mode or preferences.detailed_explanations),
+        architecture=bool(detailed_mode),
+        # Only read when optimized code is requested, so unrelated pattern changes share a template
+        num_optimized=optimized_code_count(preferences.learning_patterns) if code_optimization else 1,
+        is_repository_review=bool(is_repository_review),
+        user_feedback=user_feedback or "",
+    )
+
+
+def build_prompt(options: PromptOptions) -> str:
+    """Build the full review prompt for one combination of options"""
+    # Start with user feedback incorporation if available
+    feedback_section = ""
+    if options.user_feedback:
+        feedback_section = f"""
+📝 **IMPORTANT - User Feedback from Previous Review:**
+The user previously provided this feedback to improve future code reviews:
+"{options.user_feedback}"
+
+Please incorporate this feedback and adjust your review approach accordingly. Pay special attention to the points mentioned above.
+---
+
+"""
+    
+    if options.detailed_explanations:
+        # Professional, comprehensive multi-level analysis mode
+        analysis_depth = """
+You are an advanced Code Review Engine. Analyze the code across multiple dimensions:
+
+1️⃣ **Syntax & Language Rules** - syntax errors, deprecated APIs, formatting issues
+2️⃣ **Logic & Semantics** - logical errors, edge cases, control flow problems
+3️⃣ **Architecture & Design** - SOLID principles, design patterns, modularity
+4️⃣ **Performance** - inefficient loops, memory issues, blocking operations
+5️⃣ **Security** - hardcoded secrets, injection risks, weak crypto, missing validation
+6️⃣ **Maintainability** - complexity, coupling, scalability, technical debt"""
+        
+        # Best practices section removed per user request
+        # if preferences.best_practices:
+        #     analysis_depth += "\n6️⃣ **Best Practices** - code standards, naming conventions, documentation"
+        
+        # analysis_depth += "\n7️⃣ **Maintainability** - complexity, coupling, scalability, technical debt"
+        
+    else:
+        # Simple, beginner-friendly mode
+        analysis_depth = "You are a friendly code teacher who explains things super simply! 😊"
+    
+    # Build structured output with SEPARATE markers for each subsection (Option 1)
+    prompt_parts = [
+        analysis_depth,
+        "",
+        "Analyze this code and return SEPARATE sections with exact markers. Each section will be independently reviewable:",
+        "",
+        "###CODE_QUALITY###",
+        "📋 **Code Quality Summary:**",
+        "- Overall assessment in 2-3 sentences",
+        "- Quality score: X/10",
+        "- Use emojis: ✅ (good), ⚠️ (needs improvement), ❌ (problems)",
+        "- Keep under 60 words",
+        "",
+        "###KEY_FINDINGS###",
+        "🔍 **Key Findings:**",
+        "List each issue with:",
+        "  • Severity: 🔴 CRITICAL | 🟠 HIGH | 🟡 MEDIUM | 🟢 LOW",
+        "  • Category: Syntax/Logic/Architecture/Performance/Security/Style",
+        "  • **Line number (if applicable)**: Specify 'Line X:' for each issue",
+        "  • Brief description + specific fix",
+        "Group by severity. If no issues: 'No critical issues found! ✅'",
+        "Max 150 words.",
+        ""
+    ]
+    
+    # Now add conditional sections based on preferences
+    
+    # Security as SEPARATE section (conditional)
+    if options.security_analysis:
+        prompt_parts.extend([
+            "###SECURITY###",
+            "�️ **Security Analysis:**",
+            "- Check: hardcoded secrets, injection risks, validation gaps, auth issues, data exposure",
+            "- List findings with severity (🔴 CRITICAL | 🟠 HIGH | 🟡 MEDIUM | 🟢 LOW)",
+            "- If no concerns: 'No security issues detected ✅'",
+            "- Max 100 words",
+            "",
+        ])
+    
+    # Performance as SEPARATE section (conditional)
+    if options.performance_analysis:
+        prompt_parts.extend([
+            "###PERFORMANCE###",
+            "⚡ **Performance Analysis:**",
+            "- Inefficient operations, algorithms, loops",
+            "- Memory management concerns",
+            "- Blocking or expensive operations",
+            "- Optimization opportunities",
+            "- If efficient: 'Performance looks good ✅'",
+            "- Max 100 words",
+            "",
+        ])
+    
+    # Architecture as SEPARATE section (conditional - detailed mode)
+    if options.architecture:
+        prompt_parts.extend([
+            "###ARCHITECTURE###",
+            "🏗️ **Architecture & Design:**",
+            "- Design pattern usage/violations",
+            "- SOLID principles assessment",
+            "- Modularity, coupling, cohesion",
+            "- Scalability concerns",
+            "- Max 120 words",
+            "",
+        ])
+    
+    # Best practices section REMOVED per user request
+    # if preferences.best_practices:
+    #     prompt_parts.extend([
+    #         "###BEST_PRACTICES###",
+    #         "📖 **Best Practices:**",
+    #         "- Code standards compliance",
+    #         "- Naming conventions",
+    #         "- Documentation quality",
+    #         "- Error handling patterns",
+    #         "- If compliant: 'Follows best practices ✅'",
+    #         "- Max 80 words",
+    #         "",
+    #     ])
+    
+    # Optimized code section (if user wants it)
+    if options.code_optimization:
+        if options.num_optimized > 1:
+            # Generate multiple optimized code sections
+            for i in range(1, options.num_optimized + 1):
+                approach = 'performance-optimized' if i == 1 else 'readability-optimized' if i == 2 else f'alternative approach {i}'
+                prompt_parts.extend([
+                    f"###OPTIMIZED_CODE_{i}###",
+                    f"CRITICAL: Provide ONLY the {approach} code. NO explanatory text. NO inline comments. NO docstrings. NO descriptions.",
+                    f"Pure executable code ONLY. Start directly with the code syntax (def, class, function, import, etc.).",
+                    f"Remove ALL comments and explanations. Code should be clean and ready to run as-is.",
+                    ""
+                ])
+        else:
+            # Single optimized code section
+            prompt_parts.extend([
+                "###OPTIMIZED_CODE###",
+                "CRITICAL: Provide ONLY the optimized code. NO explanatory text. NO inline comments. NO docstrings. NO descriptions.",
+                "Pure executable code ONLY. Start directly with the code syntax (def, class, function, import, etc.).",
+                "Remove ALL comments and explanations. Code should be clean and ready to run as-is.",
+                ""
+            ])
+    
+    # Explanation section - MUCH SHORTER NOW
+    prompt_parts.extend([
+        "###EXPLANATION###",
+        "📚 **Quick Summary:**",
+        "- What the code does in 1-2 sentences (MAX 40 words total)",
+        "- Keep it concise and clear",
+    ])
+    
+    prompt_parts.append("")
+    
+    # Add priority recommendations as SEPARATE section
+    prompt_parts.extend([
+        "###RECOMMENDATIONS###",
+        "🎯 **Top Priority Actions:**",
+        "- List 2-3 most critical improvements",
+        "- Focus on high-impact changes",
+        "- If code is excellent: 'Code quality is excellent! Minor suggestions: [if any]'",
+        "- Max 80 words",
+        "",
+    ])
+    
+    # Add Syntax Errors section (ALWAYS include - critical for error detection)
+    prompt_parts.extend([
+        "###SYNTAX_ERRORS###",
+        "🔴 **Syntax Errors:**",
+        "Analyze the code for ALL syntax errors including:",
+        "- Missing colons, semicolons, brackets, parentheses, quotes",
+        "- Invalid operators or syntax (e.g., ^ instead of ** in Python)",
+        "- Malformed statements or declarations",
+        "- Incorrect indentation (for Python)",
+        "- Incomplete code blocks",
+        "- Invalid keywords or language-specific syntax violations",
+        "**CRITICAL: MUST include line numbers for EVERY error found!**",
+        "Format: List each error as '• Line X: [Error description]' where X is the line number",
+        "Example: '• Line 5: Missing closing parenthesis'",
+        "If NO syntax errors found, respond with EXACTLY: 'No syntax errors detected.'",
+        "Be thorough - check every line carefully and ALWAYS specify the line number!",
+        "",
+    ])
+    
+    # Add Semantic Errors section (ALWAYS include - critical for logic errors)
+    prompt_parts.extend([
+        "###SEMANTIC_ERRORS###",
+        "🟠 **Semantic Errors:**",
+        "Analyze the code for ALL semantic/logic errors including:",
+        "- Undefined variables or functions being used",
+        "- Type mismatches or incorrect data types",
+        "- Function calls with wrong number of arguments",
+        "- Name mismatches (e.g., defining function_name but calling functionname)",
+        "- Unreachable code or dead code paths",
+        "- Logical errors (incorrect conditions, wrong operators)",
+        "- Missing return statements where expected",
+        "- Incorrect scope or variable access issues",
+        "**CRITICAL: MUST include line numbers for EVERY error found!**",
+        "Format: List each error as '• Line X: [Error description]' where X is the line number",
+        "Example: '• Line 12: Variable 'result' used before definition'",
+        "If NO semantic errors found, respond with EXACTLY: 'No semantic errors detected.'",
+        "Be thorough - analyze the entire logic flow and ALWAYS specify the line number!",
+        "",
+    ])
+    
+    # Context note
+    if options.is_repository_review:
+        prompt_parts.append("\n💡 Note: This is part of a larger project. Focus on integration and consistency.")
+    
+    # Combine feedback section with the rest of the prompt
+    final_prompt = feedback_section + "\n".join(prompt_parts)
+    return final_prompt
+
+
+class PromptTemplateCache:
+    """Thread-safe bounded LRU of compiled prompt templates keyed on PromptOptions"""
+
+    def __init__(self, max_entries: int = PROMPT_TEMPLATE_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self._templates: "OrderedDict[PromptOptions, PromptTemplate]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, options: PromptOptions) -> PromptTemplate:
+        with self._lock:
+            template = self._templates.get(options)
+            if template is not None:
+                self._templates.move_to_end(options)
+                self.hits += 1
+                return template
+            self.misses += 1
+
+        # Built outside the lock; a concurrent miss on the same options builds the same text
+        text = build_prompt(options)
+        template = PromptTemplate(text, hashlib.sha256(text.encode("utf-8")).hexdigest())
+        with self._lock:
+            self._templates[options] = template
+            self._templates.move_to_end(options)
+            while len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+                self.evictions += 1
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._templates),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+            }
@@ -0,0 +1,299 @@
+"""
+Repository Mirror Cache
+Keeps a bare mirror per repository URL on disk. Re-reviews fetch only the requested
+branch into the mirror and check it out as a throwaway worktree instead of cloning again.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+try:
+    from backend.sparse_checkout import PARTIAL_CLONE_FILTER, checkout_reviewable_paths
+    from backend.diff_review import fetch_ref
+except ImportError:
+    from sparse_checkout import PARTIAL_CLONE_FILTER, checkout_reviewable_paths
+    from diff_review import fetch_ref
+
+try:
+    import fcntl  # POSIX only; elsewhere the cache is only safe within one process
+except ImportError:
+    fcntl = None
+
+REPO_CACHE_ENABLED = os.getenv("REPO_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+REPO_CACHE_DIR = os.getenv("REPO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "code_review_repo_cache"))
+REPO_CACHE_MAX_BYTES = int(os.getenv("REPO_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+GIT_TIMEOUT_SECONDS = 300  # 5 minutes, as for a fresh clone
+
+DEFAULT_BRANCH_REF = "refs/review/default"
+
+
+def redact_url(repo_url: str) -> str:
+    """repo_url without its user/password part, safe to write to disk"""
+    parts = urlsplit(repo_url)
+    if not parts.scheme or "@" not in parts.netloc:
+        return repo_url
+    return urlunsplit(parts._replace(netloc=parts.netloc.rsplit("@", 1)[1]))
+
+
+def credentials_env(repo_url: str) -> Optional[Dict[str, str]]:
+    """Environment for git commands that contact the remote. The mirror stores the redacted URL;
+    this maps it back to repo_url for one command only, so credentials reach neither the mirror's
+    config nor the process arguments. None when the URL carries no credentials."""
+    redacted = redact_url(repo_url)
+    if redacted == repo_url:
+        return None
+    return {
+        **os.environ,
+        "GIT_CONFIG_COUNT": "1",
+        "GIT_CONFIG_KEY_0": f"url.{repo_url}.insteadOf",
+        "GIT_CONFIG_VALUE_0": redacted,
+    }
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class RepoMirrorCache:
+    """Bare mirrors keyed by repo URL, evicted least-recently-used once they exceed max_bytes"""
+
+    def __init__(self, cache_dir: str = REPO_CACHE_DIR, max_bytes: int = REPO_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._evict_lock = threading.Lock()
+        # worktree path -> (mirror key, open lease file, credentials env for git commands that fetch)
+        self._checkouts: Dict[str, tuple] = {}
+
+    # ------------------ Locking ------------------
+
+    def _key(self, repo_url: str) -> str:
+        return hashlib.sha256(repo_url.encode("utf-8")).hexdigest()[:24]
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, key + suffix)
+
+    @contextmanager
+    def _exclusive(self, key: str):
+        """Serialize fetch/checkout/eviction of one mirror across threads and processes"""
+        with self._locks_guard:
+            thread_lock = self._locks.setdefault(key, threading.Lock())
+        with thread_lock:
+            with open(self._path(key, ".lock"), "a") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _take_lease(self, key: str):
+        """Shared lease held while a worktree is in use, so eviction skips the mirror"""
+        lease = open(self._path(key, ".lease"), "a")
+        if fcntl:
+            fcntl.flock(lease, fcntl.LOCK_SH)
+        return lease
+
+    def _in_use(self, key: str) -> bool:
+        if any(checkout[0] == key for checkout in self._checkouts.values()):
+            return True
+        if not fcntl or not os.path.exists(self._path(key, ".lease")):
+            return False
+        with open(self._path(key, ".lease"), "a") as lease:
+            try:
+                fcntl.flock(lease, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return True
+            fcntl.flock(lease, fcntl.LOCK_UN)
+        return False
+
+    # ------------------ Git ------------------
+
+    def _git(self, *args, cwd: Optional[str] = None,
+             env: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+        return subprocess.run(["git", *args], cwd=cwd, env=env, capture_output=True, text=True,
+                              timeout=GIT_TIMEOUT_SECONDS)
+
+    def _fetch(self, mirror: str, branch: str, blobless: bool, env: Optional[Dict[str, str]] = None) -> str:
+        """Fetch the tip of branch (or the remote's default branch) into the mirror; returns its commit.
+        A blob-less fetch turns the mirror into a partial clone that fetches blobs from origin on demand."""
+        refs = []
+        if branch:
+            refs.append((f"+refs/heads/{branch}:refs/heads/{branch}", f"refs/heads/{branch}"))
+        # Fall back to the default branch if the requested one doesn't exist
+        refs.append((f"+HEAD:{DEFAULT_BRANCH_REF}", DEFAULT_BRANCH_REF))
+
+        fetch = ["fetch", "--depth", "1", "--no-tags"]
+        if blobless:
+            fetch.append(f"--filter={PARTIAL_CLONE_FILTER}")
+        stderr = ""
+        for refspec, ref in refs:
+            result = self._git(*fetch, "origin", refspec, cwd=mirror, env=env)
+            if result.returncode == 0:
+                return self._git("rev-parse", ref, cwd=mirror).stdout.strip()
+            stderr = result.stderr
+        raise Exception(f"Failed to fetch repository: {stderr}")
+
+    # ------------------ Public API ------------------
+
+    def checkout(self, repo_url: str, branch: str = "main", include_patterns: Optional[List[str]] = None,
+                 exclude_patterns: Optional[List[str]] = None, max_files: int = 0) -> str:
+        """Fetch into the mirror (creating it on first use) and return a fresh worktree of the branch.
+        With include_patterns the worktree is sparse: only enough matching files for max_files reviewable ones are checked out."""
+        sparse = include_patterns is not None
+        if repo_url.startswith("-"):
+            raise Exception("Invalid repository URL")
+        key = self._key(repo_url)
+        mirror = self._path(key, ".git")
+        lease = self._take_lease(key)
+        try:
+            with self._exclusive(key):
+                hit = os.path.exists(os.path.join(mirror, "HEAD"))
+                if hit:
+                    # Forget worktrees of reviews that died without releasing them
+                    self._git("worktree", "prune", cwd=mirror)
+                else:
+                    shutil.rmtree(mirror, ignore_errors=True)
+                    result = self._git("init", "--bare", "--quiet", mirror)
+                    if result.returncode != 0:
+                        raise Exception(f"Failed to create repository mirror: {result.stderr}")
+                # Blobs missing from a partial mirror are fetched lazily from the configured origin.
+                # Only the redacted URL is stored; credentials are passed to each command that needs them
+                self._git("config", "remote.origin.url", redact_url(repo_url), cwd=mirror)
+                env = credentials_env(repo_url)
+
+                started = time.time()
+                try:
+                    commit = self._fetch(mirror, branch, blobless=sparse, env=env)
+                except Exception:
+                    if not hit:
+                        shutil.rmtree(mirror, ignore_errors=True)
+                    raise
+
+                worktree = tempfile.mkdtemp(prefix="code_review_repo_")
+                add = ["worktree", "add", "--detach", "--quiet"] + (["--no-checkout"] if sparse else [])
+                # A partial mirror fetches the worktree's missing blobs from origin
+                result = self._git(*add, worktree, commit, cwd=mirror, env=env)
+                if result.returncode != 0:
+                    shutil.rmtree(worktree, ignore_errors=True)
+                    raise Exception(f"Failed to check out repository: {result.stderr}")
+                if sparse:
+                    try:
+                        checkout_reviewable_paths(mirror, worktree, commit, include_patterns,
+                                                  exclude_patterns or [], max_files, env=env)
+                    except Exception:
+                        self._git("worktree", "remove", "--force", worktree, cwd=mirror)
+                        shutil.rmtree(worktree, ignore_errors=True)
+                        raise
+
+                self._write_meta(key, _dir_size(mirror))
+                self._checkouts[worktree] = (key, lease, env)
+                print(f"{'♻️ Mirror cache hit' if hit else '📦 Mirror cache miss'} for {redact_url(repo_url)} "
+                      f"({branch}{', sparse' if sparse else ''}): fetched in {time.time() - started:.1f}s")
+        except Exception:
+            lease.close()
+            raise
+
+        self.evict()
+        return worktree
+
+    def release(self, worktree: str):
+        """Remove a worktree returned by checkout()"""
+        key, lease, _ = self._checkouts.pop(worktree, (None, None, None))
+        if key is None:
+            shutil.rmtree(worktree, ignore_errors=True)
+            return
+        try:
+            with self._exclusive(key):
+                mirror = self._path(key, ".git")
+                result = self._git("worktree", "remove", "--force", worktree, cwd=mirror)
+                if result.returncode != 0:
+                    shutil.rmtree(worktree, ignore_errors=True)
+                    self._git("worktree", "prune", cwd=mirror)
+        finally:
+            lease.close()
+
+    def owns(self, worktree: str) -> bool:
+        return worktree in self._checkouts
+
+    def git_env(self, worktree: str) -> Optional[Dict[str, str]]:
+        """Environment for git commands in a worktree that may fetch missing blobs from origin"""
+        return self._checkouts[worktree][2]
+
+    def fetch_ref(self, worktree: str, ref: str) -> str:
+        """Fetch one more ref into a worktree's mirror; returns its commit. The fetch writes the
+        mirror's objects and shallow file, so it holds the mirror's lock."""
+        key, _, env = self._checkouts[worktree]
+        with self._exclusive(key):
+            return fetch_ref(worktree, ref, env=env)
+
+    # ------------------ Eviction ------------------
+
+    def _write_meta(self, key: str, size_bytes: int):
+        # The URL itself is not stored - it may carry credentials
+        with open(self._path(key, ".json"), "w") as f:
+            json.dump({"size_bytes": size_bytes, "last_used": time.time()}, f)
+
+    def _read_entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.cache_dir, name)) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            entries.append((meta.get("last_used", 0), name[:-len(".json")], meta.get("size_bytes", 0)))
+        return sorted(entries)
+
+    def total_bytes(self) -> int:
+        return sum(size for _, _, size in self._read_entries())
+
+    def evict(self):
+        """Drop least-recently-used mirrors until the cache fits in max_bytes; mirrors in use are kept"""
+        with self._evict_lock:
+            entries = self._read_entries()
+            total = sum(size for _, _, size in entries)
+            for _, key, size in entries:
+                if total <= self.max_bytes:
+                    break
+                if self._in_use(key):
+                    continue
+                with self._exclusive(key):
+                    shutil.rmtree(self._path(key, ".git"), ignore_errors=True)
+                    for suffix in (".json", ".lease"):
+                        try:
+                            os.remove(self._path(key, suffix))
+                        except OSError:
+                            pass
+                total -= size
+                print(f"🧹 Evicted repository mirror {key} ({size / 1024 / 1024:.1f} MB)")
+
+    def stats(self) -> dict:
+        entries = self._read_entries()
+        return {
+            "mirrors": len(entries),
+            "total_bytes": sum(size for _, _, size in entries),
+            "max_bytes": self.max_bytes,
+            "active_checkouts": len(self._checkouts),
+        }
@@ -0,0 +1,120 @@
+"""
+Streaming Repository File Discovery
+Walks a cloned repository and yields matching code files one at a time, so reviews
+can start on the first file while discovery continues and memory stays bounded
+"""
+
+import fnmatch
+import io
+import os
+import re
+import stat
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Files above this size on disk are skipped without being opened (generated bundles, data dumps)
+REPO_FILE_MAX_BYTES = int(os.getenv("REPO_FILE_MAX_BYTES", "1000000"))
+# Longer files are truncated before review to avoid overwhelming the AI
+REPO_FILE_MAX_CHARS = 50000
+BINARY_SNIFF_BYTES = 8192
+
+
+def compile_patterns(patterns: List[str]) -> Optional[re.Pattern]:
+    """Fold glob patterns into one regex, equivalent to any(fnmatch(name, p) for p in patterns)"""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{fnmatch.translate(pattern)})" for pattern in patterns))
+
+
+def read_code_file(file_path: str) -> Optional[str]:
+    """Read a text file, truncated to REPO_FILE_MAX_CHARS; None for binary or non-UTF-8 files"""
+    try:
+        with open(file_path, "rb") as raw:
+            if b"\0" in raw.read(BINARY_SNIFF_BYTES):
+                return None
+            raw.seek(0)
+            with io.TextIOWrapper(raw, encoding="utf-8") as f:
+                content = f.read(REPO_FILE_MAX_CHARS + 1)
+    except (UnicodeDecodeError, OSError):
+        return None
+    if len(content) > REPO_FILE_MAX_CHARS:
+        content = content[:REPO_FILE_MAX_CHARS] + "\n# ... (file truncated)"
+    return content
+
+
+def load_code_file(file_path: str) -> Optional[str]:
+    """Content of a file discovery would review; None for empty, oversized, binary or non-regular files"""
+    try:
+        info = os.stat(file_path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(info.st_mode) or info.st_size == 0 or info.st_size > REPO_FILE_MAX_BYTES:
+        return None
+    return read_code_file(file_path)
+
+
+def walk_order(path: str) -> list:
+    """Sort key for '/'-separated paths in the order iter_code_files visits them:
+    a directory's files by name, then its subdirectories by name"""
+    *dirs, name = path.split('/')
+    return [(1, d) for d in dirs] + [(0, name)]
+
+
+class CodeFileMatcher:
+    """Include/exclude rules for repository files, shared by discovery and sparse checkout"""
+
+    def __init__(self, include_patterns: List[str], exclude_patterns: List[str]):
+        self.include_re = compile_patterns(include_patterns)
+        self.exclude_re = compile_patterns(exclude_patterns)
+        # "node_modules/**" excludes the node_modules directory itself
+        self.exclude_dir_re = compile_patterns([pattern.split('/')[0] for pattern in exclude_patterns])
+
+    def dir_allowed(self, name: str) -> bool:
+        return not (self.exclude_dir_re and self.exclude_dir_re.match(name))
+
+    def file_allowed(self, name: str, relative_path: str) -> bool:
+        if self.include_re is None or not self.include_re.match(name):
+            return False
+        return not (self.exclude_re and self.exclude_re.match(relative_path))
+
+
+def select_candidate_paths(paths: Iterable[str], include_patterns: List[str], exclude_patterns: List[str],
+                           limit: Optional[int]) -> List[str]:
+    """The first `limit` '/'-separated repository paths that discovery could yield, judged by name only.
+    No limit when limit is None."""
+    matcher = CodeFileMatcher(include_patterns, exclude_patterns)
+    selected = []
+    for path in paths:
+        if limit is not None and len(selected) >= limit:
+            break
+        *dirs, name = path.split('/')
+        if all(matcher.dir_allowed(d) for d in dirs) and matcher.file_allowed(name, os.path.join(*dirs, name)):
+            selected.append(path)
+    return selected
+
+
+def iter_code_files(repo_path: str, include_patterns: List[str], exclude_patterns: List[str],
+                    max_files: int) -> Iterator[Tuple[str, str]]:
+    """Lazily yield (relative_path, content) for up to max_files matching code files, in walk_order"""
+    matcher = CodeFileMatcher(include_patterns, exclude_patterns)
+    if matcher.include_re is None or max_files <= 0:
+        return
+
+    file_count = 0
+    for root, dirs, files in os.walk(repo_path):
+        # Sorted, so a sparse checkout can pick the same files from the tree listing
+        dirs[:] = sorted(d for d in dirs if matcher.dir_allowed(d))
+
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            relative_path = os.path.relpath(file_path, repo_path)
+            if not matcher.file_allowed(file, relative_path):
+                continue
+
+            content = load_code_file(file_path)
+            if content is None:
+                continue
+
+            yield relative_path, content
+            file_count += 1
+            if file_count >= max_files:
+                return
@@ -0,0 +1,100 @@
+"""
+Review Response Parsing
+Splits Gemini's marker-delimited review responses (###CODE_QUALITY###, ###KEY_FINDINGS###, ...)
+into sections in a single pass, for both complete and streamed responses
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+# Section markers are upper-case names, optionally numbered (###OPTIMIZED_CODE_2###)
+MARKER_RE = re.compile(r"###([A-Z][A-Z0-9_]*)###")
+OPTIMIZED_VARIANT_RE = re.compile(r"OPTIMIZED_CODE_(\d+)$")
+
+
+def parse_review_sections(text: str) -> Dict[str, str]:
+    """Tokenize a response once into {section_name: content}.
+    Text before the first marker is ignored. If a marker repeats, the first
+    non-empty occurrence wins (the model sometimes echoes an empty marker list first)."""
+    sections: Dict[str, str] = {}
+    if not text:
+        return sections
+
+    markers = list(MARKER_RE.finditer(text))
+    for i, match in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        name = match.group(1)
+        if sections.get(name):
+            continue
+        sections[name] = text[match.end():end].strip()
+    return sections
+
+
+def optimized_code_variants(sections: Dict[str, str]) -> List[str]:
+    """Non-empty optimized code blocks: ###OPTIMIZED_CODE### then ###OPTIMIZED_CODE_N### in numeric order"""
+    variants = []
+    if sections.get("OPTIMIZED_CODE"):
+        variants.append(sections["OPTIMIZED_CODE"])
+    numbered = []
+    for name, content in sections.items():
+        match = OPTIMIZED_VARIANT_RE.match(name)
+        if match and content:
+            numbered.append((int(match.group(1)), content))
+    variants.extend(content for _, content in sorted(numbered))
+    return variants
+
+
+class StreamingSectionParser:
+    """Incrementally parse a streamed response, emitting each section once it is complete.
+    A section is complete when the next marker arrives or the stream ends."""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Add a chunk of streamed text; returns (section_name, content) for newly completed sections"""
+        self._buffer += chunk or ""
+        markers = list(MARKER_RE.finditer(self._buffer))
+        if len(markers) < 2:
+            return []
+
+        completed = []
+        for current, following in zip(markers, markers[1:]):
+            completed.append((current.group(1), self._buffer[current.end():following.start()].strip()))
+        # Keep the last (still open) section; a half-received marker stays in its tail until complete
+        self._buffer = self._buffer[markers[-1].start():]
+        return completed
+
+    def finish(self) -> List[Tuple[str, str]]:
+        """Flush the final section at end of stream"""
+        buffer, self._buffer = self._buffer, ""
+        match = MARKER_RE.search(buffer)
+        if not match:
+            return []
+        return [(match.group(1), buffer[match.end():].strip())]
+
+
+# Packed multi-file responses start each file's review with a delimiter line: =====FILE: path/to/file.py=====
+FILE_DELIMITER_RE = re.compile(r"^[ \t]*={3,}[ \t]*FILE:[ \t]*(.+?)[ \t]*={3,}[ \t]*$", re.MULTILINE)
+
+
+def file_delimiter(path: str) -> str:
+    return f"=====FILE: {path}====="
+
+
+def split_packed_response(text: str, paths: List[str]) -> Dict[str, str]:
+    """Split a packed response into {path: that file's review text}, for the expected paths only.
+    Text outside any delimiter, unknown paths and empty repeats are dropped."""
+    expected = set(paths)
+    reviews: Dict[str, str] = {}
+    if not text:
+        return reviews
+
+    delimiters = list(FILE_DELIMITER_RE.finditer(text))
+    for i, match in enumerate(delimiters):
+        path = match.group(1).strip().strip("`*")
+        if path not in expected or reviews.get(path):
+            continue
+        end = delimiters[i + 1].start() if i + 1 < len(delimiters) else len(text)
+        reviews[path] = text[match.end():end].strip()
+    return reviews
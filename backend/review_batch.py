@@ -0,0 +1,65 @@
+"""
+Batch Reviews
+Reviews several uploaded files in one request: every file is reviewed concurrently, failures
+are reported per file without dropping the others, and the new rows are saved together in one
+transaction. Results come back in input order, tagged with file_index and filename.
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, List, Optional
+
+REVIEW_BATCH_MAX_FILES = int(os.getenv("REVIEW_BATCH_MAX_FILES", "20"))
+
+
+def check_batch_size(count: int, maximum: int = REVIEW_BATCH_MAX_FILES):
+    """ValueError for an empty or oversized batch (the endpoint answers 400)"""
+    if count <= 0:
+        raise ValueError("No files to review")
+    if count > maximum:
+        raise ValueError(f"At most {maximum} files per batch")
+
+
+async def _gather(review_file, args_list):
+    return await asyncio.gather(*(review_file(*args) for args in args_list))
+
+
+async def run_batch(files: List[Any],
+                    review_file: Callable[[int, Any], Awaitable[dict]],
+                    save_rows: Callable[[List[Any]], List[dict]],
+                    row_result: Callable[[Any], dict],
+                    fan_out: Optional[Callable] = None,
+                    on_file_reviewed: Optional[Callable[[dict], Awaitable[None]]] = None) -> dict:
+    """Review files (each with a .filename) and save the new rows in one call.
+
+    review_file(index, file) returns {"row": <unsaved row>} for a new review or {"existing": <result>}
+    when an earlier review answers the file; an exception marks just that file as failed.
+    save_rows(rows) is blocking, runs once on a worker thread and returns one result per row.
+    fan_out(review, args_list) runs review over every args tuple and returns outcomes in order
+    (asyncio.gather by default; the endpoint passes its bounded executor)."""
+    async def review(index: int, data) -> dict:
+        try:
+            outcome = await review_file(index, data)
+        except Exception as e:
+            print(f"Error reviewing batch file {index + 1}/{len(files)} ({data.filename}): {e}")
+            outcome = {"error": str(e)}
+        if on_file_reviewed:
+            if "row" in outcome:
+                report = row_result(outcome["row"])
+            else:
+                report = outcome.get("existing") or {"error": outcome["error"]}
+            await on_file_reviewed({**report, "file_index": index, "filename": data.filename,
+                                    "total_files": len(files)})
+        return outcome
+
+    outcomes = await (fan_out or _gather)(review, list(enumerate(files)))
+    rows = [outcome["row"] for outcome in outcomes if "row" in outcome]
+    saved = iter(await asyncio.to_thread(save_rows, rows) if rows else [])
+    reviews = [
+        {**(next(saved) if "row" in outcome else outcome.get("existing") or {"error": outcome["error"]}),
+         "file_index": index, "filename": data.filename}
+        for index, (data, outcome) in enumerate(zip(files, outcomes))
+    ]
+    print(f"📦 Batch review: stored {len(rows)}/{len(files)} files in one transaction")
+    return {"reviews": reviews, "total_files": len(files),
+            "failed_files": sum(1 for outcome in outcomes if "error" in outcome)}
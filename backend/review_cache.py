@@ -0,0 +1,168 @@
+"""
+Content-Addressed Review Cache
+Caches Gemini review responses keyed on (normalized code, language, effective prompt, model)
+so resubmitting identical code with identical preferences skips the LLM call
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+REVIEW_CACHE_ENABLED = os.getenv("REVIEW_CACHE_ENABLED", "true").lower() == "true"
+REVIEW_CACHE_MAX_ENTRIES = int(os.getenv("REVIEW_CACHE_MAX_ENTRIES", "512"))
+REVIEW_CACHE_TTL_SECONDS = int(os.getenv("REVIEW_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+REVIEW_CACHE_PERSIST = os.getenv("REVIEW_CACHE_PERSIST", "false").lower() == "true"
+
+
+def normalize_code(code: str) -> str:
+    """Normalize line endings and trailing whitespace so cosmetic re-uploads hash the same"""
+    lines = (code or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def make_cache_key(code: str, language: str, prompt: str, model_name: str, file_path: Optional[str] = None,
+                   excerpt: Optional[str] = None) -> str:
+    """SHA-256 over the normalized code and everything that shapes the model's answer.
+    file_path is for prompts that name the file and excerpt for the heading of one chunk of a
+    longer file (its line range and part number); keys without them are unchanged."""
+    parts = [normalize_code(code), language or "", prompt or "", model_name or ""]
+    if excerpt is not None:
+        parts.extend([file_path or "", excerpt])
+    elif file_path is not None:
+        parts.append(file_path)
+    digest = hashlib.sha256()
+    for part in parts:
+        encoded = part.encode("utf-8")
+        # Length-prefix each part so ("ab", "c") and ("a", "bc") never collide
+        digest.update(len(encoded).to_bytes(8, "big"))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+class DatabaseCacheBacking:
+    """Persistent backing store on a SQLAlchemy table with cache_key/response/created_at columns"""
+
+    def __init__(self, session_factory, entry_model, ttl_seconds: int):
+        self.session_factory = session_factory
+        self.entry_model = entry_model
+        self.ttl_seconds = ttl_seconds
+
+    def load(self, key: str) -> Optional[str]:
+        db = self.session_factory()
+        try:
+            entry = db.query(self.entry_model).filter(self.entry_model.cache_key == key).first()
+            if not entry:
+                return None
+            if entry.created_at < datetime.utcnow() - timedelta(seconds=self.ttl_seconds):
+                db.delete(entry)
+                db.commit()
+                return None
+            return entry.response
+        finally:
+            db.close()
+
+    def store(self, key: str, response: str):
+        db = self.session_factory()
+        try:
+            entry = db.query(self.entry_model).filter(self.entry_model.cache_key == key).first()
+            if entry:
+                entry.response = response
+                entry.created_at = datetime.utcnow()
+            else:
+                db.add(self.entry_model(cache_key=key, response=response, created_at=datetime.utcnow()))
+            db.commit()
+        except Exception:
+            # Another worker may have inserted the same key first - the cache is best effort
+            db.rollback()
+        finally:
+            db.close()
+
+
+class ReviewCache:
+    """Thread-safe in-memory LRU with TTL, optionally backed by a persistent store"""
+
+    def __init__(self, max_entries: int = REVIEW_CACHE_MAX_ENTRIES, ttl_seconds: int = REVIEW_CACHE_TTL_SECONDS,
+                 backing=None, enabled: bool = True):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.backing = backing
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+
+        value = None
+        if self.backing is not None:
+            try:
+                value = self.backing.load(key)
+            except Exception as e:
+                print(f"⚠️ Review cache backing load failed: {e}")
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.persistent_hits += 1
+            self._insert(key, value, now)
+            return value
+
+    def put(self, key: str, value: str):
+        if not self.enabled or not value:
+            return
+        with self._lock:
+            self._insert(key, value, time.monotonic())
+        if self.backing is not None:
+            try:
+                self.backing.store(key, value)
+            except Exception as e:
+                print(f"⚠️ Review cache backing store failed: {e}")
+
+    def _insert(self, key: str, value: str, stored_at: float):
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "persistent": self.backing is not None,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "persistent_hits": self.persistent_hits,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0,
+            }
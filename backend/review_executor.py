@@ -0,0 +1,86 @@
+"""
+Bounded-Concurrency Review Executor
+Runs per-file review calls - coroutines on the event loop, blocking calls on worker
+threads - while capping how many are in flight globally and per user
+"""
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("REVIEW_MAX_CONCURRENCY", "8"))
+DEFAULT_MAX_CONCURRENCY_PER_USER = int(os.getenv("REVIEW_MAX_CONCURRENCY_PER_USER", "4"))
+
+
+class ReviewExecutor:
+    """Fan out review calls with global and per-user in-flight limits"""
+
+    def __init__(self, max_concurrency: Optional[int] = None, max_per_user: Optional[int] = None):
+        self.max_concurrency = max(1, max_concurrency or DEFAULT_MAX_CONCURRENCY)
+        self.max_per_user = max(1, min(max_per_user or DEFAULT_MAX_CONCURRENCY_PER_USER, self.max_concurrency))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="review")
+
+        # Semaphores bind to the event loop they are first used on, so they are
+        # rebuilt whenever the executor is driven from a different loop
+        self._loop = None
+        self._global_limit = None
+        self._user_limits: Dict[Any, asyncio.Semaphore] = {}
+        self._user_waiters: Dict[Any, int] = {}
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._global_limit = asyncio.Semaphore(self.max_concurrency)
+            self._user_limits = {}
+            self._user_waiters = {}
+
+    def _acquire_user_limit(self, user_id) -> asyncio.Semaphore:
+        limit = self._user_limits.get(user_id)
+        if limit is None:
+            limit = asyncio.Semaphore(self.max_per_user)
+            self._user_limits[user_id] = limit
+        self._user_waiters[user_id] = self._user_waiters.get(user_id, 0) + 1
+        return limit
+
+    def _release_user_limit(self, user_id):
+        remaining = self._user_waiters.get(user_id, 1) - 1
+        if remaining <= 0:
+            # Drop idle users so the table doesn't grow with every user ever seen
+            self._user_waiters.pop(user_id, None)
+            self._user_limits.pop(user_id, None)
+        else:
+            self._user_waiters[user_id] = remaining
+
+    async def run(self, user_id, func: Callable, *args, **kwargs):
+        """Run one call once both the user's and the global limit allow it.
+        Coroutine functions are awaited in place; anything else runs on a worker thread."""
+        self._bind_loop()
+        user_limit = self._acquire_user_limit(user_id)
+        try:
+            # Wait on the per-user limit first so a queued user never holds a global slot
+            async with user_limit:
+                async with self._global_limit:
+                    self.in_flight += 1
+                    self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                    try:
+                        if asyncio.iscoroutinefunction(func):
+                            return await func(*args, **kwargs)
+                        loop = asyncio.get_running_loop()
+                        return await loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+                    finally:
+                        self.in_flight -= 1
+        finally:
+            self._release_user_limit(user_id)
+
+    async def map(self, user_id, func: Callable, arg_tuples: Iterable[tuple]) -> List[Any]:
+        """Run func over each argument tuple concurrently; results keep input order"""
+        return await asyncio.gather(*(self.run(user_id, func, *args) for args in arg_tuples))
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,322 @@
+"""
+Asynchronous Review Job Queue
+Runs review pipelines in background workers so clients can submit, poll status
+and fetch results file-by-file instead of holding the HTTP connection open.
+Job state lives in the database, so queued work survives a restart.
+
+Several app processes (gunicorn workers) can run a queue over the same table: a
+job is claimed with a conditional UPDATE, so only one process runs it, and the
+owner renews a lease (heartbeat_at) while it runs. A running job whose lease has
+lapsed belongs to a dead process and is claimed again by whoever sees it next;
+the previous owner's handler is cancelled as soon as its heartbeat finds the lease
+gone. Finished files are stored in the file table, so any process can serve them.
+Database work runs on worker threads, never on the event loop.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import threading
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import and_, func, or_
+
+REVIEW_JOB_WORKERS = int(os.getenv("REVIEW_JOB_WORKERS", "2"))
+# A running job's owner renews its lease every REVIEW_JOB_HEARTBEAT_SECONDS;
+# after REVIEW_JOB_LEASE_SECONDS without a renewal the job counts as orphaned
+REVIEW_JOB_HEARTBEAT_SECONDS = float(os.getenv("REVIEW_JOB_HEARTBEAT_SECONDS", "15"))
+REVIEW_JOB_LEASE_SECONDS = float(os.getenv("REVIEW_JOB_LEASE_SECONDS", "60"))
+# How often each process looks for jobs it wasn't handed directly (other processes' or orphaned ones)
+REVIEW_JOB_SWEEP_SECONDS = float(os.getenv("REVIEW_JOB_SWEEP_SECONDS", "30"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class LeaseLost(Exception):
+    """Raised by a handler's lease check once another process has taken the job over"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class ReviewJobQueue:
+    """In-process worker pool over a persistent job table, safe to run in several processes"""
+
+    def __init__(self, session_factory, job_model, file_model, num_workers: int = REVIEW_JOB_WORKERS,
+                 lease_seconds: float = REVIEW_JOB_LEASE_SECONDS,
+                 heartbeat_seconds: float = REVIEW_JOB_HEARTBEAT_SECONDS,
+                 sweep_seconds: float = REVIEW_JOB_SWEEP_SECONDS, worker_id: Optional[str] = None):
+        self.session_factory = session_factory
+        self.job_model = job_model
+        self.file_model = file_model
+        self.num_workers = max(1, num_workers)
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.sweep_seconds = sweep_seconds
+        self.worker_id = worker_id or default_worker_id()
+        self.handlers: Dict[str, Callable[..., Awaitable[Optional[int]]]] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending = set()  # job ids in the local queue, so sweeps don't enqueue them twice
+        self._workers = []
+        # Serializes this process's file reports so progress can't move backwards
+        self._lock = threading.Lock()
+
+    def register(self, job_type: str, handler: Callable[..., Awaitable[Optional[int]]]):
+        """handler(job, report, check_lease) runs the pipeline, calls report(file_review) per file and
+        returns a review id. report and check_lease are blocking, so call them off the event loop;
+        check_lease() raises LeaseLost and must be called right before the review is stored."""
+        self.handlers[job_type] = handler
+
+    # ------------------ Lifecycle ------------------
+
+    async def start(self):
+        """Pick up claimable jobs from the database and start the workers"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        recovered = await self._enqueue_claimable()
+        if recovered:
+            print(f"🔁 Found {recovered} queued or orphaned review job(s)")
+
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+        self._workers.append(asyncio.create_task(self._sweeper()))
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # ------------------ Submission & status ------------------
+
+    def submit(self, user_id: int, job_type: str, payload: Dict[str, Any]) -> str:
+        """Persist a new job and hand it to the workers; returns the job id"""
+        if job_type not in self.handlers:
+            raise ValueError(f"Unknown job type: {job_type}")
+        job_id = str(uuid.uuid4())
+        db = self.session_factory()
+        try:
+            db.add(self.job_model(
+                id=job_id,
+                user_id=user_id,
+                job_type=job_type,
+                status=JOB_QUEUED,
+                payload=json.dumps(payload),
+                progress_done=0,
+                progress_total=None,
+            ))
+            db.commit()
+        finally:
+            db.close()
+        self._enqueue(job_id)
+        return job_id
+
+    def get_job(self, job_id: str, user_id: int):
+        db = self.session_factory()
+        try:
+            return db.query(self.job_model).filter(
+                self.job_model.id == job_id, self.job_model.user_id == user_id
+            ).first()
+        finally:
+            db.close()
+
+    def get_partial_result(self, job_id: str, file_index: int) -> Optional[dict]:
+        db = self.session_factory()
+        try:
+            result = db.query(self.file_model.result).filter(
+                self.file_model.job_id == job_id, self.file_model.file_index == file_index
+            ).scalar()
+            return json.loads(result) if result is not None else None
+        finally:
+            db.close()
+
+    def report_file(self, job_id: str, file_review: dict):
+        """Record one finished file; may be called from worker threads.
+        Ignored once this process no longer owns the job (its lease lapsed and another took over)."""
+        with self._lock:
+            db = self.session_factory()
+            try:
+                job = db.query(self.job_model).filter(
+                    self.job_model.id == job_id, self.job_model.owner == self.worker_id
+                ).first()
+                if job is None:
+                    return
+                files = self.file_model
+                file_index = file_review.get("file_index")
+                if file_index is None:
+                    file_index = db.query(func.count(files.id)).filter(files.job_id == job_id).scalar()
+                row = db.query(files).filter(files.job_id == job_id, files.file_index == file_index).first()
+                if row is None:
+                    row = files(job_id=job_id, file_index=file_index)
+                    db.add(row)
+                row.result = json.dumps(file_review, default=str)
+                db.flush()
+                job.progress_done = db.query(func.count(files.id)).filter(files.job_id == job_id).scalar()
+                job.progress_total = file_review.get("total_files")
+                job.heartbeat_at = datetime.utcnow()
+                db.commit()
+            finally:
+                db.close()
+
+    # ------------------ Claiming ------------------
+
+    def _claimable(self, now: datetime):
+        """Queued jobs, and running jobs whose owner stopped renewing the lease"""
+        job = self.job_model
+        stale = now - timedelta(seconds=self.lease_seconds)
+        return or_(job.status == JOB_QUEUED,
+                   and_(job.status == JOB_RUNNING, or_(job.heartbeat_at.is_(None), job.heartbeat_at < stale)))
+
+    def _enqueue(self, job_id: str):
+        if self._queue is not None and job_id not in self._pending:
+            self._pending.add(job_id)
+            self._queue.put_nowait(job_id)
+
+    def _claimable_ids(self):
+        db = self.session_factory()
+        try:
+            return [row.id for row in db.query(self.job_model.id).filter(
+                self._claimable(datetime.utcnow())
+            ).order_by(self.job_model.created_at.asc())]
+        finally:
+            db.close()
+
+    async def _enqueue_claimable(self) -> int:
+        job_ids = await asyncio.to_thread(self._claimable_ids)
+        for job_id in job_ids:
+            self._enqueue(job_id)
+        return len(job_ids)
+
+    def _claim(self, job_id: str):
+        """Atomically take the job for this process; returns the detached job, or None if it isn't claimable"""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            claimed = db.query(self.job_model).filter(
+                self.job_model.id == job_id, self._claimable(now)
+            ).update({
+                self.job_model.status: JOB_RUNNING,
+                self.job_model.owner: self.worker_id,
+                self.job_model.started_at: now,
+                self.job_model.heartbeat_at: now,
+                self.job_model.progress_done: 0,
+            }, synchronize_session=False)
+            if claimed != 1:
+                db.rollback()
+                return None
+            # An orphaned job starts over, so files its previous owner reported are dropped
+            db.query(self.file_model).filter(self.file_model.job_id == job_id).delete(synchronize_session=False)
+            db.commit()
+            job = db.query(self.job_model).filter(self.job_model.id == job_id).first()
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _update_owned(self, job_id: str, **fields) -> bool:
+        """Write fields only while this process owns the job; False if the lease was lost"""
+        db = self.session_factory()
+        try:
+            updated = db.query(self.job_model).filter(
+                self.job_model.id == job_id, self.job_model.owner == self.worker_id
+            ).update({getattr(self.job_model, name): value for name, value in fields.items()},
+                     synchronize_session=False)
+            db.commit()
+            return updated == 1
+        finally:
+            db.close()
+
+    def check_lease(self, job_id: str):
+        """Raise LeaseLost unless this process still owns the running job"""
+        db = self.session_factory()
+        try:
+            owned = db.query(self.job_model.id).filter(
+                self.job_model.id == job_id, self.job_model.owner == self.worker_id,
+                self.job_model.status == JOB_RUNNING
+            ).first()
+        finally:
+            db.close()
+        if owned is None:
+            raise LeaseLost(f"Review job {job_id} is now owned by another worker")
+
+    def _clear_files(self, job_id: str):
+        db = self.session_factory()
+        try:
+            db.query(self.file_model).filter(self.file_model.job_id == job_id).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    # ------------------ Workers ------------------
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            self._pending.discard(job_id)
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+    async def _sweeper(self):
+        while True:
+            await asyncio.sleep(self.sweep_seconds)
+            try:
+                await self._enqueue_claimable()
+            except Exception:
+                traceback.print_exc()
+
+    async def _heartbeat(self, job_id: str, handler: asyncio.Task):
+        """Renew the lease while the handler runs; cancel the handler once the lease is lost"""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            if not await asyncio.to_thread(self._update_owned, job_id, heartbeat_at=datetime.utcnow()):
+                print(f"⚠️ Lost the lease on review job {job_id}; another worker took it over")
+                handler.cancel()
+                return
+
+    async def _run(self, job_id: str):
+        job = await asyncio.to_thread(self._claim, job_id)
+        if job is None:
+            return
+
+        print(f"⚙️ Running {job.job_type} review job {job_id} on {self.worker_id}")
+        handler = asyncio.ensure_future(self.handlers[job.job_type](
+            job, lambda file_review: self.report_file(job_id, file_review), lambda: self.check_lease(job_id)
+        ))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, handler))
+        try:
+            review_id = await handler
+            if await asyncio.to_thread(self._update_owned, job_id, status=JOB_COMPLETED, review_id=review_id,
+                                       finished_at=datetime.utcnow()):
+                # The stored review serves the files from now on
+                await asyncio.to_thread(self._clear_files, job_id)
+                print(f"✅ Review job {job_id} completed (review {review_id})")
+        except asyncio.CancelledError:
+            if not (heartbeat.done() and handler.cancelled()):
+                raise
+            # The new owner runs the job from the start; this process's run is abandoned
+            print(f"🛑 Abandoned review job {job_id} after losing its lease")
+        except LeaseLost:
+            print(f"🛑 Abandoned review job {job_id} after losing its lease")
+        except Exception as e:
+            detail = getattr(e, "detail", None) or str(e)
+            print(f"❌ Review job {job_id} failed: {detail}")
+            # Files finished before the failure stay readable
+            await asyncio.to_thread(self._update_owned, job_id, status=JOB_FAILED, error=str(detail)[:2000],
+                                    finished_at=datetime.utcnow())
+        finally:
+            heartbeat.cancel()
+            handler.cancel()
@@ -0,0 +1,83 @@
+"""
+Multi-File Review Packing
+Groups small repository files into one LLM request up to a token budget, so the shared review
+instructions are sent once per pack instead of once per file. Each file's review is delimited
+in the response and split back out; files that can't be attributed are re-reviewed on their own.
+"""
+
+import os
+from typing import Dict, List, Tuple
+
+try:
+    from backend.response_parser import file_delimiter, split_packed_response, parse_review_sections
+except ImportError:
+    from response_parser import file_delimiter, split_packed_response, parse_review_sections
+
+REPO_PACK_ENABLED = os.getenv("REPO_PACK_ENABLED", "true").lower() in ("1", "true", "yes")
+# Only files at most this long are packed; longer files are reviewed one per call
+REPO_PACK_FILE_MAX_CHARS = int(os.getenv("REPO_PACK_FILE_MAX_CHARS", "1500"))
+# Estimated tokens of code per pack, and files per pack (each file's review is a full set of sections)
+REPO_PACK_TOKEN_BUDGET = int(os.getenv("REPO_PACK_TOKEN_BUDGET", "3000"))
+REPO_PACK_MAX_FILES = int(os.getenv("REPO_PACK_MAX_FILES", "5"))
+
+SECTION_MARKERS = ("###CODE_QUALITY###, ###KEY_FINDINGS###, ###SECURITY###, ###PERFORMANCE###, ###ARCHITECTURE###, "
+                   "###BEST_PRACTICES###, ###RECOMMENDATIONS###, ###SYNTAX_ERRORS###, ###SEMANTIC_ERRORS###, "
+                   "###OPTIMIZED_CODE###, ###EXPLANATION###")
+
+
+def code_tokens(content: str) -> int:
+    return len(content or "") // 4 + 1
+
+
+def packable(content: str) -> bool:
+    return REPO_PACK_ENABLED and len(content or "") <= REPO_PACK_FILE_MAX_CHARS
+
+
+class FilePack:
+    """Small files waiting to share one review call: (file_index, file_path, file_content) in discovery order"""
+
+    def __init__(self, token_budget: int = REPO_PACK_TOKEN_BUDGET, max_files: int = REPO_PACK_MAX_FILES):
+        self.token_budget = token_budget
+        self.max_files = max(1, max_files)
+        self.files: List[Tuple[int, str, str]] = []
+        self.tokens = 0
+
+    def __len__(self):
+        return len(self.files)
+
+    def fits(self, content: str) -> bool:
+        return not self.files or (len(self.files) < self.max_files
+                                  and self.tokens + code_tokens(content) <= self.token_budget)
+
+    def add(self, file_index: int, file_path: str, file_content: str):
+        self.files.append((file_index, file_path, file_content))
+        self.tokens += code_tokens(file_content)
+
+    def full(self) -> bool:
+        return len(self.files) >= self.max_files or self.tokens >= self.token_budget
+
+    def take(self) -> List[Tuple[int, str, str]]:
+        files, self.files, self.tokens = self.files, [], 0
+        return files
+
+
+def build_packed_prompt(custom_prompt: str, files: List[Tuple[str, str, str]]) -> str:
+    """One prompt reviewing several (file_path, language, content) files, each answered under its own delimiter"""
+    blocks = "\n\n".join(
+        f"{file_delimiter(path)}\n**Language:** {language}\n```{language}\n{content}\n```"
+        for path, language, content in files
+    )
+    return f"""{custom_prompt}
+
+**Repository Files:** the {len(files)} files below are reviewed together. Review EACH file separately.
+For every file, first repeat its delimiter line exactly as given (for example {file_delimiter(files[0][0])}),
+then give that file's complete analysis with the exact section markers ({SECTION_MARKERS}).
+Never merge files into one review and never skip a file.
+
+{blocks}"""
+
+
+def attribute_packed_response(response_text: str, paths: List[str]) -> Dict[str, str]:
+    """{path: review text} for files whose review was found under their delimiter with at least one section"""
+    return {path: review for path, review in split_packed_response(response_text, paths).items()
+            if parse_review_sections(review)}
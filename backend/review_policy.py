@@ -0,0 +1,187 @@
+"""
+Review Fast-Path Policy
+Decides, before any LLM call, whether a submission needs the full review prompt at all.
+Code that is empty, fails to parse or repeats a recent submission is answered from its
+AST analysis (or the earlier review), or with a much smaller targeted prompt. Each rule's
+action is configurable per user and every short-circuit is counted.
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Dict, NamedTuple, Optional
+
+# Rule -> action. "skip" answers without the LLM, "targeted" sends a small rule-specific prompt,
+# "llm" always runs the full review.
+POLICY_ACTIONS = {
+    "empty_code": ("skip", "llm"),
+    "syntax_error": ("skip", "targeted", "llm"),
+    "duplicate": ("skip", "llm"),
+}
+
+
+def _default_action(rule: str, fallback: str) -> str:
+    action = os.getenv(f"REVIEW_POLICY_{rule.upper()}", fallback)
+    return action if action in POLICY_ACTIONS[rule] else fallback
+
+
+DEFAULT_REVIEW_POLICY = {
+    "empty_code": _default_action("empty_code", "skip"),
+    "syntax_error": _default_action("syntax_error", "targeted"),
+    "duplicate": _default_action("duplicate", "skip"),
+}
+# A resubmission of identical code within this window returns the earlier review
+REVIEW_POLICY_DUPLICATE_WINDOW_SECONDS = int(os.getenv("REVIEW_POLICY_DUPLICATE_WINDOW_SECONDS", "600"))
+# Larger code is sent to the targeted prompt as the lines around the error only
+TARGETED_PROMPT_MAX_CHARS = int(os.getenv("REVIEW_POLICY_TARGETED_MAX_CHARS", "4000"))
+TARGETED_CONTEXT_LINES = 20
+
+# Cache-key stand-in for the user's custom prompt: targeted responses don't depend on preferences
+SYNTAX_FIX_PROMPT_KEY = "review-policy:syntax-fix:v1"
+
+SYNTAX_ERROR_LINE_RE = re.compile(r"line (\d+)")
+
+
+class PolicyDecision(NamedTuple):
+    rule: str
+    action: str  # "skip" or "targeted"
+    duplicate_of: Optional[int] = None  # review id, for the duplicate rule
+
+
+def load_review_policy(learning_patterns: Optional[str]) -> Dict[str, str]:
+    """Effective policy: the defaults overridden by a preferences.learning_patterns "review_policy" entry"""
+    policy = dict(DEFAULT_REVIEW_POLICY)
+    try:
+        stored = json.loads(learning_patterns).get("review_policy") if learning_patterns else None
+    except (ValueError, AttributeError):
+        stored = None
+    if isinstance(stored, dict):
+        for rule, action in stored.items():
+            if action in POLICY_ACTIONS.get(rule, ()):
+                policy[rule] = action
+    return policy
+
+
+def store_review_policy(learning_patterns: Optional[str], updates: Dict[str, str]) -> str:
+    """learning_patterns JSON with the policy updates applied; raises ValueError for unknown rules or actions"""
+    for rule, action in updates.items():
+        if rule not in POLICY_ACTIONS:
+            raise ValueError(f"Unknown review policy rule '{rule}'")
+        if action not in POLICY_ACTIONS[rule]:
+            raise ValueError(f"'{rule}' must be one of: {', '.join(POLICY_ACTIONS[rule])}")
+    try:
+        patterns = json.loads(learning_patterns) if learning_patterns else {}
+    except ValueError:
+        patterns = {}
+    if not isinstance(patterns, dict):
+        patterns = {}
+    patterns["review_policy"] = {**(patterns.get("review_policy") or {}), **updates}
+    return json.dumps(patterns)
+
+
+def python_syntax_error(language: str, analysis) -> Optional[str]:
+    """The parser's message when Python code fails ast.parse (other analyzers only guess at syntax errors)"""
+    if (language or "").lower() != "python" or analysis is None or not isinstance(analysis.structure, dict):
+        return None
+    return analysis.structure.get("syntax_error")
+
+
+def evaluate_review_policy(code: str, language: str, analysis, policy: Dict[str, str],
+                           duplicate_of: Optional[int] = None) -> Optional[PolicyDecision]:
+    """The first rule that applies and isn't set to "llm", or None for a full review"""
+    if not (code or "").strip() and policy["empty_code"] != "llm":
+        return PolicyDecision("empty_code", policy["empty_code"])
+    if duplicate_of is not None and policy["duplicate"] != "llm":
+        return PolicyDecision("duplicate", policy["duplicate"], duplicate_of)
+    if python_syntax_error(language, analysis) and policy["syntax_error"] != "llm":
+        return PolicyDecision("syntax_error", policy["syntax_error"])
+    return None
+
+
+def syntax_error_line(message: str) -> Optional[int]:
+    match = SYNTAX_ERROR_LINE_RE.search(message or "")
+    return int(match.group(1)) if match else None
+
+
+def deterministic_review(decision: PolicyDecision, code: str, language: str, analysis) -> str:
+    """Marker-delimited review text for a skipped submission, in the shape Gemini responses are parsed from"""
+    if decision.rule == "empty_code":
+        return ("###CODE_QUALITY###\nNo code was submitted, so there is nothing to review.\n"
+                "###SYNTAX_ERRORS###\nNo syntax errors detected.\n"
+                "###SEMANTIC_ERRORS###\nNo semantic errors detected.")
+
+    message = python_syntax_error(language, analysis) or "the code could not be parsed"
+    line_no = syntax_error_line(message)
+    lines = (code or "").split("\n")
+    finding = f"• Line {line_no}: {message}" if line_no else f"• {message}"
+    if line_no and 1 <= line_no <= len(lines) and lines[line_no - 1].strip():
+        finding += f"\n  `{lines[line_no - 1].strip()}`"
+    return ("###CODE_QUALITY###\n⛔ This code doesn't parse, so it was not reviewed further. "
+            "Fix the syntax error below and submit it again for a full review.\n"
+            f"###SYNTAX_ERRORS###\n{finding}\n"
+            "###SEMANTIC_ERRORS###\nNot checked: the code has to parse before it can be analyzed.")
+
+
+def targeted_syntax_prompt(code: str, language: str, analysis, max_chars: int = TARGETED_PROMPT_MAX_CHARS) -> str:
+    """A small prompt that only asks for the syntax errors and their fix"""
+    message = python_syntax_error(language, analysis) or "syntax error"
+    lines = code.split("\n")
+    line_no = syntax_error_line(message)
+    heading = "**Code:**"
+    if len(code) > max_chars and line_no:
+        # Only the lines around the error; the model numbers lines as in the file
+        start = max(1, line_no - TARGETED_CONTEXT_LINES)
+        end = min(len(lines), line_no + TARGETED_CONTEXT_LINES)
+        code = "\n".join(lines[start - 1:end])[:max_chars]
+        heading = (f"**Code (lines {start}-{end} of {len(lines)}; number lines as in the file, "
+                   f"so the first line shown is line {start}):**")
+    return f"""This {language} code fails to parse: {message}
+Only find and fix its syntax errors. Don't review style, security or performance.
+
+{heading}
+```{(language or "").lower()}
+{code}
+```
+
+Respond with exactly these section markers:
+###CODE_QUALITY###
+One sentence on what stops the code from parsing.
+###SYNTAX_ERRORS###
+Each syntax error as "• Line N: description".
+###OPTIMIZED_CODE###
+The code shown above with only its syntax errors fixed, without markdown fences."""
+
+
+class ReviewPolicyStats:
+    """Thread-safe counters of what the fast path saved"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.evaluated = 0
+        self.by_rule: Dict[str, Dict[str, int]] = {}
+        self.llm_calls_avoided = 0
+        self.prompt_chars_avoided = 0
+
+    def record(self, decision: Optional[PolicyDecision], llm_calls_avoided: int = 0, prompt_chars_avoided: int = 0):
+        with self._lock:
+            self.evaluated += 1
+            if decision is None:
+                return
+            by_action = self.by_rule.setdefault(decision.rule, {})
+            by_action[decision.action] = by_action.get(decision.action, 0) + 1
+            self.llm_calls_avoided += max(0, llm_calls_avoided)
+            self.prompt_chars_avoided += max(0, prompt_chars_avoided)
+
+    def stats(self) -> dict:
+        with self._lock:
+            short_circuited = sum(sum(actions.values()) for actions in self.by_rule.values())
+            return {
+                "evaluated": self.evaluated,
+                "short_circuited": short_circuited,
+                "short_circuit_rate": round(short_circuited / self.evaluated, 3) if self.evaluated else 0.0,
+                "by_rule": {rule: dict(actions) for rule, actions in self.by_rule.items()},
+                "llm_calls_avoided": self.llm_calls_avoided,
+                "prompt_chars_avoided": self.prompt_chars_avoided,
+                "defaults": dict(DEFAULT_REVIEW_POLICY),
+            }
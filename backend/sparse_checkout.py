@@ -0,0 +1,77 @@
+"""
+Sparse Repository Checkout
+Repositories are fetched blob-less (--filter=blob:none), so only commits and trees arrive up front.
+The tree listing gives the paths matching include_patterns/exclude_patterns in discovery's order,
+and the checkout is restricted to the first of them, so git fetches only their blobs. Whether a
+file is empty, binary or oversized can't be told from the trees, so a few extra paths are checked
+out and the selection is topped up until max_files of them are reviewable.
+"""
+
+import math
+import os
+import re
+import subprocess
+from typing import Dict, List, Optional
+
+try:
+    from backend.repo_discovery import load_code_file, select_candidate_paths, walk_order
+except ImportError:
+    from repo_discovery import load_code_file, select_candidate_paths, walk_order
+
+SPARSE_CHECKOUT_ENABLED = os.getenv("REPO_SPARSE_CHECKOUT", "true").lower() in ("1", "true", "yes")
+PARTIAL_CLONE_FILTER = "blob:none"
+# Share of extra paths checked out per round for files discovery turns out to reject
+SPARSE_OVERSELECT_RATIO = float(os.getenv("REPO_SPARSE_OVERSELECT_RATIO", "0.25"))
+GIT_TIMEOUT_SECONDS = 300  # 5 minutes, as for a fresh clone
+
+
+def _git(*args, cwd: Optional[str] = None, input: Optional[str] = None,
+         env: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], cwd=cwd, input=input, env=env, capture_output=True, text=True,
+                          timeout=GIT_TIMEOUT_SECONDS)
+
+
+def sparse_pattern(path: str) -> str:
+    """An anchored sparse-checkout pattern that matches exactly one repository path"""
+    return "/" + re.sub(r"([\\*?\[ ])", r"\\\1", path)
+
+
+def list_candidate_paths(git_dir: str, commit: str, include_patterns: List[str], exclude_patterns: List[str],
+                         max_files: Optional[int] = None, env: Optional[Dict[str, str]] = None) -> List[str]:
+    """Paths in commit that discovery could review, in discovery's order, read from the trees alone
+    (no blobs needed). Sizes aren't listed: in a blob-less clone they would fetch every blob."""
+    result = _git("ls-tree", "-r", "-z", "--name-only", commit, cwd=git_dir, env=env)
+    if result.returncode != 0:
+        raise Exception(f"Failed to list repository files: {result.stderr}")
+    # A newline can't be expressed in a sparse-checkout pattern; such paths are skipped
+    paths = sorted((path for path in result.stdout.split("\0") if path and "\n" not in path), key=walk_order)
+    return select_candidate_paths(paths, include_patterns, exclude_patterns, max_files)
+
+
+def checkout_paths(worktree: str, paths: List[str], env: Optional[Dict[str, str]] = None):
+    """Populate a --no-checkout worktree with only the given paths, fetching just their blobs.
+    env is passed to the commands that may fetch from the remote."""
+    patterns = "".join(sparse_pattern(path) + "\n" for path in paths)
+    result = _git("sparse-checkout", "set", "--no-cone", "--stdin", cwd=worktree, input=patterns, env=env)
+    if result.returncode == 0:
+        result = _git("reset", "--quiet", "--hard", cwd=worktree, env=env)
+    if result.returncode != 0:
+        raise Exception(f"Failed to check out repository: {result.stderr}")
+
+
+def checkout_reviewable_paths(git_dir: str, worktree: str, commit: str, include_patterns: List[str],
+                              exclude_patterns: List[str], max_files: int,
+                              env: Optional[Dict[str, str]] = None) -> List[str]:
+    """Sparse-check out candidates in discovery's order until max_files of them are reviewable, or
+    none are left. Each round adds the number still needed plus SPARSE_OVERSELECT_RATIO more, so
+    discovery in the worktree finds the same files it would in a full checkout. Returns the paths."""
+    candidates = list_candidate_paths(git_dir, commit, include_patterns, exclude_patterns, env=env)
+    selected: List[str] = []
+    reviewable = 0
+    while reviewable < max_files and len(selected) < len(candidates):
+        needed = max_files - reviewable
+        batch = candidates[len(selected):len(selected) + needed + math.ceil(needed * SPARSE_OVERSELECT_RATIO)]
+        checkout_paths(worktree, selected + batch, env=env)
+        selected += batch
+        reviewable += sum(load_code_file(os.path.join(worktree, path)) is not None for path in batch)
+    return selected
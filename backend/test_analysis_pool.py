@@ -0,0 +1,186 @@
+"""
+Test process-pool AST analysis for repository reviews
+"""
+import os
+import time
+
+from analysis_pool import AnalysisPool, _analyze_chunk
+from ast_analyzer import CodeAnalyzer
+
+FILES = [
+    ("def add(a, b):\n    return eval('a + b')\n", "python"),
+    ("function f(x) { var y = x == 1; console.log(y) }", "javascript"),
+    ("def broken(:\n    pass", "python"),
+    ("public class A { void f() { System.out.println(1); } }", "java"),
+    ("class Store:\n    def get(self, key):\n        unused = 1\n        return key\n", "python"),
+]
+
+
+def crash_chunk(items):
+    os._exit(1)
+
+
+class CrashingPool(AnalysisPool):
+    worker = staticmethod(crash_chunk)
+
+
+def stalling_chunk(items):
+    for code, _ in items:
+        if code == "hang":
+            time.sleep(600)
+        if code == "slow":
+            time.sleep(0.5)
+    return _analyze_chunk(items)
+
+
+class StallingPool(AnalysisPool):
+    worker = staticmethod(stalling_chunk)
+
+
+def generate_module(functions):
+    return "\n".join(
+        f"def handler_{i}(items):\n    total = 0\n    for item in items:\n        for part in item:\n"
+        f"            if part:\n                total += part\n    return total\n"
+        for i in range(functions)
+    )
+
+
+def test_results_match_inline_analysis_in_order():
+    pool = AnalysisPool(max_workers=2, chunk_files=2)
+    try:
+        handles = pool.submit_many(FILES)
+        results = [handle.result() for handle in handles]
+    finally:
+        pool.shutdown()
+    expected = [CodeAnalyzer().analyze_code(code, language) for code, language in FILES]
+    assert [vars(r) for r in results] == [vars(e) for e in expected]
+    assert results[2].complexity == {'status': 'syntax_error'}
+
+
+def test_chunking_by_count_and_size():
+    pool = AnalysisPool(max_workers=1, chunk_files=3, chunk_chars=100)
+    small, large = ("x = 1", "python"), ("x = 1\n" * 50, "python")
+    chunks = pool._chunks([small, small, small, small, large, small])
+    assert [len(chunk) for chunk in chunks] == [3, 1, 1, 1]
+
+
+def test_timeout_falls_back():
+    pool = AnalysisPool(max_workers=1, timeout=0.001)
+    try:
+        result = pool.submit_many([(generate_module(3000), "python")])[0].result()
+    finally:
+        pool.shutdown()
+    print(f"  timeout fallback: {result.issues[0]}")
+    assert result.complexity == {'status': 'parse_failed'}
+    assert "timed out" in result.issues[0]
+
+
+def test_worker_crash_falls_back_and_pool_recovers():
+    pool = CrashingPool(max_workers=1)
+    try:
+        results = [handle.result() for handle in pool.submit_many(FILES[:2])]
+        assert all("worker crashed" in r.issues[0] for r in results)
+        assert pool._executor is None
+
+        # A healthy worker on the next submission
+        pool.worker = staticmethod(AnalysisPool.worker)
+        assert pool.submit_many(FILES[:1])[0].result().language == "python"
+    finally:
+        pool.shutdown()
+
+
+def test_deadline_counts_from_submission():
+    pool = StallingPool(max_workers=1, timeout=0.5)
+    try:
+        handle = pool.submit_many([("hang", "python")])[0]
+        # Collected late: the deadline has already passed, so there is no further wait
+        time.sleep(0.7)
+        start = time.perf_counter()
+        result = handle.result()
+        waited = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+    print(f"  late collection waited {waited * 1000:.0f}ms")
+    assert "timed out" in result.issues[0] and waited < 0.3
+
+
+def test_timeout_kills_the_stuck_worker():
+    pool = StallingPool(max_workers=1, timeout=0.3)
+    try:
+        handle = pool.submit_many([("hang", "python")])[0]
+        workers = list(pool._executor._processes.values())
+        assert "timed out" in handle.result().issues[0]
+        for process in workers:
+            process.join(5)
+        assert workers and not any(process.is_alive() for process in workers)
+        assert pool.recycles == 1 and pool._executor is None
+        # The next submission gets a fresh pool
+        assert pool.submit_many(FILES[:1])[0].result().language == "python"
+    finally:
+        pool.shutdown()
+
+
+def test_chunks_lost_with_a_recycled_pool_run_again():
+    pool = StallingPool(max_workers=2, timeout=1.0, chunk_files=1)
+    try:
+        hung, slow = pool.submit_many([("hang", "python"), ("slow", "python")])
+        assert "timed out" in hung.result().issues[0]
+        # "slow" was mid-run when its pool was killed; it is resubmitted instead of failing
+        result = slow.result()
+    finally:
+        pool.shutdown()
+    assert vars(result) == vars(CodeAnalyzer().analyze_code("slow", "python"))
+    assert pool.recycles == 1
+
+
+def test_deadline_counts_files_queued_by_other_callers():
+    pool = StallingPool(max_workers=1, timeout=0.6, chunk_files=1)
+    try:
+        # One review queues three slow files; another review's file lands behind them
+        first = pool.submit_many([("slow", "python")] * 3)
+        assert pool.queued_files == 3
+        later = pool.submit_many(FILES[:1])[0]
+        assert later.result().language == "python" and not any("timed out" in i for i in later.result().issues)
+        assert all(not any("timed out" in i for i in handle.result().issues) for handle in first)
+        assert pool.recycles == 0
+        time.sleep(0.1)  # done callbacks run on the pool's management thread
+        assert pool.queued_files == 0
+    finally:
+        pool.shutdown()
+
+
+def test_benchmark_serial_vs_pool():
+    """Benchmark: 50 large files analyzed inline vs across worker processes"""
+    files = [(generate_module(400), "python") for _ in range(50)]
+    analyzer = CodeAnalyzer()
+
+    start = time.perf_counter()
+    for code, language in files:
+        analyzer.analyze_code(code, language)
+    serial_s = time.perf_counter() - start
+
+    pool = AnalysisPool()
+    try:
+        start = time.perf_counter()
+        results = [handle.result() for handle in pool.submit_many(files)]
+        pool_s = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+    assert all(r.complexity.get('cyclomatic_complexity') for r in results)
+    print(f"  50 files: serial {serial_s * 1000:.0f}ms, pool ({pool.max_workers} workers) {pool_s * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    test_results_match_inline_analysis_in_order()
+    test_chunking_by_count_and_size()
+    test_timeout_falls_back()
+    test_worker_crash_falls_back_and_pool_recovers()
+    test_deadline_counts_from_submission()
+    test_timeout_kills_the_stuck_worker()
+    test_chunks_lost_with_a_recycled_pool_run_again()
+    test_deadline_counts_files_queued_by_other_callers()
+    test_benchmark_serial_vs_pool()
+
+    print("=" * 60)
+    print("✅ Analysis pool tests completed!")
+    print("=" * 60)
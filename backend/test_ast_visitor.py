@@ -0,0 +1,396 @@
+"""
+Test the single-traversal Python AST analyzer against the multi-walk implementation it replaced
+"""
+import ast
+import re
+import time
+from typing import Dict, List, Any
+
+from ast_analyzer import ASTAnalysis, CodeAnalyzer, PythonASTAnalyzer
+
+
+class LegacyPythonASTAnalyzer:
+    """The multi-walk analyzer this visitor replaced, kept as the reference for output and speed"""
+
+    def analyze(self, code: str) -> ASTAnalysis:
+        """Analyze Python code using AST"""
+        try:
+            tree = ast.parse(code)
+
+            # Extract structure
+            structure = self._extract_structure(tree)
+
+            # Calculate complexity
+            complexity = self._calculate_complexity(tree)
+
+            # Find issues
+            issues = self._find_issues(tree, code)
+
+            # Calculate metrics
+            metrics = self._calculate_metrics(tree, code)
+
+            # Security analysis
+            security_concerns = self._analyze_security(tree, code)
+
+            # Performance analysis
+            performance_issues = self._analyze_performance(tree)
+
+            # Best practices check
+            best_practices = self._check_best_practices(tree, code)
+
+            return ASTAnalysis(
+                language='python',
+                structure=structure,
+                complexity=complexity,
+                issues=issues,
+                metrics=metrics,
+                security_concerns=security_concerns,
+                performance_issues=performance_issues,
+                best_practices=best_practices
+            )
+
+        except SyntaxError as e:
+            return ASTAnalysis(
+                language='python',
+                structure={'syntax_error': str(e)},
+                complexity={'status': 'syntax_error'},
+                issues=[f"Syntax Error: {e}"],
+                metrics={'line_count': len(code.split('\n'))},
+                security_concerns=[],
+                performance_issues=[],
+                best_practices=[]
+            )
+
+    def _extract_structure(self, tree: ast.AST) -> Dict[str, Any]:
+        """Extract code structure from AST"""
+        functions = []
+        classes = []
+        imports = []
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef):
+                functions.append({
+                    'name': node.name,
+                    'args': len(node.args.args),
+                    'line': node.lineno,
+                    'is_async': isinstance(node, ast.AsyncFunctionDef)
+                })
+            elif isinstance(node, ast.ClassDef):
+                methods = [n.name for n in node.body if isinstance(n, ast.FunctionDef)]
+                classes.append({
+                    'name': node.name,
+                    'methods': methods,
+                    'line': node.lineno
+                })
+            elif isinstance(node, (ast.Import, ast.ImportFrom)):
+                if isinstance(node, ast.Import):
+                    imports.extend([alias.name for alias in node.names])
+                else:
+                    imports.append(node.module or 'relative_import')
+
+        return {
+            'functions': functions,
+            'classes': classes,
+            'imports': imports,
+            'total_functions': len(functions),
+            'total_classes': len(classes),
+            'total_imports': len(imports)
+        }
+
+    def _calculate_complexity(self, tree: ast.AST) -> Dict[str, Any]:
+        """Calculate cyclomatic complexity"""
+        complexity_score = 1  # Base complexity
+        max_nesting = 0
+        current_nesting = 0
+
+        def count_complexity(node, nesting=0):
+            nonlocal complexity_score, max_nesting, current_nesting
+            current_nesting = max(current_nesting, nesting)
+            max_nesting = max(max_nesting, nesting)
+
+            # Add complexity for control flow
+            if isinstance(node, (ast.If, ast.For, ast.While, ast.Try)):
+                complexity_score += 1
+            elif isinstance(node, ast.If) and node.orelse:
+                complexity_score += 1  # elif/else
+
+            # Recursively process child nodes
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, (ast.If, ast.For, ast.While, ast.Try, ast.With)):
+                    count_complexity(child, nesting + 1)
+                else:
+                    count_complexity(child, nesting)
+
+        count_complexity(tree)
+
+        # Classify complexity
+        if complexity_score <= 5:
+            complexity_level = 'low'
+        elif complexity_score <= 10:
+            complexity_level = 'medium'
+        else:
+            complexity_level = 'high'
+
+        return {
+            'cyclomatic_complexity': complexity_score,
+            'max_nesting_depth': max_nesting,
+            'complexity_level': complexity_level
+        }
+
+    def _find_issues(self, tree: ast.AST, code: str) -> List[str]:
+        """Find potential code issues"""
+        issues = []
+
+        # Check for long functions
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef):
+                # Estimate function length
+                if hasattr(node, 'end_lineno') and node.end_lineno:
+                    func_length = node.end_lineno - node.lineno
+                    if func_length > 50:
+                        issues.append(f"Line {node.lineno}: Function '{node.name}' is too long ({func_length} lines)")
+
+                # Check for too many parameters
+                if len(node.args.args) > 7:
+                    issues.append(f"Line {node.lineno}: Function '{node.name}' has too many parameters ({len(node.args.args)})")
+
+        # Check for unused variables (basic check)
+        assigned_vars = {}  # Store variable name -> line number
+        used_vars = set()
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        assigned_vars[target.id] = node.lineno
+            elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+                used_vars.add(node.id)
+
+        unused_vars = set(assigned_vars.keys()) - used_vars
+        if unused_vars:
+            # Get line numbers for first few unused vars
+            unused_with_lines = [(var, assigned_vars[var]) for var in list(unused_vars)[:5]]
+            unused_str = ', '.join([f"'{var}' (line {line})" for var, line in unused_with_lines])
+            issues.append(f"Potentially unused variables: {unused_str}")
+
+        return issues
+
+    def _calculate_metrics(self, tree: ast.AST, code: str) -> Dict[str, Any]:
+        """Calculate code metrics"""
+        lines = code.split('\n')
+
+        return {
+            'total_lines': len(lines),
+            'non_empty_lines': len([line for line in lines if line.strip()]),
+            'comment_lines': len([line for line in lines if line.strip().startswith('#')]),
+            'total_nodes': len(list(ast.walk(tree)))
+        }
+
+    def _analyze_security(self, tree: ast.AST, code: str) -> List[str]:
+        """Basic security analysis"""
+        security_issues = []
+
+        # Check for dangerous functions
+        dangerous_funcs = ['eval', 'exec', 'compile', '__import__']
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+                if node.func.id in dangerous_funcs:
+                    line_num = node.lineno if hasattr(node, 'lineno') else 'unknown'
+                    security_issues.append(f"Line {line_num}: Dangerous function '{node.func.id}' used")
+
+        # Check for SQL injection patterns
+        if re.search(r'["\'].*%.*["\'].*%', code):
+            security_issues.append("Potential SQL injection vulnerability (string formatting) - review string concatenation in SQL queries")
+
+        return security_issues
+
+    def _analyze_performance(self, tree: ast.AST) -> List[str]:
+        """Analyze performance issues"""
+        performance_issues = []
+
+        # Check for nested loops
+        loop_nesting = 0
+        max_loop_nesting = 0
+
+        def check_loops(node, depth=0):
+            nonlocal loop_nesting, max_loop_nesting
+
+            if isinstance(node, (ast.For, ast.While)):
+                depth += 1
+                max_loop_nesting = max(max_loop_nesting, depth)
+
+                if depth > 2:
+                    performance_issues.append(f"Deeply nested loops detected (depth: {depth})")
+
+            for child in ast.iter_child_nodes(node):
+                check_loops(child, depth)
+
+        check_loops(tree)
+
+        return performance_issues
+
+    def _check_best_practices(self, tree: ast.AST, code: str) -> List[str]:
+        """Check coding best practices"""
+        suggestions = []
+
+        # Check naming conventions
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef):
+                line_num = node.lineno if hasattr(node, 'lineno') else 'unknown'
+                if not node.name.islower() or '__' in node.name[1:-1]:
+                    if not node.name.startswith('__'):  # Allow magic methods
+                        suggestions.append(f"Line {line_num}: Function '{node.name}' should use snake_case naming")
+
+            elif isinstance(node, ast.ClassDef):
+                line_num = node.lineno if hasattr(node, 'lineno') else 'unknown'
+                if not node.name[0].isupper():
+                    suggestions.append(f"Line {line_num}: Class '{node.name}' should use PascalCase naming")
+
+        # Check for docstrings
+        functions_without_docstrings = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef) and len(node.body) > 0:
+                if not (isinstance(node.body[0], ast.Expr) and
+                       isinstance(node.body[0].value, ast.Constant) and
+                       isinstance(node.body[0].value.value, str)):
+                    line_num = node.lineno if hasattr(node, 'lineno') else 'unknown'
+                    functions_without_docstrings.append(f"'{node.name}' (line {line_num})")
+
+        if functions_without_docstrings:
+            suggestions.append(f"Functions missing docstrings: {', '.join(functions_without_docstrings[:3])}")
+
+        return suggestions
+
+
+SAMPLE = '''
+import os, sys
+from collections import defaultdict
+from . import sibling
+
+class badName:
+    def Method(self, a, b, c, d, e, f, g, h):
+        unused = 1
+        for i in range(a):
+            for j in range(b):
+                while c:
+                    if d:
+                        c -= 1
+        return eval("a + b")
+
+class Good:
+    """Documented"""
+    def __init__(self):
+        self.value = 1
+
+    def run(self, query, user):
+        sql = "SELECT * FROM t WHERE id = '%s'" % user
+        with open("x") as fh:
+            try:
+                data = fh.read()
+            except OSError:
+                data = None
+        return exec(sql)
+
+def helper():
+    def inner():
+        return compile("1", "f", "eval")
+    total = 0
+    total = 1
+    return inner
+'''
+
+
+def generate_module(target_lines):
+    """Synthetic module with classes, nested loops, unused assignments and dangerous calls"""
+    blocks = ["import os", "import json", "from typing import List", ""]
+    i = 0
+    while len(blocks) < target_lines:
+        blocks.extend([
+            f"class Service{i}:",
+            f"    def handle_{i}(self, items, limit):",
+            f"        \"\"\"Handle batch {i}\"\"\"",
+            f"        result_{i} = []",
+            f"        scratch_{i} = {{}}",
+            "        for item in items:",
+            "            for key in item:",
+            "                while limit > 0:",
+            "                    limit -= 1",
+            "                    if key in os.environ:",
+            f"                        result_{i}.append(json.dumps(key))",
+            "        try:",
+            "            value = eval(str(limit))",
+            "        except Exception:",
+            "            value = None",
+            f"        return result_{i}, value",
+            "",
+            f"def CamelHelper{i}(a, b, c, d, e, f, g, h):",
+            "    # undocumented helper",
+            "    with open(a) as fh:",
+            "        return [x for x in fh if x]",
+            "",
+        ])
+        i += 1
+    return "\n".join(blocks)
+
+
+def assert_same_analysis(code):
+    expected = LegacyPythonASTAnalyzer().analyze(code)
+    actual = PythonASTAnalyzer().analyze(code)
+    for field in ASTAnalysis.__dataclass_fields__:
+        assert getattr(actual, field) == getattr(expected, field), field
+
+
+def test_matches_legacy_on_sample():
+    assert_same_analysis(SAMPLE)
+    result = PythonASTAnalyzer().analyze(SAMPLE)
+    print(f"  structure: {result.structure['total_functions']} functions, {result.structure['total_classes']} classes")
+    print(f"  complexity: {result.complexity}")
+    assert result.complexity['max_nesting_depth'] == 4
+    assert result.performance_issues == ["Deeply nested loops detected (depth: 3)"]
+    assert any("Dangerous function 'eval'" in s for s in result.security_concerns)
+
+
+def test_matches_legacy_on_repo_sources():
+    for path in ("ast_analyzer.py", "review_cache.py", "review_jobs.py", "incremental_review.py"):
+        with open(path, encoding="utf-8") as fh:
+            assert_same_analysis(fh.read())
+
+
+def test_syntax_error_and_router():
+    result = CodeAnalyzer().analyze_code("def broken(:\n    pass", "python")
+    assert result.complexity == {'status': 'syntax_error'}
+    assert result.issues[0].startswith("Syntax Error")
+
+
+def test_benchmark_large_files():
+    """Benchmark: one NodeVisitor traversal vs ~9 ast.walk passes on 5k-50k line files"""
+    print("=" * 60)
+    print("Benchmark: multi-walk vs single-traversal Python analysis")
+    print("=" * 60)
+    for target_lines in (5_000, 20_000, 50_000):
+        code = generate_module(target_lines)
+        tree_lines = code.count("\n") + 1
+        assert_same_analysis(code)
+
+        start = time.perf_counter()
+        LegacyPythonASTAnalyzer().analyze(code)
+        legacy_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        PythonASTAnalyzer().analyze(code)
+        single_s = time.perf_counter() - start
+
+        print(f"  {tree_lines:>6} lines: multi-walk {legacy_s * 1000:8.1f}ms  single-pass {single_s * 1000:8.1f}ms  ({legacy_s / single_s:.1f}x)")
+        assert single_s < legacy_s
+
+
+if __name__ == "__main__":
+    test_matches_legacy_on_sample()
+    test_matches_legacy_on_repo_sources()
+    test_syntax_error_and_router()
+    test_benchmark_large_files()
+
+    print("=" * 60)
+    print("✅ Single-pass AST analyzer tests completed!")
+    print("=" * 60)
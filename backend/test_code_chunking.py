@@ -0,0 +1,123 @@
+"""
+Tests for AST-aware chunking of long files and merging of per-chunk review responses.
+"""
+
+try:
+    from backend.code_chunking import (chunk_code, boundary_lines, offset_line_numbers, merge_chunk_responses,
+                                       CodeChunk, TRUNCATION_MARKER)
+    from backend.ast_analyzer import CodeAnalyzer
+    from backend.response_parser import parse_review_sections
+except ImportError:
+    from code_chunking import (chunk_code, boundary_lines, offset_line_numbers, merge_chunk_responses,
+                               CodeChunk, TRUNCATION_MARKER)
+    from ast_analyzer import CodeAnalyzer
+    from response_parser import parse_review_sections
+
+
+def python_module(functions: int = 30) -> str:
+    parts = ["import os\n"]
+    for i in range(functions):
+        parts.append(f"@decorator\ndef function_{i}(value):\n    total = value * {i}\n    for item in range(10):\n"
+                     f"        total += item\n    return total\n")
+    return "\n".join(parts)
+
+
+def assert_covers(code: str, chunks):
+    lines = code.split("\n")
+    assert chunks[0].start_line == 1 and chunks[-1].end_line == len(lines)
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.start_line == previous.end_line + 1
+    assert "\n".join(chunk.text for chunk in chunks) == code
+
+
+def test_small_code_is_one_chunk():
+    code = "def f():\n    return 1\n"
+    assert chunk_code(code, None, max_chars=4000) == [CodeChunk(1, 3, code)]
+
+
+def test_chunks_split_at_definitions():
+    code = python_module()
+    structure = CodeAnalyzer().analyze_code(code, "python").structure
+    chunks = chunk_code(code, structure, max_chars=600)
+    assert len(chunks) > 1
+    assert_covers(code, chunks)
+    for chunk in chunks:
+        assert len(chunk.text) <= 600
+    for chunk in chunks[1:]:
+        # Every later chunk starts with a whole decorated function, never mid-statement
+        assert chunk.text.startswith("@decorator\ndef function_")
+
+
+def test_top_level_boundaries_are_preferred():
+    methods = "".join(f"    def method_{i}(self):\n        return {i}\n\n" for i in range(6))
+    code = f"def first():\n    return 0\n\n\nclass Big:\n{methods}\ndef last():\n    return 1\n"
+    structure = CodeAnalyzer().analyze_code(code, "python").structure
+    # "class Big" (line 5) fits and is top-level, so the first chunk ends before it rather than at a method
+    chunks = chunk_code(code, structure, max_chars=len(code) - 30)
+    assert chunks[0].end_line == 4
+    assert_covers(code, chunks)
+
+
+def test_boundaries_without_structure():
+    code = ("// helpers\nfunction a() {\n  return 1;\n}\n\nfunction b() {\n  return 2;\n}\n\n"
+            "/** docs */\nclass C {\n}\n")
+    # Comment lines above a definition travel with it
+    assert boundary_lines(code) == [6, 10]
+    chunks = chunk_code(code, None, max_chars=40)
+    assert_covers(code, chunks)
+    assert chunks[1].text.startswith("function b()")
+
+
+def test_long_line_is_truncated():
+    code = "x = '" + "a" * 200 + "'\ny = 1\n"
+    chunks = chunk_code(code, None, max_chars=50)
+    assert chunks[0].text.endswith(TRUNCATION_MARKER)
+    assert (chunks[0].start_line, chunks[0].end_line) == (1, 1)
+    assert chunks[1].text == "y = 1\n"
+
+
+def test_line_numbers_are_offset():
+    text = "• Line 3: bad\nSee lines 4-6 and Line 10 to 12. Inline 7 stays."
+    assert offset_line_numbers(text, 100) == "• Line 103: bad\nSee lines 104-106 and Line 110 to 112. Inline 7 stays."
+    assert offset_line_numbers(text, 0) == text
+
+
+def test_merge_chunk_responses():
+    chunks = [CodeChunk(1, 10, "a = 1"), CodeChunk(11, 20, "b = 2"), CodeChunk(21, 30, "c = 3")]
+    responses = [
+        "###CODE_QUALITY###\nGood 8/10\n###SYNTAX_ERRORS###\nNo syntax errors detected.\n###OPTIMIZED_CODE###\na = 1  # fast",
+        "###CODE_QUALITY###\nLine 2 is odd\n###SYNTAX_ERRORS###\n• Line 3: Missing colon",
+        "###SYNTAX_ERRORS###\n• Line 1: Unclosed bracket\n###OPTIMIZED_CODE###\nc = 3  # fast",
+    ]
+    sections = parse_review_sections(merge_chunk_responses(chunks, responses, total_lines=30))
+    assert sections["CODE_QUALITY"] == "**Lines 1-10:**\nGood 8/10\n\n**Lines 11-20:**\nLine 12 is odd"
+    assert sections["SYNTAX_ERRORS"] == "• Line 13: Missing colon\n• Line 21: Unclosed bracket"
+    # The chunk without optimized code keeps its original code
+    assert sections["OPTIMIZED_CODE"] == "a = 1  # fast\n\nb = 2\n\nc = 3  # fast"
+
+    clean = ["###SYNTAX_ERRORS###\nNo syntax errors detected."] * 3
+    assert parse_review_sections(merge_chunk_responses(chunks, clean, 30))["SYNTAX_ERRORS"] == "No syntax errors detected."
+
+
+def test_chunk_limit_reports_unreviewed_lines():
+    code = python_module(60)
+    chunks = chunk_code(code, CodeAnalyzer().analyze_code(code, "python").structure, max_chars=300, max_chunks=3)
+    assert len(chunks) == 3
+    total_lines = code.count("\n") + 1
+    merged = merge_chunk_responses(chunks, ["###CODE_QUALITY###\nfine"] * 3, total_lines)
+    assert f"Lines {chunks[-1].end_line + 1}-{total_lines} were not reviewed" in parse_review_sections(merged)["CODE_QUALITY"]
+
+
+if __name__ == "__main__":
+    test_small_code_is_one_chunk()
+    test_chunks_split_at_definitions()
+    test_top_level_boundaries_are_preferred()
+    test_boundaries_without_structure()
+    test_long_line_is_truncated()
+    test_line_numbers_are_offset()
+    test_merge_chunk_responses()
+    test_chunk_limit_reports_unreviewed_lines()
+
+    print("=" * 60)
+    print("✅ Code chunking tests completed!")
+    print("=" * 60)
@@ -0,0 +1,111 @@
+"""
+Tests for compressed review text: the stored header, raw storage of small values, legacy
+plain-text values, and the CompressedText column type on SQLite.
+"""
+
+import random
+import string
+import zlib
+
+import pytest
+from sqlalchemy import create_engine, text, Column, Integer
+from sqlalchemy.orm import declarative_base, sessionmaker, deferred
+
+try:
+    from backend.compressed_text import (MAGIC, CompressedText, CompressionStats, compress_text,
+                                         decompress_text, is_compressed_value)
+except ImportError:
+    from compressed_text import (MAGIC, CompressedText, CompressionStats, compress_text,
+                                 decompress_text, is_compressed_value)
+
+CODE = "def handler(request):\n    return process(request)\n\n" * 40
+
+
+def test_round_trip_compresses_large_values():
+    stored = compress_text(CODE, codec="zlib", level=6, min_bytes=256)
+    assert stored.startswith(MAGIC + b"1z")
+    assert len(stored) < len(CODE) / 4
+    assert zlib.decompress(stored[5:]).decode("utf-8") == CODE
+    assert decompress_text(stored) == CODE
+    assert decompress_text(memoryview(stored)) == CODE
+
+
+def test_small_and_incompressible_values_are_stored_raw():
+    assert compress_text("ok", codec="zlib", min_bytes=256) == MAGIC + b"1rok"
+    rng = random.Random(3)
+    noise = "".join(rng.choice(string.ascii_letters + string.digits) for _ in range(64))
+    stored = compress_text(noise, codec="zlib", min_bytes=16)
+    assert stored == MAGIC + b"1r" + noise.encode("utf-8")
+    assert decompress_text(stored) == noise
+    assert decompress_text(compress_text("ünïcödé ✅", min_bytes=0)) == "ünïcödé ✅"
+
+
+def test_legacy_values_read_as_is():
+    assert decompress_text("plain text from before") == "plain text from before"
+    assert decompress_text("plain bytes ✅".encode("utf-8")) == "plain bytes ✅"
+    assert not is_compressed_value("plain text")
+    assert not is_compressed_value(b"plain bytes")
+    assert is_compressed_value(memoryview(compress_text(CODE)))
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        decompress_text(MAGIC + b"9z" + b"payload")
+    with pytest.raises(ValueError):
+        decompress_text(MAGIC + b"1?" + b"payload")
+    with pytest.raises(ValueError):
+        compress_text(CODE, codec="brotli")
+
+
+def test_stats():
+    stats = CompressionStats()
+    stats.record_write(1000, 250, compressed=True)
+    stats.record_write(10, 15, compressed=False)
+    stats.record_read(legacy=False)
+    stats.record_read(legacy=True)
+    snapshot = stats.stats()
+    assert snapshot["compressed_writes"] == 1 and snapshot["raw_writes"] == 1
+    assert snapshot["write_ratio"] == round(265 / 1010, 3)
+    assert snapshot["reads"] == 1 and snapshot["legacy_reads"] == 1
+
+
+def test_column_type_on_sqlite():
+    Base = declarative_base()
+
+    class Document(Base):
+        __tablename__ = "documents"
+        id = Column(Integer, primary_key=True)
+        body = deferred(Column(CompressedText), group="text")
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(engine)
+    with Session() as session:
+        session.add_all([Document(id=1, body=CODE), Document(id=2, body=None)])
+        session.commit()
+    with engine.begin() as conn:
+        # A row written before the column was compressed holds plain TEXT
+        conn.execute(text("INSERT INTO documents (id, body) VALUES (3, 'legacy review')"))
+        stored = conn.execute(text("SELECT body FROM documents WHERE id = 1")).scalar()
+    assert is_compressed_value(stored) and len(stored) < len(CODE)
+
+    with Session() as session:
+        documents = {document.id: document for document in session.query(Document)}
+        assert "body" not in documents[1].__dict__  # deferred until first access
+        assert documents[1].body == CODE
+        assert documents[2].body is None
+        assert documents[3].body == "legacy review"
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    test_round_trip_compresses_large_values()
+    test_small_and_incompressible_values_are_stored_raw()
+    test_legacy_values_read_as_is()
+    test_unknown_format_is_rejected()
+    test_stats()
+    test_column_type_on_sqlite()
+
+    print("=" * 60)
+    print("✅ Compressed text tests completed!")
+    print("=" * 60)
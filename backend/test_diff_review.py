@@ -0,0 +1,161 @@
+"""
+Tests for diff review: unified diff parsing, widening changes to their enclosing functions,
+prompt rendering and diffs between two refs of a repository.
+"""
+
+import os
+import subprocess
+import tempfile
+
+try:
+    from backend.diff_review import (parse_unified_diff, changed_regions, render_regions, region_text,
+                                     git_diff_refs, read_revision_file, DiffRegion)
+except ImportError:
+    from diff_review import (parse_unified_diff, changed_regions, render_regions, region_text,
+                             git_diff_refs, read_revision_file, DiffRegion)
+
+
+NEW_CONTENT = """import os
+
+
+def first(value):
+    total = value * 2
+    return total
+
+
+class Service:
+    retries = 3
+
+    def run(self):
+        return first(self.retries)
+"""
+
+DIFF = """diff --git a/app.py b/app.py
+index 1111111..2222222 100644
+--- a/app.py
++++ b/app.py
+@@ -3,5 +3,5 @@ import os
+
+ def first(value):
+-    total = value + 2
++    total = value * 2
+     return total
+
+@@ -9,3 +9,3 @@ def first(value):
+ class Service:
+-    retries = 1
++    retries = 3
+
+diff --git a/new.py b/new.py
+new file mode 100644
+--- /dev/null
++++ b/new.py
+@@ -0,0 +1,2 @@
++x = 1
++y = 2
+\\ No newline at end of file
+diff --git a/gone.py b/gone.py
+deleted file mode 100644
+--- a/gone.py
++++ /dev/null
+@@ -1 +0,0 @@
+-print("bye")
+diff --git a/logo.png b/logo.png
+Binary files a/logo.png and b/logo.png differ
+"""
+
+
+def test_parse_unified_diff():
+    files = {f.path: f for f in parse_unified_diff(DIFF)}
+    assert set(files) == {"app.py", "new.py", "gone.py", "logo.png"}
+    app = files["app.py"]
+    assert [(h.old_start, h.new_start) for h in app.hunks] == [(3, 3), (9, 9)]
+    shown, added, removed = app.new_side()
+    assert added == {5, 10}
+    assert removed == {5: ["    total = value + 2"], 10: ["    retries = 1"]}
+    assert shown[4] == "def first(value):"
+    assert files["new.py"].is_new and files["new.py"].new_side()[1] == {1, 2}
+    assert files["gone.py"].is_deleted
+    assert files["logo.png"].is_binary and not files["logo.png"].hunks
+
+
+def test_plain_diff_without_git_headers():
+    diff = "--- old/a.js\t2024-01-01\n+++ new/a.js\t2024-01-02\n@@ -1 +1 @@\n-let a = 1;\n+const a = 1;\n"
+    (file_diff,) = parse_unified_diff(diff)
+    assert file_diff.path == "new/a.js" and file_diff.new_side()[1] == {1}
+
+
+def test_changes_widen_to_enclosing_function():
+    app = parse_unified_diff(DIFF)[0]
+    regions = changed_regions(app, NEW_CONTENT, "Python", context_lines=1)
+    # The change inside first() covers the whole function; the class attribute change gets context lines
+    assert regions == [DiffRegion(4, 6, True), DiffRegion(9, 11, False)]
+    assert region_text(regions[0], app, NEW_CONTENT).startswith("def first(value):")
+
+
+def test_oversized_function_falls_back_to_context():
+    app = parse_unified_diff(DIFF)[0]
+    regions = changed_regions(app, NEW_CONTENT, "python", context_lines=1, max_region_chars=10)
+    assert regions[0] == DiffRegion(4, 6, False)
+
+
+def test_diff_only_regions_use_hunk_context():
+    app = parse_unified_diff(DIFF)[0]
+    regions = changed_regions(app, None, "python")
+    assert regions == [DiffRegion(3, 7, False), DiffRegion(9, 11, False)]
+    assert region_text(regions[1], app, None) == "class Service:\n    retries = 3\n"
+
+
+def test_render_marks_added_and_removed_lines():
+    app = parse_unified_diff(DIFF)[0]
+    regions = changed_regions(app, NEW_CONTENT, "Python", context_lines=1)
+    text, fitted = render_regions(regions, app, NEW_CONTENT)
+    assert fitted == regions
+    lines = text.split("\n")
+    assert lines[0] == "@@ lines 4-6 @@"
+    assert "-      |     total = value + 2" in lines
+    assert "+    5 |     total = value * 2" in lines
+    assert "     6 |     return total" in lines
+    # Later regions that don't fit are left out, but the first is always rendered
+    text, fitted = render_regions(regions, app, NEW_CONTENT, max_chars=10)
+    assert fitted == regions[:1] and "@@ lines 9-11 @@" not in text
+
+
+def git(cwd, *args):
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd, check=True,
+                   capture_output=True)
+
+
+def test_git_diff_refs_between_branches():
+    with tempfile.TemporaryDirectory() as origin, tempfile.TemporaryDirectory() as clone:
+        git(origin, "init", "-q", "-b", "main")
+        with open(os.path.join(origin, "m.py"), "w") as f:
+            f.write("def f():\n    return 1\n")
+        git(origin, "add", ".")
+        git(origin, "commit", "-q", "-m", "base")
+        git(origin, "checkout", "-q", "-b", "feature")
+        with open(os.path.join(origin, "m.py"), "w") as f:
+            f.write("def f():\n    return 2\n")
+        git(origin, "commit", "-q", "-am", "change")
+
+        git(clone, "init", "-q")
+        git(clone, "remote", "add", "origin", f"file://{origin}")
+        diff_text, head_commit = git_diff_refs(clone, "main", "feature")
+        (file_diff,) = parse_unified_diff(diff_text)
+        assert file_diff.path == "m.py" and file_diff.new_side()[1] == {2}
+        assert read_revision_file(clone, head_commit, "m.py") == "def f():\n    return 2\n"
+        assert read_revision_file(clone, head_commit, "missing.py") is None
+
+
+if __name__ == "__main__":
+    test_parse_unified_diff()
+    test_plain_diff_without_git_headers()
+    test_changes_widen_to_enclosing_function()
+    test_oversized_function_falls_back_to_context()
+    test_diff_only_regions_use_hunk_context()
+    test_render_marks_added_and_removed_lines()
+    test_git_diff_refs_between_branches()
+
+    print("=" * 60)
+    print("✅ Diff review tests completed!")
+    print("=" * 60)
@@ -0,0 +1,90 @@
+"""
+Tests for mapping file review dicts to repository_file_reviews columns and back, including
+keys without a column of their own and legacy JSON blobs.
+"""
+
+import json
+
+try:
+    from backend.file_reviews import (FILE_REVIEW_TEXT_COLUMNS, file_review_columns, file_review_from_columns,
+                                      parse_file_reviews_json)
+except ImportError:
+    from file_reviews import (FILE_REVIEW_TEXT_COLUMNS, file_review_columns, file_review_from_columns,
+                              parse_file_reviews_json)
+
+
+def repository_file_review(index=0, **extra):
+    file_review = {
+        "file_path": f"src/module_{index}.py",
+        "original_code": "def f():\n    return 1\n",
+        "review": "###CODE_QUALITY###\nFine",
+        "optimized_code": "def f():\n    return 1",
+        "explanation": "Nothing to change",
+        "security_issues": "None",
+        "language": "Python",
+        "rating": 8,
+        "file_index": index,
+        "total_files": 3,
+        "content_hash": "abc",
+        "prompt_hash": "def",
+        "review_failed": False,
+        "reused": False,
+    }
+    file_review.update(extra)
+    return file_review
+
+
+def test_round_trip():
+    file_review = repository_file_review(2)
+    columns = file_review_columns(file_review)
+    assert columns["file_index"] == 2 and "total_files" not in columns
+    assert json.loads(columns["details"]) == {"reused": False}
+    assert file_review_from_columns(columns, total_files=3) == file_review
+
+
+def test_diff_review_keys_travel_in_details():
+    file_review = repository_file_review(0, diff="@@ -1 +1 @@", changed_regions=[[3, 7], [9, 11]], is_new_file=False)
+    restored = file_review_from_columns(file_review_columns(file_review), total_files=3)
+    assert restored["changed_regions"] == [[3, 7], [9, 11]] and restored["diff"] == "@@ -1 +1 @@"
+    assert restored == file_review
+
+
+def test_file_index_comes_from_position():
+    # Rows are keyed by their position in the review, whatever the dict says
+    columns = file_review_columns(repository_file_review(0, file_index=None), file_index=5)
+    assert columns["file_index"] == 5
+    assert columns["review_failed"] is False
+    assert file_review_columns({"file_path": "a.py"})["review_failed"] is False
+
+
+def test_summary_leaves_out_text():
+    summary = file_review_from_columns(file_review_columns(repository_file_review(1)), total_files=3, summary=True)
+    assert summary["file_path"] == "src/module_1.py" and summary["rating"] == 8 and summary["total_files"] == 3
+    assert not any(column in summary for column in FILE_REVIEW_TEXT_COLUMNS)
+    assert "reused" not in summary
+
+
+def test_unreadable_details_are_ignored():
+    columns = file_review_columns(repository_file_review(0))
+    columns["details"] = "{not json"
+    assert file_review_from_columns(columns)["review"] == "###CODE_QUALITY###\nFine"
+
+
+def test_legacy_json_blobs():
+    blob = json.dumps([repository_file_review(0), "junk", repository_file_review(1)])
+    assert [fr["file_index"] for fr in parse_file_reviews_json(blob)] == [0, 1]
+    for bad in (None, "", "not json", json.dumps({"file_path": "a.py"})):
+        assert parse_file_reviews_json(bad) == []
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_diff_review_keys_travel_in_details()
+    test_file_index_comes_from_position()
+    test_summary_leaves_out_text()
+    test_unreadable_details_are_ignored()
+    test_legacy_json_blobs()
+
+    print("=" * 60)
+    print("✅ File review row tests completed!")
+    print("=" * 60)
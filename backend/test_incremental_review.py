@@ -0,0 +1,118 @@
+"""
+Test incremental repository re-review reuse decisions
+"""
+import json
+
+from incremental_review import content_hash, index_previous_file_reviews, reuse_previous_review
+
+PROMPT_HASH = "prompt-v1"
+
+
+def stored_review(path, code, **extra):
+    review = {
+        "file_path": path,
+        "original_code": code,
+        "review": f"###CODE_QUALITY###\nReview of {path}",
+        "content_hash": content_hash(code),
+        "prompt_hash": PROMPT_HASH,
+        "file_index": 0,
+        "total_files": 3,
+    }
+    review.update(extra)
+    return review
+
+
+def discover(code_files, previous_by_path, prompt_hash):
+    """Reuse decisions file by file in discovery order, as run_repository_review makes them"""
+    reused, pending = {}, []
+    for index, (file_path, file_content) in enumerate(code_files.items()):
+        file_review = reuse_previous_review(index, file_path, file_content, previous_by_path, prompt_hash)
+        if file_review:
+            reused[index] = file_review
+        else:
+            pending.append((index, file_path, file_content))
+    return reused, pending
+
+
+def test_only_changed_and_added_files_are_pending():
+    previous = index_previous_file_reviews(json.dumps([
+        stored_review("a.py", "print('a')"),
+        stored_review("b.py", "print('b')"),
+        stored_review("deleted.py", "print('gone')"),
+    ]))
+    code_files = {
+        "a.py": "print('a')",          # unchanged
+        "b.py": "print('b changed')",  # modified
+        "c.py": "print('c')",          # added
+    }
+
+    reused, pending = discover(code_files, previous, PROMPT_HASH)
+    print(f"  reused={sorted(reused)} pending={[p[1] for p in pending]}")
+
+    assert list(reused) == [0]
+    assert reused[0]["review"] == "###CODE_QUALITY###\nReview of a.py"
+    assert reused[0]["reused"] is True
+    # Re-indexed for this run; the total is filled in once discovery finishes
+    assert reused[0]["file_index"] == 0 and reused[0]["total_files"] is None
+    assert pending == [(1, "b.py", "print('b changed')"), (2, "c.py", "print('c')")]
+
+
+def test_prompt_change_invalidates_reuse():
+    previous = {"a.py": stored_review("a.py", "x = 1")}
+    reused, pending = discover({"a.py": "x = 1"}, previous, "prompt-v2")
+    assert reused == {} and len(pending) == 1
+
+
+def test_failed_reviews_are_not_reused():
+    previous = {"a.py": stored_review("a.py", "x = 1", review_failed=True)}
+    reused, pending = discover({"a.py": "x = 1"}, previous, PROMPT_HASH)
+    assert reused == {} and len(pending) == 1
+
+
+def test_legacy_reviews_without_hashes():
+    # Reviews stored without a content hash are matched on original_code
+    no_content_hash = {"file_path": "a.py", "original_code": "x = 1", "review": "old", "prompt_hash": PROMPT_HASH}
+    previous = index_previous_file_reviews(json.dumps([no_content_hash]))
+    reused, pending = discover({"a.py": "x = 1"}, previous, PROMPT_HASH)
+    assert list(reused) == [0] and pending == []
+
+    # A review without a prompt hash may come from any prompt, so it is never reused
+    no_prompt_hash = {"file_path": "a.py", "original_code": "x = 1", "review": "old"}
+    previous = index_previous_file_reviews(json.dumps([no_prompt_hash]))
+    reused, pending = discover({"a.py": "x = 1"}, previous, PROMPT_HASH)
+    assert reused == {} and pending == [(0, "a.py", "x = 1")]
+
+
+def test_file_rows_index_like_json():
+    # Reviews stored as repository_file_reviews rows are indexed from their dicts
+    rows = [stored_review("a.py", "print('a')"), stored_review("b.py", "print('b')")]
+    assert index_previous_file_reviews(rows) == index_previous_file_reviews(json.dumps(rows))
+    assert index_previous_file_reviews([]) == {}
+
+
+def test_bad_json_means_full_review():
+    assert index_previous_file_reviews("not json") == {}
+    assert index_previous_file_reviews(None) == {}
+
+
+def test_reused_review_is_reindexed_for_this_run():
+    previous = {"a.py": stored_review("a.py", "x = 1", file_index=7)}
+    file_review = reuse_previous_review(2, "a.py", "x = 1", previous, PROMPT_HASH)
+    assert file_review["file_index"] == 2 and file_review["original_code"] == "x = 1"
+    # The stored review itself is left untouched
+    assert previous["a.py"]["file_index"] == 7 and "reused" not in previous["a.py"]
+    assert reuse_previous_review(0, "missing.py", "x = 1", previous, PROMPT_HASH) is None
+
+
+if __name__ == "__main__":
+    test_only_changed_and_added_files_are_pending()
+    test_prompt_change_invalidates_reuse()
+    test_failed_reviews_are_not_reused()
+    test_legacy_reviews_without_hashes()
+    test_reused_review_is_reindexed_for_this_run()
+    test_file_rows_index_like_json()
+    test_bad_json_means_full_review()
+
+    print("=" * 60)
+    print("✅ Incremental review tests completed!")
+    print("=" * 60)
@@ -0,0 +1,196 @@
+"""
+Test the LLM gateway against a local fake Gemini server
+The server simulates latency, rate limits and server errors per request
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_gateway import LLMGateway, GeminiHTTPBackend, CircuitBreaker, CircuitOpenError, LLMError, LLMTimeoutError
+from llm_governor import LLMGovernor
+
+
+class FakeGemini:
+    """Serves generateContent/streamGenerateContent; `script` holds (status, latency) per request, then 200s"""
+
+    def __init__(self, script=(), latency=0.0):
+        self.script = list(script)
+        self.latency = latency
+        self.requests = 0
+        self.connections = set()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                prompt = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["contents"][0]["parts"][0]["text"]
+                fake.requests += 1
+                fake.connections.add(self.client_address)
+                status, latency = fake.script.pop(0) if fake.script else (200, fake.latency)
+                time.sleep(latency)
+                if status != 200:
+                    body = json.dumps({"error": {"code": status}}).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                if "streamGenerateContent" in self.path:
+                    events = "".join(
+                        f"data: {json.dumps({'candidates': [{'content': {'parts': [{'text': part}]}}]})}\r\n\r\n"
+                        for part in ("###CODE_QUALITY###\n", f"Reviewed: {prompt}")
+                    ).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.send_header("Content-Length", str(len(events)))
+                    self.end_headers()
+                    self.wfile.write(events)
+                    return
+                body = json.dumps({"candidates": [{"content": {"parts": [{"text": f"Reviewed: {prompt}"}]}}]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/v1beta"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def new_gateway(fake, **kwargs):
+    kwargs.setdefault("retry_base", 0.01)
+    return LLMGateway(GeminiHTTPBackend("test-key", "fake-model", base_url=fake.url), **kwargs)
+
+
+def test_generate_reuses_pooled_connections():
+    fake = FakeGemini()
+    gateway = new_gateway(fake)
+
+    async def run():
+        for i in range(5):
+            assert await gateway.generate(f"p{i}") == f"Reviewed: p{i}"
+        await gateway.aclose()
+
+    asyncio.run(run())
+    assert fake.requests == 5 and len(fake.connections) == 1
+    fake.close()
+
+
+def test_retries_rate_limits_and_server_errors():
+    fake = FakeGemini(script=[(429, 0), (503, 0)])
+    gateway = new_gateway(fake)
+    assert asyncio.run(gateway.generate("x")) == "Reviewed: x"
+    assert fake.requests == 3 and gateway.stats()["retries"] == 2
+    fake.close()
+
+
+def test_client_errors_are_not_retried():
+    fake = FakeGemini(script=[(400, 0)])
+    gateway = new_gateway(fake)
+    try:
+        asyncio.run(gateway.generate("x"))
+        assert False, "expected failure"
+    except LLMError as e:
+        assert e.status == 400 and not e.retryable
+    assert fake.requests == 1 and gateway.breaker.state == CircuitBreaker.CLOSED
+    fake.close()
+
+
+def test_deadline_covers_retries():
+    fake = FakeGemini(latency=0.5)
+    gateway = new_gateway(fake, timeout=0.3)
+    start = time.perf_counter()
+    try:
+        asyncio.run(gateway.generate("slow"))
+        assert False, "expected timeout"
+    except LLMTimeoutError:
+        pass
+    elapsed = time.perf_counter() - start
+    print(f"  timed out after {elapsed:.2f}s")
+    assert elapsed < 0.45
+    fake.close()
+
+
+def test_circuit_breaker_opens_and_recovers():
+    now = [0.0]
+    fake = FakeGemini(script=[(500, 0)] * 4)
+    gateway = new_gateway(fake, max_retries=1, breaker=CircuitBreaker(failure_threshold=2, reset_seconds=10,
+                                                                        clock=lambda: now[0]))
+    for _ in range(2):
+        try:
+            asyncio.run(gateway.generate("x"))
+        except CircuitOpenError:
+            break
+        except LLMError:
+            pass
+    assert gateway.breaker.state == CircuitBreaker.OPEN
+    requests_when_open = fake.requests
+    try:
+        asyncio.run(gateway.generate("x"))
+        assert False, "expected the breaker to reject the call"
+    except CircuitOpenError:
+        pass
+    assert fake.requests == requests_when_open
+
+    # After the reset window a probe goes through; it fails once more, then succeeds and closes the breaker
+    fake.script = [(500, 0)]
+    now[0] = 11
+    try:
+        asyncio.run(gateway.generate("x"))
+    except LLMError:
+        pass
+    assert gateway.breaker.state == CircuitBreaker.OPEN
+    now[0] = 22
+    assert asyncio.run(gateway.generate("x")) == "Reviewed: x"
+    assert gateway.breaker.state == CircuitBreaker.CLOSED
+    fake.close()
+
+
+def test_stream_retries_before_first_chunk():
+    fake = FakeGemini(script=[(503, 0)])
+    gateway = new_gateway(fake)
+
+    async def collect():
+        return [text async for text in gateway.stream("s")]
+
+    assert asyncio.run(collect()) == ["###CODE_QUALITY###\n", "Reviewed: s"]
+    assert fake.requests == 2
+    fake.close()
+
+
+def test_governor_queue_time_is_outside_the_deadline():
+    fake = FakeGemini(latency=0.2)
+    governor = LLMGovernor(max_concurrency=1, requests_per_minute=0, tokens_per_minute=0)
+    gateway = new_gateway(fake, timeout=0.35, governor=governor)
+
+    async def run():
+        return await asyncio.gather(*(gateway.generate(f"p{i}", user_id=i) for i in range(3)))
+
+    assert asyncio.run(run()) == ["Reviewed: p0", "Reviewed: p1", "Reviewed: p2"]
+    assert gateway.stats()["governor"]["queues"]["interactive"]["max_wait_ms"] >= 350
+    fake.close()
+
+
+if __name__ == "__main__":
+    test_generate_reuses_pooled_connections()
+    test_retries_rate_limits_and_server_errors()
+    test_client_errors_are_not_retried()
+    test_deadline_covers_retries()
+    test_circuit_breaker_opens_and_recovers()
+    test_stream_retries_before_first_chunk()
+    test_governor_queue_time_is_outside_the_deadline()
+
+    print("=" * 60)
+    print("✅ LLM gateway tests completed!")
+    print("=" * 60)
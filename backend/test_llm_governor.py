@@ -0,0 +1,130 @@
+"""
+Test the LLM rate governor: concurrency cap, token buckets, priority and per-user fairness
+"""
+import asyncio
+import tempfile
+import time
+
+from llm_governor import (LLMGovernor, TokenBucket, SharedRateLimit, PRIORITY_INTERACTIVE, PRIORITY_BULK,
+                          estimate_tokens)
+
+
+async def hold(governor, order, name, user_id, priority=PRIORITY_BULK, seconds=0.01, tokens=0):
+    async with governor.slot(user_id, priority, tokens):
+        order.append(name)
+        await asyncio.sleep(seconds)
+
+
+async def queue_behind_blocker(governor, calls):
+    """Occupy the only slot, queue `calls` in order, then let them run; returns the grant order"""
+    order = []
+    blocker = asyncio.create_task(hold(governor, order, "blocker", "x", seconds=0.05))
+    await asyncio.sleep(0)
+    tasks = []
+    for name, user_id, priority in calls:
+        tasks.append(asyncio.create_task(hold(governor, order, name, user_id, priority)))
+        await asyncio.sleep(0)
+    await asyncio.gather(blocker, *tasks)
+    return order[1:]
+
+
+def test_concurrency_cap():
+    governor = LLMGovernor(max_concurrency=2, requests_per_minute=0, tokens_per_minute=0)
+    active = {"now": 0, "max": 0}
+
+    async def call(i):
+        async with governor.slot(i % 3):
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+            await asyncio.sleep(0.05)
+            active["now"] -= 1
+
+    async def run():
+        await asyncio.gather(*(call(i) for i in range(6)))
+
+    asyncio.run(run())
+    assert active["max"] == 2
+    assert governor.stats()["queues"]["interactive"]["granted"] == 6
+
+
+def test_single_file_reviews_go_first():
+    governor = LLMGovernor(max_concurrency=1, requests_per_minute=0, tokens_per_minute=0)
+    calls = [("bulk1", "a", PRIORITY_BULK), ("bulk2", "a", PRIORITY_BULK), ("single", "b", PRIORITY_INTERACTIVE)]
+    assert asyncio.run(queue_behind_blocker(governor, calls)) == ["single", "bulk1", "bulk2"]
+
+
+def test_users_are_served_round_robin():
+    governor = LLMGovernor(max_concurrency=1, requests_per_minute=0, tokens_per_minute=0)
+    calls = [(f"a{i}", "alice", PRIORITY_BULK) for i in range(4)] + [(f"b{i}", "bob", PRIORITY_BULK) for i in range(2)]
+    order = asyncio.run(queue_behind_blocker(governor, calls))
+    assert order == ["a0", "b0", "a1", "b1", "a2", "a3"]
+
+
+def test_requests_per_minute_bucket_paces_calls():
+    governor = LLMGovernor(max_concurrency=10, requests_per_minute=600, tokens_per_minute=0)  # 10/s
+    governor.requests.tokens = 0  # burst already spent
+
+    async def run():
+        order = []
+        await asyncio.gather(*(hold(governor, order, i, i, seconds=0) for i in range(5)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    print(f"  5 calls at 10/min-bucket rate: {elapsed:.2f}s")
+    assert 0.45 <= elapsed < 1.0
+    waits = governor.stats()["queues"]["bulk"]
+    assert waits["granted"] == 5 and waits["max_wait_ms"] >= 400
+
+
+def test_token_bucket_refills_and_caps_oversized_requests():
+    now = [0.0]
+    bucket = TokenBucket(600, clock=lambda: now[0])  # 10 tokens/s
+    bucket.take(600)
+    assert bucket.wait_time(100) == 10.0
+    now[0] = 5
+    assert bucket.wait_time(50) == 0
+    # Larger than the bucket: waits for a full bucket instead of forever
+    assert bucket.wait_time(10 ** 6) == (600 - 50) / 10
+    assert TokenBucket(0).wait_time(10 ** 9) == 0
+    assert estimate_tokens("x" * 400) > 100
+
+
+def test_shared_limit_spans_processes():
+    directory = tempfile.mkdtemp(prefix="llm_limits_")
+    first, second = SharedRateLimit(directory, 2, 0), SharedRateLimit(directory, 2, 0)
+    assert first.try_take(1, 5000) == 0
+    assert second.try_take(1, 5000) == 0
+    wait = first.try_take(1, 5000)
+    assert 29 < wait <= 30  # one request refills every 30s at 2/min
+
+
+def test_cancelled_waiter_releases_nothing():
+    governor = LLMGovernor(max_concurrency=1, requests_per_minute=0, tokens_per_minute=0)
+
+    async def run():
+        order = []
+        blocker = asyncio.create_task(hold(governor, order, "blocker", "x", seconds=0.05))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold(governor, order, "gave-up", "y"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.gather(blocker, hold(governor, order, "next", "z"), return_exceptions=True)
+        return order
+
+    assert asyncio.run(run()) == ["blocker", "next"]
+    assert governor.in_flight == 0
+
+
+if __name__ == "__main__":
+    test_concurrency_cap()
+    test_single_file_reviews_go_first()
+    test_users_are_served_round_robin()
+    test_requests_per_minute_bucket_paces_calls()
+    test_token_bucket_refills_and_caps_oversized_requests()
+    test_shared_limit_spans_processes()
+    test_cancelled_waiter_releases_nothing()
+
+    print("=" * 60)
+    print("✅ LLM governor tests completed!")
+    print("=" * 60)
@@ -0,0 +1,44 @@
+"""
+Tests for keyset pagination cursors and page sizes.
+"""
+
+from datetime import datetime
+
+try:
+    from backend.pagination import encode_cursor, decode_cursor, page_size
+except ImportError:
+    from pagination import encode_cursor, decode_cursor, page_size
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 17, 9, 30, 12, 345678)
+    cursor = encode_cursor(created_at, 4242)
+    assert decode_cursor(cursor) == (created_at, 4242)
+    # Safe to put in a query string as is
+    assert all(c.isalnum() or c in "-_" for c in cursor)
+
+
+def test_invalid_cursors_are_rejected():
+    for bad in ("", "not-a-cursor", encode_cursor(datetime(2024, 1, 1), 1)[:-3] + "!!", "MjAyNHwx"):
+        try:
+            decode_cursor(bad)
+            assert False, f"{bad!r} should be rejected"
+        except ValueError:
+            pass
+
+
+def test_page_size_is_clamped():
+    assert page_size(None, default=50, maximum=200) == 50
+    assert page_size(10, default=50, maximum=200) == 10
+    assert page_size(10_000, default=50, maximum=200) == 200
+    assert page_size(-5, default=50, maximum=200) == 1
+
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_invalid_cursors_are_rejected()
+    test_page_size_is_clamped()
+
+    print("=" * 60)
+    print("✅ Pagination tests completed!")
+    print("=" * 60)
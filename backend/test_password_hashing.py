@@ -0,0 +1,149 @@
+"""
+Tests for the bcrypt pool: hashing and verification, rehashing at a changed cost, admission
+limits (including concurrent logins behind a proxy) and the 72-byte truncation.
+"""
+
+import asyncio
+import threading
+
+try:
+    from backend.password_hashing import (PasswordHashBusy, PasswordHasher, forwarded_client, make_password_context,
+                                          parse_networks, truncate_password)
+except ImportError:
+    from password_hashing import (PasswordHashBusy, PasswordHasher, forwarded_client, make_password_context,
+                                  parse_networks, truncate_password)
+
+
+class GatedContext:
+    """Stands in for a CryptContext whose checks wait until the gate opens"""
+
+    def __init__(self):
+        self.gate = threading.Event()
+
+    def verify_and_update(self, password, hashed):
+        self.gate.wait(5)
+        return password == hashed, None
+
+    def to_dict(self):
+        return {}
+
+
+def test_hash_and_verify():
+    hasher = PasswordHasher(make_password_context(4), workers=2)
+    hashed = hasher.hash_blocking("s3cret")
+    assert hasher.verify_blocking("s3cret", hashed) == (True, None)
+    assert hasher.verify_blocking("wrong", hashed) == (False, None)
+    assert asyncio.run(hasher.verify("s3cret", hashed, client="1.2.3.4")) == (True, None)
+    assert hasher.stats()["completed"] == 4 and hasher.stats()["pending"] == 0
+    hasher.shutdown()
+
+
+def test_malformed_hash_is_a_failed_check():
+    hasher = PasswordHasher(make_password_context(4), workers=1)
+    assert hasher.verify_blocking("s3cret", "not-a-bcrypt-hash") == (False, None)
+    hasher.shutdown()
+
+
+def test_hash_at_another_cost_is_replaced():
+    old = PasswordHasher(make_password_context(4), workers=1)
+    hashed = old.hash_blocking("s3cret")
+    hasher = PasswordHasher(make_password_context(5), workers=1)
+    valid, new_hash = asyncio.run(hasher.verify("s3cret", hashed))
+    assert valid and new_hash and new_hash.startswith("$2b$05$")
+    assert hasher.verify_blocking("s3cret", new_hash) == (True, None)
+    # A wrong password never produces a replacement
+    assert hasher.verify_blocking("wrong", hashed) == (False, None)
+    assert hasher.stats()["rehashed"] == 1
+    old.shutdown()
+    hasher.shutdown()
+
+
+def test_admission_limits():
+    context = GatedContext()
+    hasher = PasswordHasher(context, workers=1, max_pending=3, max_per_client=2)
+    in_flight = [hasher._submit("a", context.verify_and_update, "x", "x") for _ in range(2)]
+    try:
+        hasher.verify_blocking("x", "x", client="a")
+        assert False, "a third check from one client should be refused"
+    except PasswordHashBusy as e:
+        assert e.status_code == 429
+    in_flight.append(hasher._submit("b", context.verify_and_update, "x", "x"))
+    try:
+        hasher.verify_blocking("x", "x", client="c")
+        assert False, "a full pool should refuse new checks"
+    except PasswordHashBusy as e:
+        assert e.status_code == 503 and e.retry_after >= 1
+
+    context.gate.set()
+    assert [f.result(5) for f in in_flight] == [(True, None)] * 3
+    # Slots are released once checks finish
+    assert hasher.verify_blocking("x", "x", client="a") == (True, None)
+    stats = hasher.stats()
+    assert stats["rejected_client"] == 1 and stats["rejected_busy"] == 1 and stats["peak_pending"] == 3
+    hasher.shutdown()
+
+
+def test_client_behind_trusted_proxy():
+    trusted = parse_networks("10.0.0.0/8, ::1")
+    # Direct connections, and untrusted peers' headers, use the peer address
+    assert forwarded_client("203.0.113.9", None, trusted) == "203.0.113.9"
+    assert forwarded_client("203.0.113.9", "198.51.100.1", trusted) == "203.0.113.9"
+    # The proxy appends the address it saw; anything left of it is whatever the client sent
+    assert forwarded_client("10.1.2.3", "198.51.100.1", trusted) == "198.51.100.1"
+    assert forwarded_client("10.1.2.3", "6.6.6.6, 198.51.100.1", trusted) == "198.51.100.1"
+    assert forwarded_client("10.1.2.3", "198.51.100.1, 10.9.9.9", trusted) == "198.51.100.1"
+    assert forwarded_client("10.1.2.3", "10.4.4.4", trusted) == "10.4.4.4"
+    assert forwarded_client("10.1.2.3", "not-an-ip, 10.4.4.4", trusted) == "not-an-ip"
+    assert forwarded_client(None, "198.51.100.1", trusted) is None
+
+
+def test_concurrent_logins_behind_one_proxy():
+    trusted = parse_networks("10.0.0.0/8")
+    context = GatedContext()
+    hasher = PasswordHasher(context, workers=2, max_pending=32, max_per_client=4)
+
+    async def logins(addresses):
+        async def login(address):
+            try:
+                return await hasher.verify("x", "x", client=forwarded_client("10.0.0.5", address, trusted))
+            except PasswordHashBusy as e:
+                return e.status_code
+        attempts = [asyncio.ensure_future(login(address)) for address in addresses]
+        await asyncio.sleep(0.05)  # every attempt has been admitted or refused
+        context.gate.set()
+        results = await asyncio.gather(*attempts)
+        context.gate.clear()
+        return results
+
+    # 16 users signing in at once through the same proxy are 16 clients, not one
+    results = asyncio.run(logins([f"198.51.100.{i}" for i in range(16)]))
+    assert results == [(True, None)] * 16
+    # One address still gets only max_per_client checks at a time
+    results = asyncio.run(logins(["198.51.100.200"] * 16))
+    assert results.count((True, None)) == 4 and results.count(429) == 12
+    hasher.shutdown()
+
+
+def test_truncation_is_by_bytes():
+    assert truncate_password("a" * 100) == "a" * 72
+    # A multi-byte character split at byte 72 is dropped, not mangled
+    assert truncate_password("a" * 71 + "é") == "a" * 71
+    assert truncate_password(None) == ""
+    hasher = PasswordHasher(make_password_context(4), workers=1)
+    hashed = hasher.hash_blocking("p" * 80)
+    assert hasher.verify_blocking("p" * 72 + "different", hashed)[0]
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    test_hash_and_verify()
+    test_malformed_hash_is_a_failed_check()
+    test_hash_at_another_cost_is_replaced()
+    test_admission_limits()
+    test_client_behind_trusted_proxy()
+    test_concurrent_logins_behind_one_proxy()
+    test_truncation_is_by_bytes()
+
+    print("=" * 60)
+    print("✅ Password hashing tests completed!")
+    print("=" * 60)
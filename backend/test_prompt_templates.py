@@ -0,0 +1,88 @@
+"""
+Tests for compiled review prompt templates: cache keys, bounded LRU behaviour and fingerprints.
+"""
+
+import hashlib
+import json
+from types import SimpleNamespace
+
+try:
+    from backend.prompt_templates import PromptTemplateCache, prompt_options, optimized_code_count, build_prompt
+except ImportError:
+    from prompt_templates import PromptTemplateCache, prompt_options, optimized_code_count, build_prompt
+
+
+def make_preferences(**overrides):
+    values = dict(security_analysis=True, performance_analysis=True, code_optimization=True,
+                  detailed_explanations=False, ast_analysis=True, learning_patterns=None)
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def test_template_is_built_once_per_options():
+    cache = PromptTemplateCache()
+    first = cache.get(prompt_options(make_preferences(), is_repository_review=True, user_feedback="shorter"))
+    # Separate preference objects with the same values share the compiled template
+    second = cache.get(prompt_options(make_preferences(), is_repository_review=True, user_feedback="shorter"))
+    assert second is first
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    assert '"shorter"' in first.text
+    assert "part of a larger project" in first.text
+
+
+def test_options_only_track_what_shapes_the_prompt():
+    patterns = json.dumps({"optimized_code_count": 3})
+    # Without optimized code, the requested count doesn't matter
+    assert (prompt_options(make_preferences(code_optimization=False, learning_patterns=patterns))
+            == prompt_options(make_preferences(code_optimization=False)))
+    # No feedback and empty feedback are the same prompt
+    assert prompt_options(make_preferences(), user_feedback=None) == prompt_options(make_preferences(), user_feedback="")
+
+    text = build_prompt(prompt_options(make_preferences(learning_patterns=patterns)))
+    assert "###OPTIMIZED_CODE_3###" in text and "###OPTIMIZED_CODE###" not in text
+    assert "###SECURITY###" not in build_prompt(prompt_options(make_preferences(security_analysis=False)))
+    assert "###ARCHITECTURE###" in build_prompt(prompt_options(make_preferences(), detailed_mode=True))
+
+
+def test_optimized_code_count_parsing():
+    assert optimized_code_count(None) == 1
+    assert optimized_code_count(json.dumps({"other": True})) == 1
+    assert optimized_code_count(json.dumps({"optimized_code_count": 2})) == 2
+    assert optimized_code_count("not json") == 1
+    assert optimized_code_count("[1, 2]") == 1
+
+
+def test_cache_is_bounded_lru():
+    cache = PromptTemplateCache(max_entries=2)
+    a, b, c = (prompt_options(make_preferences(), user_feedback=f"feedback {i}") for i in range(3))
+    cache.get(a)
+    cache.get(b)
+    cache.get(a)  # a is now the most recently used
+    cache.get(c)
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    cache.get(a)
+    assert cache.stats()["hits"] == 2  # a survived, b was evicted
+    cache.get(b)
+    assert cache.stats()["misses"] == 4
+
+
+def test_fingerprint_is_stable_and_distinct():
+    options = prompt_options(make_preferences())
+    template = PromptTemplateCache().get(options)
+    assert template.fingerprint == hashlib.sha256(template.text.encode("utf-8")).hexdigest()
+    assert PromptTemplateCache().get(options).fingerprint == template.fingerprint
+    other = PromptTemplateCache().get(prompt_options(make_preferences(performance_analysis=False)))
+    assert other.fingerprint != template.fingerprint
+
+
+if __name__ == "__main__":
+    test_template_is_built_once_per_options()
+    test_options_only_track_what_shapes_the_prompt()
+    test_optimized_code_count_parsing()
+    test_cache_is_bounded_lru()
+    test_fingerprint_is_stable_and_distinct()
+
+    print("=" * 60)
+    print("✅ Prompt template tests completed!")
+    print("=" * 60)
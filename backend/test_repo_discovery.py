@@ -0,0 +1,110 @@
+"""
+Test streaming repository file discovery
+"""
+import fnmatch
+import os
+import tempfile
+
+import repo_discovery
+from repo_discovery import compile_patterns, iter_code_files, select_candidate_paths
+
+INCLUDE = ["*.py", "*.js", "*.ts"]
+EXCLUDE = ["node_modules/**", "*.min.js", "dist/**", "__pycache__/**", ".git/**"]
+
+
+def make_repo():
+    root = tempfile.mkdtemp(prefix="discovery_test_")
+    files = {
+        "app.py": "print('app')\n",
+        "src/util.js": "export const x = 1;\n",
+        "src/app.min.js": "var a=1;",
+        "src/notes.txt": "not code",
+        "node_modules/lib/index.js": "module.exports = {};",
+        "dist/bundle.js": "bundle();",
+        "pkg/empty.py": "",
+        "pkg/big.py": "x = 1\n" * 20000,
+        "pkg/long.ts": "let y = 2;\n" * 6000,
+    }
+    for path, content in files.items():
+        full = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w", encoding="utf-8") as f:
+            f.write(content)
+    with open(os.path.join(root, "pkg", "blob.py"), "wb") as f:
+        f.write(b"\x89PNG\x00\x00binary")
+    with open(os.path.join(root, "pkg", "latin1.py"), "wb") as f:
+        f.write("caf\xe9 = 1\n".encode("latin-1"))
+    return root
+
+
+def test_compiled_patterns_match_fnmatch():
+    regex = compile_patterns(EXCLUDE + INCLUDE)
+    for name in ["a.py", "src/a.min.js", "node_modules/x/y.js", "dist/a", "a.pyc", "README.md", "x.ts.bak"]:
+        expected = any(fnmatch.fnmatch(name, p) for p in EXCLUDE + INCLUDE)
+        assert bool(regex.match(name)) == expected, name
+    assert compile_patterns([]) is None
+
+
+def test_discovery_filters_and_truncates():
+    root = make_repo()
+    old_limit = repo_discovery.REPO_FILE_MAX_BYTES
+    repo_discovery.REPO_FILE_MAX_BYTES = 100000
+    try:
+        files = dict(iter_code_files(root, INCLUDE, EXCLUDE, 50))
+    finally:
+        repo_discovery.REPO_FILE_MAX_BYTES = old_limit
+    print(f"  discovered: {sorted(files)}")
+    # Excluded dirs/patterns, non-matching, empty, binary, non-UTF-8 and oversized files are skipped
+    assert sorted(files) == ["app.py", os.path.join("pkg", "long.ts"), os.path.join("src", "util.js")]
+    assert files["app.py"] == "print('app')\n"
+    long_ts = files[os.path.join("pkg", "long.ts")]
+    assert long_ts.endswith("\n# ... (file truncated)") and len(long_ts) == 50000 + len("\n# ... (file truncated)")
+
+
+def test_oversized_files_are_never_opened():
+    root = make_repo()
+    opened = []
+    original = repo_discovery.read_code_file
+    repo_discovery.read_code_file = lambda path: opened.append(path) or original(path)
+    old_limit = repo_discovery.REPO_FILE_MAX_BYTES
+    repo_discovery.REPO_FILE_MAX_BYTES = 100000
+    try:
+        list(iter_code_files(root, INCLUDE, EXCLUDE, 50))
+    finally:
+        repo_discovery.read_code_file = original
+        repo_discovery.REPO_FILE_MAX_BYTES = old_limit
+    assert not any(p.endswith("big.py") or p.endswith("empty.py") for p in opened)
+
+
+def test_files_are_yielded_lazily_up_to_max_files():
+    root = make_repo()
+    reads = []
+    original = repo_discovery.read_code_file
+    repo_discovery.read_code_file = lambda path: reads.append(path) or original(path)
+    try:
+        discovered = iter_code_files(root, INCLUDE, EXCLUDE, 2)
+        first = next(discovered)
+        assert len(reads) == 1 and first[1]
+        assert len(list(discovered)) == 1
+    finally:
+        repo_discovery.read_code_file = original
+
+
+def test_candidate_paths_match_discovery_by_name():
+    paths = ["app.py", "src/util.js", "src/app.min.js", "src/notes.txt", "node_modules/lib/index.js",
+             "dist/bundle.js", "pkg/empty.py", "pkg/long.ts"]
+    assert select_candidate_paths(paths, INCLUDE, EXCLUDE, 50) == ["app.py", "src/util.js", "pkg/empty.py", "pkg/long.ts"]
+    assert select_candidate_paths(paths, INCLUDE, EXCLUDE, 2) == ["app.py", "src/util.js"]
+    assert select_candidate_paths(paths, [], EXCLUDE, 50) == []
+
+
+if __name__ == "__main__":
+    test_compiled_patterns_match_fnmatch()
+    test_discovery_filters_and_truncates()
+    test_oversized_files_are_never_opened()
+    test_files_are_yielded_lazily_up_to_max_files()
+    test_candidate_paths_match_discovery_by_name()
+
+    print("=" * 60)
+    print("✅ Repository discovery tests completed!")
+    print("=" * 60)
@@ -0,0 +1,172 @@
+"""
+Test review response parsing
+"""
+import re
+import time
+
+from response_parser import (StreamingSectionParser, parse_review_sections, optimized_code_variants, file_delimiter,
+                             split_packed_response)
+
+RESPONSE = """Sure! Here is the review.
+###CODE_QUALITY###
+✅ Clean code. Quality score: 8/10
+###KEY_FINDINGS###
+🟡 MEDIUM - Line 3: missing input validation
+###OPTIMIZED_CODE_1###
+def add(a, b):
+    return a + b
+###OPTIMIZED_CODE_2###
+add = lambda a, b: a + b
+###EXPLANATION###
+Adds two numbers.
+###SYNTAX_ERRORS###
+No syntax errors detected.
+###SEMANTIC_ERRORS###
+No semantic errors detected."""
+
+EXPECTED = [
+    ("CODE_QUALITY", "✅ Clean code. Quality score: 8/10"),
+    ("KEY_FINDINGS", "🟡 MEDIUM - Line 3: missing input validation"),
+    ("OPTIMIZED_CODE_1", "def add(a, b):\n    return a + b"),
+    ("OPTIMIZED_CODE_2", "add = lambda a, b: a + b"),
+    ("EXPLANATION", "Adds two numbers."),
+    ("SYNTAX_ERRORS", "No syntax errors detected."),
+    ("SEMANTIC_ERRORS", "No semantic errors detected."),
+]
+
+
+def stream_sections(chunk_size):
+    parser = StreamingSectionParser()
+    sections = []
+    for i in range(0, len(RESPONSE), chunk_size):
+        sections.extend(parser.feed(RESPONSE[i:i + chunk_size]))
+    sections.extend(parser.finish())
+    return sections
+
+
+def test_streaming_parser_any_chunking():
+    # Chunk sizes of 1-7 split markers at every possible position
+    for chunk_size in (1, 2, 3, 5, 7, 64, len(RESPONSE)):
+        assert stream_sections(chunk_size) == EXPECTED, chunk_size
+
+
+def test_sections_emitted_before_stream_ends():
+    parser = StreamingSectionParser()
+    assert parser.feed("###CODE_QUALITY###\nGood") == []
+    assert parser.feed("\n###KEY_") == []
+    assert parser.feed("FINDINGS###\nNone") == [("CODE_QUALITY", "Good")]
+    assert parser.finish() == [("KEY_FINDINGS", "None")]
+
+
+def test_markdown_headings_are_not_markers():
+    parser = StreamingSectionParser()
+    parser.feed("###EXPLANATION###\n### Summary\nText ### more")
+    assert parser.finish() == [("EXPLANATION", "### Summary\nText ### more")]
+
+
+def test_time_to_first_section():
+    """Simulated Gemini stream: first section arrives long before the full response"""
+    chunk_delay = 0.01
+    parser = StreamingSectionParser()
+    started = time.perf_counter()
+    first_section_at = None
+    for i in range(0, len(RESPONSE), 16):
+        time.sleep(chunk_delay)
+        if parser.feed(RESPONSE[i:i + 16]) and first_section_at is None:
+            first_section_at = time.perf_counter() - started
+    parser.finish()
+    total = time.perf_counter() - started
+    print(f"  time to first section: {first_section_at * 1000:.0f}ms, full response: {total * 1000:.0f}ms")
+    assert first_section_at < total / 3
+
+
+def legacy_parse_section(text, marker):
+    """The per-marker regex scan previously inlined in both review endpoints"""
+    pattern = rf"{marker}(.*?)(?=###[A-Z_]+###|$)"
+    m = re.search(pattern, text, re.S)
+    return m.group(1).strip() if m else ''
+
+
+LEGACY_MARKERS = ['CODE_QUALITY', 'KEY_FINDINGS', 'SECURITY', 'PERFORMANCE', 'ARCHITECTURE', 'BEST_PRACTICES',
+                  'OPTIMIZED_CODE', 'EXPLANATION', 'RECOMMENDATIONS', 'SYNTAX_ERRORS', 'SEMANTIC_ERRORS']
+
+
+def legacy_parse_all(text):
+    sections = {m: legacy_parse_section(text, f'###{m}###') for m in LEGACY_MARKERS}
+    for i in range(1, 10):
+        sections[f'OPTIMIZED_CODE_{i}'] = legacy_parse_section(text, f'###OPTIMIZED_CODE_{i}###')
+    return sections
+
+
+def test_single_pass_parse():
+    sections = parse_review_sections(RESPONSE)
+    assert [(name, sections[name]) for name in sections] == EXPECTED
+    assert optimized_code_variants(sections) == ["def add(a, b):\n    return a + b", "add = lambda a, b: a + b"]
+    assert parse_review_sections("") == {} and parse_review_sections("no markers") == {}
+
+
+def test_numbered_variants_do_not_swallow_each_other():
+    # The legacy lookahead ignored digits, so OPTIMIZED_CODE_1 ran on into OPTIMIZED_CODE_2
+    assert "OPTIMIZED_CODE_2" in legacy_parse_section(RESPONSE, "###OPTIMIZED_CODE_1###")
+    assert "lambda" not in parse_review_sections(RESPONSE)["OPTIMIZED_CODE_1"]
+
+
+def test_numbered_variants_sort_numerically():
+    sections = parse_review_sections("###OPTIMIZED_CODE_10###\nten\n###OPTIMIZED_CODE_2###\ntwo\n###OPTIMIZED_CODE###\nbase")
+    assert optimized_code_variants(sections) == ["base", "two", "ten"]
+
+
+def test_duplicate_markers_first_non_empty_wins():
+    sections = parse_review_sections("###CODE_QUALITY###\n###CODE_QUALITY###\nReal\n###CODE_QUALITY###\nEcho")
+    assert sections["CODE_QUALITY"] == "Real"
+
+
+def build_large_response(kb):
+    body = "\n".join(f"- Line {i}: consider extracting helper_{i}() to reduce duplication" for i in range(40))
+    chunks = []
+    while sum(map(len, chunks)) < kb * 1024:
+        for marker in LEGACY_MARKERS:
+            chunks.append(f"###{marker}###\n{body}\n")
+    return "".join(chunks)
+
+
+def test_single_pass_matches_legacy_on_large_responses():
+    # On well-formed, unnumbered responses legacy (first occurrence) and single-pass agree;
+    # benchmark_response_parser.py times the two on these responses
+    for kb in (4, 64, 512):
+        text = build_large_response(kb)
+        legacy = legacy_parse_all(text)
+        single = parse_review_sections(text)
+        assert all(single.get(m, '') == legacy[m] for m in LEGACY_MARKERS)
+
+
+def test_packed_response_splits_per_file():
+    text = (
+        "Here are the reviews.\n"
+        f"{file_delimiter('a.py')}\n###CODE_QUALITY###\nA is fine\n###SECURITY###\nnone\n"
+        "  ===== FILE: `b/c.js` =====\n###CODE_QUALITY###\nC is fine\n"
+        f"{file_delimiter('unknown.py')}\n###CODE_QUALITY###\nnot asked for\n"
+        f"{file_delimiter('a.py')}\n###CODE_QUALITY###\nduplicate\n"
+    )
+    reviews = split_packed_response(text, ["a.py", "b/c.js", "missing.py"])
+    assert sorted(reviews) == ["a.py", "b/c.js"]
+    assert parse_review_sections(reviews["a.py"]) == {"CODE_QUALITY": "A is fine", "SECURITY": "none"}
+    assert reviews["b/c.js"] == "###CODE_QUALITY###\nC is fine"
+    assert split_packed_response("###CODE_QUALITY###\nno delimiters", ["a.py"]) == {}
+
+
+if __name__ == "__main__":
+    test_streaming_parser_any_chunking()
+    test_sections_emitted_before_stream_ends()
+    test_markdown_headings_are_not_markers()
+    test_time_to_first_section()
+    test_single_pass_parse()
+    test_numbered_variants_do_not_swallow_each_other()
+    test_numbered_variants_sort_numerically()
+    test_duplicate_markers_first_non_empty_wins()
+    test_single_pass_matches_legacy_on_large_responses()
+    test_packed_response_splits_per_file()
+
+    print("=" * 60)
+    print("✅ Response parser tests completed!")
+    print("=" * 60)
@@ -0,0 +1,134 @@
+"""
+Tests for batch reviews: input-order results, per-file failures, duplicates answered by an
+earlier review, one save for all new rows, and the batch size limit.
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+try:
+    from backend.review_batch import check_batch_size, run_batch
+except ImportError:
+    from review_batch import check_batch_size, run_batch
+
+
+def batch_files(count: int):
+    return [SimpleNamespace(filename=f"file_{i}.py", code=f"x = {i}") for i in range(count)]
+
+
+class RecordingSaver:
+    """save_rows stand-in: assigns ids and records each call and its thread"""
+
+    def __init__(self):
+        self.calls = []
+        self.threads = []
+
+    def __call__(self, rows):
+        self.calls.append(list(rows))
+        self.threads.append(threading.current_thread())
+        return [{"id": 100 + i, "review": row["review"]} for i, row in enumerate(rows)]
+
+
+def row_result(row):
+    return {"id": None, "review": row["review"]}
+
+
+async def slow_first(index, data):
+    # Later files finish first, so results must be ordered by input, not completion
+    await asyncio.sleep(0.01 * (5 - index))
+    return {"row": {"review": f"review of {data.filename}"}}
+
+
+def test_results_keep_input_order():
+    saver = RecordingSaver()
+    result = asyncio.run(run_batch(batch_files(5), slow_first, saver, row_result))
+    assert [review["file_index"] for review in result["reviews"]] == [0, 1, 2, 3, 4]
+    assert [review["filename"] for review in result["reviews"]] == [f"file_{i}.py" for i in range(5)]
+    assert [review["review"] for review in result["reviews"]] == [f"review of file_{i}.py" for i in range(5)]
+    assert result["total_files"] == 5 and result["failed_files"] == 0
+
+
+def test_failed_file_keeps_the_other_rows():
+    async def review_file(index, data):
+        if index == 1:
+            raise RuntimeError("Gemini unavailable")
+        return {"row": {"review": f"review {index}"}}
+
+    saver = RecordingSaver()
+    result = asyncio.run(run_batch(batch_files(3), review_file, saver, row_result))
+    assert result["failed_files"] == 1
+    assert result["reviews"][1] == {"error": "Gemini unavailable", "file_index": 1, "filename": "file_1.py"}
+    assert [r["id"] for r in (result["reviews"][0], result["reviews"][2])] == [100, 101]
+    assert len(saver.calls[0]) == 2
+
+
+def test_duplicates_reuse_the_earlier_review():
+    async def review_file(index, data):
+        if index == 0:
+            return {"existing": {"id": 7, "review": "earlier review", "duplicate": True}}
+        return {"row": {"review": "new review"}}
+
+    saver = RecordingSaver()
+    result = asyncio.run(run_batch(batch_files(2), review_file, saver, row_result))
+    assert result["reviews"][0] == {"id": 7, "review": "earlier review", "duplicate": True,
+                                    "file_index": 0, "filename": "file_0.py"}
+    assert result["reviews"][1]["id"] == 100
+    # Only the new review is saved
+    assert saver.calls == [[{"review": "new review"}]]
+
+
+def test_new_rows_are_saved_once_off_the_event_loop():
+    saver = RecordingSaver()
+    asyncio.run(run_batch(batch_files(4), slow_first, saver, row_result))
+    assert len(saver.calls) == 1 and len(saver.calls[0]) == 4
+    assert saver.threads[0] is not threading.main_thread()
+
+    # A batch of failures and duplicates has nothing to save
+    async def duplicate(index, data):
+        return {"existing": {"id": 1}}
+    saver = RecordingSaver()
+    asyncio.run(run_batch(batch_files(2), duplicate, saver, row_result))
+    assert saver.calls == []
+
+
+def test_progress_events_and_custom_fan_out():
+    events = []
+    fan_out_calls = []
+
+    async def report(event):
+        events.append(event)
+
+    async def fan_out(review, args_list):
+        fan_out_calls.append(len(args_list))
+        return [await review(*args) for args in args_list]
+
+    asyncio.run(run_batch(batch_files(2), slow_first, RecordingSaver(), row_result,
+                          fan_out=fan_out, on_file_reviewed=report))
+    assert fan_out_calls == [2]
+    assert [(e["file_index"], e["total_files"], e["review"]) for e in events] == [
+        (0, 2, "review of file_0.py"), (1, 2, "review of file_1.py")]
+
+
+def test_batch_size_limit():
+    check_batch_size(1, maximum=20)
+    check_batch_size(20, maximum=20)
+    with pytest.raises(ValueError, match="At most 20 files"):
+        check_batch_size(21, maximum=20)
+    with pytest.raises(ValueError, match="No files"):
+        check_batch_size(0, maximum=20)
+
+
+if __name__ == "__main__":
+    test_results_keep_input_order()
+    test_failed_file_keeps_the_other_rows()
+    test_duplicates_reuse_the_earlier_review()
+    test_new_rows_are_saved_once_off_the_event_loop()
+    test_progress_events_and_custom_fan_out()
+    test_batch_size_limit()
+
+    print("=" * 60)
+    print("✅ Batch review tests completed!")
+    print("=" * 60)
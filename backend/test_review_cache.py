@@ -0,0 +1,124 @@
+"""
+Test the content-addressed review cache
+"""
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from review_cache import ReviewCache, DatabaseCacheBacking, make_cache_key, normalize_code
+
+CODE = "def add(a, b):\n    return a + b\n"
+PROMPT = "Analyze this code and return SEPARATE sections"
+
+
+def test_key_ignores_cosmetic_whitespace():
+    crlf = "def add(a, b):   \r\n    return a + b\r\n\r\n"
+    assert normalize_code(crlf) == normalize_code(CODE)
+    assert make_cache_key(crlf, "Python", PROMPT, "gemini") == make_cache_key(CODE, "Python", PROMPT, "gemini")
+
+
+def test_key_changes_with_prompt_language_and_model():
+    base = make_cache_key(CODE, "Python", PROMPT, "gemini-2.5-flash")
+    assert base != make_cache_key(CODE, "JavaScript", PROMPT, "gemini-2.5-flash")
+    assert base != make_cache_key(CODE, "Python", PROMPT + "###SECURITY###", "gemini-2.5-flash")
+    assert base != make_cache_key(CODE, "Python", PROMPT, "gemini-2.5-pro")
+    assert base != make_cache_key(CODE + "x = 1", "Python", PROMPT, "gemini-2.5-flash")
+
+
+def test_key_includes_the_file_path_when_given():
+    base = make_cache_key(CODE, "Python", PROMPT, "gemini")
+    in_repo = make_cache_key(CODE, "Python", PROMPT, "gemini", "src/add.py")
+    # Repository prompts name the file, so the same code at another path is another review
+    assert in_repo != make_cache_key(CODE, "Python", PROMPT, "gemini", "tests/add.py")
+    assert in_repo != base
+    assert base == make_cache_key(CODE, "Python", PROMPT, "gemini", None)
+
+
+def test_key_includes_the_chunk_heading_when_given():
+    first = make_cache_key(CODE, "Python", PROMPT, "gemini", "src/add.py", "lines 1-2 of 4, part 1 of 2")
+    # The same chunk text at another line range or part number is prompted differently
+    assert first != make_cache_key(CODE, "Python", PROMPT, "gemini", "src/add.py", "lines 3-4 of 4, part 2 of 2")
+    assert first != make_cache_key(CODE, "Python", PROMPT, "gemini", "src/add.py")
+    # A heading never collides with a file path in the same position
+    assert (make_cache_key(CODE, "Python", PROMPT, "gemini", None, "part 1")
+            != make_cache_key(CODE, "Python", PROMPT, "gemini", "part 1"))
+
+
+def test_hit_miss_counters():
+    cache = ReviewCache(max_entries=10, ttl_seconds=60)
+    key = make_cache_key(CODE, "Python", PROMPT, "gemini")
+    assert cache.get(key) is None
+    cache.put(key, "###CODE_QUALITY###\nGood")
+    assert cache.get(key) == "###CODE_QUALITY###\nGood"
+    stats = cache.stats()
+    print(f"  stats: {stats}")
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 50.0
+
+
+def test_lru_eviction():
+    cache = ReviewCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")           # 'a' is now most recently used
+    cache.put("c", "C")      # evicts 'b'
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiry():
+    cache = ReviewCache(max_entries=10, ttl_seconds=0.05)
+    cache.put("a", "A")
+    time.sleep(0.1)
+    assert cache.get("a") is None
+
+
+def test_empty_responses_not_cached():
+    cache = ReviewCache()
+    cache.put("a", "")
+    assert cache.get("a") is None
+
+
+def test_persistent_backing_survives_restart():
+    Base = declarative_base()
+
+    class Entry(Base):
+        __tablename__ = "review_cache"
+        id = Column(Integer, primary_key=True)
+        cache_key = Column(String(64), unique=True, nullable=False)
+        response = Column(Text, nullable=False)
+        created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+
+    first = ReviewCache(backing=DatabaseCacheBacking(Session, Entry, 60))
+    first.put("k", "cached review")
+
+    # A fresh process starts with an empty in-memory cache but finds the row
+    second = ReviewCache(backing=DatabaseCacheBacking(Session, Entry, 60))
+    assert second.get("k") == "cached review"
+    assert second.stats()["persistent_hits"] == 1
+    # ... and the second lookup is served from memory
+    assert second.get("k") == "cached review"
+    assert second.stats()["persistent_hits"] == 1
+
+
+if __name__ == "__main__":
+    test_key_ignores_cosmetic_whitespace()
+    test_key_changes_with_prompt_language_and_model()
+    test_key_includes_the_file_path_when_given()
+    test_key_includes_the_chunk_heading_when_given()
+    test_hit_miss_counters()
+    test_lru_eviction()
+    test_ttl_expiry()
+    test_empty_responses_not_cached()
+    test_persistent_backing_survives_restart()
+
+    print("=" * 60)
+    print("✅ Review cache tests completed!")
+    print("=" * 60)
@@ -0,0 +1,141 @@
+"""
+Test the bounded-concurrency ReviewExecutor used by /generate-repo-review
+A stub model with artificial latency stands in for Gemini
+"""
+import asyncio
+import math
+import threading
+import time
+
+from review_executor import ReviewExecutor
+
+LATENCY = 0.2
+
+
+class StubModel:
+    """Fake Gemini model: sleeps like a network round trip and records overlap"""
+
+    def __init__(self, latency=LATENCY):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def generate_content(self, prompt):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.latency)
+            return f"###CODE_QUALITY###\nReviewed: {prompt}"
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def review_file(model, file_path, file_index):
+    return {"file_path": file_path, "review": model.generate_content(file_path), "file_index": file_index}
+
+
+def run_reviews(executor, model, num_files, user_id=1):
+    files = [(model, f"src/file_{i}.py", i) for i in range(num_files)]
+    start = time.perf_counter()
+    results = asyncio.run(executor.map(user_id, review_file, files))
+    return results, time.perf_counter() - start
+
+
+def test_wall_time_scales_with_batches_not_files():
+    print("=" * 60)
+    print("Testing wall time vs. concurrency")
+    print("=" * 60)
+
+    num_files = 12
+    for concurrency in (1, 4, 6):
+        executor = ReviewExecutor(max_concurrency=concurrency, max_per_user=concurrency)
+        model = StubModel()
+        results, elapsed = run_reviews(executor, model, num_files)
+        expected = math.ceil(num_files / concurrency) * LATENCY
+        print(f"  concurrency={concurrency}: {elapsed:.2f}s (expected ~{expected:.2f}s, serial {num_files * LATENCY:.2f}s)")
+
+        assert len(results) == num_files
+        assert model.max_active <= concurrency
+        assert elapsed >= expected * 0.9
+        assert elapsed < expected + LATENCY
+        executor.shutdown()
+
+
+def test_results_keep_file_order():
+    executor = ReviewExecutor(max_concurrency=5, max_per_user=5)
+    model = StubModel(latency=0.01)
+    results, _ = run_reviews(executor, model, 20)
+    assert [r["file_index"] for r in results] == list(range(20))
+    assert [r["file_path"] for r in results] == [f"src/file_{i}.py" for i in range(20)]
+    executor.shutdown()
+
+
+def test_per_user_limit_below_global_limit():
+    executor = ReviewExecutor(max_concurrency=8, max_per_user=2)
+    model = StubModel()
+    _, elapsed = run_reviews(executor, model, 6)
+    print(f"  one user, per-user limit 2: {elapsed:.2f}s")
+    assert model.max_active == 2
+    assert elapsed >= 3 * LATENCY * 0.9
+    executor.shutdown()
+
+
+def test_global_limit_shared_between_users():
+    executor = ReviewExecutor(max_concurrency=4, max_per_user=4)
+    model = StubModel()
+
+    async def two_users():
+        files_a = [(model, f"a_{i}.py", i) for i in range(4)]
+        files_b = [(model, f"b_{i}.py", i) for i in range(4)]
+        return await asyncio.gather(
+            executor.map("alice", review_file, files_a),
+            executor.map("bob", review_file, files_b),
+        )
+
+    start = time.perf_counter()
+    results_a, results_b = asyncio.run(two_users())
+    elapsed = time.perf_counter() - start
+    print(f"  two users sharing global limit 4: {elapsed:.2f}s")
+
+    assert [r["file_path"] for r in results_a] == [f"a_{i}.py" for i in range(4)]
+    assert [r["file_path"] for r in results_b] == [f"b_{i}.py" for i in range(4)]
+    assert model.max_active <= 4
+    assert elapsed >= 2 * LATENCY * 0.9
+    # Idle users are dropped once their work finishes
+    assert executor._user_limits == {}
+    executor.shutdown()
+
+
+def test_coroutines_share_the_same_limits():
+    executor = ReviewExecutor(max_concurrency=3, max_per_user=3)
+    active = {"now": 0, "max": 0}
+
+    async def review_async(file_path):
+        active["now"] += 1
+        active["max"] = max(active["max"], active["now"])
+        await asyncio.sleep(LATENCY)
+        active["now"] -= 1
+        return file_path
+
+    start = time.perf_counter()
+    results = asyncio.run(executor.map(1, review_async, [(f"f{i}.py",) for i in range(6)]))
+    elapsed = time.perf_counter() - start
+    assert results == [f"f{i}.py" for i in range(6)]
+    assert active["max"] == 3
+    assert 2 * LATENCY * 0.9 <= elapsed < 3 * LATENCY
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    test_wall_time_scales_with_batches_not_files()
+    test_results_keep_file_order()
+    test_per_user_limit_below_global_limit()
+    test_global_limit_shared_between_users()
+    test_coroutines_share_the_same_limits()
+
+    print("=" * 60)
+    print("✅ Review executor tests completed!")
+    print("=" * 60)
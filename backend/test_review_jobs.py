@@ -0,0 +1,325 @@
+"""
+Test the persistent review job queue with stub pipelines
+"""
+import asyncio
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from review_jobs import ReviewJobQueue, LeaseLost
+
+Base = declarative_base()
+
+
+class Job(Base):
+    __tablename__ = "review_jobs"
+    id = Column(String(36), primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    job_type = Column(String(20), nullable=False)
+    status = Column(String(20), nullable=False)
+    payload = Column(Text, nullable=False)
+    progress_done = Column(Integer, default=0, nullable=False)
+    progress_total = Column(Integer, nullable=True)
+    review_id = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    owner = Column(String(100), nullable=True)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class JobFile(Base):
+    __tablename__ = "review_job_files"
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(36), nullable=False)
+    file_index = Column(Integer, nullable=False)
+    result = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+def make_session_factory():
+    # A database file, not an in-memory one: the queue's worker threads each need their own connection
+    path = os.path.join(tempfile.mkdtemp(), "jobs.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+async def fake_repository_review(job, report, check_lease):
+    files = json.loads(job.payload)["files"]
+    for i, name in enumerate(files):
+        await asyncio.sleep(0.01)
+        report({"file_path": name, "file_index": i, "total_files": len(files)})
+    return 42
+
+
+async def failing_review(job, report, check_lease):
+    raise RuntimeError("Gemini unavailable")
+
+
+async def wait_for(queue, job_id, user_id=1):
+    for _ in range(200):
+        job = queue.get_job(job_id, user_id)
+        if job.status in ("completed", "failed"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def set_job(session_factory, job_id, **fields):
+    """Write job columns directly, as another (possibly dead) process would have"""
+    db = session_factory()
+    try:
+        db.query(Job).filter(Job.id == job_id).update(fields)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_submit_poll_and_progress():
+    async def scenario():
+        queue = ReviewJobQueue(make_session_factory(), Job, JobFile, num_workers=2)
+        queue.register("repository", fake_repository_review)
+        await queue.start()
+        job_id = queue.submit(1, "repository", {"files": ["a.py", "b.py", "c.py"]})
+        assert queue.get_job(job_id, 1).status in ("queued", "running")
+        job = await wait_for(queue, job_id)
+        await queue.stop()
+        return queue, job
+
+    queue, job = asyncio.run(scenario())
+    print(f"  job {job.id}: {job.status} {job.progress_done}/{job.progress_total}")
+    assert job.status == "completed" and job.review_id == 42
+    assert (job.progress_done, job.progress_total) == (3, 3)
+    # Other users can't see the job
+    assert queue.get_job(job.id, 2) is None
+
+
+def test_failed_job_records_error():
+    async def scenario():
+        queue = ReviewJobQueue(make_session_factory(), Job, JobFile, num_workers=1)
+        queue.register("review", failing_review)
+        await queue.start()
+        job = await wait_for(queue, queue.submit(1, "review", {"code": "x = 1"}))
+        await queue.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "failed" and "Gemini unavailable" in job.error
+
+
+def test_queued_and_interrupted_jobs_survive_restart():
+    session_factory = make_session_factory()
+
+    # Process 1: accepts two jobs, starts one, then dies before finishing either
+    first = ReviewJobQueue(session_factory, Job, JobFile)
+    first.register("repository", fake_repository_review)
+    queued_id = first.submit(1, "repository", {"files": ["a.py"]})
+    running_id = first.submit(1, "repository", {"files": ["b.py", "c.py"]})
+    set_job(session_factory, running_id, status="running", owner="dead-worker", progress_done=1,
+            heartbeat_at=datetime.utcnow() - timedelta(minutes=5))
+
+    # Process 2: recovers both from the database
+    async def restart():
+        second = ReviewJobQueue(session_factory, Job, JobFile)
+        second.register("repository", fake_repository_review)
+        await second.start()
+        jobs = [await wait_for(second, queued_id), await wait_for(second, running_id)]
+        await second.stop()
+        return jobs
+
+    jobs = asyncio.run(restart())
+    assert [j.status for j in jobs] == ["completed", "completed"]
+    assert jobs[1].progress_done == 2
+
+
+def test_each_job_runs_once_across_processes():
+    session_factory = make_session_factory()
+    runs = []
+
+    async def counting_review(job, report, check_lease):
+        runs.append(job.id)
+        await asyncio.sleep(0.01)
+        return 1
+
+    async def scenario():
+        # Three "processes" over one table: every queue sees every queued job
+        queues = [ReviewJobQueue(session_factory, Job, JobFile, num_workers=2, worker_id=f"worker-{i}")
+                  for i in range(3)]
+        for queue in queues:
+            queue.register("review", counting_review)
+        job_ids = [queues[0].submit(1, "review", {"code": f"x = {i}"}) for i in range(6)]
+        await asyncio.gather(*(queue.start() for queue in queues))
+        jobs = [await wait_for(queues[0], job_id) for job_id in job_ids]
+        for queue in queues:
+            await queue.stop()
+        return job_ids, jobs
+
+    job_ids, jobs = asyncio.run(scenario())
+    assert sorted(runs) == sorted(job_ids)
+    assert all(job.status == "completed" for job in jobs)
+    print(f"  owners: {sorted({job.owner for job in jobs})}")
+
+
+def test_live_running_job_is_left_alone():
+    session_factory = make_session_factory()
+    first = ReviewJobQueue(session_factory, Job, JobFile)
+    first.register("repository", fake_repository_review)
+    job_id = first.submit(1, "repository", {"files": ["a.py"]})
+    # Another process is running it and renewed its lease just now
+    set_job(session_factory, job_id, status="running", owner="live-worker", heartbeat_at=datetime.utcnow())
+
+    async def restart():
+        second = ReviewJobQueue(session_factory, Job, JobFile, worker_id="new-worker")
+        second.register("repository", fake_repository_review)
+        await second.start()
+        await asyncio.sleep(0.05)
+        await second.stop()
+
+    asyncio.run(restart())
+    job = first.get_job(job_id, 1)
+    assert (job.status, job.owner) == ("running", "live-worker")
+
+
+def test_orphaned_job_is_reclaimed_by_sweep_and_stale_owner_is_ignored():
+    session_factory = make_session_factory()
+
+    async def scenario():
+        queue = ReviewJobQueue(session_factory, Job, JobFile, lease_seconds=0.05, sweep_seconds=0.02,
+                               worker_id="survivor")
+        queue.register("repository", fake_repository_review)
+        await queue.start()
+        # Created after start: only the periodic sweep can find it once its owner stops renewing
+        job_id = queue.submit(1, "repository", {"files": ["a.py", "b.py"]})
+        queue._pending.discard(job_id)
+        set_job(session_factory, job_id, status="running", owner="dead-worker", heartbeat_at=datetime.utcnow())
+        job = await wait_for(queue, job_id)
+        await queue.stop()
+        return queue, job
+
+    queue, job = asyncio.run(scenario())
+    assert (job.status, job.owner, job.progress_done) == ("completed", "survivor", 2)
+    # A report from the previous owner no longer counts
+    stale = ReviewJobQueue(session_factory, Job, JobFile, worker_id="dead-worker")
+    stale.report_file(job.id, {"file_index": 5, "total_files": 9})
+    assert queue.get_job(job.id, 1).progress_total == 2
+    assert queue.get_partial_result(job.id, 5) is None
+
+
+def test_partial_results_are_visible_to_other_processes():
+    session_factory = make_session_factory()
+
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def two_step_review(job, report, check_lease):
+            report({"file_path": "a.py", "file_index": 0, "total_files": 2})
+            await gate.wait()
+            report({"file_path": "b.py", "file_index": 1, "total_files": 2})
+            return 7
+
+        owner = ReviewJobQueue(session_factory, Job, JobFile, worker_id="owner")
+        owner.register("repository", two_step_review)
+        other = ReviewJobQueue(session_factory, Job, JobFile, worker_id="other")
+        await owner.start()
+        job_id = owner.submit(1, "repository", {})
+        for _ in range(100):
+            if other.get_partial_result(job_id, 0):
+                break
+            await asyncio.sleep(0.01)
+        seen = (other.get_partial_result(job_id, 0), other.get_partial_result(job_id, 1),
+                other.get_job(job_id, 1).progress_done)
+        gate.set()
+        job = await wait_for(other, job_id)
+        await owner.stop()
+        return seen, job, other.get_partial_result(job_id, 0)
+
+    (first, second, progress), job, after = asyncio.run(scenario())
+    assert first["file_path"] == "a.py" and second is None and progress == 1
+    assert job.status == "completed" and job.progress_done == 2
+    # Completed jobs are served from the stored review; the file rows are cleared
+    assert after is None
+
+
+def test_lost_lease_cancels_the_handler():
+    session_factory = make_session_factory()
+    events = []
+
+    async def long_review(job, report, check_lease):
+        # Another process claims the job while this one is stalled
+        set_job(session_factory, job.id, owner="new-owner", heartbeat_at=datetime.utcnow())
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+        events.append("saved")
+        return 1
+
+    async def scenario():
+        queue = ReviewJobQueue(session_factory, Job, JobFile, heartbeat_seconds=0.02, worker_id="old-owner")
+        queue.register("review", long_review)
+        await queue.start()
+        job_id = queue.submit(1, "review", {})
+        for _ in range(100):
+            if events:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return queue.get_job(job_id, 1)
+
+    job = asyncio.run(scenario())
+    assert events == ["cancelled"]
+    assert (job.status, job.owner, job.review_id) == ("running", "new-owner", None)
+
+
+def test_review_is_not_stored_after_the_lease_is_lost():
+    session_factory = make_session_factory()
+    saved = []
+
+    async def review(job, report, check_lease):
+        await asyncio.to_thread(report, {"file_index": 0, "total_files": 1})
+        # Taken over between the last heartbeat and the insert
+        set_job(session_factory, job.id, owner="new-owner", heartbeat_at=datetime.utcnow())
+        await asyncio.to_thread(check_lease)
+        saved.append(job.id)
+        return 1
+
+    async def scenario():
+        queue = ReviewJobQueue(session_factory, Job, JobFile, worker_id="old-owner")
+        queue.register("review", review)
+        await queue.start()
+        job_id = queue.submit(1, "review", {})
+        await asyncio.sleep(0.1)
+        await queue.stop()
+        return queue, queue.get_job(job_id, 1)
+
+    queue, job = asyncio.run(scenario())
+    assert saved == []
+    assert (job.status, job.owner, job.error) == ("running", "new-owner", None)
+    try:
+        queue.check_lease(job.id)
+        raise AssertionError("check_lease should fail for a job owned elsewhere")
+    except LeaseLost:
+        pass
+
+
+if __name__ == "__main__":
+    test_submit_poll_and_progress()
+    test_failed_job_records_error()
+    test_queued_and_interrupted_jobs_survive_restart()
+    test_each_job_runs_once_across_processes()
+    test_live_running_job_is_left_alone()
+    test_orphaned_job_is_reclaimed_by_sweep_and_stale_owner_is_ignored()
+    test_partial_results_are_visible_to_other_processes()
+    test_lost_lease_cancels_the_handler()
+    test_review_is_not_stored_after_the_lease_is_lost()
+
+    print("=" * 60)
+    print("✅ Review job queue tests completed!")
+    print("=" * 60)
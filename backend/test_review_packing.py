@@ -0,0 +1,71 @@
+"""
+Tests for multi-file review packing: pack sizing, the packed prompt, and attributing
+a packed response back to its files.
+"""
+
+try:
+    from backend.review_packing import (FilePack, packable, code_tokens, build_packed_prompt,
+                                        attribute_packed_response, REPO_PACK_FILE_MAX_CHARS)
+    from backend.response_parser import file_delimiter, parse_review_sections
+except ImportError:
+    from review_packing import (FilePack, packable, code_tokens, build_packed_prompt,
+                                attribute_packed_response, REPO_PACK_FILE_MAX_CHARS)
+    from response_parser import file_delimiter, parse_review_sections
+
+
+def test_only_small_files_are_packable():
+    assert packable("x = 1\n")
+    assert packable("x" * REPO_PACK_FILE_MAX_CHARS)
+    assert not packable("x" * (REPO_PACK_FILE_MAX_CHARS + 1))
+
+
+def test_pack_respects_file_and_token_limits():
+    pack = FilePack(token_budget=100, max_files=3)
+    small = "x" * 80  # 21 tokens
+    assert pack.fits(small)
+    for i in range(3):
+        pack.add(i, f"f{i}.py", small)
+    assert pack.full() and not pack.fits(small)
+    assert [index for index, _, _ in pack.take()] == [0, 1, 2]
+    assert len(pack) == 0 and pack.tokens == 0
+
+    pack.add(0, "big.py", "x" * 360)  # 91 tokens
+    assert not pack.full()
+    assert not pack.fits(small)
+    # An empty pack always takes the next file, whatever its size
+    pack.take()
+    assert pack.fits("x" * 4000)
+    assert code_tokens("x" * 4000) > 100
+
+
+def test_packed_prompt_delimits_every_file():
+    files = [("src/a.py", "python", "def a():\n    return 1"), ("web/b.js", "javascript", "let b = 2;")]
+    prompt = build_packed_prompt("REVIEW INSTRUCTIONS", files)
+    # Shared instructions are sent once, every file appears under its own delimiter
+    assert prompt.count("REVIEW INSTRUCTIONS") == 1
+    for path, language, content in files:
+        assert f"{file_delimiter(path)}\n**Language:** {language}\n```{language}\n{content}\n```" in prompt
+    assert prompt.index(file_delimiter("src/a.py") + "\n**Language") < prompt.index(file_delimiter("web/b.js"))
+
+
+def test_attribution_requires_sections():
+    response = (
+        f"{file_delimiter('a.py')}\n###CODE_QUALITY###\nfine\n###EXPLANATION###\nadds\n"
+        f"{file_delimiter('b.py')}\nI could not review this file.\n"
+    )
+    reviews = attribute_packed_response(response, ["a.py", "b.py", "c.py"])
+    # b.py has no sections and c.py is missing: both go back to single-file review
+    assert list(reviews) == ["a.py"]
+    assert parse_review_sections(reviews["a.py"]) == {"CODE_QUALITY": "fine", "EXPLANATION": "adds"}
+    assert attribute_packed_response("", ["a.py"]) == {}
+
+
+if __name__ == "__main__":
+    test_only_small_files_are_packable()
+    test_pack_respects_file_and_token_limits()
+    test_packed_prompt_delimits_every_file()
+    test_attribution_requires_sections()
+
+    print("=" * 60)
+    print("✅ Review packing tests completed!")
+    print("=" * 60)
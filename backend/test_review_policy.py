@@ -0,0 +1,113 @@
+"""
+Tests for the fast-path review policy: rule evaluation, per-user overrides, deterministic
+reviews for unparseable code, targeted prompts and savings counters.
+"""
+
+import json
+
+try:
+    from backend.review_policy import (DEFAULT_REVIEW_POLICY, PolicyDecision, ReviewPolicyStats, load_review_policy,
+                                       store_review_policy, evaluate_review_policy, deterministic_review,
+                                       targeted_syntax_prompt)
+    from backend.ast_analyzer import CodeAnalyzer
+    from backend.response_parser import parse_review_sections
+except ImportError:
+    from review_policy import (DEFAULT_REVIEW_POLICY, PolicyDecision, ReviewPolicyStats, load_review_policy,
+                               store_review_policy, evaluate_review_policy, deterministic_review,
+                               targeted_syntax_prompt)
+    from ast_analyzer import CodeAnalyzer
+    from response_parser import parse_review_sections
+
+
+BROKEN = "def ok():\n    return 1\n\ndef broken(:\n    pass\n"
+
+
+def policy(**overrides):
+    return {**DEFAULT_REVIEW_POLICY, **overrides}
+
+
+def test_rules_in_order():
+    analysis = CodeAnalyzer().analyze_code(BROKEN, "python")
+    everything_skips = policy(empty_code="skip", syntax_error="skip", duplicate="skip")
+    assert evaluate_review_policy("  \n", "python", None, everything_skips) == PolicyDecision("empty_code", "skip")
+    # A duplicate is answered with the earlier review even if it doesn't parse
+    assert evaluate_review_policy(BROKEN, "Python", analysis, everything_skips, duplicate_of=7) == \
+        PolicyDecision("duplicate", "skip", 7)
+    assert evaluate_review_policy(BROKEN, "Python", analysis, policy(syntax_error="targeted")) == \
+        PolicyDecision("syntax_error", "targeted")
+    # "llm" turns a rule off; parseable code never matches the syntax rule
+    assert evaluate_review_policy(BROKEN, "Python", analysis, policy(syntax_error="llm")) is None
+    valid = "def ok():\n    return 1\n"
+    assert evaluate_review_policy(valid, "python", CodeAnalyzer().analyze_code(valid, "python"), everything_skips) is None
+
+
+def test_syntax_rule_is_python_only():
+    # The JavaScript analyzer only guesses at syntax errors, so it never short-circuits
+    code = "function f( {\n  return 1;\n}"
+    analysis = CodeAnalyzer().analyze_code(code, "javascript")
+    assert evaluate_review_policy(code, "JavaScript", analysis, policy(syntax_error="skip")) is None
+
+
+def test_per_user_policy_is_stored_with_learning_patterns():
+    patterns = json.dumps({"optimized_code_count": 2})
+    stored = store_review_policy(patterns, {"syntax_error": "skip"})
+    assert json.loads(stored)["optimized_code_count"] == 2
+    assert load_review_policy(stored) == policy(syntax_error="skip")
+    stored = store_review_policy(stored, {"duplicate": "llm"})
+    assert load_review_policy(stored) == policy(syntax_error="skip", duplicate="llm")
+    for bad in ({"syntax_error": "maybe"}, {"empty_code": "targeted"}, {"unknown": "skip"}):
+        try:
+            store_review_policy(stored, bad)
+            assert False, f"{bad} should be rejected"
+        except ValueError:
+            pass
+    # Unreadable or hand-edited values fall back to the defaults
+    assert load_review_policy("not json") == DEFAULT_REVIEW_POLICY
+    assert load_review_policy(json.dumps({"review_policy": {"duplicate": "never"}})) == DEFAULT_REVIEW_POLICY
+
+
+def test_deterministic_syntax_error_review():
+    analysis = CodeAnalyzer().analyze_code(BROKEN, "python")
+    sections = parse_review_sections(deterministic_review(PolicyDecision("syntax_error", "skip"), BROKEN, "Python", analysis))
+    assert sections["SYNTAX_ERRORS"].startswith("• Line 4: ")
+    assert "`def broken(:`" in sections["SYNTAX_ERRORS"]
+    assert "doesn't parse" in sections["CODE_QUALITY"]
+    empty = parse_review_sections(deterministic_review(PolicyDecision("empty_code", "skip"), "", "Python", None))
+    assert "nothing to review" in empty["CODE_QUALITY"]
+
+
+def test_targeted_prompt_is_small_and_windowed():
+    analysis = CodeAnalyzer().analyze_code(BROKEN, "python")
+    prompt = targeted_syntax_prompt(BROKEN, "Python", analysis)
+    assert BROKEN in prompt and "###SYNTAX_ERRORS###" in prompt and "###SECURITY###" not in prompt
+
+    long_code = "\n".join(f"value_{i} = {i}" for i in range(500)) + "\ndef broken(:\n    pass\n"
+    analysis = CodeAnalyzer().analyze_code(long_code, "python")
+    prompt = targeted_syntax_prompt(long_code, "Python", analysis, max_chars=1000)
+    assert "lines 481-503 of 503" in prompt
+    assert "def broken(:" in prompt and "value_0 = 0" not in prompt
+    assert len(prompt) < 1600
+
+
+def test_stats_count_savings():
+    stats = ReviewPolicyStats()
+    stats.record(None)
+    stats.record(PolicyDecision("syntax_error", "skip"), llm_calls_avoided=1, prompt_chars_avoided=5000)
+    stats.record(PolicyDecision("syntax_error", "targeted"), llm_calls_avoided=0, prompt_chars_avoided=4200)
+    snapshot = stats.stats()
+    assert snapshot["evaluated"] == 3 and snapshot["short_circuited"] == 2
+    assert snapshot["by_rule"] == {"syntax_error": {"skip": 1, "targeted": 1}}
+    assert snapshot["llm_calls_avoided"] == 1 and snapshot["prompt_chars_avoided"] == 9200
+
+
+if __name__ == "__main__":
+    test_rules_in_order()
+    test_syntax_rule_is_python_only()
+    test_per_user_policy_is_stored_with_learning_patterns()
+    test_deterministic_syntax_error_review()
+    test_targeted_prompt_is_small_and_windowed()
+    test_stats_count_savings()
+
+    print("=" * 60)
+    print("✅ Review policy tests completed!")
+    print("=" * 60)
@@ -0,0 +1,142 @@
+"""
+Test blob-less, sparse repository checkouts against local repositories
+"""
+import os
+import subprocess
+import tempfile
+
+import sparse_checkout
+from repo_discovery import iter_code_files
+from sparse_checkout import sparse_pattern, list_candidate_paths, checkout_paths, checkout_reviewable_paths
+from test_repo_cache import commit_files, git, make_remote, new_cache
+
+INCLUDE = ["*.py", "*.js"]
+EXCLUDE = ["node_modules/**", "assets/**"]
+FILES = {
+    "app.py": "print('app')\n",
+    "lib.js": "export const x = 1;\n",
+    "notes.md": "# notes\n",
+    "weird [1]*.py": "y = 2\n",
+    "spaced name.py": "z = 3\n",
+}
+
+
+def make_sparse_remote(files=FILES):
+    work, url = make_remote(files)
+    os.makedirs(os.path.join(work, "assets"))
+    with open(os.path.join(work, "assets", "model.bin"), "wb") as f:
+        f.write(os.urandom(200000))
+    git("add", "-A", cwd=work)
+    git("commit", "-q", "-m", "assets", cwd=work)
+    git("push", "-q", "origin", "HEAD", cwd=work)
+    bare = url[len("file://"):]
+    # Serve partial clones the way GitHub does
+    git("config", "uploadpack.allowFilter", "true", cwd=bare)
+    git("config", "uploadpack.allowAnySHA1InWant", "true", cwd=bare)
+    return url
+
+
+def checked_out(worktree):
+    listed = subprocess.run(["git", "ls-files", "-t"], cwd=worktree, capture_output=True, text=True).stdout
+    # "H" entries are present on disk, "S" entries were skipped by the sparse checkout
+    return sorted(line[2:] for line in listed.splitlines() if line.startswith("H ") and
+                  os.path.exists(os.path.join(worktree, line[2:])))
+
+
+def local_blobs(git_dir):
+    objects = subprocess.run(["git", "cat-file", "--batch-all-objects", "--batch-check=%(objecttype)"],
+                             cwd=git_dir, capture_output=True, text=True).stdout.split()
+    return objects.count("blob")
+
+
+def test_patterns_match_paths_literally():
+    assert sparse_pattern("src/app.py") == "/src/app.py"
+    assert sparse_pattern("weird [1]*.py") == "/weird\\ \\[1]\\*.py"
+
+
+def test_mirror_sparse_checkout_fetches_only_selected_blobs():
+    url = make_sparse_remote()
+    cache = new_cache()
+    worktree = cache.checkout(url, "main", INCLUDE, EXCLUDE, 2)
+    mirror = cache._path(cache._key(url), ".git")
+    files = checked_out(worktree)
+    print(f"  checked out: {files}")
+    # Two files needed plus one spare, in discovery's order
+    assert files == ["app.py", "lib.js", "spaced name.py"]
+    assert local_blobs(mirror) == 3
+    assert list(dict(iter_code_files(worktree, INCLUDE, EXCLUDE, 2))) == ["app.py", "lib.js"]
+    cache.release(worktree)
+
+    # A full checkout of the same partial mirror fetches the remaining blobs on demand
+    full = cache.checkout(url, "main")
+    assert "assets/model.bin" in checked_out(full)
+    cache.release(full)
+
+
+def test_sparse_checkout_of_blobless_clone():
+    url = make_sparse_remote()
+    clone = tempfile.mkdtemp(prefix="sparse_clone_")
+    git("clone", "-q", "--depth", "1", "--filter=blob:none", "--no-checkout", url, clone)
+    paths = list_candidate_paths(clone, "HEAD", INCLUDE, EXCLUDE, 50)
+    assert paths == ["app.py", "lib.js", "spaced name.py", "weird [1]*.py"]
+    checkout_paths(clone, paths)
+    assert checked_out(clone) == sorted(paths)
+    assert local_blobs(clone) == 4
+
+
+def test_candidates_follow_discovery_order():
+    work, url = make_remote({"z.py": "z = 1\n"})
+    for path in ("a/b/deep.py", "a/top.py", "B/upper.py"):
+        os.makedirs(os.path.join(work, os.path.dirname(path)), exist_ok=True)
+    commit_files(work, {"a/b/deep.py": "x\n", "a/top.py": "x\n", "B/upper.py": "x\n", "a.py": "x\n"}, "tree")
+    paths = list_candidate_paths(work, "HEAD", INCLUDE, EXCLUDE)
+    # A directory's files come before its subdirectories, as os.walk with sorted names visits them
+    assert paths == ["a.py", "z.py", "B/upper.py", "a/top.py", "a/b/deep.py"]
+    assert [path for path, _ in iter_code_files(work, INCLUDE, EXCLUDE, 50)] == [
+        "a.py", "z.py", os.path.join("B", "upper.py"), os.path.join("a", "top.py"), os.path.join("a", "b", "deep.py")]
+
+
+def test_sparse_selection_tops_up_rejected_files():
+    # The first candidates by name are empty, binary or not UTF-8, so discovery would drop them
+    files = {"a_empty.py": "", "b_binary.py": "\0\0\0", "d.py": "d = 1\n", "e.py": "e = 1\n",
+             "f.py": "f = 1\n", "g.py": "g = 1\n"}
+    work, _ = make_remote(files)
+    with open(os.path.join(work, "c_latin1.py"), "wb") as f:
+        f.write("caf\xe9 = 1\n".encode("latin-1"))
+    commit_files(work, {}, "latin-1")
+    git("config", "uploadpack.allowFilter", "true", cwd=work)
+
+    full = [path for path, _ in iter_code_files(work, INCLUDE, EXCLUDE, 3)]
+    assert full == ["d.py", "e.py", "f.py"]
+
+    clone = tempfile.mkdtemp(prefix="sparse_topup_")
+    git("clone", "-q", "--no-local", "--depth", "1", "--filter=blob:none", "--no-checkout", "file://" + work, clone)
+    old_ratio = sparse_checkout.SPARSE_OVERSELECT_RATIO
+    sparse_checkout.SPARSE_OVERSELECT_RATIO = 0
+    try:
+        selected = checkout_reviewable_paths(clone, clone, "HEAD", INCLUDE, EXCLUDE, 3)
+    finally:
+        sparse_checkout.SPARSE_OVERSELECT_RATIO = old_ratio
+    # Round one takes a-c (all rejected), round two d-f
+    assert selected == ["a_empty.py", "b_binary.py", "c_latin1.py", "d.py", "e.py", "f.py"]
+    assert [path for path, _ in iter_code_files(clone, INCLUDE, EXCLUDE, 3)] == full
+    assert local_blobs(clone) == 6
+
+    # Fewer reviewable files than max_files: everything matching is checked out, once
+    clone = tempfile.mkdtemp(prefix="sparse_topup_")
+    git("clone", "-q", "--no-local", "--depth", "1", "--filter=blob:none", "--no-checkout", "file://" + work, clone)
+    selected = checkout_reviewable_paths(clone, clone, "HEAD", INCLUDE, EXCLUDE, 50)
+    assert selected == sorted(list(files) + ["c_latin1.py"])
+    assert [path for path, _ in iter_code_files(clone, INCLUDE, EXCLUDE, 50)] == ["d.py", "e.py", "f.py", "g.py"]
+
+
+if __name__ == "__main__":
+    test_patterns_match_paths_literally()
+    test_mirror_sparse_checkout_fetches_only_selected_blobs()
+    test_sparse_checkout_of_blobless_clone()
+    test_candidates_follow_discovery_order()
+    test_sparse_selection_tops_up_rejected_files()
+
+    print("=" * 60)
+    print("✅ Sparse checkout tests completed!")
+    print("=" * 60)
@@ -0,0 +1,99 @@
+"""
+Tests for signed user claims and the token version cache: claim parsing, legacy and role
+tokens, revocation by version bump, TTL and the LRU bound.
+"""
+
+import time
+
+try:
+    from backend.token_claims import TokenClaims, TokenVersionCache, user_token_claims, parse_token_claims
+except ImportError:
+    from token_claims import TokenClaims, TokenVersionCache, user_token_claims, parse_token_claims
+
+
+class VersionLoader:
+    def __init__(self, version):
+        self.version = version
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.version
+
+
+def test_claims_round_trip():
+    payload = {**user_token_claims(7, "alice", 3), "exp": 1234}
+    assert parse_token_claims(payload) == TokenClaims(7, "alice", 3)
+
+
+def test_legacy_and_role_tokens_are_not_user_claims():
+    assert parse_token_claims({"sub": "alice"}) is None
+    assert parse_token_claims({"sub": "alice", "uid": "7", "ver": 0}) is None
+    assert parse_token_claims({**user_token_claims(7, "alice", 0), "role": "admin"}) is None
+    assert parse_token_claims({"uid": 7, "ver": 0}) is None
+
+
+def test_version_is_loaded_once_within_ttl():
+    cache = TokenVersionCache(ttl_seconds=60)
+    loader = VersionLoader(0)
+    claims = TokenClaims(1, "alice", 0)
+    assert cache.is_current(claims, loader) and cache.is_current(claims, loader)
+    assert loader.calls == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["rejected_tokens"] == 0
+
+
+def test_bump_revokes_older_tokens_at_once():
+    cache = TokenVersionCache(ttl_seconds=60)
+    loader = VersionLoader(0)
+    old = TokenClaims(1, "alice", 0)
+    assert cache.is_current(old, loader)
+    cache.set(1, 1)  # logout committed version 1
+    assert not cache.is_current(old, loader)
+    assert cache.is_current(TokenClaims(1, "alice", 1), loader)
+    # A slow load that read the old version can't undo the bump
+    cache.set(1, 0)
+    assert not cache.is_current(old, loader)
+    assert loader.calls == 1 and cache.stats()["rejected_tokens"] == 2
+
+
+def test_expired_version_is_reloaded():
+    cache = TokenVersionCache(ttl_seconds=0.01)
+    loader = VersionLoader(0)
+    claims = TokenClaims(1, "alice", 0)
+    assert cache.is_current(claims, loader)
+    # Another process bumped the version; it is seen once the entry expires
+    loader.version = 1
+    time.sleep(0.02)
+    assert not cache.is_current(claims, loader)
+    assert loader.calls == 2
+
+
+def test_deleted_users_are_rejected_and_not_cached():
+    cache = TokenVersionCache(ttl_seconds=60)
+    loader = VersionLoader(None)
+    assert not cache.is_current(TokenClaims(1, "ghost", 0), loader)
+    assert not cache.is_current(TokenClaims(1, "ghost", 0), loader)
+    assert loader.calls == 2 and cache.stats()["entries"] == 0
+
+
+def test_cache_is_bounded_lru():
+    cache = TokenVersionCache(max_entries=2, ttl_seconds=60)
+    loaders = {user_id: VersionLoader(0) for user_id in (1, 2, 3)}
+    for user_id in (1, 2, 1, 3, 1, 2):
+        cache.current(user_id, loaders[user_id])
+    assert loaders[1].calls == 1 and loaders[2].calls == 2
+    assert cache.stats()["entries"] == 2
+
+
+if __name__ == "__main__":
+    test_claims_round_trip()
+    test_legacy_and_role_tokens_are_not_user_claims()
+    test_version_is_loaded_once_within_ttl()
+    test_bump_revokes_older_tokens_at_once()
+    test_expired_version_is_reloaded()
+    test_deleted_users_are_rejected_and_not_cached()
+    test_cache_is_bounded_lru()
+
+    print("=" * 60)
+    print("✅ Token claims tests completed!")
+    print("=" * 60)
@@ -0,0 +1,114 @@
+"""
+Tests for the per-user context cache: TTL, LRU bound, invalidation by username or id,
+and loads that race an invalidation.
+"""
+
+import time
+from types import SimpleNamespace
+
+try:
+    from backend.user_context import UserContext, UserContextCache
+except ImportError:
+    from user_context import UserContext, UserContextCache
+
+
+def make_context(user_id: int, suggestion: str = None) -> UserContext:
+    return UserContext(SimpleNamespace(id=user_id), SimpleNamespace(security_analysis=True), suggestion)
+
+
+class CountingLoader:
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return make_context(self.user_id, f"load {self.calls}")
+
+
+def test_context_is_loaded_once_within_ttl():
+    cache = UserContextCache(ttl_seconds=60)
+    loader = CountingLoader(1)
+    first = cache.get("alice", loader)
+    assert cache.get("alice", loader) is first
+    assert loader.calls == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_expired_context_is_reloaded():
+    cache = UserContextCache(ttl_seconds=0.01)
+    loader = CountingLoader(1)
+    cache.get("alice", loader)
+    time.sleep(0.02)
+    assert cache.get("alice", loader).latest_suggestion == "load 2"
+
+
+def test_invalidate_by_username_or_id():
+    cache = UserContextCache(ttl_seconds=60)
+    alice, bob = CountingLoader(1), CountingLoader(2)
+    cache.get("alice", alice)
+    cache.get("bob", bob)
+    cache.invalidate(user_id=1)
+    cache.invalidate(username="bob")
+    cache.get("alice", alice)
+    cache.get("bob", bob)
+    assert (alice.calls, bob.calls) == (2, 2)
+    # Invalidating a user who isn't cached is harmless
+    cache.invalidate(user_id=99)
+    assert cache.stats()["invalidations"] == 3
+
+
+def test_unknown_users_are_not_cached():
+    cache = UserContextCache(ttl_seconds=60)
+    calls = []
+    assert cache.get("ghost", lambda: calls.append(1)) is None
+    assert cache.get("ghost", lambda: calls.append(1)) is None
+    assert len(calls) == 2 and cache.stats()["entries"] == 0
+
+
+def test_load_racing_an_invalidation_is_not_stored():
+    cache = UserContextCache(ttl_seconds=60)
+
+    def stale_loader():
+        # The user's preferences change (and are invalidated) while this load is in flight
+        cache.invalidate(username="alice")
+        return make_context(1, "stale")
+
+    assert cache.get("alice", stale_loader).latest_suggestion == "stale"
+    loader = CountingLoader(1)
+    assert cache.get("alice", loader).latest_suggestion == "load 1"
+
+
+def test_cache_is_bounded_lru():
+    cache = UserContextCache(max_entries=2, ttl_seconds=60)
+    loaders = {name: CountingLoader(i) for i, name in enumerate(("a", "b", "c"))}
+    cache.get("a", loaders["a"])
+    cache.get("b", loaders["b"])
+    cache.get("a", loaders["a"])  # a is now the most recently used
+    cache.get("c", loaders["c"])
+    cache.get("a", loaders["a"])
+    cache.get("b", loaders["b"])
+    assert loaders["a"].calls == 1 and loaders["b"].calls == 2
+    assert cache.stats()["entries"] == 2
+
+
+def test_disabled_cache_always_loads():
+    cache = UserContextCache(enabled=False)
+    loader = CountingLoader(1)
+    cache.get("alice", loader)
+    cache.get("alice", loader)
+    assert loader.calls == 2
+
+
+if __name__ == "__main__":
+    test_context_is_loaded_once_within_ttl()
+    test_expired_context_is_reloaded()
+    test_invalidate_by_username_or_id()
+    test_unknown_users_are_not_cached()
+    test_load_racing_an_invalidation_is_not_stored()
+    test_cache_is_bounded_lru()
+    test_disabled_cache_always_loads()
+
+    print("=" * 60)
+    print("✅ User context cache tests completed!")
+    print("=" * 60)
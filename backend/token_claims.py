@@ -0,0 +1,108 @@
+"""
+Signed User Claims
+Access tokens carry the user's id and token version next to the username, so endpoints that
+only need to know who is calling can trust the signature instead of loading the user row.
+Logout bumps the user's token version, which invalidates every token issued before it; the
+current version per user is cached for a short TTL, and the process that bumps it updates
+its cache at once.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, NamedTuple
+
+TOKEN_VERSION_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_VERSION_CACHE_TTL_SECONDS", "30"))
+TOKEN_VERSION_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_VERSION_CACHE_MAX_ENTRIES", "4096"))
+
+
+class TokenClaims(NamedTuple):
+    user_id: int
+    username: str
+    version: int
+
+
+def user_token_claims(user_id: int, username: str, version: int) -> dict:
+    """JWT payload for a user token (exp is added by create_access_token)"""
+    return {"sub": username, "uid": user_id, "ver": version}
+
+
+def parse_token_claims(payload: dict) -> Optional[TokenClaims]:
+    """TokenClaims from a decoded payload, or None for tokens issued before uid/ver were added.
+    Role tokens (admin) are never user tokens."""
+    username = payload.get("sub")
+    user_id = payload.get("uid")
+    version = payload.get("ver")
+    if not isinstance(username, str) or payload.get("role"):
+        return None
+    if not isinstance(user_id, int) or not isinstance(version, int):
+        return None
+    return TokenClaims(user_id, username, version)
+
+
+class TokenVersionCache:
+    """Thread-safe LRU of the current token version per user id, with TTL"""
+
+    def __init__(self, max_entries: int = TOKEN_VERSION_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = TOKEN_VERSION_CACHE_TTL_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._versions: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def current(self, user_id: int, loader: Callable[[], Optional[int]]) -> Optional[int]:
+        """The user's token version, from cache or loader() (None: the user no longer exists)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._versions.get(user_id)
+            if entry is not None and now - entry[0] <= self.ttl_seconds:
+                self._versions.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        version = loader()
+        if version is not None:
+            self.set(user_id, version)
+        return version
+
+    def is_current(self, claims: TokenClaims, loader: Callable[[], Optional[int]]) -> bool:
+        """Whether a token's version is still the user's current one"""
+        valid = self.current(claims.user_id, loader) == claims.version
+        if not valid:
+            with self._lock:
+                self.rejected += 1
+        return valid
+
+    def set(self, user_id: int, version: int):
+        """Record a version; call after a bump is committed so this process rejects old tokens at once.
+        Versions only move forward, so a slow load can't bring back an older one."""
+        with self._lock:
+            entry = self._versions.get(user_id)
+            if entry is not None and entry[1] > version:
+                version = entry[1]
+            self._versions[user_id] = (time.monotonic(), version)
+            self._versions.move_to_end(user_id)
+            while len(self._versions) > self.max_entries:
+                self._versions.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._versions.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._versions),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "rejected_tokens": self.rejected,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,103 @@
+"""
+User Context Cache
+Every authenticated request resolves its user, and every review also loads the user's
+preferences and latest improvement suggestion. This caches the three together per username
+for a short TTL, so a burst of requests costs one set of queries. Writes that change any of
+them invalidate the entry; the TTL bounds staleness across worker processes.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+USER_CONTEXT_CACHE_ENABLED = os.getenv("USER_CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+USER_CONTEXT_CACHE_TTL_SECONDS = float(os.getenv("USER_CONTEXT_CACHE_TTL_SECONDS", "30"))
+USER_CONTEXT_CACHE_MAX_ENTRIES = int(os.getenv("USER_CONTEXT_CACHE_MAX_ENTRIES", "1024"))
+
+
+@dataclass(frozen=True)
+class UserContext:
+    """Detached rows: read them, don't modify or re-attach them (writes load fresh rows)"""
+    user: Any
+    preferences: Any
+    latest_suggestion: Optional[str]
+
+
+class UserContextCache:
+    """Thread-safe LRU of UserContext by username, with TTL and explicit invalidation"""
+
+    def __init__(self, max_entries: int = USER_CONTEXT_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = USER_CONTEXT_CACHE_TTL_SECONDS, enabled: bool = True):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._usernames: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a load that started before one is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, username: str, loader: Callable[[], Optional[UserContext]]) -> Optional[UserContext]:
+        """The cached context, or loader()'s result (stored unless an invalidation raced the load).
+        A None result (unknown user) is never cached."""
+        if not self.enabled:
+            return loader()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and now - entry[0] <= self.ttl_seconds:
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        context = loader()
+        if context is None:
+            return None
+        with self._lock:
+            if generation == self._generation:
+                self._entries[username] = (time.monotonic(), context)
+                self._entries.move_to_end(username)
+                self._usernames[context.user.id] = username
+                while len(self._entries) > self.max_entries:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._usernames.pop(evicted.user.id, None)
+        return context
+
+    def invalidate(self, username: Optional[str] = None, user_id: Optional[int] = None):
+        """Drop a user's entry by username or id; call after the change is committed"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            if username is None and user_id is not None:
+                username = self._usernames.get(user_id)
+            entry = self._entries.pop(username, None) if username is not None else None
+            if entry is not None:
+                self._usernames.pop(entry[1].user.id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._usernames.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -15,6 +15,9 @@ const API_BASE = process.env.NODE_ENV === 'production'
   ? '' // Relative URL - same server
   : 'http://localhost:8000';
 
+// Must not exceed the backend's REVIEW_BATCH_MAX_FILES (20 by default); larger uploads are sent in several batches
+const REVIEW_BATCH_MAX_FILES = 20;
+
 const CodeReviewApp = () => {
   const navigate = useNavigate();
   const [selectedRole, setSelectedRole] = useState(null);
@@ -34,6 +37,8 @@ const CodeReviewApp = () => {
   const [currentReviewIndex, setCurrentReviewIndex] = useState(0);
   const [selectedReview, setSelectedReview] = useState(null);
   const [pastReviews, setPastReviews] = useState([]);
+  const [pastReviewsCursor, setPastReviewsCursor] = useState(null);
+  const loadingMorePastReviews = useRef(false);
 
   const [showHistory, setShowHistory] = useState(false);
   const [showDropdown, setShowDropdown] = useState(false);
@@ -92,6 +97,10 @@ const CodeReviewApp = () => {
   };
 
   const handleLogout = () => {
+    // Revoke the token server-side; the local copy is cleared either way
+    if (token) {
+      fetch(API_BASE + '/logout', { method: 'POST', headers: { Authorization: `Bearer ${token}` } }).catch(() => {});
+    }
     setIsAuthenticated(false);
     setUsername('');
     setToken(null);
@@ -105,10 +114,33 @@ const CodeReviewApp = () => {
     if (!authToken) return;
     try {
       const resp = await fetch(API_BASE + '/past-reviews', { headers: { Authorization: `Bearer ${authToken}` } });
-      if (resp.ok) setPastReviews(await resp.json());
+      if (resp.ok) {
+        setPastReviews(await resp.json());
+        setPastReviewsCursor(resp.headers.get('X-Next-Cursor'));
+      }
     } catch (e) { /* ignore */ }
   };
 
+  // Next page of history, fetched when the list is scrolled near its end
+  const loadMorePastReviews = async () => {
+    if (!token || !pastReviewsCursor || loadingMorePastReviews.current) return;
+    loadingMorePastReviews.current = true;
+    try {
+      const resp = await fetch(API_BASE + `/past-reviews?cursor=${encodeURIComponent(pastReviewsCursor)}`, { headers: { Authorization: `Bearer ${token}` } });
+      if (resp.ok) {
+        const page = await resp.json();
+        setPastReviews(prev => [...prev, ...page.filter(r => !prev.some(p => p.id === r.id))]);
+        setPastReviewsCursor(resp.headers.get('X-Next-Cursor'));
+      }
+    } catch (e) { /* ignore */ }
+    loadingMorePastReviews.current = false;
+  };
+
+  const handleHistoryScroll = (e) => {
+    const el = e.currentTarget;
+    if (el.scrollHeight - el.scrollTop - el.clientHeight < 120) loadMorePastReviews();
+  };
+
   const fetchUserPreferences = async (overrideToken) => {
     const authToken = overrideToken || token;
     if (!authToken) return;
@@ -190,17 +222,22 @@ const CodeReviewApp = () => {
     setIsLoading(true);
     try {
       if (selectedFiles.length) {
-        const results = [];
-        for (const f of selectedFiles) {
-          try {
-            const resp = await fetch(API_BASE + '/generate-review', { method: 'POST', headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` }, body: JSON.stringify({ code: f.content, filename: f.name }) });
-            if (!resp.ok) throw new Error(await resp.text());
-            const data = await resp.json();
-            results.push({ id: data.id || `${Date.now()}-${Math.random().toString(36).slice(2,8)}`, title: data.title || `Review: ${f.name}`, filename: f.name, comment: f.content, ai_feedback: data.review || data.ai_feedback || '', optimized_code: data.optimized_code, explanation: data.explanation, security_issues: data.security_issues, created_at: new Date().toISOString() });
-          } catch (err) {
-            results.push({ id: `error-${Date.now()}-${Math.random().toString(36).slice(2,8)}`, title: `Error: ${f.name}`, filename: f.name, comment: f.content, ai_feedback: `Failed: ${err.message}`, optimized_code: '', explanation: '', security_issues: '', created_at: new Date().toISOString(), isError: true });
-          }
+        // One request per REVIEW_BATCH_MAX_FILES files: the backend reviews each batch concurrently and reports each file's outcome
+        const reviews = [];
+        for (let start = 0; start < selectedFiles.length; start += REVIEW_BATCH_MAX_FILES) {
+          const chunk = selectedFiles.slice(start, start + REVIEW_BATCH_MAX_FILES);
+          const resp = await fetch(API_BASE + '/generate-reviews/batch', { method: 'POST', headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` }, body: JSON.stringify({ files: chunk.map(f => ({ code: f.content, filename: f.name })) }) });
+          if (!resp.ok) throw new Error(await resp.text());
+          const batch = await resp.json();
+          reviews.push(...batch.reviews.map(data => ({ ...data, file_index: start + data.file_index })));
         }
+        const results = reviews.map((data) => {
+          const f = selectedFiles[data.file_index];
+          if (data.error) {
+            return { id: `error-${Date.now()}-${Math.random().toString(36).slice(2,8)}`, title: `Error: ${f.name}`, filename: f.name, comment: f.content, ai_feedback: `Failed: ${data.error}`, optimized_code: '', explanation: '', security_issues: '', created_at: new Date().toISOString(), isError: true };
+          }
+          return { id: data.id || `${Date.now()}-${Math.random().toString(36).slice(2,8)}`, title: data.title || `Review: ${f.name}`, filename: f.name, comment: f.content, ai_feedback: data.review || data.ai_feedback || '', optimized_code: data.optimized_code, explanation: data.explanation, security_issues: data.security_issues, created_at: new Date().toISOString() };
+        });
         setReviewList(results);
         setCurrentReviewIndex(0);
         setPastReviews(prev => [...results, ...prev]);
@@ -320,7 +357,7 @@ const CodeReviewApp = () => {
   const handleSelectReview = async (review) => {
     if (!token) return;
     try {
-      const resp = await fetch(API_BASE + `/past-reviews/${review.id}`, { headers: { Authorization: `Bearer ${token}` } });
+      const resp = await fetch(API_BASE + `/past-reviews/${review.id}?include_files=false`, { headers: { Authorization: `Bearer ${token}` } });
       if (resp.ok) { const full = await resp.json(); setSelectedReview(full); setReviewList([]); setCurrentReviewIndex(0); } else { setSelectedReview(review); }
     } catch { setSelectedReview(review); }
   };
@@ -452,7 +489,7 @@ const CodeReviewApp = () => {
               <h3 className="text-lg font-semibold">History</h3>
               <button onClick={() => setShowHistory(false)} className="icon-btn" aria-label="Close history">&times;</button>
             </div>
-            <div className="overflow-y-auto px-5 py-4 space-y-2">
+            <div className="overflow-y-auto px-5 py-4 space-y-2" onScroll={handleHistoryScroll}>
               {pastReviews.length === 0 && <div className="text-sm text-muted">No past reviews yet.</div>}
               {pastReviews.map(r => (
                 <div key={r.id} onClick={() => { setShowHistory(false); handleSelectReview(r); }} className="p-3 rounded-md hover:bg-white/5 cursor-pointer transition-base border border-transparent hover:border-white/10">
@@ -460,6 +497,7 @@ const CodeReviewApp = () => {
                   {r.created_at && <div className="text-xs text-muted mt-1">{new Date(r.created_at).toLocaleString()}</div>}
                 </div>
               ))}
+              {pastReviewsCursor && <button onClick={loadMorePastReviews} className="btn btn-outline w-full">Load more</button>}
             </div>
           </div>
         </div>